@@ -0,0 +1,269 @@
+# bot/analytics.py
+"""
+Vektorisierte Trade- und Equity-Analytics über trades.csv / equity_curve.csv
+(und Fill-Listen aus Reports/Backtests).
+
+Alles arbeitet auf Spalten-Arrays (NumPy), keine Python-Schleifen pro Fill:
+- fifo_realized:   FIFO-PnL für Long UND Short (inkl. Flips) per np.interp
+                   über die kumulierte Kostenkurve der offenen Lots
+- drawdown:        Drawdown-Serie (absolut / %)
+- breakdown:       PnL/Anzahl/Trefferquote je Stunde oder Seite (np.bincount)
+- trade_stats:     Expectancy, Profit-Faktor, Sharpe/Sortino
+- excursions:      MAE/MFE-Verteilungen (Perzentile)
+
+CLI:
+  python -m bot.analytics --trades logs/trades.csv --equity logs/equity_curve.csv
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+_SIDE = {"LONG": 1, "Buy": 1, "BUY": 1, "SHORT": -1, "Sell": -1, "SELL": -1}
+
+
+# --------------------------------------------------------------------------- #
+#                                  Laden                                      #
+# --------------------------------------------------------------------------- #
+
+def _ts_seconds(col: pd.Series) -> np.ndarray:
+    t = pd.to_datetime(col, utc=True, errors="coerce")
+    # auflösungsunabhängig (ns/us/s je nach pandas-Version)
+    secs = (t - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+    return secs.fillna(0).to_numpy(dtype=np.int64)
+
+
+def _side_codes(col) -> np.ndarray:
+    s = pd.Series(col, dtype="object").map(_SIDE)
+    return s.fillna(0).to_numpy(dtype=np.int8)
+
+
+def load_trades(path: str = "logs/trades.csv") -> Dict[str, np.ndarray]:
+    """trades.csv (Broker) → Spalten-Arrays; leere MFE/MAE-Felder werden NaN."""
+    df = pd.read_csv(path)
+    num = ["entry_price", "exit_price", "size", "fee", "pnl_abs", "pnl_pct",
+           "max_fav_pct", "max_adv_pct", "bars_open"]
+    out = {c: pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=np.float64)
+           for c in num if c in df}
+    out["ts_open"] = _ts_seconds(df["ts_open"])
+    out["ts_close"] = _ts_seconds(df["ts_close"])
+    out["side"] = _side_codes(df["side"])
+    if "reason" in df:
+        out["reason"] = df["reason"].astype(str).to_numpy()
+    return out
+
+
+def load_equity(path: str = "logs/equity_curve.csv") -> Dict[str, np.ndarray]:
+    df = pd.read_csv(path)
+    return {"ts": _ts_seconds(df["ts"]),
+            "equity": pd.to_numeric(df["equity"], errors="coerce").to_numpy(dtype=np.float64)}
+
+
+def fills_to_arrays(fills: Iterable[dict]) -> Dict[str, np.ndarray]:
+    """Fill-Dicts (daily_report.fills_24h: ts/side/price/qty/fee) → Spalten-Arrays."""
+    df = pd.DataFrame(list(fills))
+    if df.empty:
+        z = np.zeros(0)
+        return {"ts": z.astype(np.int64), "side": z.astype(np.int8), "price": z, "qty": z, "fee": z}
+    return {
+        "ts": (df["ts"] if "ts" in df else pd.Series(0, index=df.index)).to_numpy(dtype=np.int64),
+        "side": _side_codes(df["side"]),
+        "price": df["price"].to_numpy(dtype=np.float64),
+        "qty": df["qty"].to_numpy(dtype=np.float64),
+        "fee": (df["fee"] if "fee" in df else pd.Series(0.0, index=df.index)).to_numpy(dtype=np.float64),
+    }
+
+
+# --------------------------------------------------------------------------- #
+#                                FIFO-PnL                                     #
+# --------------------------------------------------------------------------- #
+
+def _matched_cost(open_qty: np.ndarray, open_px: np.ndarray, close_qty: np.ndarray) -> np.ndarray:
+    """
+    Einstandskosten der je Fill geschlossenen Menge nach FIFO: die kumulierte
+    Kostenkurve der Lots (Menge → Kosten) ist stückweise linear, geschlossene
+    Mengen verbrauchen sie von vorne – Kosten = C(Cl_i) - C(Cl_{i-1}).
+    """
+    m = open_qty > 0
+    xp = np.concatenate(([0.0], np.cumsum(open_qty[m])))
+    fp = np.concatenate(([0.0], np.cumsum(open_qty[m] * open_px[m])))
+    cl = np.cumsum(close_qty)
+    c = np.interp(cl, xp, fp)
+    return np.diff(np.concatenate(([0.0], c)))
+
+
+def fifo_realized(side: np.ndarray, price: np.ndarray, qty: np.ndarray,
+                  eps: float = 1e-12) -> np.ndarray:
+    """
+    Realisierte PnL je Fill (FIFO) für Long und Short, inkl. Positions-Flips.
+    side: +1 Buy / −1 Sell, qty > 0. Gebühren nicht enthalten.
+    """
+    side = np.asarray(side, dtype=np.float64)
+    price = np.asarray(price, dtype=np.float64)
+    qty = np.abs(np.asarray(qty, dtype=np.float64))
+    if qty.size == 0:
+        return np.zeros(0)
+
+    q = side * qty
+    pos_after = np.cumsum(q)
+    pos_before = pos_after - q
+    pos_before = np.where(np.abs(pos_before) < eps, 0.0, pos_before)
+
+    reducing = (pos_before != 0) & (np.sign(q) != np.sign(pos_before))
+    close = np.where(reducing, np.minimum(qty, np.abs(pos_before)), 0.0)
+    opening = qty - close
+
+    open_long = np.where(side > 0, opening, 0.0)
+    open_short = np.where(side < 0, opening, 0.0)
+    close_long = np.where(pos_before > 0, close, 0.0)    # Sells schließen Longs
+    close_short = np.where(pos_before < 0, close, 0.0)   # Buys schließen Shorts
+
+    cost_long = _matched_cost(open_long, price, close_long)
+    cost_short = _matched_cost(open_short, price, close_short)
+    return (close_long * price - cost_long) + (cost_short - close_short * price)
+
+
+def fifo_pnl(fills: Iterable[dict] | Dict[str, np.ndarray], include_fees: bool = False) -> float:
+    """Summe FIFO-PnL aus Fill-Dicts oder Spalten-Arrays."""
+    a = fills if isinstance(fills, dict) else fills_to_arrays(fills)
+    if len(a["qty"]) == 0:
+        return 0.0
+    total = float(fifo_realized(a["side"], a["price"], a["qty"]).sum())
+    if include_fees:
+        total -= float(np.sum(a["fee"]))
+    return total
+
+
+# --------------------------------------------------------------------------- #
+#                         Equity / Kennzahlen                                 #
+# --------------------------------------------------------------------------- #
+
+def drawdown(equity: np.ndarray) -> Dict[str, np.ndarray | float]:
+    eq = np.asarray(equity, dtype=np.float64)
+    if eq.size == 0:
+        return {"dd_abs": eq, "dd_pct": eq, "max_dd_abs": 0.0, "max_dd_pct": 0.0}
+    peak = np.maximum.accumulate(eq)
+    dd_abs = eq - peak
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dd_pct = np.where(peak != 0, dd_abs / peak * 100.0, 0.0)
+    return {"dd_abs": dd_abs, "dd_pct": dd_pct,
+            "max_dd_abs": float(dd_abs.min()), "max_dd_pct": float(dd_pct.min())}
+
+
+def sharpe(returns: np.ndarray, periods_per_year: float = 365.0) -> Optional[float]:
+    r = np.asarray(returns, dtype=np.float64)
+    r = r[np.isfinite(r)]
+    if r.size < 2:
+        return None
+    sd = r.std(ddof=1)
+    return float(r.mean() / sd * math.sqrt(periods_per_year)) if sd > 0 else None
+
+
+def sortino(returns: np.ndarray, periods_per_year: float = 365.0) -> Optional[float]:
+    r = np.asarray(returns, dtype=np.float64)
+    r = r[np.isfinite(r)]
+    if r.size < 2:
+        return None
+    downside = np.minimum(r, 0.0)
+    dd = math.sqrt(float(np.mean(downside ** 2)))
+    return float(r.mean() / dd * math.sqrt(periods_per_year)) if dd > 0 else None
+
+
+def trade_stats(pnl: np.ndarray, periods_per_year: float = 365.0) -> Dict[str, Optional[float]]:
+    """Expectancy, Trefferquote, Profit-Faktor, Sharpe/Sortino je Trade."""
+    p = np.asarray(pnl, dtype=np.float64)
+    p = p[np.isfinite(p)]
+    n = int(p.size)
+    if n == 0:
+        return {"trades": 0, "expectancy": None, "win_rate": None, "avg_win": None,
+                "avg_loss": None, "profit_factor": None, "sharpe": None, "sortino": None, "total": 0.0}
+    wins, losses = p[p > 0], p[p < 0]
+    gross_loss = -losses.sum()
+    return {
+        "trades": n,
+        "total": float(p.sum()),
+        "expectancy": float(p.mean()),
+        "win_rate": float(wins.size / n),
+        "avg_win": float(wins.mean()) if wins.size else None,
+        "avg_loss": float(losses.mean()) if losses.size else None,
+        "profit_factor": float(wins.sum() / gross_loss) if gross_loss > 0 else None,
+        "sharpe": sharpe(p, periods_per_year),
+        "sortino": sortino(p, periods_per_year),
+    }
+
+
+def breakdown(trades: Dict[str, np.ndarray], by: str = "hour") -> Dict[str, Dict[str, float]]:
+    """PnL-Summe, Anzahl und Trefferquote je UTC-Stunde (ts_open) oder je Seite."""
+    pnl = np.nan_to_num(trades["pnl_abs"])
+    if by == "hour":
+        keys = (trades["ts_open"] // 3600 % 24).astype(np.int64)
+        labels = {i: f"{i:02d}" for i in range(24)}
+        size = 24
+    elif by == "side":
+        keys = (trades["side"].astype(np.int64) + 1) // 2   # −1 → 0 (SHORT), +1 → 1 (LONG)
+        labels = {0: "SHORT", 1: "LONG"}
+        size = 2
+    else:
+        raise ValueError("by muss 'hour' oder 'side' sein")
+    cnt = np.bincount(keys, minlength=size)
+    tot = np.bincount(keys, weights=pnl, minlength=size)
+    win = np.bincount(keys, weights=(pnl > 0).astype(np.float64), minlength=size)
+    return {labels[i]: {"trades": int(cnt[i]), "pnl": float(tot[i]),
+                        "win_rate": float(win[i] / cnt[i])}
+            for i in range(size) if cnt[i]}
+
+
+def excursions(trades: Dict[str, np.ndarray],
+               q: tuple = (5, 25, 50, 75, 95)) -> Dict[str, Optional[Dict[str, float]]]:
+    """Perzentile von max_fav_pct (MFE) und max_adv_pct (MAE); leere Spalten → None."""
+    out = {}
+    for name, col in (("mfe_pct", "max_fav_pct"), ("mae_pct", "max_adv_pct")):
+        v = trades.get(col)
+        v = v[np.isfinite(v)] if v is not None else np.zeros(0)
+        out[name] = ({f"p{p}": float(x) for p, x in zip(q, np.percentile(v, q))} if v.size else None)
+    return out
+
+
+def summary(trades: Optional[Dict[str, np.ndarray]] = None,
+            equity: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, object]:
+    out: Dict[str, object] = {}
+    if trades is not None and len(trades.get("pnl_abs", [])):
+        out["stats"] = trade_stats(trades["pnl_abs"])
+        out["fees"] = float(np.nansum(trades.get("fee", np.zeros(0))))
+        out["by_side"] = breakdown(trades, "side")
+        out["by_hour"] = breakdown(trades, "hour")
+        out["excursions"] = excursions(trades)
+    if equity is not None and len(equity["equity"]):
+        dd = drawdown(equity["equity"])
+        eq = equity["equity"]
+        rets = np.diff(eq) / eq[:-1] if eq.size > 1 else np.zeros(0)
+        out["equity"] = {"start": float(eq[0]), "end": float(eq[-1]),
+                         "max_dd_abs": dd["max_dd_abs"], "max_dd_pct": dd["max_dd_pct"],
+                         "sharpe_per_point": sharpe(rets, 1.0), "sortino_per_point": sortino(rets, 1.0)}
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Trade-/Equity-Analytics")
+    ap.add_argument("--trades", default="logs/trades.csv")
+    ap.add_argument("--equity", default="logs/equity_curve.csv")
+    args = ap.parse_args(argv)
+    trades = equity = None
+    try:
+        trades = load_trades(args.trades)
+    except FileNotFoundError:
+        pass
+    try:
+        equity = load_equity(args.equity)
+    except FileNotFoundError:
+        pass
+    print(json.dumps(summary(trades, equity), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
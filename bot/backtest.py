@@ -0,0 +1,499 @@
+# bot/backtest.py
+"""
+Vektorisierter Bar-Backtest für MomScalp (strategies/mom_s.py).
+
+Signale werden für die ganze Historie auf einmal berechnet (gleiche Logik wie
+MomScalp.generate mit Bar t als "laufender" Kerze: N-High/Low über t-N..t-1,
+Referenz-Close t bzw. t-1, Range-Guard, Tie-Handling, Short-Freigabe).
+Die Ausführung folgt run_strategy.place_order_and_stops:
+
+    Einstieg   Market zur Open der Folgebar (+ Slippage)
+    TP / SL    Distanzen vom Signal, um den Einstiegspreis gelegt
+    Ausstieg   erste Bar, deren High/Low TP oder SL berührt; berühren beide
+               dieselbe Bar, gilt konservativ der SL (Zähler "ambiguous")
+    Position   immer nur eine (One-Way); neue Signale erst ab der Exit-Bar
+
+Rollende N-High/Low-Fenster liegen in einem FeatureCache, damit Parameter-
+Sweeps (z. B. bot.walkforward) sie je Lookback nur einmal berechnen.
+
+Intrabar (optional): mit einem Intrabar-Objekt (1m-Kerzen oder zu Sekunden-
+Bars aggregierte Trades) werden die Bars, auf denen die Bar-Sicht nicht
+entscheiden kann – TP und SL in derselben Bar, Stops erst nach Latenz aktiv –
+auf dem feinen Pfad aufgelöst. Je Grob-Bar liegt der Index-Bereich [lo, hi)
+der feinen Bars vorberechnet vor; alle anderen Trades bleiben auf Bar-Ebene.
+Das ExecModel bildet place_order_and_stops nach (Entry-Latenz Market → Position
+sichtbar, Stop-Latenz bis set_trading_stop, Slippage) und lässt sich aus dem
+Order-Journal schätzen.
+
+    bars = Bars.from_candles(open_candles("data/BTCUSDT_15m.candles"))
+    res = run(bars, {"lookback": 20, "eps_break": 0.003, "use_prev_close": True})
+    res["stats"], res["trades"]["pnl_pct"]
+
+    ib = Intrabar(bars, Bars.from_candles(open_candles("data/BTCUSDT_1m.candles")))
+    res = run(bars, params, intrabar=ib, exec_model=ExecModel.from_journal())
+
+CLI:
+  python -m bot.backtest --candles data/BTCUSDT_15m.candles --lookback 20 --eps 0.003
+  python -m bot.backtest --candles data/BTCUSDT_15m.candles --fine-candles data/BTCUSDT_1m.candles \\
+      --exec-journal logs/journal/orders.jsonl
+  python -m bot.backtest --candles data/BTCUSDT_15m.candles --fine-rec logs/rec/session.jsonl.gz --fine-step-ms 1000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from .analytics import drawdown, trade_stats
+
+# Distanzen wie MomScalp.generate
+TP_PCT, TP_RANGE = 0.007, 0.50
+SL_PCT, SL_RANGE = 0.004, 0.30
+
+DEFAULT_PARAMS: Dict[str, Any] = {
+    "lookback": 20,
+    "eps_break": 0.0,
+    "use_prev_close": False,
+    "allow_short": True,
+    "min_range": 0.0,
+    "tie_side": "",
+}
+
+
+@dataclass(frozen=True)
+class Costs:
+    """Gebühr je Seite und Slippage in Basispunkten (Default: Bybit-Taker 5.5 bp)."""
+    fee_bps: float = 5.5
+    slip_bps: float = 1.0
+
+
+@dataclass(frozen=True)
+class ExecModel:
+    """
+    Ausführung wie run_strategy.place_order_and_stops:
+      entry_latency_ms  Signal/Bar-Open → Market-Entry gefüllt (submit + wait_for auf Position)
+      stop_latency_ms   Fill → TP/SL aktiv (set_trading_stop); davor ist die Position ungeschützt
+      slip_bps          Slippage je Seite; None → Costs.slip_bps
+    Latenzen wirken nur mit Intrabar-Daten (Auflösung = Schrittweite der feinen Bars).
+    """
+    entry_latency_ms: float = 0.0
+    stop_latency_ms: float = 0.0
+    slip_bps: Optional[float] = None
+
+    @classmethod
+    def from_journal(cls, path: Optional[str] = None, q: float = 50.0) -> "ExecModel":
+        """
+        Aus dem Order-Journal (bot.journal): Quantil q von submitted→filled,
+        filled→stops_set und der Fill-Abweichung avgPrice vs. Signalpreis (bp, ≥ 0).
+        """
+        from .journal import JOURNAL_PATH, iter_records
+        seq: Dict[str, Dict[str, Any]] = {}
+        for rec in iter_records(path or JOURNAL_PATH):
+            iid, ev = rec.get("id"), rec.get("ev")
+            if ev == "intent":
+                if rec.get("kind") == "entry":
+                    seq[iid] = {"side": rec.get("side"), "price": (rec.get("meta") or {}).get("price")}
+            elif iid in seq and ev in ("submitted", "filled", "stops_set") and ev not in seq[iid]:
+                seq[iid][ev] = rec.get("ts")
+                if ev == "filled":
+                    seq[iid]["avg"] = rec.get("avgPrice")
+        ent, stp, slp = [], [], []
+        for r in seq.values():
+            if r.get("submitted") is not None and r.get("filled") is not None:
+                ent.append((r["filled"] - r["submitted"]) * 1000.0)
+            if r.get("filled") is not None and r.get("stops_set") is not None:
+                stp.append((r["stops_set"] - r["filled"]) * 1000.0)
+            try:
+                px, avg = float(r["price"]), float(r["avg"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if px > 0:
+                s = 1.0 if r.get("side") == "Buy" else -1.0
+                slp.append(s * (avg - px) / px * 1e4)
+
+        def _q(x):
+            return float(np.percentile(x, q)) if x else None
+
+        return cls(round(max(0.0, _q(ent) or 0.0), 1), round(max(0.0, _q(stp) or 0.0), 1),
+                   None if not slp else round(max(0.0, _q(slp)), 3))
+
+
+@dataclass
+class Bars:
+    """OHLCV-Spalten als float64-/int64-Arrays (ts in ms)."""
+    ts: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.ts.size)
+
+    @classmethod
+    def from_candles(cls, c) -> "Bars":
+        return cls(*(np.asarray(getattr(c, f)) for f in ("ts", "open", "high", "low", "close", "volume")))
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "Bars":
+        ts = df["ts"]
+        if pd.api.types.is_numeric_dtype(ts):
+            ts_ms = ts.to_numpy(dtype=np.int64)
+        else:
+            t = pd.to_datetime(ts, utc=True)
+            ts_ms = ((t - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(milliseconds=1)).to_numpy(dtype=np.int64)
+        return cls(ts_ms, *(df[f].to_numpy(dtype=np.float64) for f in ("open", "high", "low", "close", "volume")))
+
+    @classmethod
+    def from_trades(cls, ts_ms, price, qty=None, step_ms: int = 1_000) -> "Bars":
+        """Einzel-Trades (ts in ms, aufsteigend) → OHLCV-Bars à step_ms (nur Buckets mit Trades)."""
+        ts = np.asarray(ts_ms, dtype=np.int64)
+        px = np.asarray(price, dtype=np.float64)
+        q = np.ones_like(px) if qty is None else np.asarray(qty, dtype=np.float64)
+        if ts.size == 0:
+            z = np.zeros(0)
+            return cls(np.zeros(0, dtype=np.int64), z, z, z, z, z)
+        bucket = ts // step_ms
+        start = np.flatnonzero(np.concatenate(([True], bucket[1:] != bucket[:-1])))
+        last = np.concatenate((start[1:], [ts.size])) - 1
+        return cls(bucket[start] * step_ms, px[start], np.maximum.reduceat(px, start),
+                   np.minimum.reduceat(px, start), px[last], np.add.reduceat(q, start))
+
+    def slice(self, i: int, j: int) -> "Bars":
+        return Bars(*(getattr(self, f)[i:j] for f in ("ts", "open", "high", "low", "close", "volume")))
+
+
+class Intrabar:
+    """
+    Feiner Pfad (1m-Kerzen oder Trade-Bars) zu einer Grob-Bar-Reihe.
+    lo[i]/hi[i]: Index-Bereich der feinen Bars innerhalb von Grob-Bar i (leer, wenn Daten fehlen).
+    """
+
+    def __init__(self, bars: Bars, fine: Bars, tf_ms: Optional[int] = None):
+        if tf_ms is None:
+            tf_ms = int(np.median(np.diff(bars.ts))) if len(bars) > 1 else 0
+        self.fine = fine
+        self.tf_ms = int(tf_ms)
+        self.step_ms = int(np.median(np.diff(fine.ts))) if len(fine) > 1 else self.tf_ms
+        self.lo = np.searchsorted(fine.ts, bars.ts, "left")
+        self.hi = np.searchsorted(fine.ts, bars.ts + self.tf_ms, "left")
+        self._ts = bars.ts
+
+    def at(self, offset_ms: float) -> np.ndarray:
+        """Je Grob-Bar: feine Bar, die Bar-Open + offset_ms enthält (auf [lo, hi-1] begrenzt; -1 ohne Daten)."""
+        k = np.searchsorted(self.fine.ts, self._ts + int(offset_ms), "right") - 1
+        k = np.clip(k, self.lo, np.maximum(self.hi - 1, self.lo))
+        return np.where(self.hi > self.lo, k, -1)
+
+    @property
+    def coverage(self) -> float:
+        return float((self.hi > self.lo).mean()) if self.lo.size else 0.0
+
+
+def _prior_extreme(x: np.ndarray, n: int, fn) -> np.ndarray:
+    """out[t] = fn(x[t-n:t]) (nur abgeschlossene Vorgänger-Bars), NaN für t < n."""
+    out = np.full(x.size, np.nan)
+    if n > 0 and x.size > n:
+        win = np.lib.stride_tricks.sliding_window_view(x, n)[:-1]
+        out[n:] = fn(win, axis=1)
+    return out
+
+
+class FeatureCache:
+    """Rollende N-High/Low je Lookback (einmal je Bars-Objekt berechnet)."""
+
+    def __init__(self, bars: Bars):
+        self.bars = bars
+        self._hi: Dict[int, np.ndarray] = {}
+        self._lo: Dict[int, np.ndarray] = {}
+        self.extra: Dict[Any, Any] = {}     # weitere Features (z. B. Regime in bot.walkforward)
+
+    def hi(self, n: int) -> np.ndarray:
+        v = self._hi.get(n)
+        if v is None:
+            v = self._hi[n] = _prior_extreme(self.bars.high, n, np.max)
+        return v
+
+    def lo(self, n: int) -> np.ndarray:
+        v = self._lo.get(n)
+        if v is None:
+            v = self._lo[n] = _prior_extreme(self.bars.low, n, np.min)
+        return v
+
+
+@dataclass
+class Signals:
+    side: np.ndarray      # int8: +1 Buy, -1 Sell, 0 kein Signal
+    tp_dist: np.ndarray
+    sl_dist: np.ndarray
+
+
+def _params(p: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+    out = dict(DEFAULT_PARAMS)
+    out.update(p or {})
+    return out
+
+
+def mom_signals(bars: Bars, params: Optional[Mapping[str, Any]] = None,
+                cache: Optional[FeatureCache] = None) -> Signals:
+    """MomScalp-Signale für jede Bar t (t = laufende Kerze, wie generate(klines[:t+1]))."""
+    p = _params(params)
+    cache = cache or FeatureCache(bars)
+    n = int(p["lookback"])
+    hi, lo = cache.hi(n), cache.lo(n)
+    close = bars.close
+    px = np.empty_like(close)
+    if p["use_prev_close"]:
+        px[0] = np.nan
+        px[1:] = close[:-1]
+    else:
+        px[:] = close
+    rng = hi - lo
+    eps = float(p["eps_break"])
+    with np.errstate(invalid="ignore"):
+        ok = (np.arange(close.size) >= n + 1) & (rng >= float(p["min_range"]))
+        long_b = ok & (px > hi * (1.0 + eps))
+        short_b = ok & (px < lo * (1.0 - eps))
+    tie = long_b & short_b
+    tie_side = str(p["tie_side"]).lower()
+    if tie_side == "long":
+        short_b &= ~tie
+    elif tie_side == "short":
+        long_b &= ~tie
+    else:
+        long_b &= ~tie
+        short_b &= ~tie
+    if not p["allow_short"]:
+        short_b[:] = False
+    side = long_b.astype(np.int8) - short_b.astype(np.int8)
+    with np.errstate(invalid="ignore"):
+        tp = np.maximum(px * TP_PCT, rng * TP_RANGE)
+        sl = np.maximum(px * SL_PCT, rng * SL_RANGE)
+    return Signals(side, tp, sl)
+
+
+# --------------------------------------------------------------------------- #
+#                              Ausführung                                     #
+# --------------------------------------------------------------------------- #
+
+TRADE_FIELDS = ("signal_i", "entry_i", "exit_i", "side", "entry_px", "exit_px", "pnl_pct", "reason")
+REASONS = ("tp", "sl", "eod")
+
+
+def _first_hit(high: np.ndarray, low: np.ndarray, j0: int, end: int, side: int, tp: float, sl: float):
+    """Erste Bar j in [j0, end) mit TP- oder SL-Berührung → (j, hit_tp, hit_sl) oder None."""
+    step = 64
+    while j0 < end:
+        j1 = min(end, j0 + step)
+        h, l = high[j0:j1], low[j0:j1]
+        if side > 0:
+            t_hit, s_hit = h >= tp, l <= sl
+        else:
+            t_hit, s_hit = l <= tp, h >= sl
+        any_hit = t_hit | s_hit
+        k = int(any_hit.argmax())
+        if any_hit[k]:
+            return j0 + k, bool(t_hit[k]), bool(s_hit[k])
+        j0 = j1
+        step *= 4
+    return None
+
+
+def _exit_px(op: float, gap_ok: bool, s: int, tp: float, sl: float, t_hit: bool, s_hit: bool):
+    """(reason, Preis) für eine Bar mit Berührung; Gap über TP/SL hinaus → Fill zur Open."""
+    if s_hit:
+        gap = gap_ok and (op < sl if s > 0 else op > sl)
+        return 1, (op if gap else sl)
+    gap = gap_ok and (op > tp if s > 0 else op < tp)
+    return 0, (op if gap else tp)
+
+
+def simulate(bars: Bars, sig: Signals, costs: Costs = Costs(), start: int = 0,
+             end: Optional[int] = None, intrabar: Optional[Intrabar] = None,
+             exec_model: Optional[ExecModel] = None) -> Dict[str, np.ndarray]:
+    """
+    Signale in [start, end) nacheinander ausführen (eine Position zur Zeit).
+    Mit intrabar werden Entry (nach Latenz), Stop-Aktivierung und Bars mit
+    TP- und SL-Berührung auf dem feinen Pfad aufgelöst.
+    """
+    end = len(bars) if end is None else min(end, len(bars))
+    o, h, l, c = bars.open, bars.high, bars.low, bars.close
+    ex = exec_model or ExecModel()
+    slip = (costs.slip_bps if ex.slip_bps is None else ex.slip_bps) / 1e4
+    fee_pct = 2.0 * costs.fee_bps / 100.0
+    rows = {f: [] for f in TRADE_FIELDS}
+    ambiguous = resolved = unresolved = 0
+    if intrabar is not None:
+        fo, fh, fl = intrabar.fine.open, intrabar.fine.high, intrabar.fine.low
+        lo, hi = intrabar.lo, intrabar.hi
+        k_entry = intrabar.at(ex.entry_latency_ms)
+        k_stop = intrabar.at(ex.entry_latency_ms + ex.stop_latency_ms)
+    free_from = start
+    for t in np.flatnonzero(sig.side[start:end - 1]) + start:
+        if t < free_from:
+            continue
+        s = int(sig.side[t])
+        e = t + 1
+        ke = ks = -1
+        if intrabar is not None and k_entry[e] >= 0:
+            ke, ks = int(k_entry[e]), int(k_stop[e])
+        entry = (fo[ke] if ke >= 0 else o[e]) * (1.0 + s * slip)
+        tp = entry + s * sig.tp_dist[t]
+        sl = entry - s * sig.sl_dist[t]
+        j0 = e
+        while True:
+            hit = _first_hit(h, l, j0, end, s, tp, sl)
+            if hit is None:
+                j, reason, px = end - 1, 2, c[end - 1]
+                break
+            j, t_hit, s_hit = hit
+            late = j == e and ks > lo[e] if ke >= 0 else False
+            if intrabar is None or not (late or (t_hit and s_hit)):
+                ambiguous += int(t_hit and s_hit)
+                reason, px = _exit_px(o[j], j > e, s, tp, sl, t_hit, s_hit)
+                break
+            if hi[j] <= lo[j]:
+                # keine feinen Daten für diese Bar → Bar-Regel (SL zuerst)
+                unresolved += 1
+                ambiguous += int(t_hit and s_hit)
+                reason, px = _exit_px(o[j], j > e, s, tp, sl, t_hit, s_hit)
+                break
+            a = max(int(lo[j]), ks) if j == e else int(lo[j])
+            fine_hit = _first_hit(fh, fl, a, int(hi[j]), s, tp, sl)
+            if fine_hit is None:
+                # Berührung nur vor Aktivierung der Stops → weiter ab der nächsten Bar
+                j0 = j + 1
+                continue
+            k, t_hit, s_hit = fine_hit
+            resolved += 1
+            ambiguous += int(t_hit and s_hit)
+            reason, px = _exit_px(fo[k], k > ke, s, tp, sl, t_hit, s_hit)
+            break
+        px = px * (1.0 - s * slip)
+        rows["signal_i"].append(t); rows["entry_i"].append(e); rows["exit_i"].append(j)
+        rows["side"].append(s); rows["entry_px"].append(entry); rows["exit_px"].append(px)
+        rows["pnl_pct"].append(s * (px - entry) / entry * 100.0 - fee_pct)
+        rows["reason"].append(reason)
+        free_from = j
+    out = {
+        "signal_i": np.asarray(rows["signal_i"], dtype=np.int64),
+        "entry_i": np.asarray(rows["entry_i"], dtype=np.int64),
+        "exit_i": np.asarray(rows["exit_i"], dtype=np.int64),
+        "side": np.asarray(rows["side"], dtype=np.int8),
+        "entry_px": np.asarray(rows["entry_px"], dtype=np.float64),
+        "exit_px": np.asarray(rows["exit_px"], dtype=np.float64),
+        "pnl_pct": np.asarray(rows["pnl_pct"], dtype=np.float64),
+        "reason": np.asarray(rows["reason"], dtype=np.int8),
+    }
+    out["ambiguous"] = np.asarray(ambiguous)
+    out["resolved"] = np.asarray(resolved)
+    out["unresolved"] = np.asarray(unresolved)
+    return out
+
+
+def equity_curve(pnl_pct: np.ndarray, equity0: float = 10_000.0) -> np.ndarray:
+    """Equity nach jedem Trade (Broker-Logik: Gewinn/Verlust relativ zur aktuellen Equity)."""
+    return equity0 * np.cumprod(1.0 + np.asarray(pnl_pct, dtype=np.float64) / 100.0)
+
+
+def stats(trades: Dict[str, np.ndarray], equity0: float = 10_000.0) -> Dict[str, Any]:
+    pnl = trades["pnl_pct"]
+    out: Dict[str, Any] = dict(trade_stats(pnl))
+    eq = equity_curve(pnl, equity0)
+    dd = drawdown(np.concatenate(([equity0], eq)))
+    out["return_pct"] = float((eq[-1] / equity0 - 1.0) * 100.0) if eq.size else 0.0
+    out["max_dd_pct"] = dd["max_dd_pct"]
+    out["exits"] = {r: int((trades["reason"] == i).sum()) for i, r in enumerate(REASONS)}
+    out["ambiguous"] = int(trades.get("ambiguous", 0))
+    if int(trades.get("resolved", 0)) or int(trades.get("unresolved", 0)):
+        out["intrabar"] = {"resolved": int(trades["resolved"]), "unresolved": int(trades["unresolved"])}
+    return out
+
+
+def run(bars: Bars, params: Optional[Mapping[str, Any]] = None, costs: Costs = Costs(),
+        start: int = 0, end: Optional[int] = None, cache: Optional[FeatureCache] = None,
+        intrabar: Optional[Intrabar] = None, exec_model: Optional[ExecModel] = None) -> Dict[str, Any]:
+    sig = mom_signals(bars, params, cache)
+    trades = simulate(bars, sig, costs, start, end, intrabar, exec_model)
+    return {"params": _params(params), "trades": trades, "stats": stats(trades)}
+
+
+def load_bars(candles: Optional[str] = None, csv: Optional[str] = None,
+              symbol: str = "BTCUSDT", timeframe: str = "15m") -> Bars:
+    """Kerzen aus bot.candles-Datei, CSV (Format data.backfill) oder data/<SYMBOL>_<tf>.candles."""
+    from .candles import default_path, open_candles
+    if csv:
+        return Bars.from_frame(pd.read_csv(csv))
+    return Bars.from_candles(open_candles(candles or default_path(symbol, timeframe)))
+
+
+def load_trade_bars(rec_path: str, symbol: Optional[str] = None, step_ms: int = 1_000) -> Bars:
+    """publicTrade-Nachrichten aus einer Aufzeichnung (bot.replay) → Bars à step_ms."""
+    from .replay import iter_records
+    ts, px, qty = [], [], []
+    for rec in iter_records(rec_path, "ws"):
+        topic = str(rec.get("topic") or "")
+        if not topic.startswith("publicTrade") or (symbol and not topic.endswith(symbol)):
+            continue
+        for tr in (rec.get("msg") or {}).get("data") or []:
+            try:
+                ts.append(int(tr["T"])); px.append(float(tr["p"])); qty.append(float(tr["v"]))
+            except (KeyError, TypeError, ValueError):
+                continue
+    order = np.argsort(np.asarray(ts, dtype=np.int64), kind="stable")
+    return Bars.from_trades(np.asarray(ts, dtype=np.int64)[order], np.asarray(px)[order],
+                            np.asarray(qty)[order], step_ms)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="MomScalp-Bar-Backtest")
+    ap.add_argument("--candles", default=None)
+    ap.add_argument("--csv", default=None)
+    ap.add_argument("--symbol", default=os.environ.get("SYM", "BTCUSDT"))
+    ap.add_argument("--tf", default="15m")
+    ap.add_argument("--lookback", type=int, default=int(os.environ.get("LOOKBACK", "20")))
+    ap.add_argument("--eps", type=float, default=float(os.environ.get("EPS_BREAK", "0")))
+    ap.add_argument("--prev-close", action="store_true", default=os.environ.get("USE_PREV_CLOSE", "0") == "1")
+    ap.add_argument("--no-short", action="store_true", default=os.environ.get("ALLOW_SHORT", "1") == "0")
+    ap.add_argument("--fee-bps", type=float, default=5.5)
+    ap.add_argument("--slip-bps", type=float, default=1.0)
+    ap.add_argument("--fine-candles", default=None, help="1m-Kerzen für Intrabar-Fills")
+    ap.add_argument("--fine-csv", default=None)
+    ap.add_argument("--fine-rec", default=None, help="Aufzeichnung (bot.replay) mit publicTrade")
+    ap.add_argument("--fine-step-ms", type=int, default=1_000, help="Bucket für --fine-rec")
+    ap.add_argument("--entry-latency-ms", type=float, default=None)
+    ap.add_argument("--stop-latency-ms", type=float, default=None)
+    ap.add_argument("--exec-journal", default=None, help="ExecModel aus dem Order-Journal schätzen")
+    args = ap.parse_args(argv)
+    bars = load_bars(args.candles, args.csv, args.symbol, args.tf)
+    ib = None
+    if args.fine_rec:
+        ib = Intrabar(bars, load_trade_bars(args.fine_rec, args.symbol, args.fine_step_ms))
+    elif args.fine_candles or args.fine_csv:
+        ib = Intrabar(bars, load_bars(args.fine_candles, args.fine_csv))
+    ex = ExecModel.from_journal(args.exec_journal) if args.exec_journal else ExecModel()
+    if args.entry_latency_ms is not None or args.stop_latency_ms is not None:
+        ex = ExecModel(ex.entry_latency_ms if args.entry_latency_ms is None else args.entry_latency_ms,
+                       ex.stop_latency_ms if args.stop_latency_ms is None else args.stop_latency_ms,
+                       ex.slip_bps)
+    res = run(bars, {"lookback": args.lookback, "eps_break": args.eps, "use_prev_close": args.prev_close,
+                     "allow_short": not args.no_short,
+                     "min_range": float(os.environ.get("MIN_RANGE", "0")),
+                     "tie_side": os.environ.get("TIE_SIDE", "")},
+              Costs(args.fee_bps, args.slip_bps), intrabar=ib, exec_model=ex)
+    out = {"bars": len(bars), "params": res["params"], "stats": res["stats"]}
+    if ib is not None:
+        out["intrabar"] = {"fine_bars": len(ib.fine), "step_ms": ib.step_ms, "coverage": round(ib.coverage, 4),
+                           "exec": {"entry_latency_ms": ex.entry_latency_ms, "stop_latency_ms": ex.stop_latency_ms,
+                                    "slip_bps": args.slip_bps if ex.slip_bps is None else ex.slip_bps}}
+    print(json.dumps(out, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
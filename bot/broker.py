@@ -1,8 +1,9 @@
 from dataclasses import dataclass
-from datetime import datetime, timezone
+from datetime import datetime
 from loguru import logger
 import csv, os
 from .config import SETTINGS
+from . import clock
 
 @dataclass
 class Position:
@@ -11,6 +12,8 @@ class Position:
     entry_price: float
     ts_open: datetime
     bars_open: int = 0
+    max_fav_pct: float = 0.0
+    max_adv_pct: float = 0.0
 
 class Broker:
     def __init__(self, logs_dir: str = "logs"):
@@ -43,16 +46,16 @@ class Broker:
 
     def log_equity(self):
         with open(self.equity_file, "a", newline="") as f:
-            csv.writer(f).writerow([datetime.now(timezone.utc).isoformat(), f"{self.equity:.2f}"])
+            csv.writer(f).writerow([clock.now().isoformat(), f"{self.equity:.2f}"])
 
     # --- DRY RUN order simulation ---
     def open_market(self, side: str, price: float, qty: float):
         if self.position is not None:
             logger.warning("Position already open; skip open_market")
             return False
-        self.position = Position(side=side, qty=qty, entry_price=price, ts_open=datetime.now(timezone.utc))
+        self.position = Position(side=side, qty=qty, entry_price=price, ts_open=clock.now())
         with open(self.orders_file, "a", newline="") as f:
-            csv.writer(f).writerow([datetime.now(timezone.utc).isoformat(), "OPEN", side, price, qty, "dry_run"])
+            csv.writer(f).writerow([clock.now().isoformat(), "OPEN", side, price, qty, "dry_run"])
         logger.info(f"Opened {side} qty={qty} price={price}")
         return True
 
@@ -67,15 +70,20 @@ class Broker:
         with open(self.trades_file, "a", newline="") as f:
             csv.writer(f).writerow([
                 pos.ts_open.isoformat(),
-                datetime.now(timezone.utc).isoformat(),
-                pos.side, f"{pos.entry_price:.2f}", f"{price:.2f}", pos.qty, f"{fee:.2f}", f"{pnl_abs:.2f}", f"{pnl_pct:.3f}", "", "", pos.bars_open, reason
+                clock.now().isoformat(),
+                pos.side, f"{pos.entry_price:.2f}", f"{price:.2f}", pos.qty, f"{fee:.2f}", f"{pnl_abs:.2f}", f"{pnl_pct:.3f}", f"{pos.max_fav_pct:.3f}", f"{pos.max_adv_pct:.3f}", pos.bars_open, reason
             ])
         with open(self.orders_file, "a", newline="") as f:
-            csv.writer(f).writerow([datetime.now(timezone.utc).isoformat(), "CLOSE", pos.side, price, pos.qty, reason])
+            csv.writer(f).writerow([clock.now().isoformat(), "CLOSE", pos.side, price, pos.qty, reason])
         logger.info(f"Closed {pos.side} at {price} reason={reason} PnL%={pnl_pct:.3f}")
         self.position = None
         self.log_equity()
 
+    def update_excursion(self, max_fav_pct: float, max_adv_pct: float):
+        if self.position:
+            self.position.max_fav_pct = max_fav_pct
+            self.position.max_adv_pct = max_adv_pct
+
     def tick_bar(self):
         if self.position:
             self.position.bars_open += 1
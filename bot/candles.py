@@ -0,0 +1,232 @@
+# bot/candles.py
+"""
+Binäres Kerzen-Format mit Zero-Copy-Laden per np.memmap.
+
+Layout (Little Endian):
+    Header (64 Byte)
+        magic     4s   b"BCDL"
+        version   u2
+        _pad      u2
+        symbol    16s  ASCII, mit \\0 aufgefüllt
+        interval  8s   z. B. "5m", "1m"
+        start_ts  i8   erster Zeitstempel (ms, UTC)
+        count     i8   Anzahl Kerzen
+        _reserved 16s
+    Spalten (jeweils count Einträge, zusammenhängend):
+        ts int64 (ms) | open | high | low | close | volume  (float64)
+
+Öffnen kostet nur den Header-Read; die Spalten sind read-only Views auf
+eine einzige Datei-Mapping → Backtests/Sweeps über Jahre an 1m-Daten starten
+sofort, und mehrere Worker-Prozesse teilen sich die Pages im Page-Cache.
+
+CLI:
+  python -m bot.candles csv data/BTCUSDT_5m.csv --symbol BTCUSDT --tf 5m
+  python -m bot.candles backfill BTCUSDT 1m --days 30
+  python -m bot.candles info data/BTCUSDT_1m.candles
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import struct
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b"BCDL"
+VERSION = 1
+_HEADER = struct.Struct("<4sHH16s8sqq16s")
+HEADER_SIZE = _HEADER.size  # 64
+COLUMNS = ("ts", "open", "high", "low", "close", "volume")
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
+
+
+def default_path(symbol: str, timeframe: str) -> str:
+    """data/<SYMBOL>_<tf>.candles (analog zu den optionalen CSVs)."""
+    return os.path.join(DATA_DIR, f"{symbol}_{timeframe}.candles")
+
+
+@dataclass
+class Candles:
+    """Read-only Spalten (np.memmap-Views) einer Kerzendatei."""
+    path: str
+    symbol: str
+    interval: str
+    start_ts: int
+    count: int
+    ts: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return self.count
+
+    def window(self, since_ms: Optional[int] = None, until_ms: Optional[int] = None) -> "Candles":
+        """Teilbereich since <= ts <= until per searchsorted (weiterhin Views, keine Kopie)."""
+        i = 0 if since_ms is None else int(np.searchsorted(self.ts, since_ms, side="left"))
+        j = self.count if until_ms is None else int(np.searchsorted(self.ts, until_ms, side="right"))
+        cols = {c: getattr(self, c)[i:j] for c in COLUMNS}
+        start = int(cols["ts"][0]) if j > i else 0
+        return Candles(self.path, self.symbol, self.interval, start, j - i, **cols)
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame im Format von data.backfill (ts als UTC-datetime). Kopiert die Daten."""
+        df = pd.DataFrame({c: np.asarray(getattr(self, c)) for c in COLUMNS[1:]})
+        df.insert(0, "ts", pd.to_datetime(np.asarray(self.ts), unit="ms", utc=True))
+        return df
+
+
+# --------------------------------------------------------------------------- #
+#                                 Lesen                                       #
+# --------------------------------------------------------------------------- #
+
+def _read_header(path: str):
+    with open(path, "rb") as f:
+        raw = f.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE:
+        raise ValueError(f"{path}: Datei zu kurz für Header")
+    magic, ver, _, sym, tf, start, count, _ = _HEADER.unpack(raw)
+    if magic != MAGIC:
+        raise ValueError(f"{path}: keine Kerzendatei (magic={magic!r})")
+    if ver != VERSION:
+        raise ValueError(f"{path}: Version {ver} nicht unterstützt")
+    return sym.rstrip(b"\0").decode("ascii"), tf.rstrip(b"\0").decode("ascii"), start, count
+
+
+def open_candles(path: str) -> Candles:
+    """Öffnet eine Kerzendatei zero-copy (np.memmap, mode='r')."""
+    symbol, interval, start, count = _read_header(path)
+    expected = HEADER_SIZE + 8 * len(COLUMNS) * count
+    if os.path.getsize(path) < expected:
+        raise ValueError(f"{path}: abgeschnitten ({os.path.getsize(path)} < {expected} Byte)")
+    if count == 0:
+        empty = {c: np.zeros(0, dtype=np.int64 if c == "ts" else np.float64) for c in COLUMNS}
+        return Candles(path, symbol, interval, start, 0, **empty)
+    body = np.memmap(path, dtype=np.uint8, mode="r", offset=HEADER_SIZE, shape=(8 * len(COLUMNS) * count,))
+    cols = {}
+    for i, c in enumerate(COLUMNS):
+        seg = body[i * 8 * count:(i + 1) * 8 * count]
+        cols[c] = seg.view(np.int64 if c == "ts" else np.float64)
+    return Candles(path, symbol, interval, start, count, **cols)
+
+
+# --------------------------------------------------------------------------- #
+#                                Schreiben                                    #
+# --------------------------------------------------------------------------- #
+
+def write_candles(path: str, symbol: str, interval: str, ts, open_, high, low, close, volume) -> int:
+    """
+    Schreibt Spalten atomar (tmp + os.replace) – Leser mit offener Mapping
+    behalten ihre alte Version. ts in ms; wird sortiert und dedupliziert.
+    """
+    ts = np.asarray(ts, dtype=np.int64)
+    cols = [np.asarray(x, dtype=np.float64) for x in (open_, high, low, close, volume)]
+    if any(c.shape != ts.shape for c in cols):
+        raise ValueError("Spalten müssen gleich lang sein")
+    ts, idx = np.unique(ts, return_index=True)   # sortiert, erster Eintrag je ts
+    cols = [c[idx] for c in cols]
+
+    header = _HEADER.pack(MAGIC, VERSION, 0, symbol.encode("ascii")[:16], interval.encode("ascii")[:8],
+                          int(ts[0]) if ts.size else 0, int(ts.size), b"")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(header)
+        f.write(np.ascontiguousarray(ts, dtype="<i8").tobytes())
+        for c in cols:
+            f.write(np.ascontiguousarray(c, dtype="<f8").tobytes())
+    os.replace(tmp, path)
+    return int(ts.size)
+
+
+def _frame_ts_ms(col: pd.Series) -> np.ndarray:
+    if pd.api.types.is_numeric_dtype(col):
+        v = col.to_numpy(dtype=np.int64)
+        return v * 1000 if v.size and v.max() < 10**11 else v   # Sekunden → ms
+    t = pd.to_datetime(col, utc=True)
+    return ((t - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(milliseconds=1)).to_numpy(dtype=np.int64)
+
+
+def from_frame(df: pd.DataFrame, path: str, symbol: str, interval: str, merge: bool = True) -> int:
+    """
+    DataFrame (ts + OHLCV, z. B. aus data.backfill) → Kerzendatei.
+    merge=True: mit vorhandener Datei zusammenführen (neue Werte gewinnen).
+    """
+    ts = _frame_ts_ms(df["ts"])
+    cols = [df[c].to_numpy(dtype=np.float64) for c in COLUMNS[1:]]
+    if merge and os.path.exists(path):
+        old = open_candles(path)
+        keep = ~np.isin(old.ts, ts)
+        ts = np.concatenate([np.asarray(old.ts)[keep], ts])
+        cols = [np.concatenate([np.asarray(getattr(old, c))[keep], new])
+                for c, new in zip(COLUMNS[1:], cols)]
+        del old
+    return write_candles(path, symbol, interval, ts, *cols)
+
+
+def from_csv(csv_path: str, path: Optional[str] = None, symbol: Optional[str] = None,
+             interval: Optional[str] = None) -> str:
+    """
+    CSV (Spalten ts/open/high/low/close/volume; ts als ms, s oder ISO) → Kerzendatei.
+    Symbol/Intervall werden aus dem Dateinamen <SYMBOL>_<tf>.csv abgeleitet, falls nicht gesetzt.
+    """
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    if symbol is None or interval is None:
+        s, _, tf = stem.partition("_")
+        symbol, interval = symbol or s, interval or tf or "?"
+    path = path or os.path.join(os.path.dirname(csv_path), f"{stem}.candles")
+    df = pd.read_csv(csv_path)
+    if "ts" not in df:
+        df = df.rename(columns={df.columns[0]: "ts"})
+    from_frame(df, path, symbol, interval, merge=False)
+    return path
+
+
+def from_backfill(symbol: str, timeframe: str, lookback_days: int = 2, path: Optional[str] = None) -> str:
+    """REST-Backfill (data.backfill) holen und in die Kerzendatei einpflegen."""
+    from .data import backfill
+    df = backfill(symbol, timeframe, lookback_days=lookback_days)
+    path = path or default_path(symbol, timeframe)
+    if df is not None and len(df):
+        from_frame(df, path, symbol, timeframe, merge=True)
+    return path
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Binäre Kerzendateien (memmap)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    a = sub.add_parser("csv", help="CSV konvertieren")
+    a.add_argument("csv_path")
+    a.add_argument("--out", default=None)
+    a.add_argument("--symbol", default=None)
+    a.add_argument("--tf", default=None)
+    b = sub.add_parser("backfill", help="REST-Backfill anhängen")
+    b.add_argument("symbol")
+    b.add_argument("tf")
+    b.add_argument("--days", type=int, default=2)
+    b.add_argument("--out", default=None)
+    c = sub.add_parser("info", help="Header/Bereich anzeigen")
+    c.add_argument("path")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "csv":
+        path = from_csv(args.csv_path, args.out, args.symbol, args.tf)
+    elif args.cmd == "backfill":
+        path = from_backfill(args.symbol, args.tf, args.days, args.out)
+    else:
+        path = args.path
+    cd = open_candles(path)
+    print(json.dumps({"path": path, "symbol": cd.symbol, "interval": cd.interval, "count": cd.count,
+                      "first_ts": int(cd.ts[0]) if cd.count else None,
+                      "last_ts": int(cd.ts[-1]) if cd.count else None}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# bot/clock.py
+"""
+Uhr-Abstraktion für den Bot-Loop (jetzt, schlafen, schlafen-bis).
+
+Alles in bot/, was von der Wanduhr abhängt (Session-Fenster, Stunden-Bucket
+der RiskEngine, Heartbeat, Broker-Zeitstempel, Backfill-Ende, Exit-Intervalle),
+fragt die aktive Uhr statt time/datetime direkt:
+
+    from . import clock
+    clock.time()             # Epoch-Sekunden
+    clock.now(tz)            # tz-aware datetime (Default UTC)
+    clock.sleep(60)
+    clock.sleep_until(ts)
+
+RealClock  = Wanduhr (Default).
+SimClock   = simulierte Uhr: sleep() springt sofort vor, dadurch läuft die
+             echte Loop-Logik (z. B. mit BYBIT_REPLAY) tausendfach schneller.
+
+    with clock.use(clock.SimClock("2024-01-01T00:00:00Z")):
+        run.main(max_loops=10_000)
+
+Aktivierung ohne Code-Änderung: BOT_SIM_START=2024-01-01T00:00:00Z (bot.run).
+Latenz-Messungen (metrics.timed, profiler) bleiben bewusst auf der echten Uhr.
+"""
+from __future__ import annotations
+
+import threading
+import time as _time
+from contextlib import contextmanager
+from datetime import datetime, timezone, tzinfo
+from typing import Iterator, Optional, Union
+
+
+class RealClock:
+    """Wanduhr: time.time / time.sleep."""
+
+    simulated = False
+
+    def time(self) -> float:
+        return _time.time()
+
+    def now(self, tz: Optional[tzinfo] = None) -> datetime:
+        return datetime.now(tz or timezone.utc)
+
+    def sleep(self, secs: float) -> None:
+        if secs > 0:
+            _time.sleep(secs)
+
+    def sleep_until(self, ts: float) -> None:
+        self.sleep(ts - self.time())
+
+
+class SimClock:
+    """
+    Simulierte Uhr. sleep() blockiert nicht, sondern schiebt die Zeit vor.
+    Thread-sicher; mehrere Threads teilen sich eine monotone Zeitachse
+    (die Zeit springt auf das Maximum der angeforderten Weckzeiten).
+    """
+
+    simulated = True
+
+    def __init__(self, start: Union[float, str, datetime, None] = None):
+        self._lock = threading.Lock()
+        self._t = _to_ts(start) if start is not None else _time.time()
+        self.slept = 0.0          # Summe der übersprungenen Schlafzeit
+
+    def time(self) -> float:
+        with self._lock:
+            return self._t
+
+    def now(self, tz: Optional[tzinfo] = None) -> datetime:
+        return datetime.fromtimestamp(self.time(), tz or timezone.utc)
+
+    def advance(self, secs: float) -> float:
+        with self._lock:
+            if secs > 0:
+                self._t += secs
+                self.slept += secs
+            return self._t
+
+    def sleep(self, secs: float) -> None:
+        self.advance(secs)
+
+    def sleep_until(self, ts: float) -> None:
+        with self._lock:
+            if ts > self._t:
+                self.slept += ts - self._t
+                self._t = ts
+
+    def set(self, start: Union[float, str, datetime]) -> None:
+        """Uhr stellen (z. B. auf den Zeitstempel einer aufgezeichneten Kerze)."""
+        with self._lock:
+            self._t = _to_ts(start)
+
+
+Clock = Union[RealClock, SimClock]
+
+
+def _to_ts(x: Union[float, str, datetime]) -> float:
+    if isinstance(x, datetime):
+        return (x if x.tzinfo else x.replace(tzinfo=timezone.utc)).timestamp()
+    if isinstance(x, str):
+        return _to_ts(datetime.fromisoformat(x.replace("Z", "+00:00")))
+    return float(x)
+
+
+# --------------------------------------------------------------------------- #
+#                    Aktive Uhr (prozessweit, austauschbar)                   #
+# --------------------------------------------------------------------------- #
+
+_ACTIVE: Clock = RealClock()
+
+
+def get_clock() -> Clock:
+    return _ACTIVE
+
+
+def set_clock(c: Clock) -> Clock:
+    """Aktive Uhr setzen; gibt die vorherige zurück."""
+    global _ACTIVE
+    prev, _ACTIVE = _ACTIVE, c
+    return prev
+
+
+@contextmanager
+def use(c: Clock) -> Iterator[Clock]:
+    prev = set_clock(c)
+    try:
+        yield c
+    finally:
+        set_clock(prev)
+
+
+def time() -> float:
+    return _ACTIVE.time()
+
+
+def now(tz: Optional[tzinfo] = None) -> datetime:
+    return _ACTIVE.now(tz)
+
+
+def sleep(secs: float) -> None:
+    _ACTIVE.sleep(secs)
+
+
+def sleep_until(ts: float) -> None:
+    _ACTIVE.sleep_until(ts)
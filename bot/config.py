@@ -14,6 +14,7 @@ class Settings(BaseSettings):
     risk_per_trade_pct: float = Field(0.5, env="RISK_PER_TRADE_PCT")
     daily_loss_limit_pct: float = Field(2.0, env="DAILY_LOSS_LIMIT_PCT")
     max_new_entries_per_hour: int = Field(3, env="MAX_NEW_ENTRIES_PER_HOUR")
+    max_new_entries_per_hour_total: int = Field(0, env="MAX_NEW_ENTRIES_PER_HOUR_TOTAL")  # alle Symbole, 0 = aus
     start_balance: float = Field(10000.0, env="START_BALANCE")
 
     # === Exits ===
@@ -32,6 +33,9 @@ class Settings(BaseSettings):
     session_end: str = Field("23:00", env="SESSION_END")
     tz: str = Field("Europe/Zurich", env="TZ")
     max_spread_pct: float = Field(0.04, env="MAX_SPREAD_PCT")
+    orderbook_ws: bool = Field(False, env="ORDERBOOK_WS")      # lokales L2-Buch per WS führen
+    orderbook_depth: int = Field(50, env="ORDERBOOK_DEPTH")
+    ring_size: int = Field(1000, env="RING_SIZE")               # Kerzen je Symbol im Ringpuffer
     entry_min_seconds: int = Field(120, env="ENTRY_MIN_SECONDS")
     heartbeat_secs: int = Field(15, env="HEARTBEAT_SECS")
     missed_heartbeats_max: int = Field(2, env="MISSED_HEARTBEATS_MAX")
@@ -51,6 +55,7 @@ class Settings(BaseSettings):
     # === Debug / Logging ===
     debug_signals: bool = Field(True, env="DEBUG_SIGNALS")
     loguru_level: str = Field("DEBUG", env="LOGURU_LEVEL")
+    metrics_port: int = Field(0, env="METRICS_PORT")  # 0 = Exporter aus
 
     # === Model Config ===
     model_config = SettingsConfigDict(
@@ -1,27 +1,43 @@
-import os, time
+import os
 import pandas as pd
+from typing import List, Tuple
 from datetime import datetime, timedelta, timezone
 from loguru import logger
 from pybit.unified_trading import HTTP
 from .config import SETTINGS
+from .metrics import InstrumentedClient
+from .resilience import PYBIT_RETRY_CODES, ResilientClient
+from . import clock, replay
 
 # Bybit v5 erwartet Minuten als String (z. B. "5" statt "5m")
 INTERVAL_MAP = {"1m":"1","3m":"3","5m":"5","15m":"15","30m":"30","60m":"60","120m":"120","240m":"240"}
 
 def _http_session():
     # Public Kline braucht keine Auth, Keys sind ok aber optional
-    return HTTP(timeout=60,  testnet=bool(SETTINGS.bybit_testnet),
+    return ResilientClient(InstrumentedClient(replay.wrap(lambda: HTTP(timeout=60,  retry_codes=set(PYBIT_RETRY_CODES), testnet=bool(SETTINGS.bybit_testnet),
         api_key=SETTINGS.bybit_api_key or None,
         api_secret=SETTINGS.bybit_api_secret or None,
-    )
+    ))))
 
 def _ts_ms(dt: datetime) -> int:
     return int(dt.replace(tzinfo=timezone.utc).timestamp() * 1000)
 
+def latest(symbol: str, timeframe: str, limit: int = 3, sess=None) -> List[Tuple[int, float, float, float, float, float]]:
+    """Die letzten limit Klines in einem Request als (ts_ms, o, h, l, c, v), älteste zuerst."""
+    sess = sess or _http_session()
+    resp = sess.get_kline(category="linear", symbol=symbol, interval=INTERVAL_MAP.get(timeframe, "5"), limit=limit)
+    if resp.get("retCode") != 0:
+        logger.error(f"Bybit get_kline error: {resp}")
+        return []
+    lst = (resp.get("result") or {}).get("list") or []
+    rows = [(int(r[0]), float(r[1]), float(r[2]), float(r[3]), float(r[4]), float(r[5])) for r in lst]
+    rows.sort(key=lambda r: r[0])   # Bybit liefert neueste zuerst
+    return rows
+
 def backfill(symbol: str, timeframe: str, lookback_days: int = 2) -> pd.DataFrame:
     """Ziehe historische Klines via /v5/market/kline (Kategorie 'linear' für USDT-Perps)."""
     interval = INTERVAL_MAP.get(timeframe, "5")
-    end = datetime.now(timezone.utc)
+    end = clock.now()
     start = end - timedelta(days=lookback_days)
 
     sess = _http_session()
@@ -72,7 +88,7 @@ def backfill(symbol: str, timeframe: str, lookback_days: int = 2) -> pd.DataFram
 
         last_ts = int(lst[-1][0])
         cursor_start = datetime.fromtimestamp(last_ts/1000, tz=timezone.utc) + timedelta(milliseconds=1)
-        time.sleep(0.1)  # sanftes Rate-Limit
+        clock.sleep(0.1)  # sanftes Rate-Limit
 
     if not all_rows:
         logger.warning("Kein Kline-Backfill erhalten ({} Iterationen).", iters)
@@ -0,0 +1,327 @@
+# bot/events.py
+"""
+Interner Event-Bus zwischen den Stufen Data → Strategy → Risk → Broker.
+
+- Typisierte Events (BarClosed, Signal, OrderIntent, Fill, PositionUpdate, PriceTick)
+- Pro Topic eine begrenzte Queue mit eigener Policy:
+    "block"        Backpressure: Publisher wartet (mit Timeout) auf freien Platz
+    "drop_oldest"  ältestes Element verwerfen, neues aufnehmen
+    "drop_newest"  neues Element verwerfen, wenn voll
+    "coalesce"     pro Schlüssel (z. B. Symbol) nur das jüngste Event behalten
+- Pro Stufe ein Worker-Thread (Stage), der ein Topic konsumiert und Events
+  an nachgelagerte Topics publiziert.
+
+Ein langsamer place_order blockiert damit nie den Daten-Feed: der Feed
+publiziert BarClosed nach "coalesce", die Broker-Stufe arbeitet ihre eigene
+Queue ab.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from loguru import logger
+
+
+# --------------------------------------------------------------------------- #
+#                                  Events                                     #
+# --------------------------------------------------------------------------- #
+
+@dataclass(frozen=True)
+class BarClosed:
+    symbol: str
+    timeframe: str
+    ts: Any                     # Zeitstempel der abgeschlossenen Kerze
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    frame: Any = None           # optional: DataFrame mit Indikatoren (read-only verwenden)
+
+
+@dataclass(frozen=True)
+class Signal:
+    symbol: str
+    side: str                   # 'LONG' / 'SHORT'
+    price: float
+    ts: Any
+    note: str = ""
+
+
+@dataclass(frozen=True)
+class OrderIntent:
+    symbol: str
+    side: str                   # 'LONG' / 'SHORT'
+    qty: float
+    price: float
+    sl: Optional[float] = None
+    tp: Optional[float] = None
+    ts: Any = None
+    note: str = ""
+
+
+@dataclass(frozen=True)
+class Fill:
+    symbol: str
+    side: str
+    qty: float
+    price: float
+    ts: Any = None
+    fee: float = 0.0
+    note: str = ""
+
+
+@dataclass(frozen=True)
+class PositionUpdate:
+    symbol: str
+    side: Optional[str]         # None = flat
+    qty: float
+    entry_price: float
+    mark_price: float = 0.0
+    unrealized_pnl: float = 0.0
+    ts: Any = None
+
+
+@dataclass(frozen=True)
+class PriceTick:
+    symbol: str
+    price: float                # Last- oder Mark-Preis
+    bar_ts: Any = None          # Zeitstempel der zugehörigen Kerze (Kerzenwechsel erkennen)
+    ts: Any = None
+
+
+def _symbol_key(ev: Any) -> Hashable:
+    return getattr(ev, "symbol", None)
+
+
+# --------------------------------------------------------------------------- #
+#                               Topic-Queue                                   #
+# --------------------------------------------------------------------------- #
+
+POLICIES = ("block", "drop_oldest", "drop_newest", "coalesce")
+
+
+class Topic:
+    """Begrenzte Queue mit Drop-/Coalesce-Policy und einfachen Zählern."""
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int = 1024,
+        policy: str = "block",
+        key: Callable[[Any], Hashable] = _symbol_key,
+        block_timeout: Optional[float] = None,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Unbekannte Policy '{policy}' (erlaubt: {POLICIES})")
+        if maxsize <= 0:
+            raise ValueError("maxsize muss > 0 sein")
+        self.name = name
+        self.maxsize = int(maxsize)
+        self.policy = policy
+        self.key = key
+        self.block_timeout = block_timeout
+        self._items: deque = deque()
+        self._coalesced: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.published = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.taken = 0
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._coalesced) if self.policy == "coalesce" else len(self._items)
+
+    def put(self, ev: Any) -> bool:
+        """Gibt False zurück, wenn das Event verworfen wurde."""
+        with self._cond:
+            if self._closed:
+                return False
+            self.published += 1
+
+            if self.policy == "coalesce":
+                k = self.key(ev)
+                if k in self._coalesced:
+                    # älteren Stand ersetzen, Position in der Reihenfolge bleibt
+                    self._coalesced[k] = ev
+                    self.coalesced += 1
+                elif len(self._coalesced) >= self.maxsize:
+                    self._coalesced.popitem(last=False)
+                    self._coalesced[k] = ev
+                    self.dropped += 1
+                else:
+                    self._coalesced[k] = ev
+                self._cond.notify()
+                return True
+
+            if len(self._items) >= self.maxsize:
+                if self.policy == "drop_newest":
+                    self.dropped += 1
+                    return False
+                if self.policy == "drop_oldest":
+                    self._items.popleft()
+                    self.dropped += 1
+                else:  # block
+                    ok = self._cond.wait_for(
+                        lambda: self._closed or len(self._items) < self.maxsize,
+                        timeout=self.block_timeout,
+                    )
+                    if not ok or self._closed:
+                        self.dropped += 1
+                        return False
+
+            self._items.append(ev)
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """Nächstes Event oder None (Timeout / geschlossen und leer)."""
+        with self._cond:
+            ok = self._cond.wait_for(
+                lambda: self._closed or self._items or self._coalesced, timeout=timeout
+            )
+            if not ok:
+                return None
+            if self.policy == "coalesce":
+                if not self._coalesced:
+                    return None
+                _, ev = self._coalesced.popitem(last=False)
+                self.taken += 1
+                return ev
+            if not self._items:
+                return None
+            ev = self._items.popleft()
+            self.taken += 1
+            self._cond.notify_all()  # wartende Publisher (block) wecken
+            return ev
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"depth": len(self), "published": self.published,
+                "dropped": self.dropped, "coalesced": self.coalesced,
+                "policy": self.policy, "maxsize": self.maxsize}
+
+
+# --------------------------------------------------------------------------- #
+#                                  Stages                                     #
+# --------------------------------------------------------------------------- #
+
+class Stage:
+    """
+    Worker-Thread für ein Topic. handler(ev) kann ein Event, eine Liste von
+    Events oder None zurückgeben; Rückgaben werden über bus.publish()
+    weitergeleitet (Topic = Event-Klassenname).
+    """
+
+    def __init__(self, bus: "EventBus", name: str, topic: str, handler: Callable[[Any], Any]):
+        self.bus = bus
+        self.name = name
+        self.topic = topic
+        self.handler = handler
+        self.processed = 0
+        self.errors = 0
+        self.busy_s = 0.0
+        self.done = 0            # vollständig abgearbeitet (inkl. Weiterleitung)
+        self._thread = threading.Thread(target=self._loop, name=f"stage-{name}", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        self._thread.join(timeout)
+
+    def _loop(self) -> None:
+        q = self.bus.topic(self.topic)
+        while not self.bus.stopped:
+            ev = q.get(timeout=0.5)
+            if ev is None:
+                continue
+            t0 = time.perf_counter()
+            try:
+                out = self.handler(ev)
+            except Exception as e:
+                self.errors += 1
+                logger.exception("Stage {} Fehler bei {}: {}", self.name, type(ev).__name__, e)
+                out = None
+            finally:
+                self.busy_s += time.perf_counter() - t0
+                self.processed += 1
+            if out is not None:
+                for item in (out if isinstance(out, (list, tuple)) else (out,)):
+                    self.bus.publish(item)
+            self.done += 1
+
+    def stats(self) -> Dict[str, Any]:
+        avg_ms = (self.busy_s / self.processed * 1000.0) if self.processed else 0.0
+        return {"topic": self.topic, "processed": self.processed,
+                "errors": self.errors, "avg_ms": round(avg_ms, 3)}
+
+
+class EventBus:
+    """Registry für Topics und Stages."""
+
+    def __init__(self):
+        self._topics: Dict[str, Topic] = {}
+        self._stages: List[Stage] = []
+        self.stopped = False
+
+    def add_topic(self, name: str, maxsize: int = 1024, policy: str = "block", **kw) -> Topic:
+        t = Topic(name, maxsize=maxsize, policy=policy, **kw)
+        self._topics[name] = t
+        return t
+
+    def topic(self, name: str) -> Topic:
+        t = self._topics.get(name)
+        if t is None:
+            t = self.add_topic(name)
+        return t
+
+    def publish(self, ev: Any, topic: Optional[str] = None) -> bool:
+        return self.topic(topic or type(ev).__name__).put(ev)
+
+    def stage(self, name: str, topic: str, handler: Callable[[Any], Any]) -> Stage:
+        st = Stage(self, name, topic, handler)
+        self._stages.append(st)
+        return st
+
+    def start(self) -> None:
+        for st in self._stages:
+            st.start()
+
+    def drain(self, timeout: float = 5.0) -> bool:
+        """
+        Wartet, bis alle Queues leer und alle entnommenen Events fertig
+        verarbeitet sind (für Simulation/Replay: deterministischer Takt).
+        """
+        deadline = time.monotonic() + timeout
+        consumed = [self.topic(n) for n in {st.topic for st in self._stages}]
+        while True:
+            if (all(len(t) == 0 for t in consumed)
+                    and sum(t.taken for t in consumed) == sum(st.done for st in self._stages)):
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.001)
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self.stopped = True
+        for t in self._topics.values():
+            t.close()
+        for st in self._stages:
+            st.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "topics": {n: t.stats() for n, t in self._topics.items()},
+            "stages": {s.name: s.stats() for s in self._stages},
+        }
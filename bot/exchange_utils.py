@@ -1,25 +1,28 @@
 # bot/exchange_utils.py
 from __future__ import annotations
 
-from decimal import Decimal, ROUND_DOWN
+from decimal import Decimal
 from typing import Any, Dict, Optional, Tuple
-import time
 
 from pybit.unified_trading import HTTP
 from bot.config import SETTINGS
+from bot.metrics import InstrumentedClient
+from bot.resilience import PYBIT_RETRY_CODES, ResilientClient, wait_for
+from bot import clock, replay
+from bot.journal import journal, submit
+from bot.precision import for_symbol
 
 
 def get_client() -> HTTP:
-    """Erzeuge einen Bybit-HTTP Client basierend auf SETTINGS."""
-    return HTTP(timeout=60,  testnet=SETTINGS.bybit_testnet,
+    """
+    Erzeuge einen Bybit-HTTP Client basierend auf SETTINGS (mit REST-Latenzmetriken
+    und Retry/Circuit-Breaker je Endpoint, bot.resilience).
+    BYBIT_RECORD / BYBIT_REPLAY schalten Mitschnitt bzw. Wiedergabe ein (bot.replay).
+    """
+    return ResilientClient(InstrumentedClient(replay.wrap(lambda: HTTP(timeout=60,  retry_codes=set(PYBIT_RETRY_CODES), testnet=SETTINGS.bybit_testnet,
         api_key=SETTINGS.bybit_api_key,
         api_secret=SETTINGS.bybit_api_secret,
-    )
-
-
-def round_tick(x: Decimal, tick: Decimal) -> Decimal:
-    """Rundet x auf die Bybit-Tickgröße nach unten."""
-    return (int((x / tick).to_integral_value(rounding=ROUND_DOWN)) * tick)
+    ))))
 
 
 def _get_symbol() -> str:
@@ -58,10 +61,15 @@ def force_flat_now(
             "meta": {"symbol": sym},
         }
 
-    # 1) Market reduceOnly in Gegenrichtung
+    # 1) Market reduceOnly in Gegenrichtung (Journal + orderLinkId je Leg)
     opp_side = "Buy" if side == "Sell" else "Sell"
-    market_res = s.place_order(
-        category="linear",
+    # Key aus Position + Minute: ein Neustart mitten im Flat-Stellen trifft dieselbe orderLinkId;
+    # spätere Versuche bekommen eine neue (ein stornierter IOC soll sie nicht blockieren,
+    # reduceOnly kann ohnehin nicht überfüllen)
+    key = f"{side}|{qty_str}|{pos.get('avgPrice')}|{pos.get('createdTime')}|{int(clock.time() // 60)}"
+    intent = journal().begin(sym, opp_side, qty_str, kind="flat", key=key)
+    market_res = submit(
+        s, intent, "close",
         symbol=sym,
         side=opp_side,
         orderType="Market",
@@ -71,39 +79,43 @@ def force_flat_now(
         timeInForce="IOC",
     )
 
-    # 2) Kurz pollen, ob flat
-    t_end = time.time() + max(0.0, poll_seconds)
+    # 2) Kurz pollen (50 ms, 100 ms, … statt fester 0.5 s), ob flat
     last_pos = pos
-    while time.time() < t_end:
-        time.sleep(0.5)
+
+    def _flat() -> bool:
+        nonlocal last_pos
         last_pos = _fetch_pos(s, sym)
-        if Decimal(last_pos["size"]) == 0:
-            return {
-                "status": "closed_market",
-                "pos": last_pos,
-                "opens": s.get_open_orders(category="linear", symbol=sym),
-                "meta": {"symbol": sym, "market_res": market_res},
-            }
+        return Decimal(last_pos["size"]) == 0
+
+    if poll_seconds > 0 and wait_for(_flat, timeout=poll_seconds):
+        intent.mark("done", status="closed_market")
+        return {
+            "status": "closed_market",
+            "pos": last_pos,
+            "opens": s.get_open_orders(category="linear", symbol=sym),
+            "meta": {"symbol": sym, "market_res": market_res},
+        }
 
     # 3) Fallback: Stop-Market knapp hinter Preis
     #    Richtige Richtung: SHORT schließen → Preis steigt → triggerDirection=1
     #                        LONG  schließen → Preis fällt → triggerDirection=2
     ticker = s.get_tickers(category="linear", symbol=sym)["result"]["list"][0]
     last = Decimal(ticker["lastPrice"])
-    instr = s.get_instruments_info(category="linear", symbol=sym)["result"]["list"][0]
-    tick = Decimal(instr["priceFilter"]["tickSize"])
+    prec = for_symbol(s, sym)
+    last_t = prec.price_ticks(last, "down")
 
+    # Trigger in ganzen Ticks: mind. 1 Tick bzw. 1 bp hinter last
     if last_pos["side"] == "Sell":  # SHORT → Buy Stop etwas über last
-        trigger = max(round_tick(last * Decimal("1.0001"), tick), (last // tick) * tick + tick)
+        trigger = prec.ticks_str(max(prec.price_ticks(last * Decimal("1.0001"), "down"), last_t + 1))
         close_side = "Buy"
         trigger_dir = 1
     else:  # LONG → Sell Stop etwas unter last
-        trigger = min(round_tick(last * Decimal("0.9999"), tick), (last // tick) * tick - tick)
+        trigger = prec.ticks_str(min(prec.price_ticks(last * Decimal("0.9999"), "down"), last_t - 1))
         close_side = "Sell"
         trigger_dir = 2
 
-    stop_res = s.place_order(
-        category="linear",
+    stop_res = submit(
+        s, intent, "stop",
         symbol=sym,
         side=close_side,
         orderType="Market",
@@ -119,9 +131,10 @@ def force_flat_now(
     )
 
     # 4) Noch einmal kurz schauen, ob dadurch bereits flat
-    time.sleep(1.5)
+    clock.sleep(1.5)
     final_pos = _fetch_pos(s, sym)
     status = "closed_stop" if Decimal(final_pos["size"]) == 0 else "armed_stop"
+    intent.mark("done", status=status)
 
     return {
         "status": status,
@@ -0,0 +1,174 @@
+# bot/exits.py
+"""
+Tick-getriebener Exit-Manager (Trailing-Stop, Timeout, MFE/MAE).
+
+- konsumiert Last-/Mark-Preise (on_price) und Kerzen-Wechsel (on_bar)
+- führt max. günstige/ungünstige Auslenkung (max_fav_pct / max_adv_pct) je Position
+- Trailing nach bot.risk.trail_params: Stop wird nur nachgezogen, wenn er sich
+  um mindestens einen Tick verbessert
+- Amendments werden pro Position zusammengefasst (nur der jüngste Stop zählt)
+  und frühestens alle min_interval_s per set_trading_stop gesendet
+- Timeout nach bot.risk.should_timeout (Anzahl Kerzen)
+"""
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from . import clock, risk
+from .precision import for_tick
+
+
+def _round_stop(x: float, tick: float, side: str) -> float:
+    """LONG-Stops abrunden, SHORT-Stops aufrunden (nie zu eng)."""
+    if tick <= 0:
+        return x
+    return for_tick(tick).stop_price(x, side)
+
+
+@dataclass
+class TrackedPosition:
+    symbol: str
+    side: str                      # 'LONG' / 'SHORT'
+    entry: float
+    qty: float
+    stop: Optional[float] = None   # zuletzt an die Börse gesendeter Stop
+    tp: Optional[float] = None
+    tick: float = 0.01
+    position_idx: int = 0
+    best: float = 0.0
+    worst: float = 0.0
+    max_fav_pct: float = 0.0
+    max_adv_pct: float = 0.0
+    bars_open: int = 0
+    pending_stop: Optional[float] = None
+    last_sent_ts: float = 0.0
+    amends: int = 0
+    trailing: bool = False
+
+
+class ExitManager:
+    """
+    amend_fn(pos, stop_str) sendet einen Stop-Amend (z. B. set_trading_stop).
+    Ohne amend_fn (DRY_RUN) wird der Stop nur lokal geführt.
+    """
+
+    def __init__(self, amend_fn: Optional[Callable[[TrackedPosition, str], Any]] = None,
+                 min_interval_s: float = 5.0):
+        self.amend_fn = amend_fn
+        self.min_interval_s = float(min_interval_s)
+        self._pos: Dict[str, TrackedPosition] = {}
+        self._lock = threading.Lock()
+
+    # --- Lifecycle --------------------------------------------------------------
+    def open(self, symbol: str, side: str, entry: float, qty: float,
+             stop: Optional[float] = None, tp: Optional[float] = None,
+             tick: float = 0.01, position_idx: int = 0, bars_open: int = 0) -> TrackedPosition:
+        """bars_open > 0: Position läuft schon (z. B. Neustart) → Timeout zählt ab Eröffnung."""
+        p = TrackedPosition(symbol, side, float(entry), float(qty), stop=stop, tp=tp,
+                            tick=float(tick), position_idx=position_idx,
+                            best=float(entry), worst=float(entry), bars_open=int(bars_open))
+        with self._lock:
+            self._pos[symbol] = p
+        return p
+
+    def close(self, symbol: str) -> Optional[TrackedPosition]:
+        with self._lock:
+            return self._pos.pop(symbol, None)
+
+    def get(self, symbol: str) -> Optional[TrackedPosition]:
+        return self._pos.get(symbol)
+
+    # --- Preis-Stream -------------------------------------------------------------
+    def on_price(self, symbol: str, price: float) -> Optional[str]:
+        """
+        Aktualisiert MFE/MAE und Trailing. Gibt einen Exit-Grund zurück, wenn
+        der Preis Stop ('stop'/'trail') oder TP ('tp') erreicht – relevant für
+        DRY_RUN, live übernimmt das die Börse.
+        """
+        with self._lock:
+            p = self._pos.get(symbol)
+            if p is None:
+                return None
+            long_ = p.side == "LONG"
+            if (price > p.best) if long_ else (price < p.best):
+                p.best = price
+            if (price < p.worst) if long_ else (price > p.worst):
+                p.worst = price
+            sgn = 1.0 if long_ else -1.0
+            p.max_fav_pct = max(p.max_fav_pct, sgn * (p.best - p.entry) / p.entry * 100.0)
+            p.max_adv_pct = min(p.max_adv_pct, sgn * (p.worst - p.entry) / p.entry * 100.0)
+
+            # Trailing relativ zum besten Preis, aktiviert ab trail_trigger_pct
+            active, dist = risk.trail_params(p.max_fav_pct)
+            if active:
+                cand = _round_stop(p.best * (1.0 - sgn * dist / 100.0), p.tick, p.side)
+                ref = p.pending_stop if p.pending_stop is not None else p.stop
+                if ref is None or sgn * (cand - ref) >= p.tick * (1 - 1e-9):
+                    p.pending_stop = cand
+                    p.trailing = True
+
+            eff_stop = p.pending_stop if p.pending_stop is not None else p.stop
+            if eff_stop is not None and sgn * (price - eff_stop) <= 0:
+                return "trail" if p.trailing else "stop"
+            if p.tp is not None and sgn * (price - p.tp) >= 0:
+                return "tp"
+            return None
+
+    def on_bar(self, symbol: str) -> Optional[str]:
+        """Pro abgeschlossener Kerze aufrufen; 'timeout' nach risk.should_timeout."""
+        with self._lock:
+            p = self._pos.get(symbol)
+            if p is None:
+                return None
+            p.bars_open += 1
+            return "timeout" if risk.should_timeout(p.bars_open) else None
+
+    # --- Amendments -----------------------------------------------------------------
+    def flush(self, now: Optional[float] = None) -> int:
+        """
+        Sendet offene Stop-Änderungen – pro Position max. ein Call je
+        min_interval_s, zwischenzeitliche Ticks werden zusammengefasst.
+        Gibt die Anzahl API-Calls zurück.
+        """
+        now = clock.time() if now is None else now
+        with self._lock:
+            due = [p for p in self._pos.values()
+                   if p.pending_stop is not None and now - p.last_sent_ts >= self.min_interval_s]
+        calls = 0
+        for p in due:
+            stop = p.pending_stop
+            stop_str = for_tick(p.tick).price_str(stop) if p.tick > 0 else str(stop)
+            if self.amend_fn is not None:
+                try:
+                    self.amend_fn(p, stop_str)
+                    calls += 1
+                except Exception as e:
+                    logger.warning("Stop-Amend {} → {} fehlgeschlagen: {}", p.symbol, stop_str, e)
+                    continue
+            with self._lock:
+                p.stop = stop
+                if p.pending_stop == stop:
+                    p.pending_stop = None
+                p.last_sent_ts = now
+                p.amends += 1
+            logger.debug("Stop {} {} → {} (Amend #{})", p.symbol, p.side, stop_str, p.amends)
+        return calls
+
+    def positions(self) -> List[TrackedPosition]:
+        with self._lock:
+            return list(self._pos.values())
+
+
+def make_amend_fn(s) -> Callable[[TrackedPosition, str], Any]:
+    """Amend über pybit set_trading_stop (nur stopLoss, TP bleibt unverändert)."""
+    def _amend(p: TrackedPosition, stop_str: str):
+        r = s.set_trading_stop(category="linear", symbol=p.symbol, positionIdx=p.position_idx,
+                               stopLoss=stop_str, slTriggerBy="LastPrice")
+        if isinstance(r, dict) and r.get("retCode") not in (0, None):
+            raise RuntimeError(f"set_trading_stop retCode={r.get('retCode')} {r.get('retMsg')}")
+        return r
+    return _amend
@@ -51,8 +51,10 @@ def compute_all(
     rsi_len: int = 14,
     atr_len: int = 14,
     vol_len: int = 10,
+    copy: bool = True,
 ) -> pd.DataFrame:
-    out = df.copy()
+    # copy=False: Spalten direkt an df anhängen (z. B. frisch aus dem Ringpuffer gebaut)
+    out = df.copy() if copy else df
     out["ema_fast"] = ema(out["close"], ema_fast)
     out["ema_slow"] = ema(out["close"], ema_slow)
     out["rsi"] = rsi(out["close"], rsi_len)
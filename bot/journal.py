@@ -0,0 +1,502 @@
+# bot/journal.py
+"""
+Write-Ahead-Journal für Orders mit deterministischen Client-Order-IDs.
+
+Jede Order-Sequenz (Entry + Stops, IOC-Versuche, Flat-Stellen) wird vor dem
+Absenden als Intent ins Journal geschrieben und danach Schritt für Schritt
+fortgeschrieben:
+
+    intent → submitted → acked → filled → stops_set → done
+                                     (bzw. failed / unwound)
+
+- Append-only JSONL (logs/journal/orders.jsonl, ENV ORDER_JOURNAL)
+- fsync gebündelt: "submitted" wird vor dem API-Call durabel gemacht
+  (Group-Commit – parallele Schreiber teilen sich ein fsync), alle anderen
+  Einträge spätestens nach JOURNAL_FSYNC_MS
+- orderLinkId = <Prefix>-<Hash aus Intent-ID und Leg>: Wiederholungen eines
+  Legs tragen dieselbe ID → Bybit lehnt Duplikate ab (110072), submit()
+  erkennt das und liefert die bereits existierende Order statt eines zweiten Fills
+- reconcile() gleicht offene Sequenzen beim Start mit der Börse ab und
+  schliesst sie ab (Stops nachziehen) oder wickelt sie ab (reduceOnly-Close);
+  Sequenzen eines noch lebenden Prozesses (pid/host im Intent) bzw. jünger als
+  JOURNAL_RECONCILE_MIN_AGE_S bleiben unberührt
+
+CLI:
+  PYTHONPATH=. python -m bot.journal status
+  PYTHONPATH=. python -m bot.journal reconcile --symbol BTCUSDT [--unwind]
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from loguru import logger
+
+from . import clock
+
+JOURNAL_PATH = os.environ.get("ORDER_JOURNAL", os.path.join("logs", "journal", "orders.jsonl"))
+FSYNC_MS = float(os.environ.get("JOURNAL_FSYNC_MS", "50"))
+LINK_PREFIX = os.environ.get("ORDER_LINK_PREFIX", "bb")
+# Sequenzen jünger als das gelten als laufend (fremder Host / unbekannter Besitzer)
+RECONCILE_MIN_AGE_S = float(os.environ.get("JOURNAL_RECONCILE_MIN_AGE_S", "30"))
+HOST = socket.gethostname()
+
+STAGES = ("intent", "submitted", "acked", "filled", "stops_set")
+TERMINAL = ("done", "failed", "unwound")
+
+# Bybit: orderLinkId bereits vergeben / Order existiert nicht (mehr)
+RC_DUPLICATE_LINK = 110072
+
+
+def link_id(intent_id: str, leg: str = "entry") -> str:
+    """Deterministische orderLinkId (max. 36 Zeichen) für ein Leg eines Intents."""
+    h = hashlib.sha1(f"{intent_id}|{leg}".encode("utf-8")).hexdigest()[:24]
+    return f"{LINK_PREFIX}-{h}"[:36]
+
+
+@dataclass
+class Intent:
+    """Offene Order-Sequenz; Schritte über mark() ins Journal."""
+    id: str
+    symbol: str
+    side: str
+    qty: str
+    kind: str
+    meta: Dict[str, Any] = field(default_factory=dict)
+    stage: str = "intent"
+    legs: Dict[str, str] = field(default_factory=dict)    # leg → orderLinkId
+    order_ids: Dict[str, str] = field(default_factory=dict)
+    last: Dict[str, Any] = field(default_factory=dict)
+    owner: Dict[str, Any] = field(default_factory=dict)   # pid/host des schreibenden Prozesses
+    updated: float = 0.0                                  # ts des letzten Eintrags
+    journal: Optional["OrderJournal"] = field(default=None, repr=False, compare=False)
+
+    def link(self, leg: str = "entry") -> str:
+        lid = self.legs.get(leg)
+        if lid is None:
+            lid = self.legs[leg] = link_id(self.id, leg)
+        return lid
+
+    def mark(self, ev: str, durable: bool = False, **fields) -> None:
+        self.stage = ev
+        self.last = fields
+        self.updated = clock.time()
+        if self.journal is not None:
+            self.journal.append({"id": self.id, "ev": ev, **fields}, durable=durable)
+
+    @property
+    def closed(self) -> bool:
+        return self.stage in TERMINAL
+
+
+class OrderJournal:
+    """Append-only JSONL mit gebündeltem fsync (Group-Commit)."""
+
+    def __init__(self, path: str = JOURNAL_PATH, fsync_ms: float = FSYNC_MS):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._f = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._seq = 0          # geschrieben
+        self._synced = 0       # durabel
+        self._begun = 0        # Intents dieses Prozesses
+        self._nonce = f"{os.getpid():x}{int(time.time() * 1000):x}"
+        self._interval = max(fsync_ms, 1.0) / 1000.0
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="journal-fsync", daemon=True)
+        self._flusher.start()
+
+    # --- Schreiben --------------------------------------------------------------------
+    def append(self, rec: Dict[str, Any], durable: bool = False) -> int:
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            line = json.dumps(dict(rec, seq=seq, ts=round(clock.time(), 3)),
+                              ensure_ascii=False, default=str, separators=(",", ":"))
+            self._f.write(line + "\n")
+        if durable:
+            self.sync(seq)
+        return seq
+
+    def sync(self, upto: Optional[int] = None) -> None:
+        """fsync bis mindestens upto; wer nach einem laufenden fsync kommt, ist oft schon abgedeckt."""
+        with self._lock:
+            target = self._seq if upto is None else upto
+            if self._synced >= target or self._f.closed:
+                return
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            self._synced = self._seq
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self._interval):
+            try:
+                self.sync()
+            except (OSError, ValueError):
+                pass
+
+    def close(self) -> None:
+        self._stop.set()
+        self.sync()
+        with self._lock:
+            self._f.close()
+
+    # --- Intents ----------------------------------------------------------------------
+    def begin(self, symbol: str, side: str, qty: Any, kind: str = "entry",
+              key: Optional[str] = None, **meta) -> Intent:
+        """
+        Neuer Intent. key (z. B. Kerzen-Zeitstempel des Signals) macht die ID über
+        Prozess-Neustarts stabil; ohne key ist sie je Prozess eindeutig.
+        """
+        with self._lock:
+            self._begun += 1
+            n = self._begun
+        raw = f"{symbol}|{side}|{kind}|{key if key is not None else f'{self._nonce}-{n}'}"
+        iid = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+        owner = {"pid": os.getpid(), "host": HOST}
+        it = Intent(iid, symbol, side, str(qty), kind, meta=meta, owner=owner, updated=clock.time(), journal=self)
+        self.append({"id": iid, "ev": "intent", "symbol": symbol, "side": side,
+                     "qty": str(qty), "kind": kind, "meta": meta, "owner": owner})
+        return it
+
+    # --- Lesen ------------------------------------------------------------------------
+    def records(self) -> Iterator[Dict[str, Any]]:
+        self.sync()
+        return iter_records(self.path)
+
+    def intents(self) -> Dict[str, Intent]:
+        """Zustand aller Intents aus dem Journal (letzter Eintrag gewinnt)."""
+        out: Dict[str, Intent] = {}
+        for rec in self.records():
+            iid, ev = rec.get("id"), rec.get("ev")
+            if not iid or not ev:
+                continue
+            if ev == "intent":
+                out[iid] = Intent(iid, rec.get("symbol", ""), rec.get("side", ""), rec.get("qty", "0"),
+                                  rec.get("kind", ""), meta=rec.get("meta") or {}, owner=rec.get("owner") or {},
+                                  updated=float(rec.get("ts") or 0), journal=self)
+                continue
+            it = out.get(iid)
+            if it is None:
+                continue
+            it.stage = ev
+            it.updated = float(rec.get("ts") or it.updated)
+            it.last = {k: v for k, v in rec.items() if k not in ("id", "ev", "seq", "ts")}
+            if rec.get("leg") and rec.get("orderLinkId"):
+                it.legs[rec["leg"]] = rec["orderLinkId"]
+            if rec.get("leg") and rec.get("orderId"):
+                it.order_ids[rec["leg"]] = rec["orderId"]
+        return out
+
+    def pending(self, symbol: Optional[str] = None) -> List[Intent]:
+        return [it for it in self.intents().values()
+                if not it.closed and (symbol is None or it.symbol == symbol)]
+
+    def compact(self) -> int:
+        """Abgeschlossene Sequenzen entfernen (atomar neu schreiben). Gibt Anzahl entfernter Intents zurück."""
+        open_ids = {it.id for it in self.pending()}
+        recs = list(self.records())
+        closed = {r.get("id") for r in recs} - open_ids
+        keep = [r for r in recs if r.get("id") in open_ids]
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with self._lock:
+            with open(tmp, "w", encoding="utf-8") as f:
+                for r in keep:
+                    f.write(json.dumps(r, ensure_ascii=False, default=str, separators=(",", ":")) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._f.close()
+            os.replace(tmp, self.path)
+            self._f = open(self.path, "a", encoding="utf-8")
+        return len(closed)
+
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue   # abgeschnittene letzte Zeile nach Crash
+
+
+_JOURNAL: Optional[OrderJournal] = None
+_J_LOCK = threading.Lock()
+
+
+def journal() -> OrderJournal:
+    """Prozessweites Journal (ORDER_JOURNAL)."""
+    global _JOURNAL
+    with _J_LOCK:
+        if _JOURNAL is None:
+            _JOURNAL = OrderJournal()
+        return _JOURNAL
+
+
+# --------------------------------------------------------------------------- #
+#                          Idempotentes Absenden                              #
+# --------------------------------------------------------------------------- #
+
+def _rc_of(exc: BaseException) -> Optional[int]:
+    rc = getattr(exc, "status_code", None)
+    if isinstance(rc, int):
+        return rc
+    msg = str(exc)
+    for token in msg.replace("(", " ").replace(")", " ").replace(":", " ").split():
+        if token.isdigit() and len(token) in (5, 6):
+            return int(token)
+    return None
+
+
+def lookup(s, symbol: str, order_link_id: str) -> Optional[Dict[str, Any]]:
+    """Order per orderLinkId suchen (offen, sonst Historie). None = nicht bekannt."""
+    for fn in ("get_open_orders", "get_order_history"):
+        try:
+            r = getattr(s, fn)(category="linear", symbol=symbol, orderLinkId=order_link_id)
+        except Exception as e:
+            logger.debug("lookup {} {}: {}", fn, order_link_id, e)
+            continue
+        lst = ((r or {}).get("result") or {}).get("list") or []
+        if lst:
+            return lst[0]
+    return None
+
+
+def submit(s, intent: Intent, leg: str = "entry", **params) -> Dict[str, Any]:
+    """
+    place_order mit orderLinkId des Legs, Journal-Einträgen und Duplikat-Erkennung.
+    Bei unklarem Ausgang (Exception, Duplikat) wird per orderLinkId nachgeschaut:
+    existiert die Order, gilt sie als angenommen – es wird nie ein zweites Mal gefüllt.
+    """
+    lid = intent.link(leg)
+    params = dict(params, orderLinkId=lid)
+    params.setdefault("category", "linear")
+    params.setdefault("symbol", intent.symbol)
+    intent.mark("submitted", durable=True, leg=leg, orderLinkId=lid,
+                params={k: v for k, v in params.items() if k not in ("category", "orderLinkId")})
+    try:
+        res = s.place_order(**params)
+    except Exception as e:
+        existing = lookup(s, intent.symbol, lid)
+        if existing is None:
+            intent.mark("submit_error", leg=leg, orderLinkId=lid, error=str(e), retCode=_rc_of(e))
+            raise
+        logger.warning("Order {} existiert bereits ({}) – kein erneuter Versuch", lid, e)
+        res = {"retCode": 0, "retMsg": "OK (existing)", "result": {"orderId": existing.get("orderId"),
+                                                                   "orderLinkId": lid}}
+    rc = (res or {}).get("retCode")
+    if rc == RC_DUPLICATE_LINK:
+        existing = lookup(s, intent.symbol, lid) or {}
+        res = {"retCode": 0, "retMsg": "OK (duplicate)",
+               "result": {"orderId": existing.get("orderId"), "orderLinkId": lid}}
+        rc = 0
+    if rc == 0:
+        oid = ((res.get("result") or {}).get("orderId"))
+        if oid:
+            intent.order_ids[leg] = oid
+        intent.mark("acked", leg=leg, orderLinkId=lid, orderId=oid)
+    else:
+        intent.mark("submit_error", leg=leg, orderLinkId=lid, retCode=rc, retMsg=(res or {}).get("retMsg"))
+    return res
+
+
+# --------------------------------------------------------------------------- #
+#                              Reconciler                                     #
+# --------------------------------------------------------------------------- #
+
+_FILLED = ("Filled", "PartiallyFilled", "PartiallyFilledCanceled")
+_DEAD = ("Cancelled", "Rejected", "Deactivated")
+
+
+def _position(s, symbol: str) -> Dict[str, Any]:
+    r = s.get_positions(category="linear", symbol=symbol)
+    lst = ((r or {}).get("result") or {}).get("list") or []
+    return next((p for p in lst if float(p.get("size") or 0) > 0), {})
+
+
+def _unwind(s, it: Intent, pos: Dict[str, Any]) -> Dict[str, Any]:
+    opp = "Sell" if pos.get("side") == "Buy" else "Buy"
+    res = submit(s, it, "unwind", side=opp, orderType="Market", qty=str(pos.get("size")),
+                 reduceOnly=True, positionIdx=int(pos.get("positionIdx") or 0), timeInForce="IOC")
+    it.mark("unwound", durable=True, retCode=res.get("retCode"))
+    return res
+
+
+def _planned_stops(s, it: Intent, pos: Dict[str, Any]):
+    """Geplante Stops: aus dem filled-Eintrag, dem Intent oder (bps) um den avgPrice der Position."""
+    sl = it.last.get("sl") if it.stage == "filled" else None
+    tp = it.last.get("tp") if it.stage == "filled" else None
+    sl, tp = sl or it.meta.get("sl"), tp or it.meta.get("tp")
+    avg = float(pos.get("avgPrice") or 0)
+    if not sl and it.meta.get("sl_bps") and avg > 0:
+        from .precision import for_symbol
+        prec = for_symbol(s, it.symbol)
+        sign = 1.0 if pos.get("side") == "Buy" else -1.0
+        sl = prec.stop_str(avg * (1 - sign * float(it.meta["sl_bps"]) / 10000.0), pos.get("side"))
+        if it.meta.get("tp_bps"):
+            tp = prec.price_str(avg * (1 + sign * float(it.meta["tp_bps"]) / 10000.0), "nearest")
+    return sl, tp
+
+
+def _reconcile_one(s, it: Intent, unwind: bool) -> Dict[str, Any]:
+    out: Dict[str, Any] = {"id": it.id, "symbol": it.symbol, "kind": it.kind, "stage": it.stage}
+    orders = {leg: lookup(s, it.symbol, lid) for leg, lid in it.legs.items()}
+    if not it.legs:
+        # Crash vor dem Absenden: es kann keine Order geben
+        it.mark("failed", reason="never_submitted")
+        out["action"] = "abandon"
+        return out
+
+    filled = {leg: o for leg, o in orders.items() if o and o.get("orderStatus") in _FILLED
+              and float(o.get("cumExecQty") or 0) > 0}
+    live = {leg: o for leg, o in orders.items() if o and o.get("orderStatus") in ("New", "Untriggered", "PartiallyFilled")}
+
+    for leg, o in live.items():
+        if leg == "stop" and it.kind == "flat":
+            continue   # Schutz-Stop eines Flat-Intents bleibt aktiv
+        s.cancel_order(category="linear", symbol=it.symbol, orderLinkId=it.legs[leg])
+        it.mark("cancelled", leg=leg, orderLinkId=it.legs[leg])
+
+    if not filled:
+        it.mark("failed", reason="not_filled", orders={k: (v or {}).get("orderStatus") for k, v in orders.items()})
+        out["action"] = "close_unfilled"
+        return out
+
+    if it.stage not in ("filled", "stops_set"):
+        o = next(iter(filled.values()))
+        it.mark("filled", avgPrice=o.get("avgPrice"), cumExecQty=o.get("cumExecQty"))
+
+    needs_stops = bool(it.meta.get("stops"))
+    pos = _position(s, it.symbol)
+    if not needs_stops or not pos:
+        it.mark("done", reason="filled" if pos or not needs_stops else "position_gone")
+        out["action"] = "complete"
+        return out
+
+    has_stop = float(pos.get("stopLoss") or 0) > 0
+    if has_stop:
+        it.mark("done", reason="stops_present")
+        out["action"] = "complete"
+        return out
+
+    sl, tp = _planned_stops(s, it, pos)
+    if unwind or not sl:
+        out["action"] = "unwind"
+        out["result"] = _unwind(s, it, pos)
+        return out
+
+    res = s.set_trading_stop(category="linear", symbol=it.symbol, positionIdx=int(pos.get("positionIdx") or 0),
+                             stopLoss=str(sl), **({"takeProfit": str(tp)} if tp else {}),
+                             tpTriggerBy="LastPrice", slTriggerBy="LastPrice")
+    if (res or {}).get("retCode") == 0:
+        it.mark("stops_set", sl=sl, tp=tp)
+        it.mark("done", reason="stops_restored")
+        out["action"] = "set_stops"
+    else:
+        out["action"] = "unwind"
+        out["result"] = _unwind(s, it, pos)
+    return out
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True     # existiert, gehört aber einem anderen User
+    return True
+
+
+def owner_active(it: Intent, min_age_s: float = RECONCILE_MIN_AGE_S, now: Optional[float] = None) -> bool:
+    """
+    Läuft die Sequenz evtl. noch in einem anderen Prozess? Besitzer auf diesem Host
+    → Prozess lebt; sonst (fremder Host, alter Eintrag ohne owner) → jünger als min_age_s.
+    """
+    pid, host = it.owner.get("pid"), it.owner.get("host")
+    if host == HOST and isinstance(pid, int):
+        return _pid_alive(pid)
+    now = clock.time() if now is None else now
+    return now - it.updated < min_age_s
+
+
+def reconcile(s, symbol: Optional[str] = None, unwind: Optional[bool] = None,
+              j: Optional[OrderJournal] = None, force: bool = False) -> List[Dict[str, Any]]:
+    """
+    Offene Sequenzen gegen die Börse abgleichen:
+      - nie abgesendet           → failed
+      - Order offen              → stornieren
+      - nicht gefüllt            → failed
+      - gefüllt, Stops fehlen    → Stops aus dem Intent setzen (sonst / unwind=True: reduceOnly schliessen)
+    Sequenzen eines noch laufenden Prozesses (owner_active) bleiben unberührt, ausser force=True.
+    """
+    j = j or journal()
+    unwind = (os.environ.get("JOURNAL_UNWIND", "0") == "1") if unwind is None else unwind
+    report = []
+    for it in j.pending(symbol):
+        if not force and owner_active(it):
+            logger.info("Reconcile {} {} ({}): übersprungen, Besitzer aktiv {}", it.id, it.symbol, it.stage, it.owner)
+            report.append({"id": it.id, "symbol": it.symbol, "stage": it.stage, "action": "skip_active",
+                           "owner": it.owner})
+            continue
+        try:
+            r = _reconcile_one(s, it, unwind)
+        except Exception as e:
+            logger.exception("Reconcile {} fehlgeschlagen: {}", it.id, e)
+            r = {"id": it.id, "symbol": it.symbol, "stage": it.stage, "action": "error", "error": str(e)}
+        logger.info("Reconcile {} {} ({}): {}", it.id, it.symbol, r.get("stage"), r.get("action"))
+        report.append(r)
+    j.sync()
+    return report
+
+
+def reconcile_on_startup(s, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Für Skript-Starts: nur wenn JOURNAL_RECONCILE != 0 und es offene Sequenzen gibt."""
+    if os.environ.get("JOURNAL_RECONCILE", "1") == "0":
+        return []
+    j = journal()
+    if not any(not owner_active(it) for it in j.pending(symbol)):
+        return []
+    return reconcile(s, symbol, j=j)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Order-Journal (WAL) + Reconciler")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("status", help="offene Sequenzen anzeigen")
+    r = sub.add_parser("reconcile", help="offene Sequenzen mit der Börse abgleichen")
+    r.add_argument("--symbol", default=None)
+    r.add_argument("--unwind", action="store_true", help="gefüllte Positionen ohne Stops schliessen")
+    r.add_argument("--force", action="store_true", help="auch Sequenzen laufender Prozesse abgleichen")
+    sub.add_parser("compact", help="abgeschlossene Sequenzen entfernen")
+    args = ap.parse_args(argv)
+
+    j = journal()
+    if args.cmd == "status":
+        print(json.dumps([{"id": it.id, "symbol": it.symbol, "side": it.side, "kind": it.kind,
+                           "stage": it.stage, "legs": it.legs, "owner": it.owner,
+                           "active": owner_active(it)} for it in j.pending()], ensure_ascii=False))
+    elif args.cmd == "reconcile":
+        from .exchange_utils import get_client
+        print(json.dumps(reconcile(get_client(), args.symbol, unwind=args.unwind, force=args.force), ensure_ascii=False, default=str))
+    else:
+        print(json.dumps({"removed": j.compact()}))
+    j.close()
+
+
+if __name__ == "__main__":
+    main()
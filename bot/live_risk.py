@@ -0,0 +1,148 @@
+# bot/live_risk.py
+"""
+RiskEngine für die Live-Order-Pfade (run_signal_exec → bybit_helpers,
+run_strategy.place_order_and_stops, trade_once).
+
+Die Skripte laufen als einzelne Prozesse (Cron/Loop), deshalb wird die Engine
+vor jeder Order aus dem Börsenstand aufgebaut statt im Speicher gehalten:
+
+- Equity:      Wallet totalEquity abzüglich unrealisierter PnL
+- Positionen:  alle linearen USDT-Positionen (Menge, avgPrice, markPrice)
+               → Exposure über alle Symbole
+- Tages-PnL:   closedPnl seit 00:00 UTC (gepaged) + Änderung der offenen PnL
+               seit Tagesbeginn (Vortagspositionen gegen den Open der Tageskerze)
+- Entries:     Entry-Intents (kind entry/ioc) im Fenster aus dem Order-Journal
+               – alle Prozesse schreiben dasselbe Journal
+
+pre_trade() ist der Pre-Trade-Check: Tagesverlust-Halt, Entry-Limits je Symbol
+und gesamt (MAX_NEW_ENTRIES_PER_HOUR[_TOTAL]), Exposure, Risiko je Trade.
+Reduzierende Orders (Gegenseite einer offenen Position) werden nie blockiert.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
+
+from . import clock
+from .config import SETTINGS
+from .events import OrderIntent
+from .journal import OrderJournal, journal
+from .risk import RiskEngine
+
+DAY_S = 86_400
+ENTRY_KINDS = ("entry", "ioc")
+
+
+def _list(r) -> list:
+    return ((r or {}).get("result") or {}).get("list") or []
+
+
+def _f(x, default: float = 0.0) -> float:
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        return default
+
+
+def wallet_equity(s) -> float:
+    """Konto-Equity (UNIFIED totalEquity, sonst USDT-Equity)."""
+    acc = (_list(s.get_wallet_balance(accountType="UNIFIED")) or [{}])[0]
+    eq = _f(acc.get("totalEquity"))
+    if eq <= 0:
+        usdt = next((c for c in acc.get("coin") or [] if c.get("coin") == "USDT"), {})
+        eq = _f(usdt.get("equity"))
+    return eq
+
+
+def open_positions(s) -> list:
+    return [p for p in _list(s.get_positions(category="linear", settleCoin="USDT")) if _f(p.get("size")) > 0]
+
+
+def closed_pnl_since(s, start_ms: int) -> float:
+    """Summe closedPnl (inkl. Gebühren) aller linearen Symbole seit start_ms (nextPageCursor)."""
+    total, cursor, seen = 0.0, None, set()
+    while True:
+        kw = dict(category="linear", startTime=start_ms, limit=100)
+        if cursor:
+            kw["cursor"] = cursor
+        r = s.get_closed_pnl(**kw)
+        total += sum(_f(it.get("closedPnl")) for it in _list(r))
+        cursor = ((r or {}).get("result") or {}).get("nextPageCursor") or None
+        if not cursor or cursor in seen:
+            return total
+        seen.add(cursor)
+
+
+def _day_open(s, symbol: str) -> float:
+    """Open der laufenden Tageskerze (Bybit: 00:00 UTC) ≈ Kurs beim Tageswechsel."""
+    lst = _list(s.get_kline(category="linear", symbol=symbol, interval="D", limit=1))
+    return _f(lst[0][1]) if lst else 0.0
+
+
+def journal_entries(j: OrderJournal, since: float) -> Dict[str, list]:
+    """Zeitstempel der Entry-Intents seit since je Symbol (fehlgeschlagene zählen nicht)."""
+    first: Dict[str, Tuple[str, float]] = {}
+    last_ev: Dict[str, str] = {}
+    for rec in j.records():
+        iid, ev = rec.get("id"), rec.get("ev")
+        if not iid or not ev:
+            continue
+        if ev == "intent":
+            if rec.get("kind") in ENTRY_KINDS and iid not in first:
+                first[iid] = (rec.get("symbol", ""), float(rec.get("ts") or 0))
+        last_ev[iid] = ev
+    out: Dict[str, list] = {}
+    for iid, (sym, ts) in first.items():
+        if ts >= since and last_ev.get(iid) != "failed":
+            out.setdefault(sym, []).append(ts)
+    return out
+
+
+def engine_from_exchange(s, j: Optional[OrderJournal] = None, now: Optional[float] = None) -> RiskEngine:
+    """RiskEngine mit dem aktuellen Konto-, Positions- und Journal-Stand."""
+    now = clock.time() if now is None else now
+    day_start = now - now % DAY_S
+    positions = open_positions(s)
+    unreal = sum(_f(p.get("unrealisedPnl")) for p in positions)
+    equity = wallet_equity(s) - unreal
+
+    total = SETTINGS.max_new_entries_per_hour_total
+    eng = RiskEngine(start_equity=equity, max_entries_per_hour_total=total if total > 0 else None)
+    unreal_at_day_start = 0.0
+    for p in positions:
+        sym, size, avg = p.get("symbol", ""), _f(p.get("size")), _f(p.get("avgPrice"))
+        qty = size if p.get("side") == "Buy" else -size
+        eng.set_position(sym, qty, avg, _f(p.get("markPrice")) or avg)
+        if _f(p.get("createdTime")) / 1000.0 < day_start:
+            px0 = _day_open(s, sym)
+            if px0 > 0:
+                unreal_at_day_start += qty * (px0 - avg)
+
+    realized_today = closed_pnl_since(s, int(day_start * 1000))
+    eng.realized_today = realized_today
+    eng.day_start_equity = equity - realized_today + unreal_at_day_start
+
+    entries = journal_entries(j or journal(), now - eng.window_s)
+    for sym, tss in entries.items():
+        for ts in sorted(tss):
+            eng.seed_entry(sym, ts)
+    return eng
+
+
+def pre_trade(s, symbol: str, side: str, qty: float, price: float, sl: Optional[float] = None,
+              engine: Optional[RiskEngine] = None) -> Tuple[bool, str, Dict[str, Any]]:
+    """
+    (ok, reason, snapshot) für eine Live-Order. side 'Buy'/'Sell' bzw. 'LONG'/'SHORT'.
+    Ohne engine wird sie aus dem Börsenstand aufgebaut (engine_from_exchange).
+    """
+    eng = engine or engine_from_exchange(s)
+    long_ = side in ("Buy", "LONG")
+    held, _ = eng.position(symbol)
+    if held and (held > 0) != long_ and abs(qty) <= abs(held) + 1e-12:
+        return True, "reduce", eng.snapshot()
+    ok, reason = eng.check(OrderIntent(symbol, "LONG" if long_ else "SHORT", abs(qty), price, sl=sl))
+    snap = eng.snapshot()
+    if not ok:
+        logger.warning("Live-Risk blockiert {} {} qty={} @ {}: {}", side, symbol, qty, price, reason)
+    return ok, reason, snap
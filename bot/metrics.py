@@ -0,0 +1,266 @@
+# bot/metrics.py
+"""
+In-Process-Metriken (Counter, Gauge, HDR-artige Latenz-Histogramme) mit
+Prometheus-Text-Export auf localhost.
+
+- Histogramme haben fest vorallokierte log-lineare Buckets (array('q')):
+  record() rechnet nur einen Index aus und erhöht einen Zähler – keine
+  Listen, keine Dicts, kein Wachstum. Dauerhaft im Live-Betrieb nutzbar.
+- Labels werden einmalig beim Anlegen aufgelöst (registry.histogram(...)
+  liefert dasselbe Objekt zurück); im Hot-Path nur .inc()/.set()/.record().
+- serve(port) startet einen Daemon-Thread mit http.server auf 127.0.0.1.
+
+Beispiel:
+    from bot.metrics import REGISTRY, timed
+    LOOP = REGISTRY.histogram("bot_loop_seconds", "Dauer einer Loop-Iteration")
+    with timed(LOOP):
+        ...
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _fmt_labels(labels: LabelKey, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, n: float = 1.0) -> None:
+        self.value += n
+
+
+class Gauge:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, v: float) -> None:
+        self.value = v
+
+    def inc(self, n: float = 1.0) -> None:
+        self.value += n
+
+
+class Histogram:
+    """
+    Log-lineares Histogramm (HDR-artig) für Werte in Sekunden.
+    Bereich [lowest, highest], sub_buckets Unterteilungen je Zweierpotenz
+    → relative Genauigkeit ~ 1/sub_buckets.
+    """
+    __slots__ = ("lowest", "highest", "sub", "_log_lo", "counts", "count", "sum", "max")
+
+    def __init__(self, lowest: float = 1e-6, highest: float = 60.0, sub_buckets: int = 16):
+        self.lowest = lowest
+        self.highest = highest
+        self.sub = sub_buckets
+        self._log_lo = math.log2(lowest)
+        n = int(math.ceil((math.log2(highest) - self._log_lo) * sub_buckets)) + 2
+        self.counts = array("q", bytes(8 * n))
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def _index(self, v: float) -> int:
+        if v <= self.lowest:
+            return 0
+        i = int((math.log2(v) - self._log_lo) * self.sub) + 1
+        last = len(self.counts) - 1
+        return i if i < last else last
+
+    def record(self, v: float) -> None:
+        self.counts[self._index(v)] += 1
+        self.count += 1
+        self.sum += v
+        if v > self.max:
+            self.max = v
+
+    def upper_bound(self, i: int) -> float:
+        if i == 0:
+            return self.lowest
+        if i >= len(self.counts) - 1:
+            return math.inf
+        return 2.0 ** (self._log_lo + i / self.sub)
+
+    def percentile(self, p: float) -> float:
+        """Oberkante des Buckets, in dem das p-Perzentil liegt (0 wenn leer)."""
+        if self.count == 0:
+            return 0.0
+        target = max(1, int(math.ceil(self.count * p / 100.0)))
+        acc = 0
+        for i, c in enumerate(self.counts):
+            acc += c
+            if acc >= target:
+                return min(self.upper_bound(i), self.max)
+        return self.max
+
+    def reset(self) -> None:
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.count, self.sum, self.max = 0, 0.0, 0.0
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Tuple[str, str, Dict[LabelKey, object]]] = {}
+
+    def _get(self, kind: str, name: str, help_: str, labels: Optional[Dict[str, str]], factory):
+        key: LabelKey = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            entry = self._metrics.get(name)
+            if entry is None:
+                entry = self._metrics[name] = (kind, help_, {})
+            elif entry[0] != kind:
+                raise ValueError(f"Metrik {name} existiert bereits als {entry[0]}")
+            series = entry[2]
+            m = series.get(key)
+            if m is None:
+                m = series[key] = factory()
+            return m
+
+    def counter(self, name: str, help_: str = "", labels: Optional[Dict[str, str]] = None) -> Counter:
+        return self._get("counter", name, help_, labels, Counter)
+
+    def gauge(self, name: str, help_: str = "", labels: Optional[Dict[str, str]] = None) -> Gauge:
+        return self._get("gauge", name, help_, labels, Gauge)
+
+    def histogram(self, name: str, help_: str = "", labels: Optional[Dict[str, str]] = None,
+                  **kw) -> Histogram:
+        return self._get("histogram", name, help_, labels, lambda: Histogram(**kw))
+
+    def series(self, name: str) -> Dict[LabelKey, object]:
+        entry = self._metrics.get(name)
+        return dict(entry[2]) if entry else {}
+
+    def render(self) -> str:
+        """Prometheus-Text-Format (0.0.4)."""
+        out: List[str] = []
+        with self._lock:
+            items = [(n, k, h, dict(s)) for n, (k, h, s) in self._metrics.items()]
+        for name, kind, help_, series in items:
+            if help_:
+                out.append(f"# HELP {name} {help_}")
+            out.append(f"# TYPE {name} {kind}")
+            quantiles: List[str] = []
+            for labels, m in series.items():
+                if kind in ("counter", "gauge"):
+                    out.append(f"{name}{_fmt_labels(labels)} {m.value}")
+                    continue
+                acc = 0
+                for i, c in enumerate(m.counts):
+                    if not c:
+                        continue
+                    acc += c
+                    le = m.upper_bound(i)
+                    le_s = "+Inf" if le == math.inf else f"{le:.9g}"
+                    lbl = _fmt_labels(labels, 'le="%s"' % le_s)
+                    out.append(f"{name}_bucket{lbl} {acc}")
+                if not m.counts[-1]:
+                    lbl = _fmt_labels(labels, 'le="+Inf"')
+                    out.append(f"{name}_bucket{lbl} {m.count}")
+                out.append(f"{name}_sum{_fmt_labels(labels)} {m.sum}")
+                out.append(f"{name}_count{_fmt_labels(labels)} {m.count}")
+                for q in (0.5, 0.9, 0.99):
+                    lbl = _fmt_labels(labels, 'quantile="%s"' % q)
+                    quantiles.append(f"{name}_quantile{lbl} {m.percentile(q * 100)}")
+            if quantiles:
+                # Perzentile als eigene Gauge-Familie (aus den Buckets geschätzt)
+                out.append(f"# TYPE {name}_quantile gauge")
+                out.extend(quantiles)
+        return "\n".join(out) + "\n"
+
+
+REGISTRY = Registry()
+
+
+@contextmanager
+def timed(hist: Histogram) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        hist.record(time.perf_counter() - t0)
+
+
+class InstrumentedClient:
+    """
+    Proxy um einen pybit-HTTP-Client: misst jede Methode als REST-Endpoint
+    (bybit_rest_seconds{endpoint=...}) und zählt Fehler/retCode != 0.
+    """
+
+    def __init__(self, client, registry: Registry = REGISTRY):
+        self._client = client
+        self._registry = registry
+        self._wrapped: Dict[str, object] = {}
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+        w = self._wrapped.get(name)
+        if w is not None:
+            return w
+        reg = self._registry
+        hist = reg.histogram("bybit_rest_seconds", "REST-Latenz je Endpoint", {"endpoint": name})
+        errors = reg.counter("bybit_rest_errors_total", "REST-Fehler je Endpoint", {"endpoint": name})
+
+        def _call(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                r = attr(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                hist.record(time.perf_counter() - t0)
+            if isinstance(r, dict) and r.get("retCode") not in (0, None):
+                errors.inc()
+            return r
+
+        self._wrapped[name] = _call
+        return _call
+
+
+class _Handler(BaseHTTPRequestHandler):
+    registry: Registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # kein Access-Log auf stderr
+        pass
+
+
+def serve(port: int, registry: Registry = REGISTRY, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Startet den Exporter in einem Daemon-Thread (nur localhost)."""
+    handler = type("MetricsHandler", (_Handler,), {"registry": registry})
+    srv = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=srv.serve_forever, name="metrics-http", daemon=True).start()
+    return srv
@@ -0,0 +1,200 @@
+# bot/montecarlo.py
+"""
+Monte-Carlo-Robustheit einer Trade-Sequenz (vollständig vektorisiert, NumPy).
+
+Eingabe: Trade-Renditen in Prozent (pnl_pct aus logs/trades.csv oder einem
+bot.backtest-Lauf). Aus der einen beobachteten Reihenfolge werden P Pfade als
+2-D-Array (Pfade × Trades) erzeugt:
+
+    bootstrap   Ziehen mit Zurücklegen (Trade-Verteilung unsicher)
+    shuffle     Permutation je Pfad (gleiche Trades, andere Reihenfolge → Drawdown)
+    slippage    Originalreihenfolge, je Trade zusätzliche Slippage |N(0, σ)| bp
+                auf Ein- und Ausstieg
+
+Je Pfad: Equity (Broker-Logik, Gewinn relativ zur aktuellen Equity), finaler
+PnL, max. Drawdown. Tagesgrenze wie RiskEngine: die Trades werden in Tage à
+trades_per_day geschnitten; erreicht der Tages-PnL -daily_loss_limit_pct, ist
+der Tag "halted" und (halt=True) die restlichen Trades des Tages entfallen.
+Risk of Ruin = Anteil der Pfade mit Drawdown ≥ ruin_mult × daily_loss_limit_pct.
+
+Pfade werden in Blöcken (≈ BLOCK_ELEMS Zellen) gerechnet → konstanter Speicher,
+100k Pfade × einige hundert Trades in Sekunden.
+
+    mc = analyze(pnl_pct, paths=100_000, trades_per_day=6)
+    mc["bootstrap"]["max_dd_pct"]["p5"], mc["bootstrap"]["p_ruin"]
+
+CLI:
+  python -m bot.montecarlo --trades logs/trades.csv --paths 100000
+  python -m bot.montecarlo --candles data/BTCUSDT_15m.candles --lookback 20 --eps 0.003
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+import numpy as np
+
+from .config import SETTINGS
+
+MODES = ("bootstrap", "shuffle", "slippage")
+QUANTILES = (1, 5, 25, 50, 75, 95, 99)
+BLOCK_ELEMS = 4_000_000
+
+
+def _paths(pnl: np.ndarray, n_paths: int, mode: str, rng: np.random.Generator,
+           slip_bps: float, block: int) -> Iterator[np.ndarray]:
+    """Pfad-Blöcke (rows × n) der Trade-Renditen in Prozent."""
+    n = pnl.size
+    done = 0
+    while done < n_paths:
+        rows = min(block, n_paths - done)
+        if mode == "bootstrap":
+            r = pnl[rng.integers(0, n, size=(rows, n))]
+        elif mode == "shuffle":
+            r = rng.permuted(np.broadcast_to(pnl, (rows, n)), axis=1)
+        elif mode == "slippage":
+            # bp je Seite → Prozent: zwei Seiten, /100
+            r = pnl - np.abs(rng.normal(0.0, slip_bps, size=(rows, n))) * 2.0 / 100.0
+        else:
+            raise ValueError(f"unbekannter Modus {mode!r} (erlaubt: {MODES})")
+        done += rows
+        yield r
+
+
+def _block_stats(r: np.ndarray, per_day: int, limit_pct: float, halt: bool):
+    """
+    Ein Pfad-Block → (finaler PnL %, max. Drawdown %, Halt-Tage) je Pfad.
+    Equity tageweise: ein cumprod innerhalb der Tage, Tagesstarts per cumprod
+    über die Tagesenden (kein zweiter Durchlauf über alle Trades).
+    """
+    rows, n = r.shape
+    days = -(-n // per_day)
+    pad = days * per_day - n
+    x = np.pad(r, ((0, 0), (0, pad))) if pad else r
+    g = x.reshape(rows, days, per_day) / 100.0
+    g += 1.0
+    cum = np.cumprod(g, axis=2, out=g)
+    hit = cum <= 1.0 - limit_pct / 100.0
+    any_hit = hit.any(axis=2)
+    if halt and any_hit.any():
+        # nach dem auslösenden Trade ruht der Tag (RiskEngine.halted) → Tages-Equity eingefroren
+        first = hit.argmax(axis=2)[..., None]
+        frozen = np.take_along_axis(cum, first, axis=2)
+        after = (np.arange(per_day) > first) & any_hit[..., None]
+        cum = np.where(after, frozen, cum)
+    start = np.cumprod(cum[:, :, -1], axis=1)
+    start = np.concatenate((np.ones((rows, 1)), start[:, :-1]), axis=1)
+    cum *= start[..., None]
+    eq = cum.reshape(rows, days * per_day)[:, :n]
+    peak = np.maximum.accumulate(eq, axis=1)
+    np.maximum(peak, 1.0, out=peak)         # Startkapital zählt als erstes Hoch
+    np.divide(eq, peak, out=peak)
+    max_dd = (peak.min(axis=1) - 1.0) * 100.0
+    final = (eq[:, -1] - 1.0) * 100.0
+    return final, max_dd, any_hit.sum(axis=1)
+
+
+def _dist(x: np.ndarray) -> Dict[str, float]:
+    q = np.percentile(x, QUANTILES)
+    out = {f"p{p}": round(float(v), 4) for p, v in zip(QUANTILES, q)}
+    out["mean"] = round(float(x.mean()), 4)
+    return out
+
+
+def run_mode(pnl_pct: Sequence[float], mode: str = "bootstrap", paths: int = 100_000,
+             trades_per_day: int = 10, daily_limit_pct: Optional[float] = None, halt: bool = True,
+             ruin_mult: float = 5.0, slip_bps: float = 2.0, seed: Optional[int] = 0) -> Dict[str, Any]:
+    pnl = np.asarray(pnl_pct, dtype=np.float64)
+    pnl = pnl[np.isfinite(pnl)]
+    if pnl.size == 0:
+        raise ValueError("keine Trades")
+    limit = float(SETTINGS.daily_loss_limit_pct if daily_limit_pct is None else daily_limit_pct)
+    per_day = max(1, int(trades_per_day))
+    rng = np.random.default_rng(seed)
+    block = max(1, BLOCK_ELEMS // pnl.size)
+    finals, dds, halts = [], [], []
+    for r in _paths(pnl, paths, mode, rng, slip_bps, block):
+        f, d, h = _block_stats(r, per_day, limit, halt)
+        finals.append(f); dds.append(d); halts.append(h)
+    final = np.concatenate(finals)
+    dd = np.concatenate(dds)
+    hd = np.concatenate(halts)
+    ruin_pct = ruin_mult * limit
+    return {
+        "paths": int(final.size),
+        "final_pnl_pct": _dist(final),
+        "max_dd_pct": _dist(dd),
+        "p_loss": round(float((final < 0).mean()), 6),
+        "p_halt_day": round(float((hd > 0).mean()), 6),
+        "halt_days": _dist(hd.astype(np.float64)),
+        "ruin_dd_pct": ruin_pct,
+        "p_ruin": round(float((dd <= -ruin_pct).mean()), 6),
+    }
+
+
+def analyze(pnl_pct: Sequence[float], paths: int = 100_000, modes: Sequence[str] = MODES,
+            trades_per_day: int = 10, daily_limit_pct: Optional[float] = None, halt: bool = True,
+            ruin_mult: float = 5.0, slip_bps: float = 2.0, seed: Optional[int] = 0) -> Dict[str, Any]:
+    pnl = np.asarray(pnl_pct, dtype=np.float64)
+    pnl = pnl[np.isfinite(pnl)]
+    limit = float(SETTINGS.daily_loss_limit_pct if daily_limit_pct is None else daily_limit_pct)
+    out: Dict[str, Any] = {
+        "trades": int(pnl.size),
+        "observed_pnl_pct": round(float((np.prod(1.0 + pnl / 100.0) - 1.0) * 100.0), 4) if pnl.size else 0.0,
+        "daily_loss_limit_pct": limit,
+        "trades_per_day": int(trades_per_day),
+        "halt": halt,
+    }
+    for i, m in enumerate(modes):
+        out[m] = run_mode(pnl, m, paths, trades_per_day, limit, halt, ruin_mult, slip_bps,
+                          None if seed is None else seed + i)
+    return out
+
+
+def trades_per_day_of(ts_open: np.ndarray) -> int:
+    """Mittlere Trades je Handelstag (UTC) aus Öffnungszeiten in Sekunden."""
+    ts = np.asarray(ts_open, dtype=np.float64)
+    ts = ts[np.isfinite(ts)]
+    if not ts.size:
+        return 10
+    days = np.unique((ts // 86_400).astype(np.int64)).size
+    return max(1, int(round(ts.size / days)))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Monte-Carlo-Robustheit einer Trade-Sequenz")
+    ap.add_argument("--trades", default=None, help="trades.csv (Broker)")
+    ap.add_argument("--candles", default=None, help="statt trades.csv: MomScalp-Backtest über diese Kerzen")
+    ap.add_argument("--lookback", type=int, default=int(os.environ.get("LOOKBACK", "20")))
+    ap.add_argument("--eps", type=float, default=float(os.environ.get("EPS_BREAK", "0")))
+    ap.add_argument("--paths", type=int, default=100_000)
+    ap.add_argument("--modes", default=",".join(MODES))
+    ap.add_argument("--trades-per-day", type=int, default=None, help="Default: aus den Daten")
+    ap.add_argument("--daily-limit", type=float, default=None, help="Default: SETTINGS.daily_loss_limit_pct")
+    ap.add_argument("--no-halt", action="store_true", help="Trades nach Tageslimit nicht auslassen")
+    ap.add_argument("--ruin-mult", type=float, default=5.0)
+    ap.add_argument("--slip-bps", type=float, default=2.0)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    if args.candles:
+        from .backtest import Bars, run
+        from .candles import open_candles
+        bars = Bars.from_candles(open_candles(args.candles))
+        res = run(bars, {"lookback": args.lookback, "eps_break": args.eps})
+        pnl = res["trades"]["pnl_pct"]
+        ts_open = bars.ts[res["trades"]["entry_i"]] / 1000.0
+    else:
+        from .analytics import load_trades
+        tr = load_trades(args.trades or os.path.join("logs", "trades.csv"))
+        pnl, ts_open = tr["pnl_pct"], tr["ts_open"]
+    per_day = args.trades_per_day or trades_per_day_of(ts_open)
+    out = analyze(pnl, args.paths, [m for m in args.modes.split(",") if m], per_day, args.daily_limit,
+                  not args.no_halt, args.ruin_mult, args.slip_bps, args.seed)
+    print(json.dumps(out, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
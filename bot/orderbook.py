@@ -0,0 +1,411 @@
+# bot/orderbook.py
+"""
+Lokales L2-Orderbuch je Symbol aus Bybit-v5-WebSocket-Snapshots und -Deltas.
+
+- Preisstufen als sortierte Listen (bisect) + dict Preis→Menge:
+  Best Bid/Ask in O(1), Update einer Stufe O(log n + Verschiebung)
+- Sequenz-Prüfung über das Update-ID-Feld "u" des WS-Snapshots: Deltas mit
+  u <= letzter u (noch unterwegs, älter als der Snapshot) werden still
+  verworfen; Lücke (u > letzter u + 1) → Buch stale, Deltas bis zum nächsten
+  Snapshot ignoriert und ein Resync angestossen (Live: Topic neu abonnieren →
+  frischer WS-Snapshot; REST-"u" gehört nicht zur WS-Sequenz)
+- Tiefengewichteter Mid (Microprice über n Stufen), Spread in %,
+  Preis für marketable Limits (Sweep bis zur gewünschten Menge)
+
+Quellen:
+- live:    start_ws(["BTCUSDT"], depth=50)          (pybit WebSocket)
+- Replay:  replay.replay_ws(path, BOOKS.on_message) (Mitschnitt, siehe bot.replay)
+           bzw. python -m bot.orderbook logs/rec/ob.jsonl.gz
+- REST:    BOOKS.load_rest(symbol, s.get_orderbook(...))
+
+Ohne laufenden Feed (One-Shot-Skripte) liefern quote()/spread_guard() den
+REST-L1-Fallback.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from . import clock
+from .config import SETTINGS
+
+Level = Tuple[float, float]
+
+MAX_AGE_S = 5.0   # älter → nicht mehr als "live" verwenden
+RESYNC_MIN_S = float(os.environ.get("ORDERBOOK_RESYNC_MIN_S", "1.0"))   # Abstand Resyncs je Symbol
+RESUB_WAIT_S = 5.0   # max. Warten auf die Unsubscribe-Bestätigung vor dem Neu-Abo
+
+
+class _Side:
+    """Eine Buchseite: aufsteigend sortierte Preise + Mengen."""
+
+    __slots__ = ("prices", "sizes", "descending")
+
+    def __init__(self, descending: bool):
+        self.prices: List[float] = []
+        self.sizes: Dict[float, float] = {}
+        self.descending = descending   # Bids: bester Preis = höchster
+
+    def clear(self) -> None:
+        self.prices.clear()
+        self.sizes.clear()
+
+    def set(self, price: float, size: float) -> None:
+        if size <= 0.0:
+            if price in self.sizes:
+                del self.sizes[price]
+                i = bisect_left(self.prices, price)
+                if i < len(self.prices) and self.prices[i] == price:
+                    del self.prices[i]
+            return
+        if price not in self.sizes:
+            i = bisect_left(self.prices, price)
+            self.prices.insert(i, price)
+        self.sizes[price] = size
+
+    def best(self) -> Optional[Level]:
+        if not self.prices:
+            return None
+        p = self.prices[-1] if self.descending else self.prices[0]
+        return p, self.sizes[p]
+
+    def levels(self, n: Optional[int] = None) -> List[Level]:
+        """Stufen vom besten Preis aus."""
+        ps = self.prices[::-1] if self.descending else self.prices
+        if n is not None:
+            ps = ps[:n]
+        return [(p, self.sizes[p]) for p in ps]
+
+    def trim(self, depth: int) -> None:
+        extra = len(self.prices) - depth
+        if extra <= 0:
+            return
+        drop = self.prices[:extra] if self.descending else self.prices[-extra:]
+        for p in drop:
+            del self.sizes[p]
+        if self.descending:
+            del self.prices[:extra]
+        else:
+            del self.prices[-extra:]
+
+
+class OrderBook:
+    def __init__(self, symbol: str, depth: int = 50):
+        self.symbol = symbol
+        self.depth = depth
+        self.bids = _Side(descending=True)
+        self.asks = _Side(descending=False)
+        self.update_id: Optional[int] = None
+        self.ts_ms: int = 0
+        self.updated_at: float = 0.0
+        self.stale = True          # bis zum ersten Snapshot
+        self.gaps = 0
+        self.lock = threading.Lock()
+
+    # --- Updates ------------------------------------------------------------------
+    def _apply_levels(self, bids, asks) -> None:
+        for p, q in bids or ():
+            self.bids.set(float(p), float(q))
+        for p, q in asks or ():
+            self.asks.set(float(p), float(q))
+
+    def snapshot(self, bids, asks, update_id: Optional[int] = None, ts_ms: int = 0) -> None:
+        with self.lock:
+            self.bids.clear()
+            self.asks.clear()
+            self._apply_levels(bids, asks)
+            self.bids.trim(self.depth)
+            self.asks.trim(self.depth)
+            self.update_id = update_id
+            self.ts_ms = ts_ms
+            self.updated_at = clock.time()
+            self.stale = False
+
+    def delta(self, bids, asks, update_id: Optional[int] = None, ts_ms: int = 0) -> bool:
+        """
+        False = Delta verworfen (Lücke, Buch stale oder ohne WS-Sequenzbasis) → Resync nötig.
+        Veraltete Deltas (u <= letzter u) gelten nicht als Lücke und werden still verworfen.
+        """
+        with self.lock:
+            if self.stale:
+                return False
+            if update_id is not None and self.update_id is None:
+                # REST-Snapshot: dessen "u" ist keine Basis für WS-Deltas → WS-Snapshot abwarten
+                self.stale = True
+                return False
+            if update_id is not None and update_id <= self.update_id:
+                return True
+            if update_id is not None and update_id > self.update_id + 1:
+                self.stale = True
+                self.gaps += 1
+                logger.warning("Orderbuch {}: Sequenzlücke {} → {} – Resync", self.symbol, self.update_id, update_id)
+                return False
+            self._apply_levels(bids, asks)
+            self.bids.trim(self.depth)
+            self.asks.trim(self.depth)
+            if update_id is not None:
+                self.update_id = update_id
+            self.ts_ms = ts_ms or self.ts_ms
+            self.updated_at = clock.time()
+            return True
+
+    # --- Abfragen -----------------------------------------------------------------
+    def best_bid(self) -> Optional[Level]:
+        return self.bids.best()
+
+    def best_ask(self) -> Optional[Level]:
+        return self.asks.best()
+
+    def age_s(self) -> float:
+        return clock.time() - self.updated_at if self.updated_at else float("inf")
+
+    def is_live(self, max_age_s: float = MAX_AGE_S) -> bool:
+        return not self.stale and self.age_s() <= max_age_s
+
+    def mid(self) -> Optional[float]:
+        b, a = self.best_bid(), self.best_ask()
+        return (b[0] + a[0]) / 2.0 if b and a else None
+
+    def spread_pct(self) -> Optional[float]:
+        b, a = self.best_bid(), self.best_ask()
+        if not (b and a):
+            return None
+        m = (b[0] + a[0]) / 2.0
+        return (a[0] - b[0]) / m * 100.0 if m > 0 else None
+
+    def weighted_mid(self, levels: int = 5) -> Optional[float]:
+        """
+        Tiefengewichteter Mid (Microprice über n Stufen): VWAP je Seite,
+        gewichtet mit dem Volumen der Gegenseite.
+        """
+        with self.lock:
+            bl, al = self.bids.levels(levels), self.asks.levels(levels)
+        if not bl or not al:
+            return None
+        bq = sum(q for _, q in bl)
+        aq = sum(q for _, q in al)
+        if bq <= 0 or aq <= 0:
+            return self.mid()
+        bvwap = sum(p * q for p, q in bl) / bq
+        avwap = sum(p * q for p, q in al) / aq
+        return (bvwap * aq + avwap * bq) / (aq + bq)
+
+    def marketable_price(self, side: str, qty: float) -> Optional[float]:
+        """
+        Limitpreis, der qty vollständig gegen das Buch füllt (schlechteste
+        benötigte Stufe). side = 'Buy'/'LONG' nimmt Asks, sonst Bids.
+        None, wenn die Tiefe nicht reicht.
+        """
+        buy = side in ("Buy", "LONG")
+        with self.lock:
+            levels = (self.asks if buy else self.bids).levels()
+        left = qty
+        for p, q in levels:
+            left -= q
+            if left <= 0:
+                return p
+        return None
+
+
+class LocalBooks:
+    """Registry der Bücher; verarbeitet WS-Nachrichten und stösst Resyncs an."""
+
+    def __init__(self, depth: int = 50, resync: Optional[Callable[[str], None]] = None):
+        self.depth = depth
+        self.books: Dict[str, OrderBook] = {}
+        self.resync = resync
+        self._lock = threading.Lock()
+
+    def get(self, symbol: str) -> OrderBook:
+        b = self.books.get(symbol)
+        if b is None:
+            with self._lock:
+                b = self.books.setdefault(symbol, OrderBook(symbol, self.depth))
+        return b
+
+    def live(self, symbol: str, max_age_s: float = MAX_AGE_S) -> Optional[OrderBook]:
+        b = self.books.get(symbol)
+        return b if b is not None and b.is_live(max_age_s) else None
+
+    def on_message(self, msg: dict) -> None:
+        """Bybit v5 orderbook.{depth}.{symbol} (type snapshot/delta)."""
+        if not isinstance(msg, dict) or not str(msg.get("topic", "")).startswith("orderbook."):
+            return
+        data = msg.get("data") or {}
+        sym = data.get("s") or str(msg["topic"]).rsplit(".", 1)[-1]
+        book = self.get(sym)
+        u = data.get("u")
+        u = int(u) if u is not None else None
+        ts = int(msg.get("ts") or 0)
+        # u == 1 bei einem Delta = Neustart des Bybit-Dienstes → wie Snapshot behandeln
+        if msg.get("type") == "snapshot" or u == 1:
+            book.snapshot(data.get("b"), data.get("a"), u, ts)
+            return
+        if not book.delta(data.get("b"), data.get("a"), u, ts) and self.resync is not None:
+            self.resync(sym)
+
+    def load_rest(self, symbol: str, resp: dict) -> Optional[OrderBook]:
+        """
+        REST get_orderbook-Antwort als Snapshot übernehmen. Ohne Update-ID: REST- und
+        WS-Sequenz sind getrennt, das nächste WS-Delta verlangt einen WS-Snapshot.
+        """
+        if not (isinstance(resp, dict) and resp.get("retCode") == 0):
+            return None
+        r = resp.get("result") or {}
+        book = self.get(symbol)
+        book.snapshot(r.get("b"), r.get("a"), None, int(r.get("ts") or 0))
+        return book
+
+
+BOOKS = LocalBooks()
+
+
+def _throttled(run: Callable[[str], None], min_interval_s: float, name: str) -> Callable[[str], None]:
+    """
+    Resync-Callback: run(symbol) in eigenem Thread (WS-Callback nicht blockieren).
+    Je Symbol höchstens ein Resync gleichzeitig und frühestens min_interval_s nach dem
+    letzten Start – solange das Buch stale ist, meldet jedes Delta erneut Resync-Bedarf.
+    """
+    lock = threading.Lock()
+    in_flight: set = set()
+    last: Dict[str, float] = {}
+
+    def _resync(symbol: str) -> None:
+        now = clock.time()
+        with lock:
+            if symbol in in_flight or now - last.get(symbol, float("-inf")) < min_interval_s:
+                return
+            in_flight.add(symbol)
+            last[symbol] = now
+
+        def _run():
+            try:
+                run(symbol)
+            except Exception as e:
+                logger.error("Orderbuch-Resync {} fehlgeschlagen: {}", symbol, e)
+            finally:
+                with lock:
+                    in_flight.discard(symbol)
+        threading.Thread(target=_run, name=f"ob-{name}-{symbol}", daemon=True).start()
+    return _resync
+
+
+def rest_resync(client, books: LocalBooks = BOOKS, min_interval_s: float = RESYNC_MIN_S) -> Callable[[str], None]:
+    """Resync per REST-Snapshot (ohne WS-Feed, z. B. Replay); siehe _throttled."""
+    def _run(symbol: str) -> None:
+        books.load_rest(symbol, client.get_orderbook(category="linear", symbol=symbol,
+                                                     limit=min(books.depth, 200)))
+    return _throttled(_run, min_interval_s, "resync")
+
+
+def ws_resync(ws, callback: Callable[[Any], None], depth: int,
+              min_interval_s: float = RESYNC_MIN_S, wait_s: float = RESUB_WAIT_S) -> Callable[[str], None]:
+    """
+    Resync per Neu-Abo des Topics: Bybit schickt danach einen frischen type=snapshot,
+    dessen "u" wieder Basis der Delta-Sequenz ist. pybit entfernt den Callback erst mit
+    der Unsubscribe-Bestätigung – bis dahin (max. wait_s) warten, dann neu abonnieren.
+    """
+    def _run(symbol: str) -> None:
+        topic = f"orderbook.{depth}.{symbol}"
+        if topic in ws.callback_directory:
+            ws.unsubscribe(topic)
+            deadline = time.monotonic() + wait_s
+            while topic in ws.callback_directory and time.monotonic() < deadline:
+                time.sleep(0.05)
+            if topic in ws.callback_directory:
+                logger.error("Orderbuch {}: Unsubscribe nicht bestätigt – kein Neu-Abo", symbol)
+                return
+        ws.orderbook_stream(depth=depth, symbol=symbol, callback=callback)
+        logger.info("Orderbuch {}: Topic neu abonniert (Resync)", symbol)
+    return _throttled(_run, min_interval_s, "resub")
+
+
+def start_ws(symbols: List[str], depth: int = 50, books: LocalBooks = BOOKS):
+    """
+    Startet den pybit-WebSocket-Feed (linear) für die Symbole. Nachrichten
+    laufen über replay.record_ws (BYBIT_RECORD) in books.on_message; Lücken
+    werden per Neu-Abo des Topics (ws_resync) aufgelöst.
+    """
+    from pybit.unified_trading import WebSocket
+    from .replay import record_ws
+
+    books.depth = depth
+    ws = WebSocket(testnet=bool(SETTINGS.bybit_testnet), channel_type="linear")
+    cb = record_ws(books.on_message)
+    books.resync = ws_resync(ws, cb, depth)
+    for sym in symbols:
+        ws.orderbook_stream(depth=depth, symbol=sym, callback=cb)
+    return ws
+
+
+# --------------------------------------------------------------------------- #
+#                     Zugriff für Order-Pfade / Spread-Guard                  #
+# --------------------------------------------------------------------------- #
+
+def _rest_book(s, symbol: str, limit: int) -> Optional[OrderBook]:
+    """REST-Snapshot als eigenes Buch – überschreibt kein (gerade stales) WS-Buch der Registry."""
+    return LocalBooks(depth=limit).load_rest(symbol, s.get_orderbook(category="linear", symbol=symbol,
+                                                                     limit=limit))
+
+
+def quote(s, symbol: str, books: LocalBooks = BOOKS) -> Tuple[float, float]:
+    """(bid, ask): aus dem lokalen Buch, wenn live – sonst REST-L1 (limit=1)."""
+    book = books.live(symbol)
+    if book is None:
+        book = _rest_book(s, symbol, 1)
+    b = book.best_bid() if book else None
+    a = book.best_ask() if book else None
+    return (b[0] if b else 0.0), (a[0] if a else 0.0)
+
+
+def marketable_limit(s, symbol: str, side: str, qty: float, books: LocalBooks = BOOKS) -> Optional[float]:
+    """
+    Limitpreis, der qty sofort füllt: aus dem lokalen Buch, wenn live –
+    sonst aus einem REST-Snapshot (limit=ORDERBOOK_DEPTH). None bei zu wenig Tiefe.
+    """
+    book = books.live(symbol)
+    if book is None:
+        book = _rest_book(s, symbol, min(SETTINGS.orderbook_depth, 200))
+    return book.marketable_price(side, qty) if book else None
+
+
+def spread_guard(bid: float, ask: float, max_spread_pct: Optional[float] = None) -> Tuple[bool, float]:
+    """(ok, spread_pct). max_spread_pct in Prozent (Default SETTINGS.max_spread_pct)."""
+    limit = SETTINGS.max_spread_pct if max_spread_pct is None else max_spread_pct
+    if bid <= 0 or ask <= 0 or ask < bid:
+        return False, float("inf")
+    sp = (ask - bid) / ((ask + bid) / 2.0) * 100.0
+    return sp <= limit, sp
+
+
+def main(argv=None):
+    """Mitschnitt (BYBIT_RECORD) durch die lokalen Bücher abspielen und Endstand ausgeben."""
+    import argparse
+    import json
+    from .replay import replay_ws
+
+    ap = argparse.ArgumentParser(description="Orderbuch aus WS-Mitschnitt aufbauen")
+    ap.add_argument("path")
+    ap.add_argument("--speed", type=float, default=0.0, help="0 = so schnell wie möglich")
+    ap.add_argument("--depth", type=int, default=50)
+    args = ap.parse_args(argv)
+
+    books = LocalBooks(depth=args.depth)
+    t0 = time.perf_counter()
+    n = replay_ws(args.path, books.on_message, speed=args.speed)
+    dt = time.perf_counter() - t0
+    out = {"messages": n, "seconds": round(dt, 3), "msgs_per_s": round(n / dt) if dt > 0 else None, "books": {}}
+    for sym, b in books.books.items():
+        out["books"][sym] = {"bid": b.best_bid(), "ask": b.best_ask(), "spread_pct": b.spread_pct(),
+                             "weighted_mid": b.weighted_mid(), "stale": b.stale, "gaps": b.gaps,
+                             "update_id": b.update_id}
+    print(json.dumps(out))
+
+
+if __name__ == "__main__":
+    main()
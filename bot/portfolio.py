@@ -0,0 +1,338 @@
+# bot/portfolio.py
+"""
+Portfolio-Backtest: viele Symbole auf einer gemeinsamen Zeitachse.
+
+Je Symbol liegen die Kerzen spaltenweise vor (bot.candles → np.memmap, keine
+Kopie) und die MomScalp-Signale werden vektorisiert vorberechnet
+(bot.backtest.mom_signals); gespeichert werden nur die Signal-Bars (kompakte
+Spalten). Die Symbole laufen dann über einen Heap von Bar-Events zusammen:
+
+    ENTRY   Market zur Open der Folgebar eines Signals
+    MARK    Mark-to-Market einer offenen Position (alle mark_every Bars, Close)
+    EXIT    Bar-Ende der Exit-Bar (TP/SL wie bot.backtest, SL zuerst)
+
+Bei gleichem Zeitstempel gilt EXIT < MARK < ENTRY (freies Kapital steht der
+nächsten Open zur Verfügung). Events gibt es nur für Signale und offene
+Positionen, nicht für jede Bar; während eines Tages-Halts springt ein Symbol
+direkt zum ersten Signal des nächsten UTC-Tags. 100 Symbole × 1 Jahr 5m
+(≈ 10 Mio. Bars) laufen so in Sekunden.
+
+Gemeinsame Limits laufen über die RiskEngine (bot.risk), wie im Live-Bot:
+geteilte Equity, Exposure ≤ Equity × Leverage, Entries je Stunde (je Symbol
+und optional gesamt), Risiko je Trade und der Tagesverlust-Halt
+(DAILY_LOSS_LIMIT_PCT, realisiert + unrealisiert). Positionsgrösse wie
+run._size_from_risk: risk_per_trade_pct der aktuellen Equity / SL-Distanz.
+Eine Position je Symbol.
+
+    books = load_universe(["BTCUSDT", "ETHUSDT", "SOLUSDT"], "5m")
+    res = run_portfolio(books, {"lookback": 20}, leverage=3)
+    res["stats"], res["symbols"]["ETHUSDT"]
+
+CLI:
+  python -m bot.portfolio --symbols BTCUSDT,ETHUSDT,SOLUSDT --tf 5m --days 365
+  python -m bot.portfolio --symbols-file universe.txt --max-entries-total 6 --out reports/portfolio.json
+"""
+from __future__ import annotations
+
+import argparse
+import heapq
+import itertools
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+from loguru import logger
+
+from .analytics import drawdown, trade_stats
+from .backtest import Bars, Costs, _exit_px, _first_hit, mom_signals
+from .events import OrderIntent
+from .risk import RiskEngine
+
+EXIT, MARK, ENTRY = 0, 1, 2
+SIDES = {1: "LONG", -1: "SHORT"}
+TRADE_FIELDS = ("symbol", "entry_ts", "exit_ts", "side", "qty", "entry_px", "exit_px",
+                "pnl_abs", "pnl_pct", "ret_pct", "reason")
+REASONS = ("tp", "sl", "eod")
+
+
+@dataclass
+class Book:
+    """Ein Symbol: Kerzen (Spalten) + vorberechnete Signal-Bars."""
+    symbol: str
+    bars: Bars
+    sig_t: np.ndarray       # Signal-Bar t (Entry bei t+1), aufsteigend
+    side: np.ndarray        # int8 je Signal
+    tp_dist: np.ndarray
+    sl_dist: np.ndarray
+
+    @classmethod
+    def build(cls, symbol: str, bars: Bars, params: Optional[Mapping[str, Any]] = None) -> "Book":
+        sig = mom_signals(bars, params)
+        t = np.flatnonzero(sig.side[:-1]) if len(bars) > 1 else np.zeros(0, dtype=np.int64)
+        return cls(symbol, bars, t, sig.side[t], sig.tp_dist[t], sig.sl_dist[t])
+
+
+def load_universe(symbols: Sequence[str], timeframe: str = "5m", since_ms: Optional[int] = None,
+                  until_ms: Optional[int] = None) -> Dict[str, Bars]:
+    """Kerzen je Symbol aus data/<SYMBOL>_<tf>.candles (memmap-Views, fehlende Dateien übersprungen)."""
+    from .candles import default_path, open_candles
+    out: Dict[str, Bars] = {}
+    for sym in symbols:
+        path = default_path(sym, timeframe)
+        if not os.path.exists(path):
+            logger.warning("Portfolio: keine Kerzen für {} ({})", sym, path)
+            continue
+        c = open_candles(path).window(since_ms, until_ms)
+        if len(c) > 1:
+            out[sym] = Bars.from_candles(c)
+    return out
+
+
+def simulate_portfolio(books: Sequence[Book], engine: RiskEngine, costs: Costs = Costs(),
+                       tf_ms: Optional[int] = None, mark_every: int = 12) -> Dict[str, Any]:
+    """
+    Alle Books über einen Event-Heap ausführen; Limits und Equity in engine.
+    Gibt Trades (Spalten), Equity-Kurve und Zähler zurück.
+    """
+    if tf_ms is None:
+        tf_ms = min((int(np.median(np.diff(b.bars.ts[:1000]))) for b in books if len(b.bars) > 1), default=0)
+    slip = costs.slip_bps / 1e4
+    fee_rate = costs.fee_bps / 1e4
+    mark_every = max(1, int(mark_every))
+    heap: list = []
+    seq = itertools.count()
+    rows: Dict[str, list] = {f: [] for f in TRADE_FIELDS}
+    eq_ts: List[int] = []
+    eq_val: List[float] = []
+    rejected: Dict[str, int] = {}
+    rej_sym = np.zeros(len(books), dtype=np.int64)
+    halt_days = set()
+    open_n = max_open = 0
+    max_exposure = 0.0
+
+    def push_signal(i: int, from_t: int) -> None:
+        b = books[i]
+        k = int(np.searchsorted(b.sig_t, from_t, "left"))
+        if k < b.sig_t.size:
+            heapq.heappush(heap, (int(b.bars.ts[b.sig_t[k] + 1]), ENTRY, i, next(seq), k))
+
+    def record(now_ms: int) -> None:
+        eq_ts.append(now_ms)
+        eq_val.append(engine.equity + engine.unrealized)
+        if engine.halted and engine.halt_reason.startswith("daily_loss"):
+            halt_days.add(now_ms // 86_400_000)
+
+    for i in range(len(books)):
+        push_signal(i, 0)
+
+    while heap:
+        now_ms, kind, i, _, data = heapq.heappop(heap)
+        b = books[i]
+        bars = b.bars
+        now = now_ms / 1000.0
+        if kind == ENTRY:
+            k = data
+            t = int(b.sig_t[k])
+            e = t + 1
+            s = int(b.side[k])
+            entry = float(bars.open[e]) * (1.0 + s * slip)
+            sl_dist = float(b.sl_dist[k])
+            tp = entry + s * float(b.tp_dist[k])
+            sl = entry - s * sl_dist
+            # Sizing wie run._size_from_risk; offene Verluste mindern die Basis (sonst lehnt check() ab)
+            base = engine.equity + min(0.0, engine.unrealized)
+            qty = base * engine.risk_per_trade_pct / 100.0 / sl_dist if sl_dist > 0 else 0.0
+            ok, reason = (False, "size 0") if qty <= 0 else engine.check(
+                OrderIntent(b.symbol, SIDES[s], qty, entry, sl=sl, tp=tp, ts=now_ms), now=now)
+            if not ok:
+                key = reason.split(" ", 1)[0].rstrip(":")
+                nxt = t + 1
+                if key == "halted" and engine.halt_reason.startswith("daily_loss"):
+                    # Halt gilt bis zum nächsten UTC-Tag → Signale bis dahin gesammelt verwerfen
+                    day = now_ms // 86_400_000
+                    halt_days.add(day)
+                    nxt = max(nxt, int(np.searchsorted(bars.ts, (day + 1) * 86_400_000, "left")) - 1)
+                skipped = int(np.searchsorted(b.sig_t, nxt, "left")) - k
+                rejected[key] = rejected.get(key, 0) + skipped
+                rej_sym[i] += skipped
+                push_signal(i, nxt)
+                continue
+            engine.on_fill(b.symbol, SIDES[s], qty, entry, qty * entry * fee_rate, now=now)
+            n = len(bars)
+            hit = _first_hit(bars.high, bars.low, e, n, s, tp, sl)
+            if hit is None:
+                j, why, px = n - 1, 2, float(bars.close[n - 1])
+            else:
+                j, t_hit, s_hit = hit
+                why, px = _exit_px(float(bars.open[j]), j > e, s, tp, sl, t_hit, s_hit)
+            pos = (s, qty, entry, float(px) * (1.0 - s * slip), why, now_ms, engine.equity, j)
+            heapq.heappush(heap, (int(bars.ts[j]) + tf_ms, EXIT, i, next(seq), pos))
+            m = e + mark_every - 1
+            if m < j:
+                heapq.heappush(heap, (int(bars.ts[m]) + tf_ms, MARK, i, next(seq), (m, j)))
+            open_n += 1
+            max_open = max(max_open, open_n)
+            max_exposure = max(max_exposure, engine.exposure)
+        elif kind == MARK:
+            m, j = data
+            engine.on_mark(b.symbol, float(bars.close[m]), now=now)
+            record(now_ms)
+            m += mark_every
+            if m < j:
+                heapq.heappush(heap, (int(bars.ts[m]) + tf_ms, MARK, i, next(seq), (m, j)))
+        else:
+            s, qty, entry, px, why, entry_ms, eq_entry, j = data
+            pnl = engine.on_fill(b.symbol, SIDES[-s], qty, px, qty * px * fee_rate, now=now)
+            pnl -= qty * entry * fee_rate           # Entry-Gebühr dem Trade zuordnen
+            open_n -= 1
+            rows["symbol"].append(i); rows["entry_ts"].append(entry_ms); rows["exit_ts"].append(now_ms)
+            rows["side"].append(s); rows["qty"].append(qty); rows["entry_px"].append(entry)
+            rows["exit_px"].append(px); rows["pnl_abs"].append(pnl)
+            rows["pnl_pct"].append(pnl / eq_entry * 100.0 if eq_entry > 0 else 0.0)
+            rows["ret_pct"].append(s * (px - entry) / entry * 100.0 - 2.0 * costs.fee_bps / 100.0)
+            rows["reason"].append(why)
+            record(now_ms)
+            push_signal(i, j)
+
+    trades = {
+        "symbol": np.asarray(rows["symbol"], dtype=np.int32),
+        "entry_ts": np.asarray(rows["entry_ts"], dtype=np.int64),
+        "exit_ts": np.asarray(rows["exit_ts"], dtype=np.int64),
+        "side": np.asarray(rows["side"], dtype=np.int8),
+        "reason": np.asarray(rows["reason"], dtype=np.int8),
+    }
+    for f in ("qty", "entry_px", "exit_px", "pnl_abs", "pnl_pct", "ret_pct"):
+        trades[f] = np.asarray(rows[f], dtype=np.float64)
+    return {
+        "trades": trades,
+        "equity_ts": np.asarray(eq_ts, dtype=np.int64),
+        "equity": np.asarray(eq_val, dtype=np.float64),
+        "rejected": rejected,
+        "rejected_by_symbol": rej_sym,
+        "halt_days": len(halt_days),
+        "max_open": max_open,
+        "max_exposure": max_exposure,
+    }
+
+
+def portfolio_stats(books: Sequence[Book], sim: Dict[str, Any], equity0: float) -> Dict[str, Any]:
+    tr = sim["trades"]
+    eq = np.concatenate(([equity0], sim["equity"]))
+    out: Dict[str, Any] = dict(trade_stats(tr["pnl_pct"]))
+    out["start_equity"] = equity0
+    out["end_equity"] = round(float(eq[-1]), 2)
+    out["return_pct"] = float((eq[-1] / equity0 - 1.0) * 100.0)
+    out["max_dd_pct"] = drawdown(eq)["max_dd_pct"]
+    out["exits"] = {r: int((tr["reason"] == k).sum()) for k, r in enumerate(REASONS)}
+    out["signals"] = int(sum(b.sig_t.size for b in books))
+    out["rejected"] = dict(sorted(sim["rejected"].items()))
+    out["halt_days"] = sim["halt_days"]
+    out["max_open"] = sim["max_open"]
+    out["max_exposure"] = round(float(sim["max_exposure"]), 2)
+    return out
+
+
+def symbol_stats(books: Sequence[Book], sim: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    tr = sim["trades"]
+    order = np.argsort(tr["symbol"], kind="stable")
+    sym = tr["symbol"][order]
+    bounds = np.searchsorted(sym, np.arange(len(books) + 1))
+    out: Dict[str, Dict[str, Any]] = {}
+    for i, b in enumerate(books):
+        idx = order[bounds[i]:bounds[i + 1]]
+        ret = tr["ret_pct"][idx]
+        st = trade_stats(ret)
+        out[b.symbol] = {
+            "bars": len(b.bars),
+            "signals": int(b.sig_t.size),
+            "trades": int(idx.size),
+            "rejected": int(sim["rejected_by_symbol"][i]),
+            "pnl_abs": round(float(tr["pnl_abs"][idx].sum()), 2),
+            "expectancy_pct": st["expectancy"],
+            "win_rate": st["win_rate"],
+            "profit_factor": st["profit_factor"],
+        }
+    return out
+
+
+def run_portfolio(universe: Mapping[str, Bars], params: Optional[Mapping[str, Any]] = None,
+                  costs: Costs = Costs(), start_equity: Optional[float] = None, leverage: Optional[float] = None,
+                  max_entries_per_hour: Optional[int] = None, max_entries_total: Optional[int] = None,
+                  risk_per_trade_pct: Optional[float] = None, mark_every: int = 12,
+                  per_symbol_params: Optional[Mapping[str, Mapping[str, Any]]] = None) -> Dict[str, Any]:
+    """Signale je Symbol vorberechnen, Portfolio simulieren, Kennzahlen (gesamt + je Symbol)."""
+    books = []
+    for sym, bars in universe.items():
+        p = dict(params or {})
+        p.update((per_symbol_params or {}).get(sym, {}))
+        books.append(Book.build(sym, bars, p))
+    engine = RiskEngine(start_equity=start_equity, leverage=leverage, max_entries_per_hour=max_entries_per_hour,
+                        max_entries_per_hour_total=max_entries_total, risk_per_trade_pct=risk_per_trade_pct)
+    equity0 = engine.equity
+    sim = simulate_portfolio(books, engine, costs, mark_every=mark_every)
+    return {
+        "stats": portfolio_stats(books, sim, equity0),
+        "symbols": symbol_stats(books, sim),
+        "trades": sim["trades"],
+        "equity": {"ts": sim["equity_ts"], "equity": sim["equity"]},
+        "symbol_names": [b.symbol for b in books],
+    }
+
+
+def _symbols(args) -> List[str]:
+    syms = [s.strip().upper() for s in (args.symbols or "").split(",") if s.strip()]
+    if args.symbols_file:
+        with open(args.symbols_file, "r", encoding="utf-8") as f:
+            syms += [ln.strip().upper() for ln in f if ln.strip() and not ln.startswith("#")]
+    return list(dict.fromkeys(syms))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Multi-Symbol-Portfolio-Backtest (MomScalp, RiskEngine-Limits)")
+    ap.add_argument("--symbols", default=os.environ.get("SYM", "BTCUSDT"), help="kommagetrennt")
+    ap.add_argument("--symbols-file", default=None, help="ein Symbol je Zeile")
+    ap.add_argument("--tf", default="5m")
+    ap.add_argument("--days", type=float, default=None, help="nur die letzten N Tage")
+    ap.add_argument("--lookback", type=int, default=int(os.environ.get("LOOKBACK", "20")))
+    ap.add_argument("--eps", type=float, default=float(os.environ.get("EPS_BREAK", "0")))
+    ap.add_argument("--prev-close", action="store_true", default=os.environ.get("USE_PREV_CLOSE", "0") == "1")
+    ap.add_argument("--no-short", action="store_true", default=os.environ.get("ALLOW_SHORT", "1") == "0")
+    ap.add_argument("--equity", type=float, default=None, help="Default: START_BALANCE")
+    ap.add_argument("--leverage", type=float, default=None, help="Default: LEVERAGE")
+    ap.add_argument("--risk-pct", type=float, default=None, help="Default: RISK_PER_TRADE_PCT")
+    ap.add_argument("--max-entries", type=int, default=None, help="je Symbol und Stunde (Default: MAX_NEW_ENTRIES_PER_HOUR)")
+    ap.add_argument("--max-entries-total", type=int, default=None, help="alle Symbole je Stunde")
+    ap.add_argument("--mark-every", type=int, default=12, help="Mark-to-Market alle N Bars")
+    ap.add_argument("--fee-bps", type=float, default=5.5)
+    ap.add_argument("--slip-bps", type=float, default=1.0)
+    ap.add_argument("--out", default=None, help="Report inkl. Trades und Equity als JSON")
+    args = ap.parse_args(argv)
+
+    universe = load_universe(_symbols(args), args.tf)
+    if args.days and universe:
+        since = max(int(b.ts[-1]) for b in universe.values()) - int(args.days * 86_400_000)
+        universe = {s: b.slice(int(np.searchsorted(b.ts, since)), len(b)) for s, b in universe.items()}
+        universe = {s: b for s, b in universe.items() if len(b) > 1}
+    if not universe:
+        raise SystemExit("keine Kerzen gefunden (python -m bot.candles backfill …)")
+    params = {"lookback": args.lookback, "eps_break": args.eps, "use_prev_close": args.prev_close,
+              "allow_short": not args.no_short}
+    logger.info("Portfolio: {} Symbole, {} Bars ({})", len(universe), sum(len(b) for b in universe.values()), args.tf)
+    res = run_portfolio(universe, params, Costs(args.fee_bps, args.slip_bps), args.equity, args.leverage,
+                        args.max_entries, args.max_entries_total, args.risk_pct, args.mark_every)
+    if args.out:
+        names = res["symbol_names"]
+        tr = res["trades"]
+        rep = {"stats": res["stats"], "symbols": res["symbols"],
+               "trades": {k: (v.tolist() if k != "symbol" else [names[x] for x in v]) for k, v in tr.items()},
+               "equity": [[int(t), round(float(e), 2)] for t, e in zip(res["equity"]["ts"], res["equity"]["equity"])]}
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(rep, f, ensure_ascii=False)
+    print(json.dumps({"stats": res["stats"], "symbols": res["symbols"]}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
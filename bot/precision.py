@@ -0,0 +1,188 @@
+# bot/precision.py
+"""
+Exakte Preis-/Mengen-Arithmetik in ganzzahligen Tick- bzw. Step-Einheiten.
+
+Statt Strings umzudrehen, Decimal zu quantisieren oder mit float-round()
+zu arbeiten, wird jeder Wert einmal in Ticks (Preis) bzw. Steps (Menge)
+umgerechnet; Rundung, richtungsabhängiges Klemmen und Min/Max-Grenzen
+laufen als Integer-Operationen. Die Exchange-Strings werden aus den
+Integer-Einheiten mit vorab berechneter Skalierung formatiert – exakt,
+auch für Ticks wie 0.005 oder 0.25.
+
+    prec = Precision.from_instrument(item)        # get_instruments_info()["result"]["list"][0]
+    prec.price_str(101.2372, "down")  -> "101.235"  (tick 0.005)
+    prec.stop_str(px, "LONG")         -> LONG-Stop abgerundet, SHORT aufgerundet
+    prec.qty_str(0.01234, "down")     -> "0.012"     (step 0.001)
+
+Rundungsmodi: "down" (Richtung -inf), "up" (Richtung +inf), "nearest" (half-up).
+"""
+from __future__ import annotations
+
+import threading
+from decimal import Decimal
+from functools import lru_cache
+from typing import Dict, Optional, Union
+
+Number = Union[float, int, str, Decimal]
+
+# Zusätzliche Nachkommastellen beim Einlesen von floats (Float-Rauschen
+# unterhalb 1e-6 Tick wird so weggerundet, ohne echte Werte zu verfälschen)
+_EXTRA = 6
+MODES = ("down", "up", "nearest")
+
+
+def _decimals(x: Number) -> int:
+    exp = Decimal(str(x)).normalize().as_tuple().exponent
+    return max(0, -int(exp))
+
+
+def _units(x: Number, dec: int) -> int:
+    """Wert als Integer in 10^-dec-Einheiten (exakt für str/Decimal)."""
+    return int(Decimal(str(x)).scaleb(dec).to_integral_value())
+
+
+def _scaled(x: Number, scale: int) -> int:
+    if isinstance(x, (str, Decimal)):
+        return int((Decimal(str(x)) * scale).to_integral_value())
+    return int(round(float(x) * scale))
+
+
+def _div(n: int, d: int, mode: str) -> int:
+    if mode == "down":
+        return n // d
+    if mode == "up":
+        return -((-n) // d)
+    if mode == "nearest":
+        return (n + d // 2) // d
+    raise ValueError(f"Unbekannter Rundungsmodus '{mode}' (erlaubt: {MODES})")
+
+
+class _Grid:
+    """Ein Raster (Tick oder Step): Integer-Einheiten ↔ Wert/String."""
+
+    __slots__ = ("dec", "unit", "pow", "_scale", "_unit_scaled")
+
+    def __init__(self, size: Number):
+        if Decimal(str(size)) <= 0:
+            raise ValueError(f"Rastergrösse muss > 0 sein: {size}")
+        self.dec = _decimals(size)
+        self.unit = _units(size, self.dec)          # z. B. tick 0.005 → dec=3, unit=5
+        self.pow = 10 ** self.dec
+        self._scale = 10 ** (self.dec + _EXTRA)
+        self._unit_scaled = self.unit * 10 ** _EXTRA
+
+    def to_units(self, x: Number, mode: str) -> int:
+        return _div(_scaled(x, self._scale), self._unit_scaled, mode)
+
+    def value(self, n: int) -> float:
+        return n * self.unit / self.pow
+
+    def fmt(self, n: int) -> str:
+        v = n * self.unit
+        if not self.dec:
+            return str(v)
+        sign = "-" if v < 0 else ""
+        q, r = divmod(abs(v), self.pow)
+        return f"{sign}{q}.{r:0{self.dec}d}"
+
+
+class Precision:
+    """Preis-/Mengen-Raster eines Instruments (tickSize, qtyStep, Min/Max)."""
+
+    def __init__(self, tick: Number = "0.01", step: Number = "0.001",
+                 min_qty: Optional[Number] = None, min_price: Optional[Number] = None,
+                 max_price: Optional[Number] = None):
+        self.tick = float(tick)
+        self.step = float(step)
+        self.price = _Grid(tick)
+        self.qty = _Grid(step)
+        self.min_steps = self.qty.to_units(min_qty, "up") if min_qty else 0
+        self.min_ticks = self.price.to_units(min_price, "up") if min_price else None
+        self.max_ticks = self.price.to_units(max_price, "down") if max_price else None
+
+    @classmethod
+    def from_instrument(cls, item: dict) -> "Precision":
+        pf = item.get("priceFilter") or {}
+        lsf = item.get("lotSizeFilter") or {}
+        return cls(tick=pf.get("tickSize") or "0.01", step=lsf.get("qtyStep") or "0.001",
+                   min_qty=lsf.get("minOrderQty"), min_price=pf.get("minPrice"),
+                   max_price=pf.get("maxPrice"))
+
+    @property
+    def price_decimals(self) -> int:
+        return self.price.dec
+
+    # --- Preise -----------------------------------------------------------------------
+    def price_ticks(self, px: Number, mode: str = "nearest") -> int:
+        return self.price.to_units(px, mode)
+
+    def clamp_ticks(self, t: int) -> int:
+        """Auf [minPrice, maxPrice] des Instruments begrenzen (falls bekannt)."""
+        if self.min_ticks is not None and t < self.min_ticks:
+            t = self.min_ticks
+        if self.max_ticks is not None and t > self.max_ticks:
+            t = self.max_ticks
+        return t
+
+    def ticks_str(self, t: int) -> str:
+        return self.price.fmt(t)
+
+    def round_price(self, px: Number, mode: str = "nearest") -> float:
+        return self.price.value(self.price_ticks(px, mode))
+
+    def price_str(self, px: Number, mode: str = "nearest", clamp: bool = False) -> str:
+        t = self.price_ticks(px, mode)
+        return self.price.fmt(self.clamp_ticks(t) if clamp else t)
+
+    def stop_ticks(self, px: Number, side: str) -> int:
+        """Stops nie zu eng: LONG-Stop (unter dem Preis) abrunden, SHORT-Stop aufrunden."""
+        return self.price_ticks(px, "down" if side in ("LONG", "Buy") else "up")
+
+    def stop_price(self, px: Number, side: str) -> float:
+        return self.price.value(self.stop_ticks(px, side))
+
+    def stop_str(self, px: Number, side: str) -> str:
+        return self.price.fmt(self.stop_ticks(px, side))
+
+    # --- Mengen -----------------------------------------------------------------------
+    def qty_steps(self, q: Number, mode: str = "down", enforce_min: bool = False) -> int:
+        n = self.qty.to_units(q, mode)
+        if enforce_min and n < self.min_steps:
+            n = self.min_steps
+        return n
+
+    def round_qty(self, q: Number, mode: str = "down", enforce_min: bool = False) -> float:
+        return self.qty.value(self.qty_steps(q, mode, enforce_min))
+
+    def qty_str(self, q: Number, mode: str = "down", enforce_min: bool = False) -> str:
+        return self.qty.fmt(self.qty_steps(q, mode, enforce_min))
+
+    def steps_str(self, n: int) -> str:
+        return self.qty.fmt(n)
+
+    def __repr__(self) -> str:
+        return f"Precision(tick={self.price.fmt(1)}, step={self.qty.fmt(1)})"
+
+
+@lru_cache(maxsize=256)
+def for_tick(tick: Number, step: Number = "0.001") -> Precision:
+    """Gecachte Precision nur aus tick/step (ohne Min/Max), z. B. für Exit-Manager."""
+    return Precision(tick=tick, step=step)
+
+
+_SYMBOLS: Dict[str, Precision] = {}
+_SYM_LOCK = threading.Lock()
+
+
+def for_symbol(s, symbol: str, refresh: bool = False) -> Precision:
+    """Precision je Symbol aus get_instruments_info (einmal pro Prozess geholt)."""
+    with _SYM_LOCK:
+        p = _SYMBOLS.get(symbol)
+    if p is not None and not refresh:
+        return p
+    r = s.get_instruments_info(category="linear", symbol=symbol)
+    item = (((r or {}).get("result") or {}).get("list") or [{}])[0]
+    p = Precision.from_instrument(item)
+    with _SYM_LOCK:
+        _SYMBOLS[symbol] = p
+    return p
@@ -0,0 +1,194 @@
+# bot/profiler.py
+"""
+On-Demand Sampling-Profiler für laufende Prozesse (ohne Neustart).
+
+- Statistischer Sampler: ein Daemon-Thread liest alle 1/PROFILE_HZ Sekunden
+  sys._current_frames() und zählt die Stacks aller anderen Threads.
+  Kein sys.setprofile/settrace → der profilierte Code läuft unverändert.
+- Ausgabe als "collapsed stacks" (eine Zeile je Stack: "a;b;c <n>"),
+  direkt verwendbar mit flamegraph.pl oder speedscope.
+- Parallel ein tracemalloc-Snapshot-Diff (Start vs. Ende) für Speicherwachstum.
+
+Auslöser:
+    kill -USR2 <pid>                          # Signal (PROFILE_SECS_DEFAULT Dauer)
+    echo 60 > logs/profiles/<name>.trigger    # Control-File (Inhalt = Sekunden)
+    PROFILE_SECS=30 python -m bot.run         # sofort ab Start (One-Shot-Skripte)
+
+Ergebnisse: logs/profiles/<name>-<YYYYmmdd-HHMMSS>.collapsed / .mem.txt
+"""
+from __future__ import annotations
+
+import atexit
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from loguru import logger
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+PROFILE_DIR = os.path.join(BASE_DIR, "logs", "profiles")
+
+DEFAULT_SECS = float(os.environ.get("PROFILE_SECS_DEFAULT", "30"))
+SAMPLE_HZ = float(os.environ.get("PROFILE_HZ", "100"))
+MEM_FRAMES = int(os.environ.get("PROFILE_MEM_FRAMES", "10"))
+MEM_TOP = 40
+
+
+def _frame_label(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class Profiler:
+    """Ein Sampling-Lauf nach dem anderen; start() während eines Laufs wird ignoriert."""
+
+    def __init__(self, name: str = "bot", out_dir: str = PROFILE_DIR, hz: float = SAMPLE_HZ):
+        self.name = name
+        self.out_dir = out_dir
+        self.interval = 1.0 / max(hz, 1.0)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._stacks: Counter = Counter()
+        self._samples = 0
+        self._mem_start = None
+        self._own_tracemalloc = False
+        self._started_at = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # --- Steuerung ------------------------------------------------------------------
+    def start(self, duration: Optional[float] = None) -> bool:
+        with self._lock:
+            if self.running:
+                logger.info("Profiler läuft bereits – Trigger ignoriert")
+                return False
+            self._stacks = Counter()
+            self._samples = 0
+            self._stop.clear()
+            self._own_tracemalloc = not tracemalloc.is_tracing()
+            if self._own_tracemalloc:
+                tracemalloc.start(MEM_FRAMES)
+            self._mem_start = tracemalloc.take_snapshot()
+            self._started_at = time.time()
+            secs = DEFAULT_SECS if duration is None else float(duration)
+            self._thread = threading.Thread(target=self._run, args=(secs,),
+                                            name="profiler", daemon=True)
+            self._thread.start()
+        logger.info("Profiler gestartet ({}s, {} Hz)", secs, round(1.0 / self.interval))
+        return True
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        t = self._thread
+        if t is not None and t is not threading.current_thread():
+            t.join(timeout)
+
+    # --- Sampling -------------------------------------------------------------------
+    def _sample(self, me: int, names: Dict[int, str]) -> None:
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            parts = []
+            while frame is not None:
+                parts.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            parts.append(names.get(ident, f"thread-{ident}"))
+            parts.reverse()
+            self._stacks[";".join(parts)] += 1
+        self._samples += 1
+
+    def _run(self, secs: float) -> None:
+        me = threading.get_ident()
+        end = time.monotonic() + secs
+        names: Dict[int, str] = {}
+        next_names = 0.0
+        try:
+            while not self._stop.is_set() and time.monotonic() < end:
+                now = time.monotonic()
+                if now >= next_names:   # Thread-Namen nur 1x/s auflösen
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                    next_names = now + 1.0
+                self._sample(me, names)
+                self._stop.wait(self.interval)
+        finally:
+            self._write()
+
+    # --- Ausgabe --------------------------------------------------------------------
+    def _write(self) -> Tuple[str, str]:
+        os.makedirs(self.out_dir, exist_ok=True)
+        stamp = datetime.fromtimestamp(self._started_at, tz=timezone.utc).strftime("%Y%m%d-%H%M%S")
+        base = os.path.join(self.out_dir, f"{self.name}-{stamp}")
+
+        collapsed = base + ".collapsed"
+        with open(collapsed, "w", encoding="utf-8") as f:
+            for stack, n in self._stacks.most_common():
+                f.write(f"{stack} {n}\n")
+
+        mem = base + ".mem.txt"
+        try:
+            snap = tracemalloc.take_snapshot()
+            diff = snap.compare_to(self._mem_start, "lineno") if self._mem_start else []
+            cur, peak = tracemalloc.get_traced_memory()
+            with open(mem, "w", encoding="utf-8") as f:
+                f.write(f"# tracemalloc diff {self.name} {stamp} "
+                        f"current={cur / 1e6:.2f}MB peak={peak / 1e6:.2f}MB\n")
+                for st in diff[:MEM_TOP]:
+                    f.write(f"{st}\n")
+        finally:
+            self._mem_start = None
+            if self._own_tracemalloc:
+                tracemalloc.stop()
+                self._own_tracemalloc = False
+
+        logger.info("Profil geschrieben: {} ({} Samples), {}", collapsed, self._samples, mem)
+        return collapsed, mem
+
+
+def _watch_trigger(prof: Profiler, path: str, poll_s: float) -> None:
+    while True:
+        time.sleep(poll_s)
+        if not os.path.exists(path):
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                raw = f.read().strip()
+            os.remove(path)
+        except OSError:
+            continue
+        try:
+            secs = float(raw) if raw else None
+        except ValueError:
+            secs = None
+        prof.start(secs)
+
+
+def install(name: str = "bot", poll_s: float = 1.0) -> Profiler:
+    """
+    Aktiviert die Profiling-Auslöser für den aktuellen Prozess:
+    SIGUSR2 (falls verfügbar, nur aus dem Main-Thread), Control-File
+    logs/profiles/<name>.trigger und PROFILE_SECS (Sofortstart).
+    """
+    prof = Profiler(name)
+
+    if hasattr(signal, "SIGUSR2") and threading.current_thread() is threading.main_thread():
+        # im Handler nur einen Thread anstossen (keine Locks im Signal-Kontext)
+        signal.signal(signal.SIGUSR2, lambda *_: threading.Thread(
+            target=prof.start, name="profiler-start", daemon=True).start())
+
+    trigger = os.path.join(prof.out_dir, f"{name}.trigger")
+    threading.Thread(target=_watch_trigger, args=(prof, trigger, poll_s),
+                     name="profiler-trigger", daemon=True).start()
+
+    secs = float(os.environ.get("PROFILE_SECS", "0") or 0)
+    if secs > 0:
+        prof.start(secs)
+        atexit.register(prof.stop)   # One-Shot-Skripte: beim Exit schreiben
+    return prof
@@ -0,0 +1,331 @@
+# bot/replay.py
+"""
+Record-and-Replay für Exchange-Traffic (REST + WS).
+
+Aufnahme: jeder REST-Call (Methode, kwargs, Antwort oder Exception, Latenz)
+und jede WS-Nachricht landet mit Zeitstempel als eine JSON-Zeile im
+Mitschnitt (".gz" → gzip-komprimiert).
+
+Wiedergabe: ReplayClient hat dieselbe Methoden-Schnittstelle wie der
+pybit-Client und liefert die aufgezeichneten Antworten deterministisch in
+Aufnahmereihenfolge zurück:
+- Treffer zuerst über (Methode, kwargs), sonst die nächste unverbrauchte
+  Antwort derselben Methode (zeitabhängige Parameter wie start/end oder
+  orderLinkId ändern sich zwischen Läufen)
+- speed=1.0 → aufgezeichnete Latenz wird nachgebildet, speed=0 → so schnell
+  wie möglich, speed=10 → zehnfach beschleunigt (Wartezeit über bot.clock,
+  unter SimClock also ohne echte Pause)
+
+Aktivierung ohne Code-Änderung (über exchange_utils.get_client / data):
+    BYBIT_RECORD=logs/rec/glitch.jsonl.gz  python scripts/trade_once.py
+    BYBIT_REPLAY=logs/rec/glitch.jsonl.gz BYBIT_REPLAY_SPEED=0  python scripts/trade_once.py
+
+WS: record_ws(callback) umhüllt einen pybit-WebSocket-Callback,
+replay_ws(path, callback, speed) spielt die Nachrichten wieder ab.
+"""
+from __future__ import annotations
+
+import atexit
+import gzip
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Tuple
+
+from loguru import logger
+
+from . import clock
+
+ENV_RECORD = "BYBIT_RECORD"
+ENV_REPLAY = "BYBIT_REPLAY"
+ENV_SPEED = "BYBIT_REPLAY_SPEED"
+
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _key(method: str, kwargs: Dict[str, Any]) -> str:
+    return method + "|" + json.dumps(kwargs, sort_keys=True, default=str, separators=(",", ":"))
+
+
+_ERRCODE = re.compile(r"\(ErrCode: (-?\d+)\)")
+
+
+class ReplayMiss(KeyError):
+    """Für den Call existiert keine (unverbrauchte) Aufnahme."""
+
+
+class ReplayedError(RuntimeError):
+    """
+    Aufgezeichnete Exception des Original-Calls: Typname in exc_type, pybit-
+    status_code (HTTP-Status bzw. retCode) wie im Original → resilience.classify
+    ordnet sie genauso ein wie live (502 / ConnectionError → retryable).
+    """
+
+    def __init__(self, exc_type: str, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.exc_type = exc_type
+        if status_code is None:              # ältere Mitschnitte ohne "c": aus pybit-Text
+            m = _ERRCODE.search(message or "")
+            status_code = int(m.group(1)) if m else None
+        self.status_code = status_code
+
+
+# --------------------------------------------------------------------------- #
+#                                 Aufnahme                                    #
+# --------------------------------------------------------------------------- #
+
+class Recorder:
+    """Thread-sicherer JSONL-Writer; eine Instanz je Pfad (siehe recorder())."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._f = _open(path, "a")
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def write(self, rec: Dict[str, Any]) -> None:
+        line = json.dumps(rec, ensure_ascii=False, default=str, separators=(",", ":"))
+        with self._lock:
+            if self._f is None:
+                return
+            self._f.write(line + "\n")
+            self._f.flush()
+
+    def rest(self, method: str, kwargs: Dict[str, Any], t0: float, dur: float,
+             resp: Any = None, error: Optional[BaseException] = None) -> None:
+        rec = {"t": round(t0, 6), "k": "rest", "m": method, "a": kwargs, "d": round(dur, 6)}
+        if error is not None:
+            rec["x"], rec["e"] = type(error).__name__, str(error)
+            code = getattr(error, "status_code", None)
+            if isinstance(code, int):
+                rec["c"] = code
+        else:
+            rec["r"] = resp
+        self.write(rec)
+
+    def ws(self, msg: Any, topic: Optional[str] = None) -> None:
+        if topic is None and isinstance(msg, dict):
+            topic = msg.get("topic")
+        self.write({"t": round(time.time(), 6), "k": "ws", "topic": topic, "msg": msg})
+
+    def close(self) -> None:
+        with self._lock:
+            if self._f is not None:
+                self._f.close()
+                self._f = None
+
+
+_RECORDERS: Dict[str, Recorder] = {}
+_REC_LOCK = threading.Lock()
+
+
+def recorder(path: str) -> Recorder:
+    with _REC_LOCK:
+        r = _RECORDERS.get(path)
+        if r is None:
+            r = _RECORDERS[path] = Recorder(path)
+        return r
+
+
+class RecordingClient:
+    """Proxy um einen pybit-HTTP-Client, der jeden Call mitschneidet."""
+
+    def __init__(self, client, path: str):
+        self._client = client
+        self._rec = recorder(path)
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+        rec = self._rec
+
+        def _call(*args, **kwargs):
+            if args:   # pybit arbeitet nur mit kwargs; Positionsargumente mit aufzeichnen
+                kwargs = dict(kwargs, _args=list(args))
+            t0 = time.time()
+            try:
+                r = attr(*args, **{k: v for k, v in kwargs.items() if k != "_args"})
+            except Exception as e:
+                rec.rest(name, kwargs, t0, time.time() - t0, error=e)
+                raise
+            rec.rest(name, kwargs, t0, time.time() - t0, resp=r)
+            return r
+
+        return _call
+
+
+def record_ws(callback: Callable[[Any], Any], path: Optional[str] = None) -> Callable[[Any], Any]:
+    """WS-Callback umhüllen: Nachricht aufzeichnen (falls BYBIT_RECORD/path), dann weiterreichen."""
+    path = path or os.environ.get(ENV_RECORD)
+    if not path:
+        return callback
+    rec = recorder(path)
+
+    def _cb(msg):
+        rec.ws(msg)
+        return callback(msg)
+
+    return _cb
+
+
+# --------------------------------------------------------------------------- #
+#                                Wiedergabe                                   #
+# --------------------------------------------------------------------------- #
+
+def iter_records(path: str, kind: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    with _open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if kind is None or rec.get("k") == kind:
+                yield rec
+
+
+class _Tape:
+    """Aufgezeichnete REST-Antworten, indiziert nach exaktem Key und nach Methode."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._by_key: Dict[str, Deque[int]] = defaultdict(deque)
+        self._by_method: Dict[str, Deque[int]] = defaultdict(deque)
+        self._recs = []
+        self._used = []
+        for rec in iter_records(path, "rest"):
+            i = len(self._recs)
+            self._recs.append(rec)
+            self._used.append(False)
+            self._by_key[_key(rec["m"], rec.get("a") or {})].append(i)
+            self._by_method[rec["m"]].append(i)
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._recs)
+
+    def _pop(self, q: Deque[int]) -> Optional[int]:
+        while q and self._used[q[0]]:
+            q.popleft()
+        return q.popleft() if q else None
+
+    def take(self, method: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            i = self._pop(self._by_key.get(_key(method, kwargs), deque()))
+            if i is None:
+                i = self._pop(self._by_method.get(method, deque()))
+            if i is None:
+                self.misses += 1
+                raise ReplayMiss(f"keine Aufnahme für {method}({kwargs})")
+            self._used[i] = True
+            return self._recs[i]
+
+    def remaining(self) -> int:
+        with self._lock:
+            return self._used.count(False)
+
+
+_TAPES: Dict[str, _Tape] = {}
+_TAPE_LOCK = threading.Lock()
+
+
+def tape(path: str) -> _Tape:
+    """Eine Tape-Instanz je Pfad und Prozess → alle Clients verbrauchen gemeinsam."""
+    with _TAPE_LOCK:
+        t = _TAPES.get(path)
+        if t is None:
+            t = _TAPES[path] = _Tape(path)
+            logger.info("Replay: {} REST-Antworten aus {}", len(t), path)
+        return t
+
+
+class ReplayClient:
+    """Client-Attrappe mit pybit-Schnittstelle, die aus einem Mitschnitt antwortet."""
+
+    def __init__(self, path: str, speed: float = 1.0):
+        self._tape = tape(path)
+        self._speed = float(speed)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        tp, speed = self._tape, self._speed
+
+        def _call(*args, **kwargs):
+            if args:
+                kwargs = dict(kwargs, _args=list(args))
+            rec = tp.take(name, kwargs)
+            if speed > 0:
+                clock.sleep(float(rec.get("d") or 0.0) / speed)
+            if "x" in rec:
+                raise ReplayedError(rec["x"], rec.get("e", ""), rec.get("c"))
+            return rec.get("r")
+
+        return _call
+
+
+def replay_ws(path: str, callback: Callable[[Any], Any], speed: float = 1.0,
+              topic: Optional[str] = None) -> int:
+    """Spielt aufgezeichnete WS-Nachrichten ab (Abstände / speed; speed=0 ohne Pause)."""
+    n, prev_t = 0, None
+    for rec in iter_records(path, "ws"):
+        if topic is not None and rec.get("topic") != topic:
+            continue
+        t = float(rec.get("t") or 0.0)
+        if speed > 0 and prev_t is not None and t > prev_t:
+            clock.sleep((t - prev_t) / speed)
+        prev_t = t
+        callback(rec.get("msg"))
+        n += 1
+    return n
+
+
+# --------------------------------------------------------------------------- #
+#                                 ENV-Hook                                    #
+# --------------------------------------------------------------------------- #
+
+def wrap(factory: Callable[[], Any]):
+    """
+    Client je nach ENV: BYBIT_REPLAY → ReplayClient (factory wird nicht aufgerufen),
+    BYBIT_RECORD → RecordingClient(factory()), sonst factory().
+    """
+    replay_path = os.environ.get(ENV_REPLAY)
+    if replay_path:
+        return ReplayClient(replay_path, speed=float(os.environ.get(ENV_SPEED, "1") or 1))
+    client = factory()
+    record_path = os.environ.get(ENV_RECORD)
+    if record_path:
+        return RecordingClient(client, record_path)
+    return client
+
+
+def summarize(path: str) -> Tuple[int, int, Dict[str, int]]:
+    """(#REST, #WS, Calls je Methode) eines Mitschnitts."""
+    rest = ws = 0
+    per: Dict[str, int] = defaultdict(int)
+    for rec in iter_records(path):
+        if rec.get("k") == "rest":
+            rest += 1
+            per[rec["m"]] += 1
+        elif rec.get("k") == "ws":
+            ws += 1
+    return rest, ws, dict(per)
+
+
+if __name__ == "__main__":
+    import sys
+    for p in sys.argv[1:]:
+        r, w, per = summarize(p)
+        print(json.dumps({"path": p, "rest": r, "ws": w, "methods": per}))
@@ -0,0 +1,351 @@
+# bot/resilience.py
+"""
+Retry-/Circuit-Breaker-Schicht für Exchange-Calls mit Fehlerklassen je retCode.
+
+Jeder Fehler (Exception oder Antwort mit retCode != 0) wird einer Klasse
+zugeordnet, die bestimmt, was passiert:
+
+    retryable     Netzwerk/Timeout/5xx, Bybit-Serverfehler → Backoff + Retry
+    rate_limit    10006/10018, HTTP 403/429               → längerer Backoff + Retry
+    price_adjust  110003 (Preis ausserhalb Band)          → Parameter anpassen (Callback), sofort erneut
+    fatal         Parameter-/Auth-/Saldofehler usw.       → sofort durchreichen
+
+Backoff: exponentiell mit "full jitter" (uniform(0, min(cap, base·2^n))), d. h.
+transiente Fehler kosten Millisekunden statt fester 0.3–0.8 s. Je Endpoint
+(Methodenname) zählt ein Circuit-Breaker aufeinanderfolgende transiente Fehler;
+nach `threshold` Fehlern ist er `open_s` Sekunden offen (Aufrufe scheitern sofort
+mit CircuitOpen), danach lässt er einen Probe-Call durch (half-open).
+
+    s = ResilientClient(client)                 # get_client() macht das bereits
+    s.get_tickers(category="linear", symbol="BTCUSDT")
+    call(s.place_order, endpoint="place_order", on_price_adjust=nudge, **params)
+
+Schreibende Calls (place_order, amend_order) werden bei unklarem Ausgang nur mit
+orderLinkId wiederholt – ohne sie könnte ein Retry doppelt füllen (vgl. bot.journal).
+Rate-Limit-Antworten sind immer wiederholbar (Request wurde abgelehnt).
+pybit-Clients werden mit retry_codes=PYBIT_RETRY_CODES gebaut, damit pybit
+nicht vorher selbst wiederholt.
+
+Metriken (bot.metrics.REGISTRY): exchange_retries_total{endpoint,cls},
+exchange_time_to_success_seconds{endpoint}, exchange_breaker_open{endpoint}.
+"""
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time as _time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from loguru import logger
+
+from . import clock
+from .metrics import REGISTRY, Registry
+
+# pybit wiederholt 10002/10006/… sonst selbst (blockierender sleep, danach
+# FailedRequestError(400, "Retries exceeded") → fatal). Leeres Set ersetzt pybit
+# durch die Defaults, daher ein nie vorkommender Code: retCodes landen hier.
+PYBIT_RETRY_CODES = frozenset({-1})
+
+RETRYABLE = "retryable"
+RATE_LIMIT = "rate_limit"
+PRICE_ADJUST = "price_adjust"
+FATAL = "fatal"
+
+# Bybit v5 retCodes (https://bybit-exchange.github.io/docs/v5/error)
+RC_CLASSES: Dict[int, str] = {
+    10000: RETRYABLE,      # Server Timeout
+    10002: RETRYABLE,      # Request-Zeit ausserhalb recv_window (Uhrdrift) → neu signieren
+    10016: RETRYABLE,      # Server Error
+    10019: RETRYABLE,      # Service restarting
+    10006: RATE_LIMIT,     # Too many visits
+    10018: RATE_LIMIT,     # IP-Rate-Limit
+    10429: RATE_LIMIT,     # System-Frequenz-Schutz
+    110003: PRICE_ADJUST,  # Order price out of permissible range
+}
+_HTTP_RATE_LIMIT = (403, 429)
+
+WRITE_METHODS = frozenset({"place_order", "amend_order", "place_batch_order", "amend_batch_order"})
+
+
+class CircuitOpen(RuntimeError):
+    """Endpoint ist nach wiederholten Fehlern vorübergehend gesperrt."""
+
+
+def _rc(x: Any) -> Optional[int]:
+    if isinstance(x, dict):
+        rc = x.get("retCode")
+        return int(rc) if isinstance(rc, (int, str)) and str(rc).lstrip("-").isdigit() else None
+    rc = getattr(x, "status_code", None)
+    if isinstance(rc, int):
+        return rc
+    for token in str(x).replace("(", " ").replace(")", " ").replace(":", " ").split():
+        if token.isdigit() and len(token) in (5, 6):
+            return int(token)
+    return None
+
+
+def classify(x: Any) -> Optional[str]:
+    """Fehlerklasse einer Exception oder Antwort; None = Erfolg (retCode 0)."""
+    if isinstance(x, dict):
+        rc = _rc(x)
+        if rc in (0, None):
+            return None
+        return RC_CLASSES.get(rc, FATAL)
+    if isinstance(x, CircuitOpen):
+        return FATAL
+    name = getattr(x, "exc_type", None) or type(x).__name__    # bot.replay.ReplayedError: Originaltyp
+    if name == "FailedRequestError":           # pybit: HTTP-Fehler, status_code = HTTP-Status
+        code = getattr(x, "status_code", None)
+        if code in _HTTP_RATE_LIMIT:
+            return RATE_LIMIT
+        return RETRYABLE if code is None or code >= 500 else FATAL
+    if isinstance(x, (ConnectionError, TimeoutError)) or name in (
+            "ConnectionError", "Timeout", "ReadTimeout", "ConnectTimeout", "ChunkedEncodingError"):
+        return RETRYABLE
+    rc = _rc(x)
+    return RC_CLASSES.get(rc, FATAL) if rc is not None else FATAL
+
+
+# --------------------------------------------------------------------------- #
+#                              Backoff / Policy                               #
+# --------------------------------------------------------------------------- #
+
+@dataclass(frozen=True)
+class Policy:
+    """Retry-Budget und Backoff-Parameter (Sekunden)."""
+    max_retries: int = 4
+    base: float = 0.025
+    cap: float = 1.0
+    rate_limit_base: float = 0.25
+    rate_limit_cap: float = 5.0
+    max_price_adjust: int = 6
+
+    @classmethod
+    def from_env(cls) -> "Policy":
+        return cls(
+            max_retries=int(os.getenv("RETRY_MAX", "4")),
+            base=float(os.getenv("RETRY_BASE_MS", "25")) / 1000.0,
+            cap=float(os.getenv("RETRY_CAP_MS", "1000")) / 1000.0,
+        )
+
+    def delay(self, attempt: int, cls: str) -> float:
+        """Full jitter: uniform(0, min(cap, base·2^attempt))."""
+        base, cap = (self.rate_limit_base, self.rate_limit_cap) if cls == RATE_LIMIT else (self.base, self.cap)
+        return random.uniform(0.0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """closed → (threshold Fehler) → open → (open_s) → half-open → Probe ok → closed."""
+
+    def __init__(self, name: str, threshold: int = 5, open_s: float = 10.0, registry: Registry = REGISTRY):
+        self.name = name
+        self.threshold = threshold
+        self.open_s = open_s
+        self._lock = threading.Lock()
+        self._fails = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._gauge = registry.gauge("exchange_breaker_open", "1 = Circuit-Breaker offen", {"endpoint": name})
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half_open" if clock.time() - self._opened_at >= self.open_s else "open"
+
+    def before(self) -> None:
+        with self._lock:
+            st = self._state()
+            if st == "open" or (st == "half_open" and self._probing):
+                left = self.open_s - (clock.time() - self._opened_at)
+                raise CircuitOpen(f"{self.name}: Circuit offen (noch {max(left, 0):.1f}s)")
+            if st == "half_open":
+                self._probing = True
+
+    def success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("Circuit {} wieder geschlossen", self.name)
+            self._fails = 0
+            self._opened_at = None
+            self._probing = False
+            self._gauge.set(0.0)
+
+    def failure(self) -> None:
+        with self._lock:
+            self._fails += 1
+            half_open = self._probing
+            self._probing = False
+            if half_open or (self._opened_at is None and self._fails >= self.threshold):
+                self._opened_at = clock.time()
+                self._gauge.set(1.0)
+                logger.warning("Circuit {} offen nach {} Fehlern ({}s)", self.name, self._fails, self.open_s)
+
+    def neutral(self) -> None:
+        """Fatale Fehler (z. B. Parameterfehler) sagen nichts über den Endpoint – Probe freigeben."""
+        with self._lock:
+            self._probing = False
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def breaker(endpoint: str) -> CircuitBreaker:
+    with _BREAKERS_LOCK:
+        b = _BREAKERS.get(endpoint)
+        if b is None:
+            b = _BREAKERS[endpoint] = CircuitBreaker(
+                endpoint,
+                threshold=int(os.getenv("BREAKER_THRESHOLD", "5")),
+                open_s=float(os.getenv("BREAKER_OPEN_S", "10")),
+            )
+        return b
+
+
+# --------------------------------------------------------------------------- #
+#                                   call()                                    #
+# --------------------------------------------------------------------------- #
+
+_STATS: Dict[str, Dict[str, float]] = {}
+_STATS_LOCK = threading.Lock()
+
+
+def _stat(endpoint: str, **inc: float) -> None:
+    with _STATS_LOCK:
+        st = _STATS.setdefault(endpoint, {"calls": 0, "retries": 0, "adjusts": 0, "recovered": 0,
+                                          "failed": 0, "rejected": 0})
+        for k, v in inc.items():
+            st[k] = st.get(k, 0) + v
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    """Retry-Statistik je Endpoint (für Status-Ausgaben)."""
+    with _STATS_LOCK:
+        out = {k: dict(v) for k, v in _STATS.items()}
+    for k, v in out.items():
+        v["breaker"] = breaker(k).state
+    return out
+
+
+def call(fn: Callable[..., Any], *args, endpoint: Optional[str] = None, policy: Optional[Policy] = None,
+         on_price_adjust: Optional[Callable[[Dict[str, Any], int], Dict[str, Any]]] = None,
+         idempotent: bool = True, registry: Registry = REGISTRY, **kwargs) -> Any:
+    """
+    fn(*args, **kwargs) mit Fehlerklassen-Policy ausführen.
+
+    on_price_adjust(kwargs, n) → neue kwargs (z. B. Preis +1 Tick) für den n-ten
+    price_adjust-Fehler; ohne Callback ist price_adjust fatal. idempotent=False
+    wiederholt nur Rate-Limit-Ablehnungen. Antworten mit retCode != 0 werden wie
+    Exceptions klassifiziert, nach aufgebrauchtem Budget aber zurückgegeben
+    (Verhalten wie ohne Schicht); Exceptions werden weitergeworfen.
+    """
+    endpoint = endpoint or getattr(fn, "__name__", "call")
+    policy = policy or DEFAULT_POLICY
+    br = breaker(endpoint)
+    t0 = _time.perf_counter()
+    retries = adjusts = 0
+    _stat(endpoint, calls=1)
+    while True:
+        try:
+            br.before()
+        except CircuitOpen:
+            _stat(endpoint, rejected=1)
+            raise
+        exc: Optional[BaseException] = None
+        res: Any = None
+        try:
+            res = fn(*args, **kwargs)
+            cls = classify(res)
+        except Exception as e:
+            exc, cls = e, classify(e)
+
+        if cls is None:
+            br.success()
+            if retries or adjusts:
+                _stat(endpoint, recovered=1)
+                registry.histogram("exchange_time_to_success_seconds", "Zeit bis Erfolg inkl. Retries",
+                                   {"endpoint": endpoint}).record(_time.perf_counter() - t0)
+            return res
+
+        if cls == PRICE_ADJUST:
+            br.neutral()
+            if on_price_adjust is not None and adjusts < policy.max_price_adjust:
+                adjusts += 1
+                _stat(endpoint, adjusts=1)
+                kwargs = on_price_adjust(dict(kwargs), adjusts)
+                registry.counter("exchange_retries_total", "Retries je Endpoint/Fehlerklasse",
+                                 {"endpoint": endpoint, "cls": cls}).inc()
+                continue
+        elif cls == FATAL:
+            br.neutral()
+        else:
+            br.failure()
+            may_retry = idempotent or cls == RATE_LIMIT
+            if may_retry and retries < policy.max_retries:
+                d = policy.delay(retries, cls)
+                retries += 1
+                _stat(endpoint, retries=1)
+                registry.counter("exchange_retries_total", "Retries je Endpoint/Fehlerklasse",
+                                 {"endpoint": endpoint, "cls": cls}).inc()
+                logger.debug("{} {} (Versuch {}) → Retry in {:.0f} ms: {}", endpoint, cls, retries,
+                             d * 1000, exc if exc is not None else (res or {}).get("retMsg"))
+                clock.sleep(d)
+                continue
+
+        _stat(endpoint, failed=1)
+        if exc is not None:
+            raise exc
+        return res
+
+
+DEFAULT_POLICY = Policy.from_env()
+
+
+class ResilientClient:
+    """
+    Proxy um einen pybit-HTTP-Client: jede öffentliche Methode läuft über call()
+    mit Endpoint = Methodenname. Schreibende Methoden ohne orderLinkId gelten
+    als nicht idempotent.
+    """
+
+    def __init__(self, client, policy: Optional[Policy] = None):
+        self._client = client
+        self._policy = policy
+        self._wrapped: Dict[str, object] = {}
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+        w = self._wrapped.get(name)
+        if w is not None:
+            return w
+        write = name in WRITE_METHODS
+
+        def _call(*args, **kwargs):
+            return call(attr, *args, endpoint=name, policy=self._policy,
+                        idempotent=not write or bool(kwargs.get("orderLinkId")), **kwargs)
+
+        self._wrapped[name] = _call
+        return _call
+
+
+def wait_for(pred: Callable[[], bool], timeout: float = 2.0, base: float = 0.05, cap: float = 0.5) -> bool:
+    """pred() mit exponentiell wachsenden Abständen pollen, bis True oder timeout."""
+    deadline = clock.time() + timeout
+    d = base
+    while True:
+        if pred():
+            return True
+        left = deadline - clock.time()
+        if left <= 0:
+            return False
+        clock.sleep(min(d, left))
+        d = min(cap, d * 2)
@@ -0,0 +1,162 @@
+# bot/ringbuffer.py
+"""
+Vorallokierter Kerzen-Ringpuffer je Symbol (feste Grösse, konstanter Speicher).
+
+Jede Spalte (ts, open, high, low, close, volume) liegt doppelt hintereinander
+im Speicher ("gespiegelter" Ring: Slot i und i+capacity werden immer beide
+geschrieben). Dadurch sind die letzten k Kerzen – auch über den Umlauf
+hinweg – stets ein zusammenhängender Abschnitt, und last(k, "close") ist
+eine NumPy-View ohne Kopie.
+
+    ring = CandleRing(1000, "BTCUSDT", "5m")
+    ring.load_frame(backfill(...))             # einmalig füllen
+    ring.update(latest(...))                   # pro Bar: nur neue/laufende Kerzen
+    ring.last(20, "high").max()                # View, keine Allokation der Daten
+    ring.frame()                               # DataFrame (Kopie) für Pandas-Indikatoren
+
+append() mit gleichem Zeitstempel wie die letzte Kerze überschreibt diese
+(laufende Kerze), ältere Zeitstempel werden ignoriert.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+FIELDS = ("ts", "open", "high", "low", "close", "volume")
+_PRICE_FIELDS = FIELDS[1:]
+_ROW = {f: i for i, f in enumerate(_PRICE_FIELDS)}
+
+
+class CandleRing:
+    """Fester Ring der letzten capacity Kerzen mit zusammenhängenden Views."""
+
+    def __init__(self, capacity: int, symbol: str = "", timeframe: str = ""):
+        if capacity <= 0:
+            raise ValueError("capacity muss > 0 sein")
+        self.capacity = int(capacity)
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self._ts = np.zeros(2 * self.capacity, dtype=np.int64)
+        # eine Zeile je Feld → jede Spalte für sich zusammenhängend
+        self._px = np.full((len(_PRICE_FIELDS), 2 * self.capacity), np.nan, dtype=np.float64)
+        self._head = 0       # nächster Schreib-Slot in [0, capacity)
+        self._n = 0          # gefüllte Slots (<= capacity)
+        self.appended = 0    # neue Kerzen insgesamt
+        self.updated = 0     # Überschreibungen der laufenden Kerze
+
+    # --- Schreiben --------------------------------------------------------------------
+    def _write(self, slot: int, ts: int, o: float, h: float, l: float, c: float, v: float) -> None:
+        px = self._px
+        for i in (slot, slot + self.capacity):
+            self._ts[i] = ts
+            px[0, i] = o; px[1, i] = h; px[2, i] = l; px[3, i] = c; px[4, i] = v
+
+    def _push(self, ts: int, o: float, h: float, l: float, c: float, v: float) -> None:
+        self._write(self._head, ts, o, h, l, c, v)
+        self._head = (self._head + 1) % self.capacity
+        if self._n < self.capacity:
+            self._n += 1
+        self.appended += 1
+
+    def append(self, ts: int, o: float, h: float, l: float, c: float, v: float) -> bool:
+        """Neue Kerze anhängen oder laufende aktualisieren. False = veraltet, ignoriert."""
+        ts = int(ts)
+        vals = (float(o), float(h), float(l), float(c), float(v))
+        if self._n:
+            last_ts = self.last_ts
+            if ts == last_ts:
+                self._write((self._head - 1) % self.capacity, ts, *vals)
+                self.updated += 1
+                return True
+            if ts < last_ts:
+                return False
+        self._push(ts, *vals)
+        return True
+
+    def update(self, rows: Iterable[Sequence[float]]) -> int:
+        """Zeilen (ts_ms, o, h, l, c, v), älteste zuerst. Gibt Anzahl neuer Kerzen zurück."""
+        before = self.appended
+        for r in rows:
+            self.append(*r[:6])
+        return self.appended - before
+
+    def load_frame(self, df: pd.DataFrame) -> int:
+        """DataFrame im Format von data.backfill (ts als datetime oder ms) übernehmen."""
+        if df is None or not len(df):
+            return 0
+        ts = df["ts"]
+        if pd.api.types.is_numeric_dtype(ts):
+            ts_ms = ts.to_numpy(dtype=np.int64)
+        else:
+            t = pd.to_datetime(ts, utc=True)
+            ts_ms = ((t - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(milliseconds=1)).to_numpy(dtype=np.int64)
+        cols = [df[f].to_numpy(dtype=np.float64) for f in _PRICE_FIELDS]
+        k = min(len(ts_ms), self.capacity)
+        return self.update(zip(ts_ms[-k:], *(c[-k:] for c in cols)))
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Mapping[str, Any]], capacity: Optional[int] = None) -> "CandleRing":
+        """Kerzen-Dicts (Werte auch als Strings, ts optional) in Listenreihenfolge übernehmen."""
+        ring = cls(capacity or max(len(rows), 1))
+        for k in rows[-ring.capacity:]:
+            ring._push(int(k.get("ts") or 0), float(k["open"]), float(k["high"]),
+                       float(k["low"]), float(k["close"]), float(k.get("volume") or 0.0))
+        return ring
+
+    def clear(self) -> None:
+        self._head = self._n = 0
+
+    # --- Lesen ------------------------------------------------------------------------
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def last_ts(self) -> int:
+        return int(self._ts[self._head - 1 + self.capacity]) if self._n else 0
+
+    def _span(self, k: Optional[int]) -> slice:
+        k = self._n if k is None else max(0, min(int(k), self._n))
+        end = self._head + self.capacity
+        return slice(end - k, end)
+
+    def last(self, k: Optional[int] = None, field: str = "close") -> np.ndarray:
+        """Die letzten k Werte eines Feldes (älteste zuerst) als read-only View."""
+        sl = self._span(k)
+        v = self._ts[sl] if field == "ts" else self._px[_ROW[field], sl]
+        v.flags.writeable = False
+        return v
+
+    def column(self, field: str) -> np.ndarray:
+        return self.last(None, field)
+
+    def __getitem__(self, i: int) -> Dict[str, float]:
+        """Einzelne Kerze als Dict (Index wie bei Listen, -1 = jüngste)."""
+        if not -self._n <= i < self._n:
+            raise IndexError(i)
+        pos = self._head + self.capacity - self._n + (i % self._n)
+        row = {f: float(self._px[j, pos]) for f, j in _ROW.items()}
+        row["ts"] = int(self._ts[pos])
+        return row
+
+    def frame(self, k: Optional[int] = None) -> pd.DataFrame:
+        """DataFrame der letzten k Kerzen (Kopie, ts als UTC-datetime) für Pandas-Code."""
+        sl = self._span(k)
+        df = pd.DataFrame({f: self._px[j, sl].copy() for f, j in _ROW.items()})
+        df.insert(0, "ts", pd.to_datetime(self._ts[sl], unit="ms", utc=True))
+        return df
+
+    @property
+    def nbytes(self) -> int:
+        return self._ts.nbytes + self._px.nbytes
+
+
+def interval_ms(timeframe: str) -> int:
+    """'5m' / '5' / '1h' → Millisekunden je Kerze."""
+    tf = str(timeframe).strip().lower()
+    if tf.endswith("h"):
+        return int(tf[:-1]) * 3_600_000
+    if tf.endswith("m"):
+        tf = tf[:-1]
+    return int(tf) * 60_000
@@ -1,3 +1,7 @@
+import threading
+from collections import deque
+
+from . import clock
 from .config import SETTINGS
 
 def should_timeout(bars_open: int) -> bool:
@@ -13,3 +17,224 @@ def trail_params(unrealized_pnl_pct: float):
 
 def use_tp() -> bool:
     return SETTINGS.use_tp
+
+
+# --------------------------------------------------------------------------- #
+#                     Portfolio-Risk-Engine (Pre-Trade-Check)                 #
+# --------------------------------------------------------------------------- #
+_SIGN = {"LONG": 1.0, "Buy": 1.0, "SHORT": -1.0, "Sell": -1.0}
+
+
+def _utc_day(ts: float) -> int:
+    return int(ts // 86400)
+
+
+class RiskEngine:
+    """
+    Zentrale Limits über alle Symbole, alles inkrementell in O(1):
+      - Exposure: Summe |Notional| je Symbol, laufend nachgeführt
+      - Tages-PnL: Equity + unrealisiert gegen den Stand beim UTC-Tageswechsel
+      - Entries pro Fenster: deque mit Zeitstempeln (amortisiert O(1))
+    check(intent) ist der Pre-Trade-Check für jeden OrderIntent. Ein Bruch
+    des Tagesverlust-Limits setzt einen globalen Halt, bis reset_halt()
+    oder der nächste UTC-Tag kommt.
+    """
+
+    def __init__(
+        self,
+        start_equity: float | None = None,
+        leverage: float | None = None,
+        max_entries_per_hour: int | None = None,
+        max_entries_per_hour_total: int | None = None,
+        risk_per_trade_pct: float | None = None,
+        window_s: float = 3600.0,
+    ):
+        self.equity = float(start_equity if start_equity is not None else SETTINGS.start_balance)
+        self.leverage = float(leverage if leverage is not None else SETTINGS.leverage)
+        self.max_entries = int(max_entries_per_hour if max_entries_per_hour is not None
+                               else SETTINGS.max_new_entries_per_hour)
+        self.max_entries_total = max_entries_per_hour_total
+        self.risk_per_trade_pct = float(risk_per_trade_pct if risk_per_trade_pct is not None
+                                        else SETTINGS.risk_per_trade_pct)
+        self.window_s = float(window_s)
+
+        self._lock = threading.Lock()
+        self._pos: dict[str, list[float]] = {}        # sym -> [signed_qty, avg_entry, mark]
+        self._notional: dict[str, float] = {}         # sym -> |qty|*mark
+        self._unreal: dict[str, float] = {}           # sym -> unrealisierte PnL
+        self.exposure = 0.0
+        self.unrealized = 0.0
+        self.realized_today = 0.0
+        self._entries: dict[str, deque] = {}
+        self._entries_total: deque = deque()
+        self._day = _utc_day(clock.time())
+        self.day_start_equity = self.equity
+        self.halted = False
+        self.halt_reason = ""
+
+    # --- Hilfen ---------------------------------------------------------------
+    def _roll_day(self, now: float) -> None:
+        d = _utc_day(now)
+        if d != self._day:
+            self._day = d
+            self.day_start_equity = self.equity + self.unrealized
+            self.realized_today = 0.0
+            if self.halted and self.halt_reason.startswith("daily_loss"):
+                self.halted, self.halt_reason = False, ""
+
+    @staticmethod
+    def _evict(dq: deque, cutoff: float) -> None:
+        while dq and dq[0] <= cutoff:
+            dq.popleft()
+
+    def _set_mark(self, sym: str, mark: float) -> None:
+        p = self._pos.get(sym)
+        if p is None:
+            return
+        p[2] = mark
+        notional = abs(p[0]) * mark
+        unreal = p[0] * (mark - p[1])
+        self.exposure += notional - self._notional.get(sym, 0.0)
+        self.unrealized += unreal - self._unreal.get(sym, 0.0)
+        self._notional[sym] = notional
+        self._unreal[sym] = unreal
+
+    def daily_pnl_pct(self) -> float:
+        if self.day_start_equity <= 0:
+            return 0.0
+        # gegen den Tagesstart (Equity + Unrealisiert beim Rollover): offene Verluste
+        # vom Vortag zählen nicht erneut
+        return (self.equity + self.unrealized - self.day_start_equity) / self.day_start_equity * 100.0
+
+    def _check_daily(self) -> None:
+        if not self.halted and should_daily_stop(self.daily_pnl_pct()):
+            self.halted = True
+            self.halt_reason = f"daily_loss {self.daily_pnl_pct():.2f}% <= -{SETTINGS.daily_loss_limit_pct}%"
+
+    # --- API --------------------------------------------------------------------
+    def check(self, intent, now: float | None = None) -> tuple[bool, str]:
+        """
+        Pre-Trade-Check. Bei ok=True wird der Entry im Fenster reserviert.
+        intent braucht: symbol, side, qty, price, optional sl.
+        """
+        now = clock.time() if now is None else now
+        with self._lock:
+            self._roll_day(now)
+            self._check_daily()
+            if self.halted:
+                return False, f"halted: {self.halt_reason}"
+
+            cutoff = now - self.window_s
+            dq = self._entries.get(intent.symbol)
+            if dq is None:
+                dq = self._entries[intent.symbol] = deque()
+            self._evict(dq, cutoff)
+            if len(dq) >= self.max_entries:
+                return False, f"entry_rate {intent.symbol}: {len(dq)}/{self.max_entries} pro Fenster"
+            if self.max_entries_total is not None:
+                self._evict(self._entries_total, cutoff)
+                if len(self._entries_total) >= self.max_entries_total:
+                    return False, f"entry_rate total: {len(self._entries_total)}/{self.max_entries_total}"
+
+            equity = self.equity + self.unrealized
+            notional = abs(intent.qty) * intent.price
+            if self.exposure + notional > equity * self.leverage:
+                return False, (f"exposure {self.exposure + notional:.2f} > "
+                               f"{equity * self.leverage:.2f} ({self.leverage}x)")
+
+            sl = getattr(intent, "sl", None)
+            if sl:
+                risk_abs = abs(intent.qty) * abs(intent.price - sl)
+                # kleine Toleranz für Rundung der Menge
+                if risk_abs > equity * self.risk_per_trade_pct / 100.0 * 1.01:
+                    return False, f"risk_per_trade {risk_abs:.2f} > {self.risk_per_trade_pct}% Equity"
+
+            dq.append(now)
+            if self.max_entries_total is not None:
+                self._entries_total.append(now)
+            return True, "ok"
+
+    def on_fill(self, symbol: str, side: str, qty: float, price: float,
+                fee: float = 0.0, now: float | None = None) -> float:
+        """Fill verbuchen (side LONG/Buy = +, SHORT/Sell = −). Gibt realisierte PnL zurück."""
+        now = clock.time() if now is None else now
+        signed = _SIGN[side] * abs(qty)
+        with self._lock:
+            self._roll_day(now)
+            p = self._pos.get(symbol)
+            if p is None:
+                p = self._pos[symbol] = [0.0, 0.0, price]
+            realized = 0.0
+            if p[0] == 0.0 or (p[0] > 0) == (signed > 0):
+                # Aufstocken: Durchschnittspreis fortschreiben
+                new_qty = p[0] + signed
+                p[1] = (p[1] * abs(p[0]) + price * abs(signed)) / abs(new_qty)
+                p[0] = new_qty
+            else:
+                closed = min(abs(signed), abs(p[0]))
+                realized = closed * (price - p[1]) * (1.0 if p[0] > 0 else -1.0)
+                rest = p[0] + signed
+                if abs(rest) < 1e-12:
+                    p[0], p[1] = 0.0, 0.0
+                elif (rest > 0) != (p[0] > 0):
+                    p[0], p[1] = rest, price   # Flip: Rest eröffnet neue Seite
+                else:
+                    p[0] = rest
+            realized -= fee
+            self.realized_today += realized
+            self.equity += realized
+            self._set_mark(symbol, price)
+            if p[0] == 0.0:
+                self.exposure -= self._notional.pop(symbol, 0.0)
+                self.unrealized -= self._unreal.pop(symbol, 0.0)
+                del self._pos[symbol]
+            self._check_daily()
+            return realized
+
+    def on_mark(self, symbol: str, price: float, now: float | None = None) -> None:
+        now = clock.time() if now is None else now
+        with self._lock:
+            self._roll_day(now)
+            self._set_mark(symbol, price)
+            self._check_daily()
+
+    def set_position(self, symbol: str, qty: float, avg: float, mark: float) -> None:
+        """Bestehende Position übernehmen (qty vorzeichenbehaftet), ohne PnL zu buchen."""
+        with self._lock:
+            if qty == 0.0:
+                return
+            self._pos[symbol] = [float(qty), float(avg), float(mark)]
+            self._set_mark(symbol, float(mark))
+
+    def seed_entry(self, symbol: str, ts: float) -> None:
+        """Früheren Entry ins Fenster übernehmen (z. B. aus dem Order-Journal eines anderen Prozesses)."""
+        with self._lock:
+            self._entries.setdefault(symbol, deque()).append(float(ts))
+            if self.max_entries_total is not None:
+                self._entries_total.append(float(ts))
+
+    def position(self, symbol: str) -> tuple[float, float]:
+        p = self._pos.get(symbol)
+        return (p[0], p[1]) if p else (0.0, 0.0)
+
+    def halt(self, reason: str) -> None:
+        with self._lock:
+            self.halted, self.halt_reason = True, reason
+
+    def reset_halt(self) -> None:
+        with self._lock:
+            self.halted, self.halt_reason = False, ""
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "ts": clock.now().isoformat(),
+                "equity": round(self.equity, 2),
+                "exposure": round(self.exposure, 2),
+                "unrealized": round(self.unrealized, 2),
+                "realized_today": round(self.realized_today, 2),
+                "daily_pnl_pct": round(self.daily_pnl_pct(), 3),
+                "positions": {s: {"qty": p[0], "avg": p[1], "mark": p[2]} for s, p in self._pos.items()},
+                "halted": self.halted,
+                "halt_reason": self.halt_reason,
+            }
@@ -0,0 +1,333 @@
+# bot/rules.py
+"""
+Deklarative Signal-Regeln → vektorisierte Maske (Backtest) + Closure je Bar (live).
+
+Eine Regel ist ein Ausdruck in Python-Syntax über Indikator-Spalten der
+aktuellen Kerze, prev.<spalte> für die Vorkerze und Parametern:
+
+    "ema_fast > ema_slow and prev.ema_fast <= prev.ema_slow"
+    "isna(atr_pct) or ATR_MIN <= atr_pct <= ATR_MAX"
+
+Erlaubt: and/or/not, Vergleiche (auch verkettet), + - * /, Zahlen,
+True/False, notna(a, b, ...), isna(a), abs(a). Namen, die in params stehen,
+sind Konstanten; alle anderen sind Spalten.
+
+Aus demselben Syntaxbaum entstehen zwei Auswerter:
+  - mask(df)         NumPy-Ausdruck über alle Zeilen (prev = um 1 verschoben)
+  - rule(now, prev)  verschachtelte Closures für eine einzelne Kerze
+Beide folgen denselben IEEE-Regeln (NaN-Vergleiche sind False, x/0 → ±inf/NaN),
+verify(sig, df) prüft die Übereinstimmung Zeile für Zeile.
+
+Ein Signal ist eine Liste benannter Bedingungen, die alle gelten müssen:
+
+    sig = compile_signal({"side": "LONG", "when": [["trend", "ema_fast > ema_slow"], ...]},
+                         params={"ATR_MIN": 0.01})
+    sig.mask(df)                 # bool-Array
+    sig(row_now, row_prev)       # bool
+    sig.explain(row_now, row_prev)  # Name der ersten verletzten Bedingung (Debug)
+"""
+from __future__ import annotations
+
+import ast
+import math
+import operator
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+_NAN = float("nan")
+
+_CMP = {
+    ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt,
+    ast.GtE: operator.ge, ast.Eq: operator.eq, ast.NotEq: operator.ne,
+}
+
+
+def _div(a: float, b: float) -> float:
+    """Skalare Division mit IEEE-Semantik wie np.divide (statt ZeroDivisionError)."""
+    if b != 0:
+        return a / b
+    if a != a or a == 0:
+        return _NAN
+    return math.copysign(math.inf, a) * math.copysign(1.0, b)
+
+
+_BIN = {
+    ast.Add: (operator.add, operator.add),
+    ast.Sub: (operator.sub, operator.sub),
+    ast.Mult: (operator.mul, operator.mul),
+    ast.Div: (np.divide, _div),
+}
+
+
+def _value(v: Any) -> float:
+    if v is None or v is pd.NA:
+        return _NAN
+    return float(v)
+
+
+class RuleError(ValueError):
+    """Ungültiger Regel-Ausdruck."""
+
+
+# Vektor-Kontext: Spalte → Array, ("prev", Spalte) → um 1 verschobenes Array
+_VecFn = Callable[[Dict[Any, np.ndarray]], Any]
+_BarFn = Callable[[Mapping[str, Any], Mapping[str, Any]], Any]
+
+
+class _Compiler:
+    def __init__(self, expr: str, params: Mapping[str, Any]):
+        self.expr = expr
+        self.params = params
+        self.columns: set = set()
+        self.prev_columns: set = set()
+
+    def fail(self, node: ast.AST, msg: str):
+        raise RuleError(f"{msg} in '{self.expr}' (Spalte {getattr(node, 'col_offset', '?')})")
+
+    def compile(self) -> Tuple[_VecFn, _BarFn]:
+        try:
+            tree = ast.parse(self.expr.strip(), mode="eval")
+        except SyntaxError as e:
+            raise RuleError(f"Syntaxfehler in '{self.expr}': {e.msg}") from None
+        return self.node(tree.body)
+
+    # ---------------------------------------------------------------------------------
+    def node(self, n: ast.AST) -> Tuple[_VecFn, _BarFn]:
+        if isinstance(n, ast.Constant):
+            if not isinstance(n.value, (int, float, bool)):
+                self.fail(n, f"Konstante {n.value!r} nicht erlaubt")
+            c = n.value
+            return (lambda ctx: c), (lambda now, prev: c)
+
+        if isinstance(n, ast.Name):
+            if n.id in self.params:
+                c = self.params[n.id]
+                return (lambda ctx: c), (lambda now, prev: c)
+            if n.id == "prev":
+                self.fail(n, "prev nur als prev.<spalte>")
+            col = n.id
+            self.columns.add(col)
+            return (lambda ctx: ctx[col]), (lambda now, prev: _value(now[col]))
+
+        if isinstance(n, ast.Attribute):
+            if not (isinstance(n.value, ast.Name) and n.value.id == "prev"):
+                self.fail(n, "Attribute nur als prev.<spalte>")
+            col = n.attr
+            self.prev_columns.add(col)
+            key = ("prev", col)
+            return (lambda ctx: ctx[key]), (lambda now, prev: _value(prev[col]))
+
+        if isinstance(n, ast.BoolOp):
+            parts = [self.node(v) for v in n.values]
+            vecs = [p[0] for p in parts]
+            bars = [p[1] for p in parts]
+            if isinstance(n.op, ast.And):
+                def vec(ctx):
+                    out = vecs[0](ctx)
+                    for f in vecs[1:]:
+                        out = np.logical_and(out, f(ctx))
+                    return out
+
+                def bar(now, prev):
+                    return all(bool(f(now, prev)) for f in bars)
+            else:
+                def vec(ctx):
+                    out = vecs[0](ctx)
+                    for f in vecs[1:]:
+                        out = np.logical_or(out, f(ctx))
+                    return out
+
+                def bar(now, prev):
+                    return any(bool(f(now, prev)) for f in bars)
+            return vec, bar
+
+        if isinstance(n, ast.UnaryOp):
+            v, b = self.node(n.operand)
+            if isinstance(n.op, ast.Not):
+                return (lambda ctx: np.logical_not(v(ctx))), (lambda now, prev: not b(now, prev))
+            if isinstance(n.op, ast.USub):
+                return (lambda ctx: -v(ctx)), (lambda now, prev: -b(now, prev))
+            self.fail(n, "Operator nicht erlaubt")
+
+        if isinstance(n, ast.BinOp):
+            ops = _BIN.get(type(n.op))
+            if ops is None:
+                self.fail(n, "Operator nicht erlaubt")
+            vop, bop = ops
+            lv, lb = self.node(n.left)
+            rv, rb = self.node(n.right)
+            return (lambda ctx: vop(lv(ctx), rv(ctx))), (lambda now, prev: bop(lb(now, prev), rb(now, prev)))
+
+        if isinstance(n, ast.Compare):
+            terms = [self.node(n.left)] + [self.node(c) for c in n.comparators]
+            cmps = []
+            for op in n.ops:
+                f = _CMP.get(type(op))
+                if f is None:
+                    self.fail(n, "Vergleich nicht erlaubt")
+                cmps.append(f)
+
+            def vec(ctx):
+                vals = [t[0](ctx) for t in terms]
+                out = cmps[0](vals[0], vals[1])
+                for i in range(1, len(cmps)):
+                    out = np.logical_and(out, cmps[i](vals[i], vals[i + 1]))
+                return out
+
+            def bar(now, prev):
+                left = terms[0][1](now, prev)
+                for i, f in enumerate(cmps):
+                    right = terms[i + 1][1](now, prev)
+                    if not f(left, right):
+                        return False
+                    left = right
+                return True
+            return vec, bar
+
+        if isinstance(n, ast.Call):
+            if not isinstance(n.func, ast.Name) or n.keywords:
+                self.fail(n, "Funktionsaufruf nicht erlaubt")
+            args = [self.node(a) for a in n.args]
+            name = n.func.id
+            if name == "notna" and args:
+                def vec(ctx):
+                    out = True
+                    for a in args:
+                        out = np.logical_and(out, ~np.isnan(np.asarray(a[0](ctx), dtype=np.float64)))
+                    return out
+
+                def bar(now, prev):
+                    for a in args:
+                        x = a[1](now, prev)
+                        if x != x:
+                            return False
+                    return True
+                return vec, bar
+            if name == "isna" and len(args) == 1:
+                v, b = args[0]
+
+                def bar(now, prev):
+                    x = b(now, prev)
+                    return x != x
+                return (lambda ctx: np.isnan(np.asarray(v(ctx), dtype=np.float64))), bar
+            if name == "abs" and len(args) == 1:
+                v, b = args[0]
+                return (lambda ctx: np.abs(v(ctx))), (lambda now, prev: abs(b(now, prev)))
+            self.fail(n, f"Funktion '{name}' nicht erlaubt")
+
+        self.fail(n, f"Ausdruck {type(n).__name__} nicht erlaubt")
+
+
+@dataclass
+class Rule:
+    """Eine kompilierte Bedingung: mask(df) und rule(now, prev) aus einem Ausdruck."""
+    name: str
+    expr: str
+    columns: frozenset
+    prev_columns: frozenset
+    _vec: _VecFn = field(repr=False)
+    _bar: _BarFn = field(repr=False)
+
+    def mask(self, df: pd.DataFrame, ctx: Optional[Dict[Any, np.ndarray]] = None) -> np.ndarray:
+        ctx = _context(df, self.columns, self.prev_columns) if ctx is None else ctx
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out = self._vec(ctx)
+        return np.broadcast_to(np.asarray(out, dtype=bool), (len(df),))
+
+    def __call__(self, now: Mapping[str, Any], prev: Mapping[str, Any]) -> bool:
+        return bool(self._bar(now, prev))
+
+
+def compile_rule(expr: str, params: Optional[Mapping[str, Any]] = None, name: str = "") -> Rule:
+    c = _Compiler(expr, params or {})
+    vec, bar = c.compile()
+    return Rule(name or expr, expr, frozenset(c.columns), frozenset(c.prev_columns), vec, bar)
+
+
+def _context(df: pd.DataFrame, columns, prev_columns) -> Dict[Any, np.ndarray]:
+    ctx: Dict[Any, np.ndarray] = {}
+    for col in set(columns) | set(prev_columns):
+        if col not in df:
+            raise RuleError(f"Spalte '{col}' fehlt im DataFrame")
+        a = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        ctx[col] = a
+        if col in prev_columns:
+            p = np.empty_like(a)
+            p[:1] = np.nan
+            p[1:] = a[:-1]
+            ctx[("prev", col)] = p
+    return ctx
+
+
+@dataclass
+class SignalRule:
+    """Alle Bedingungen müssen gelten. Erste Zeile ist nie ein Signal (keine Vorkerze)."""
+    side: str
+    rules: List[Rule]
+    params: Dict[str, Any]
+
+    @property
+    def columns(self) -> frozenset:
+        return frozenset().union(*(r.columns | r.prev_columns for r in self.rules))
+
+    def mask(self, df: pd.DataFrame) -> np.ndarray:
+        n = len(df)
+        if n == 0:
+            return np.zeros(0, dtype=bool)
+        ctx = _context(df, frozenset().union(*(r.columns for r in self.rules)),
+                       frozenset().union(*(r.prev_columns for r in self.rules)))
+        out = np.ones(n, dtype=bool)
+        for r in self.rules:
+            out &= r.mask(df, ctx)
+        out[0] = False
+        return out
+
+    def __call__(self, now: Mapping[str, Any], prev: Mapping[str, Any]) -> bool:
+        for r in self.rules:
+            if not r._bar(now, prev):
+                return False
+        return True
+
+    def explain(self, now: Mapping[str, Any], prev: Mapping[str, Any]) -> Optional[str]:
+        """Name der ersten nicht erfüllten Bedingung, None = Signal."""
+        for r in self.rules:
+            if not r._bar(now, prev):
+                return r.name
+        return None
+
+
+def compile_signal(spec: Mapping[str, Any], params: Optional[Mapping[str, Any]] = None) -> SignalRule:
+    """
+    spec = {"side": "LONG", "when": [[name, expr], ...], "params": {...}} (z. B. aus JSON).
+    params überschreibt spec["params"] – so lassen sich Varianten ohne neue Loops sweepen.
+    """
+    merged = dict(spec.get("params") or {})
+    merged.update(params or {})
+    rules = []
+    for item in spec["when"]:
+        name, expr = (item if isinstance(item, (list, tuple)) else (str(item), str(item)))
+        rules.append(compile_rule(expr, merged, name))
+    return SignalRule(spec.get("side", ""), rules, merged)
+
+
+def verify(sig: SignalRule, df: pd.DataFrame) -> List[int]:
+    """Zeilenindizes, an denen Maske und Bar-Auswertung abweichen (erwartet: leer)."""
+    m = sig.mask(df)
+    bad = []
+    rows = df.to_dict("records")
+    for i in range(1, len(rows)):
+        if bool(m[i]) != sig(rows[i], rows[i - 1]):
+            bad.append(i)
+    return bad
+
+
+def signal_indices(sig: SignalRule, df: pd.DataFrame) -> np.ndarray:
+    return np.flatnonzero(sig.mask(df))
+
+
+def sweep(spec: Mapping[str, Any], df: pd.DataFrame, grid: Sequence[Mapping[str, Any]]) -> List[Tuple[Dict[str, Any], int]]:
+    """Anzahl Signale je Parameter-Kombination (rein vektorisiert)."""
+    return [(dict(p), int(compile_signal(spec, p).mask(df).sum())) for p in grid]
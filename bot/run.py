@@ -1,7 +1,8 @@
 # --- stdlib ---
+import os
 import sys
-import time
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime
 from zoneinfo import ZoneInfo  # Python 3.11+: stdlib
 
 # --- 3rd party ---
@@ -9,13 +10,36 @@ from loguru import logger
 
 # --- project ---
 from .config import SETTINGS
-from .data import backfill
+from . import clock
+from .data import _http_session, backfill, latest
 from . import indicators as ind
 from . import strategy as strat
+from .risk import RiskEngine
+from .broker import Broker
+from .exits import ExitManager
+from .events import EventBus, BarClosed, Signal, OrderIntent, Fill, PriceTick
+from .metrics import REGISTRY, serve, timed
+from . import profiler
+from .orderbook import quote, spread_guard, start_ws
+from .ringbuffer import CandleRing, interval_ms
 
 # --- state (module-level) ---
 # Verhindert doppelte Orders auf derselben Kerze
 LAST_FILLED_BAR = {"LONG": None, "SHORT": None}
+# Broker/Exit-Manager werden von Broker- und Exit-Stage gemeinsam genutzt
+_BROKER_LOCK = threading.Lock()
+# Kerzen je Symbol (feste Grösse; nach dem ersten Backfill nur noch inkrementell)
+RINGS: dict[str, CandleRing] = {}
+
+# --- Metriken (einmalig aufgelöst, im Loop nur inc/set/record) ---
+M_LOOP = REGISTRY.histogram("bot_loop_seconds", "Dauer einer Feed-Iteration (Backfill+Indikatoren+Publish)")
+M_BARS = REGISTRY.counter("bot_bars_total", "Verarbeitete Kerzen")
+M_SIGNALS = REGISTRY.counter("bot_signals_total", "Emittierte Signale")
+M_ORDERS = REGISTRY.counter("bot_orders_total", "Platzierte Orders")
+M_FILLS = REGISTRY.counter("bot_fills_total", "Gebuchte Fills")
+M_ERRORS = REGISTRY.counter("bot_loop_errors_total", "Fehler im Feed-Loop")
+M_ERR_STREAK = REGISTRY.gauge("bot_loop_error_streak", "Aufeinanderfolgende Fehler im Feed-Loop")
+M_HALTED = REGISTRY.gauge("bot_risk_halted", "1 = globaler Risk-Halt aktiv")
 
 
 def _size_from_risk(entry: float, sl_pct: float, balance: float, risk_pct_pct: float) -> float:
@@ -41,102 +65,301 @@ def _in_session(now_local: datetime) -> bool:
     return start <= now_local <= end
 
 
-def main():
+# --------------------------------------------------------------------------- #
+#                                  Stages                                     #
+# --------------------------------------------------------------------------- #
+
+def strategy_stage(ev: BarClosed):
+    """BarClosed → Signal: Signalprüfung nur auf der letzten Kerze."""
+    df = ev.frame
+    row_prev = df.iloc[-2]
+    row_now = df.iloc[-1]
+    spread_pct = SETTINGS.max_spread_pct if hasattr(SETTINGS, "max_spread_pct") else 0.02
+
+    long_ok = strat.long_signal(row_now, row_prev, spread_pct)
+    short_ok = strat.short_signal(row_now, row_prev, spread_pct)
+    logger.info("Signals (letzte Kerze): LONG={}, SHORT={}", int(bool(long_ok)), int(bool(short_ok)))
+
+    # LONG hat Vorrang (wie bisher: elif)
+    if long_ok:
+        M_SIGNALS.inc()
+        return Signal(ev.symbol, "LONG", ev.close, ev.ts)
+    if short_ok:
+        M_SIGNALS.inc()
+        return Signal(ev.symbol, "SHORT", ev.close, ev.ts)
+    return None
+
+
+class RiskStage:
+    """Signal → OrderIntent: Sizing + Spread-Guard + Pre-Trade-Check über die RiskEngine."""
+
+    def __init__(self, engine: RiskEngine, session=None):
+        self.engine = engine
+        self._session = session
+
+    def _quote(self, symbol: str):
+        """(bid, ask) aus dem lokalen L2-Buch, ohne live Buch (ORDERBOOK_WS aus) per REST-L1."""
+        if self._session is None:
+            self._session = _http_session()
+        return quote(self._session, symbol)
+
+    def __call__(self, ev: Signal):
+        if LAST_FILLED_BAR.get(ev.side) == ev.ts:
+            logger.debug("{} auf Kerze {} bereits ausgeführt – skip", ev.side, ev.ts)
+            return None
+
+        sl_pct, tp_pct = SETTINGS.sl_pct, SETTINGS.tp_pct
+        entry = float(ev.price)
+        balance = self.engine.equity
+        qty = _size_from_risk(entry, sl_pct, balance, SETTINGS.risk_per_trade_pct)
+        sign = 1.0 if ev.side == "LONG" else -1.0
+        sl = entry * (1.0 - sign * sl_pct / 100.0)
+        tp = entry * (1.0 + sign * tp_pct / 100.0) if SETTINGS.use_tp else None
+        intent = OrderIntent(ev.symbol, ev.side, qty, entry, sl=sl, tp=tp, ts=ev.ts)
+
+        if not clock.get_clock().simulated:      # SimClock: aktueller Spread passt nicht zur Sim-Zeit
+            try:
+                bid, ask = self._quote(ev.symbol)
+            except Exception as e:
+                logger.warning("Spread-Guard {}: kein Quote ({}) – Signal verworfen", ev.symbol, e)
+                return None
+            spread_ok, spread = spread_guard(bid, ask)
+            if not spread_ok:
+                logger.info("Spread-Guard blockiert {} {}: {:.4f}% > {}%",
+                            ev.side, ev.symbol, spread, SETTINGS.max_spread_pct)
+                return None
+
+        if not SETTINGS.dry_run:
+            # Live-Orders laufen über die Order-Skripte (run_signal_exec / run_strategy) –
+            # kein Entry-/Exposure-Budget für einen Intent reservieren, den niemand ausführt.
+            logger.info("Live-Signal {} {} @ {} – bot.run platziert keine Orders", ev.side, ev.symbol,
+                        _fmt_price(entry))
+            return None
+        ok, reason = self.engine.check(intent)
+        if not ok:
+            logger.info("Risk-Check blockiert {} {}: {}", ev.side, ev.symbol, reason)
+            return None
+        LAST_FILLED_BAR[ev.side] = ev.ts
+        return intent
+
+
+class BrokerStage:
+    """OrderIntent → Fill (DRY_RUN: Broker simuliert) + Übergabe an den Exit-Manager."""
+
+    def __init__(self, broker: Broker, exits: ExitManager):
+        self.broker = broker
+        self.exits = exits
+
+    def __call__(self, ev: OrderIntent):
+        if not SETTINGS.dry_run:
+            logger.warning("Live-Intent {} verworfen – bot.run platziert keine Orders", ev)
+            return None
+        logger.info("[DRY_RUN] {} {} qty={:.6f} entry={} SL={}{}",
+                    ev.side, ev.symbol, ev.qty, _fmt_price(ev.price), _fmt_price(ev.sl),
+                    f" TP={_fmt_price(ev.tp)}" if ev.tp else "")
+        with _BROKER_LOCK:
+            if not self.broker.open_market(ev.side, ev.price, ev.qty):
+                return None
+            self.exits.open(ev.symbol, ev.side, ev.price, ev.qty, stop=ev.sl, tp=ev.tp)
+        M_ORDERS.inc()
+        return Fill(ev.symbol, ev.side, ev.qty, ev.price, ts=ev.ts, note="dry_run")
+
+
+class ExitStage:
+    """PriceTick → Fill (Exit): Trailing/Timeout/TP/SL über den Exit-Manager."""
+
+    def __init__(self, broker: Broker, exits: ExitManager):
+        self.broker = broker
+        self.exits = exits
+        self.last_bar_ts = None
+
+    def __call__(self, ev: PriceTick):
+        with _BROKER_LOCK:
+            pos = self.broker.position
+            if pos is None:
+                self.last_bar_ts = ev.bar_ts
+                return None
+            reason = None
+            if ev.bar_ts is not None and ev.bar_ts != self.last_bar_ts:
+                self.last_bar_ts = ev.bar_ts
+                self.broker.tick_bar()
+                reason = self.exits.on_bar(ev.symbol)
+            reason = self.exits.on_price(ev.symbol, ev.price) or reason
+            self.exits.flush()
+            if reason is None:
+                return None
+            tp = self.exits.close(ev.symbol)
+            if tp is not None:
+                self.broker.update_excursion(tp.max_fav_pct, tp.max_adv_pct)
+            self.broker.close_market(reason, ev.price)
+        close_side = "SHORT" if pos.side == "LONG" else "LONG"
+        return Fill(ev.symbol, close_side, pos.qty, ev.price, ts=ev.ts, note=f"exit:{reason}")
+
+
+def book_stage(engine: RiskEngine):
+    def _on_fill(ev: Fill):
+        realized = engine.on_fill(ev.symbol, ev.side, ev.qty, ev.price, fee=ev.fee)
+        M_FILLS.inc()
+        M_HALTED.set(1.0 if engine.halted else 0.0)
+        logger.info("Fill {} {} qty={:.6f} @ {} ({}) realized={:.2f}",
+                    ev.symbol, ev.side, ev.qty, _fmt_price(ev.price), ev.note, realized)
+        if engine.halted:
+            logger.warning("GLOBALER HALT: {}", engine.halt_reason)
+        return None
+    return _on_fill
+
+
+def build_bus(engine: RiskEngine, broker: Broker, exits: ExitManager) -> EventBus:
+    bus = EventBus()
+    # Feed darf nie blockieren: nur der jüngste Stand je Symbol zählt
+    bus.add_topic("BarClosed", maxsize=64, policy="coalesce")
+    bus.add_topic("Signal", maxsize=256, policy="drop_oldest")
+    # Orders nie stillschweigend verwerfen → Backpressure
+    bus.add_topic("OrderIntent", maxsize=64, policy="block", block_timeout=5.0)
+    bus.add_topic("Fill", maxsize=1024, policy="drop_oldest")
+    bus.add_topic("PositionUpdate", maxsize=64, policy="coalesce")
+    bus.add_topic("PriceTick", maxsize=64, policy="coalesce")
+
+    bus.stage("strategy", "BarClosed", strategy_stage)
+    bus.stage("risk", "Signal", RiskStage(engine))
+    bus.stage("broker", "OrderIntent", BrokerStage(broker, exits))
+    bus.stage("exits", "PriceTick", ExitStage(broker, exits))
+    bus.stage("book", "Fill", book_stage(engine))
+    return bus
+
+
+def _ring(symbol: str, timeframe: str) -> CandleRing | None:
+    """
+    Ringpuffer des Symbols. Beim ersten Mal bzw. nach einer Lücke per Backfill
+    füllen, sonst nur die letzten Kerzen nachladen (ein kleiner Request je Bar).
+    """
+    ring = RINGS.get(symbol)
+    if ring is not None and len(ring) >= 100:
+        fresh = latest(symbol, timeframe, limit=3)
+        if not fresh:
+            logger.warning("Keine neuen Kerzen erhalten – Ringpuffer unverändert")
+            return ring
+        if fresh[0][0] <= ring.last_ts + interval_ms(timeframe):
+            ring.update(fresh)
+            return ring
+        logger.warning("Lücke im Kerzen-Feed ({} → {}) – neuer Backfill", ring.last_ts, fresh[0][0])
+
+    logger.debug("Backfill ...")
+    df = backfill(symbol, timeframe, lookback_days=2)
+    rows = 0 if df is None else len(df)
+    if rows < 100:
+        logger.warning("Zu wenig Daten ({}) – schlafe 60s", rows)
+        return None
+    if ring is None:
+        ring = RINGS[symbol] = CandleRing(SETTINGS.ring_size, symbol, timeframe)
+    ring.clear()
+    ring.load_frame(df)
+    return ring
+
+
+def _feed_once(engine: RiskEngine, bus: EventBus) -> bool:
+    """Eine Feed-Iteration. False = zu wenig Daten (Aufrufer schläft)."""
+    # ---------- Kerzen + Indikatoren ----------
+    ring = _ring(SETTINGS.symbol, SETTINGS.timeframe)
+    if ring is None:
+        return False
+
+    # ein Frame fester Länge je Bar; Indikatoren ohne weitere Kopie anhängen
+    df = ind.compute_all(ring.frame(), copy=False)
+    last = df.iloc[-1]
+    engine.on_mark(SETTINGS.symbol, float(last["close"]))
+    bus.publish(PriceTick(SETTINGS.symbol, float(last["close"]), bar_ts=last["ts"]))
+    if engine.halted:
+        logger.warning("GLOBALER HALT aktiv: {} – keine neuen Entries", engine.halt_reason)
+    bus.publish(BarClosed(
+        SETTINGS.symbol, SETTINGS.timeframe, last["ts"],
+        float(last["open"]), float(last["high"]), float(last["low"]),
+        float(last["close"]), float(last["volume"]), frame=df,
+    ))
+
+    # ---------- Status ----------
+    logger.info("Letzte Kerze: {} O:{} H:{} L:{} C:{} Vol:{} | Bus: {}",
+                last["ts"], last["open"], last["high"], last["low"], last["close"], last["volume"],
+                bus.stats()["stages"])
+    M_BARS.inc()
+    return True
+
+
+def main(max_loops: int | None = None):
+    """
+    Bot-Loop. Zeit kommt aus bot.clock: BOT_SIM_START=<ISO-Zeit> aktiviert die
+    simulierte Uhr (Schlafen ohne Warten), BOT_MAX_LOOPS bzw. max_loops begrenzt
+    die Iterationen – zusammen mit BYBIT_REPLAY läuft so eine Woche Loop-Logik
+    in Sekunden.
+    """
     # ---------- Logging ----------
     logger.remove()
     logger.add(sys.stderr, level=SETTINGS.loguru_level.upper())
+    # Profiling zur Laufzeit: kill -USR2 <pid> oder logs/profiles/bot.trigger
+    profiler.install("bot")
+
+    sim_start = os.environ.get("BOT_SIM_START")
+    if sim_start:
+        clock.set_clock(clock.SimClock(sim_start))
+    if max_loops is None and os.environ.get("BOT_MAX_LOOPS"):
+        max_loops = int(os.environ["BOT_MAX_LOOPS"])
+    simulated = clock.get_clock().simulated
 
-    logger.info("Start Bot-Loop (DRY_RUN={})  Symbol={} TF={}", SETTINGS.dry_run, SETTINGS.symbol, SETTINGS.timeframe)
+    logger.info("Start Bot-Loop (DRY_RUN={})  Symbol={} TF={}{}", SETTINGS.dry_run, SETTINGS.symbol,
+                SETTINGS.timeframe, f"  SimClock ab {clock.now().isoformat()}" if simulated else "")
 
     tz = ZoneInfo(SETTINGS.tz)
     balance = getattr(SETTINGS, "start_balance", 10_000.0)  # DRY_RUN Startsaldo
-    sl_pct = SETTINGS.sl_pct
-    tp_pct = SETTINGS.tp_pct
-
-    # Rate-Limit: max neue Entries pro Stunde
-    hour_bucket_start = datetime.now(tz).replace(minute=0, second=0, microsecond=0)
-    new_entries_this_hour = 0
-
-    # Hauptloop
-    while True:
-        now_local = datetime.now(tz)
-
-        # Stunde gewechselt? Zähler zurücksetzen
-        if now_local >= hour_bucket_start + timedelta(hours=1):
-            hour_bucket_start = now_local.replace(minute=0, second=0, microsecond=0)
-            new_entries_this_hour = 0
-
-        if not _in_session(now_local):
-            logger.debug("Außerhalb Session {}–{} {} – schlafe 60s", SETTINGS.session_start, SETTINGS.session_end, SETTINGS.tz)
-            time.sleep(60)
-            continue
-
-        # ---------- Backfill + Indikatoren ----------
-        logger.debug("Backfill ...")
-        df = backfill(SETTINGS.symbol, SETTINGS.timeframe, lookback_days=2)
-        rows = 0 if df is None else len(df)
-        if rows < 100:
-            logger.warning("Zu wenig Daten ({}) – schlafe 60s", rows)
-            time.sleep(60)
-            continue
-
-        df = ind.compute_all(df)
-
-        # ---------- Signalprüfung nur auf der letzten Kerze ----------
-        row_prev = df.iloc[-2]
-        row_now = df.iloc[-1]
-        spread_pct = SETTINGS.max_spread_pct if hasattr(SETTINGS, "max_spread_pct") else 0.02
-
-        long_ok = strat.long_signal(row_now, row_prev, spread_pct)
-        short_ok = strat.short_signal(row_now, row_prev, spread_pct)
-
-        long_count = 1 if long_ok else 0
-        short_count = 1 if short_ok else 0
-
-        logger.info("Signals (letzte Kerze): LONG={}, SHORT={}", long_count, short_count)
-
-        # ---------- Entry-Rate-Limit ----------
-        if new_entries_this_hour >= SETTINGS.max_new_entries_per_hour:
-            logger.info("Rate-Limit erreicht ({} neue Entries/h). Keine neuen Orders in dieser Stunde.",
-                        SETTINGS.max_new_entries_per_hour)
-            time.sleep(60)
-            continue
-
-        # ---------- DRY_RUN Orders simulieren ----------
-        simulated = 0
-        if SETTINGS.dry_run:
-            if long_ok and new_entries_this_hour < SETTINGS.max_new_entries_per_hour:
-                entry = float(row_now["close"])
-                qty = _size_from_risk(entry, sl_pct, balance, SETTINGS.risk_per_trade_pct)
-                sl = entry * (1.0 - sl_pct / 100.0)
-                tp = entry * (1.0 + tp_pct / 100.0) if SETTINGS.use_tp else None
-                logger.info("[DRY_RUN] LONG {} qty={:.6f} entry={} SL={}{}",
-                            SETTINGS.symbol, qty, _fmt_price(entry), _fmt_price(sl),
-                            f" TP={_fmt_price(tp)}" if tp else "")
-                simulated += 1
-                new_entries_this_hour += 1
-
-            elif short_ok and new_entries_this_hour < SETTINGS.max_new_entries_per_hour:
-                entry = float(row_now["close"])
-                qty = _size_from_risk(entry, sl_pct, balance, SETTINGS.risk_per_trade_pct)
-                sl = entry * (1.0 + sl_pct / 100.0)
-                tp = entry * (1.0 - tp_pct / 100.0) if SETTINGS.use_tp else None
-                logger.info("[DRY_RUN] SHORT {} qty={:.6f} entry={} SL={}{}",
-                            SETTINGS.symbol, qty, _fmt_price(entry), _fmt_price(sl),
-                            f" TP={_fmt_price(tp)}" if tp else "")
-                simulated += 1
-                new_entries_this_hour += 1
-
-        # ---------- Status ----------
-        last = df.iloc[-1]
-        logger.info("Letzte Kerze: {} O:{} H:{} L:{} C:{} Vol:{} | Simuliert: {} | Neue Entries diese Stunde: {}",
-                    last["ts"], last["open"], last["high"], last["low"], last["close"], last["volume"],
-                    simulated, new_entries_this_hour)
-
-        # Herzschlag
-        sleep_s = max(SETTINGS.heartbeat_secs, 15)
-        time.sleep(sleep_s)
+
+    engine = RiskEngine(start_equity=balance)
+    broker = Broker()
+    exits = ExitManager()
+    bus = build_bus(engine, broker, exits)
+    bus.start()
+    if SETTINGS.orderbook_ws and not simulated:
+        start_ws([SETTINGS.symbol], depth=SETTINGS.orderbook_depth)
+    if SETTINGS.metrics_port:
+        serve(SETTINGS.metrics_port)
+        logger.info("Metrics: http://127.0.0.1:{}/metrics", SETTINGS.metrics_port)
+
+    # Hauptloop = Feed-Stufe: Daten holen, Indikatoren, BarClosed publizieren
+    loops = 0
+    try:
+        while max_loops is None or loops < max_loops:
+            loops += 1
+            now_local = clock.now(tz)
+
+            if not _in_session(now_local):
+                logger.debug("Außerhalb Session {}–{} {} – schlafe 60s", SETTINGS.session_start, SETTINGS.session_end, SETTINGS.tz)
+                clock.sleep(60)
+                continue
+
+            try:
+                with timed(M_LOOP):
+                    fed = _feed_once(engine, bus)
+                M_ERR_STREAK.set(0)
+                if simulated:
+                    # Stufen vor dem Zeitsprung abarbeiten lassen → reproduzierbarer Ablauf
+                    bus.drain()
+                if not fed:
+                    clock.sleep(60)
+                    continue
+            except Exception as e:
+                M_ERRORS.inc()
+                M_ERR_STREAK.inc()
+                logger.exception("Fehler im Feed-Loop ({} in Folge): {}", int(M_ERR_STREAK.value), e)
+                if M_ERR_STREAK.value > SETTINGS.missed_heartbeats_max:
+                    raise
+
+            # Herzschlag
+            sleep_s = max(SETTINGS.heartbeat_secs, 15)
+            clock.sleep(sleep_s)
+    finally:
+        bus.stop()
+        if simulated:
+            logger.info("SimClock: {} Iterationen, {:.0f}s simuliert, Ende {}",
+                        loops, clock.get_clock().slept, clock.now().isoformat())
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
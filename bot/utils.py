@@ -1,6 +1,7 @@
 from datetime import datetime, time
 from zoneinfo import ZoneInfo
 from .config import SETTINGS
+from .precision import for_tick
 
 def session_is_open(dt_utc: datetime) -> bool:
     if not SETTINGS.use_session:
@@ -23,5 +24,5 @@ def pct(a, b) -> float:
     return (a / b) * 100.0
 
 def clamp_qty_to_precision(qty: float, step: float) -> float:
-    # simple precision clamp; in real broker, fetch lot size meta
-    return round(qty / step) * step
+    # exakt in ganzen Steps, nach unten (nie mehr als berechnet); Lot-Meta siehe precision.for_symbol
+    return for_tick(step, step).round_qty(qty, "down")
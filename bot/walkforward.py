@@ -0,0 +1,356 @@
+# bot/walkforward.py
+"""
+Walk-Forward-Optimierung der auto_run-Presets und -Schwellen.
+
+Je Fenster i:
+    In-Sample  [s, s+IS)        Parameter-Grid (LOOKBACK × EPS_BREAK × USE_PREV_CLOSE)
+                                über bot.backtest, dazu die Regime-Schwellen
+                                (ATR_PCT_LOW/HIGH, VOL_RATIO_HIGH) aus IS-Quantilen
+    Out-of-Sample [s+IS, s+IS+OOS)  Regime je Bar wie auto_run.decide_preset,
+                                    Parameter des jeweiligen Presets, ein Backtest
+Die OOS-Trades aller Fenster werden zu einer Equity-Kurve verkettet.
+
+Optimierung je Fenster: jede Grid-Kombination läuft einmal über das IS-Fenster;
+jeder Trade zählt für das Regime seiner Signal-Bar. Für jede Schwellen-Variante
+wird je Regime die beste Kombination gewählt (separierbar, Überlappung von
+Positionen verschiedener Presets wird dabei vernachlässigt), Regime mit zu
+wenigen Trades fallen auf die global beste Kombination zurück. Bewertet wird
+dann nur OOS mit dem echten, umschaltenden Backtest.
+
+Fenster laufen parallel (ProcessPool, --workers); Rolling-High/Low und die
+Regime-Features liegen je Fenster in einem FeatureCache und werden für alle
+Kombinationen und Schwellen wiederverwendet.
+
+Ergebnis: Preset-Datei (JSON) mit Schwellen und Presets des jüngsten Fensters,
+die scripts/auto_run.py über PRESET_FILE lädt, plus OOS-Report.
+
+CLI:
+  python -m bot.walkforward --candles data/BTCUSDT_15m.candles --is-days 30 --oos-days 7 \\
+      --out presets/auto_presets.json [--mc-paths 100000]
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+from .backtest import Bars, Costs, FeatureCache, Signals, load_bars, mom_signals, simulate, stats
+from .ringbuffer import interval_ms
+
+REGIMES = ("conservative", "balanced", "aggressive")
+ENV_KEYS = {"lookback": "LOOKBACK", "eps_break": "EPS_BREAK", "use_prev_close": "USE_PREV_CLOSE"}
+
+DEFAULT_GRID: Dict[str, Sequence[Any]] = {
+    "lookback": (5, 10, 15, 20, 30),
+    "eps_break": (0.0, 0.001, 0.003, 0.005, 0.01),
+    "use_prev_close": (False,),
+}
+ATR_LOOKBACK = 14
+VOL_LOOKBACK = 20
+ATR_LOW_Q = (0.20, 0.33, 0.50)
+ATR_HIGH_Q = (0.50, 0.67, 0.80)
+VOL_HIGH = (1.0, 1.3, 1.6)
+
+
+# --------------------------------------------------------------------------- #
+#                          Regime (wie auto_run)                              #
+# --------------------------------------------------------------------------- #
+
+def regime_features(bars: Bars, atr_lb: int = ATR_LOOKBACK, vol_lb: int = VOL_LOOKBACK) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    ATR% und Volumen-Ratio je Bar t (t = laufende Kerze), analog auto_run:
+    ATR über TR der Bars t-n+1..t, Preis/Volumen der letzten abgeschlossenen
+    Bar t-1, Volumen-Schnitt über t-vol_lb..t-1.
+    """
+    h, l, c, v = bars.high, bars.low, bars.close, bars.volume
+    m = c.size
+    tr = np.full(m, np.nan)
+    if m > 1:
+        pc = c[:-1]
+        tr[1:] = np.maximum(h[1:] - l[1:], np.maximum(np.abs(h[1:] - pc), np.abs(l[1:] - pc)))
+    cs = np.concatenate(([0.0], np.nancumsum(tr)))
+    atr = np.full(m, np.nan)
+    idx = np.arange(m)
+    ok = idx >= atr_lb
+    atr[ok] = (cs[idx[ok] + 1] - cs[idx[ok] + 1 - atr_lb]) / atr_lb
+    px_prev = np.concatenate(([np.nan], c[:-1]))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        atr_pct = np.where(px_prev > 0, atr / px_prev * 100.0, 0.0)
+    vs = np.concatenate(([0.0], np.cumsum(v)))
+    avgv = np.full(m, np.nan)
+    okv = idx >= vol_lb
+    avgv[okv] = (vs[idx[okv]] - vs[idx[okv] - vol_lb]) / vol_lb
+    v_prev = np.concatenate(([np.nan], v[:-1]))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        vol_ratio = np.where(avgv > 0, v_prev / avgv, 1.0)
+    return atr_pct, vol_ratio
+
+
+def classify(atr_pct: np.ndarray, vol_ratio: np.ndarray, thr: Dict[str, float]) -> np.ndarray:
+    """Vektorisiertes auto_run.decide_preset → 0 conservative, 1 balanced, 2 aggressive."""
+    reg = np.ones(atr_pct.size, dtype=np.int8)
+    reg[(atr_pct > thr["ATR_PCT_HIGH"]) & (vol_ratio > thr["VOL_RATIO_HIGH"])] = 2
+    reg[atr_pct < thr["ATR_PCT_LOW"]] = 0
+    return reg
+
+
+def _features(cache: FeatureCache) -> Tuple[np.ndarray, np.ndarray]:
+    f = cache.extra.get("regime")
+    if f is None:
+        f = cache.extra["regime"] = regime_features(cache.bars)
+    return f
+
+
+def _threshold_candidates(atr_pct: np.ndarray, vol_low: float) -> List[Dict[str, float]]:
+    a = atr_pct[np.isfinite(atr_pct)]
+    if not a.size:
+        return [{"ATR_PCT_LOW": 0.30, "ATR_PCT_HIGH": 0.80, "VOL_RATIO_LOW": vol_low, "VOL_RATIO_HIGH": 1.30}]
+    out = []
+    for ql, qh, vh in itertools.product(ATR_LOW_Q, ATR_HIGH_Q, VOL_HIGH):
+        lo, hi = float(np.quantile(a, ql)), float(np.quantile(a, qh))
+        if lo < hi:
+            out.append({"ATR_PCT_LOW": round(lo, 4), "ATR_PCT_HIGH": round(hi, 4),
+                        "VOL_RATIO_LOW": vol_low, "VOL_RATIO_HIGH": vh})
+    return out
+
+
+# --------------------------------------------------------------------------- #
+#                               Ein Fenster                                   #
+# --------------------------------------------------------------------------- #
+
+def param_grid(grid: Optional[Dict[str, Sequence[Any]]] = None) -> List[Dict[str, Any]]:
+    g = dict(DEFAULT_GRID, **(grid or {}))
+    keys = list(g)
+    return [dict(zip(keys, vals)) for vals in itertools.product(*(g[k] for k in keys))]
+
+
+def _score(pnl: np.ndarray, objective: str) -> float:
+    if not pnl.size:
+        return 0.0
+    if objective == "sharpe":
+        sd = pnl.std(ddof=1) if pnl.size > 1 else 0.0
+        return float(pnl.mean() / sd * np.sqrt(pnl.size)) if sd > 0 else 0.0
+    return float(pnl.sum())
+
+
+def switched_signals(bars: Bars, cache: FeatureCache, reg: np.ndarray,
+                     presets: Dict[str, Dict[str, Any]], base: Dict[str, Any]) -> Signals:
+    """Signale je Bar vom Preset des Bar-Regimes (wie auto_run bei jedem Lauf)."""
+    side = np.zeros(len(bars), dtype=np.int8)
+    tp = np.zeros(len(bars))
+    sl = np.zeros(len(bars))
+    for r, name in enumerate(REGIMES):
+        sel = reg == r
+        if not sel.any():
+            continue
+        s = mom_signals(bars, dict(base, **presets[name]), cache)
+        side[sel], tp[sel], sl[sel] = s.side[sel], s.tp_dist[sel], s.sl_dist[sel]
+    return Signals(side, tp, sl)
+
+
+def optimize_window(bars: Bars, is_start: int, is_end: int, oos_end: int, grid: List[Dict[str, Any]],
+                    base: Dict[str, Any], costs: Costs, objective: str = "pnl", min_trades: int = 5,
+                    vol_low: float = 0.70) -> Dict[str, Any]:
+    """IS optimieren, OOS bewerten. bars enthält Vorlauf + IS + OOS dieses Fensters."""
+    cache = FeatureCache(bars)
+    atr_pct, vol_ratio = _features(cache)
+
+    # jede Kombination einmal über IS; Trades mit Signal-Bar für die Regime-Zuordnung
+    runs = []
+    for p in grid:
+        tr = simulate(bars, mom_signals(bars, dict(base, **p), cache), costs, is_start, is_end)
+        runs.append((tr["signal_i"], tr["pnl_pct"]))
+    totals = np.array([_score(pnl, objective) for _, pnl in runs])
+    best_all = int(totals.argmax()) if totals.size else 0
+
+    best: Optional[Dict[str, Any]] = None
+    for thr in _threshold_candidates(atr_pct[is_start:is_end], vol_low):
+        reg = classify(atr_pct, vol_ratio, thr)
+        pick, score = [], 0.0
+        for r in range(len(REGIMES)):
+            scores = np.full(len(grid), -np.inf)
+            for k, (sig_i, pnl) in enumerate(runs):
+                sel = reg[sig_i] == r
+                if sel.sum() >= min_trades:
+                    scores[k] = _score(pnl[sel], objective)
+            k = int(scores.argmax()) if np.isfinite(scores).any() else best_all
+            pick.append(k)
+            if np.isfinite(scores[k]):
+                score += scores[k]
+        if best is None or score > best["score"]:
+            best = {"score": score, "thresholds": thr, "pick": pick}
+
+    presets = {name: dict(grid[k]) for name, k in zip(REGIMES, best["pick"])}
+    reg = classify(atr_pct, vol_ratio, best["thresholds"])
+    oos = simulate(bars, switched_signals(bars, cache, reg, presets, base), costs, is_end, oos_end)
+    oos_reg = reg[oos["signal_i"]]
+    return {
+        "is": [int(bars.ts[is_start]), int(bars.ts[is_end - 1])],
+        "oos": [int(bars.ts[is_end]), int(bars.ts[oos_end - 1])],
+        "is_score": round(float(best["score"]), 6),
+        "thresholds": best["thresholds"],
+        "presets": presets,
+        "oos_trades": {
+            "entry_ts": bars.ts[oos["entry_i"]].tolist(),
+            "exit_ts": bars.ts[oos["exit_i"]].tolist(),
+            "side": oos["side"].tolist(),
+            "pnl_pct": oos["pnl_pct"].tolist(),
+            "reason": oos["reason"].tolist(),
+            "regime": oos_reg.tolist(),
+        },
+        "oos_regime_share": {name: float((reg[is_end:oos_end] == r).mean()) for r, name in enumerate(REGIMES)},
+    }
+
+
+def _run_window(job: Tuple) -> Dict[str, Any]:
+    bars, is_start, is_end, oos_end, grid, base, costs, objective, min_trades, vol_low = job
+    return optimize_window(bars, is_start, is_end, oos_end, grid, base, costs, objective, min_trades, vol_low)
+
+
+# --------------------------------------------------------------------------- #
+#                               Walk-Forward                                  #
+# --------------------------------------------------------------------------- #
+
+def windows(n: int, is_bars: int, oos_bars: int, warmup: int, step: Optional[int] = None) -> List[Tuple[int, int, int]]:
+    """(is_start, is_end, oos_end) als absolute Indizes; IS beginnt frühestens nach dem Vorlauf."""
+    step = step or oos_bars
+    out = []
+    s = warmup
+    while s + is_bars + oos_bars <= n:
+        out.append((s, s + is_bars, s + is_bars + oos_bars))
+        s += step
+    return out
+
+
+def walk_forward(bars: Bars, is_bars: int, oos_bars: int, grid: Optional[List[Dict[str, Any]]] = None,
+                 base: Optional[Dict[str, Any]] = None, costs: Costs = Costs(), objective: str = "pnl",
+                 min_trades: int = 5, vol_low: float = 0.70, workers: Optional[int] = None,
+                 step: Optional[int] = None) -> Dict[str, Any]:
+    grid = grid or param_grid()
+    base = dict(base or {})
+    warmup = max(max(int(p["lookback"]) for p in grid) + 2, ATR_LOOKBACK + 1, VOL_LOOKBACK + 2)
+    wins = windows(len(bars), is_bars, oos_bars, warmup, step)
+    if not wins:
+        raise ValueError(f"zu wenig Bars ({len(bars)}) für IS={is_bars} + OOS={oos_bars} + Vorlauf={warmup}")
+    # je Fenster nur den benötigten Ausschnitt (Vorlauf + IS + OOS) an die Worker schicken
+    jobs = []
+    for a, b, c in wins:
+        lo = a - warmup
+        jobs.append((bars.slice(lo, c), a - lo, b - lo, c - lo, grid, base, costs, objective, min_trades, vol_low))
+    workers = workers or os.cpu_count() or 1
+    logger.info("Walk-Forward: {} Fenster × {} Kombinationen, {} Worker", len(jobs), len(grid), workers)
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as ex:
+            results = list(ex.map(_run_window, jobs))
+    else:
+        results = [_run_window(j) for j in jobs]
+    return {"windows": results, "oos": stitch(results), "grid_size": len(grid), "objective": objective}
+
+
+def stitch(results: List[Dict[str, Any]], equity0: float = 10_000.0) -> Dict[str, Any]:
+    """OOS-Trades aller Fenster in Zeitfolge → Kennzahlen und Equity-Kurve."""
+    cols = {k: np.concatenate([np.asarray(r["oos_trades"][k]) for r in results]) if results else np.zeros(0)
+            for k in ("entry_ts", "exit_ts", "side", "pnl_pct", "reason", "regime")}
+    order = np.argsort(cols["entry_ts"], kind="stable")
+    cols = {k: v[order] for k, v in cols.items()}
+    st = stats({"pnl_pct": cols["pnl_pct"].astype(np.float64), "reason": cols["reason"]}, equity0)
+    eq = equity0 * np.cumprod(1.0 + cols["pnl_pct"].astype(np.float64) / 100.0)
+    st["by_regime"] = {name: {"trades": int((cols["regime"] == r).sum()),
+                              "pnl_pct": float(cols["pnl_pct"][cols["regime"] == r].sum())}
+                       for r, name in enumerate(REGIMES)}
+    return {"stats": st,
+            "equity": [[int(t), round(float(e), 2)] for t, e in zip(cols["exit_ts"], eq)]}
+
+
+def preset_file(res: Dict[str, Any], symbol: str, timeframe: str) -> Dict[str, Any]:
+    """Preset-Datei für auto_run (PRESET_FILE): Schwellen + Presets des jüngsten Fensters."""
+    last = res["windows"][-1]
+    presets = {name: {ENV_KEYS[k]: (("1" if v else "0") if k == "use_prev_close" else str(v))
+                      for k, v in p.items() if k in ENV_KEYS}
+               for name, p in last["presets"].items()}
+    return {
+        "generated": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "symbol": symbol,
+        "timeframe": timeframe,
+        "thresholds": last["thresholds"],
+        "presets": presets,
+        "walk_forward": {
+            "windows": len(res["windows"]),
+            "objective": res["objective"],
+            "grid_size": res["grid_size"],
+            "last_is": last["is"],
+            "oos": res["oos"]["stats"],
+        },
+    }
+
+
+def _floats(s: str) -> Tuple[float, ...]:
+    return tuple(float(x) for x in s.split(",") if x.strip())
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Walk-Forward-Optimierung der auto_run-Presets")
+    ap.add_argument("--candles", default=None)
+    ap.add_argument("--csv", default=None)
+    ap.add_argument("--symbol", default=os.environ.get("SYM", "BTCUSDT"))
+    ap.add_argument("--tf", default="15m")
+    ap.add_argument("--is-days", type=float, default=30.0)
+    ap.add_argument("--oos-days", type=float, default=7.0)
+    ap.add_argument("--lookbacks", default=None, help="z. B. 5,10,20")
+    ap.add_argument("--eps", default=None, help="z. B. 0,0.002,0.005")
+    ap.add_argument("--prev-close", default=None, help="0, 1 oder 0,1")
+    ap.add_argument("--objective", choices=("pnl", "sharpe"), default="pnl")
+    ap.add_argument("--min-trades", type=int, default=5)
+    ap.add_argument("--fee-bps", type=float, default=5.5)
+    ap.add_argument("--slip-bps", type=float, default=1.0)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--out", default=os.path.join("presets", "auto_presets.json"))
+    ap.add_argument("--report", default=None, help="vollständiger Report (Fenster, Equity) als JSON")
+    ap.add_argument("--mc-paths", type=int, default=0, help="Monte-Carlo über die OOS-Trades (0 = aus)")
+    args = ap.parse_args(argv)
+
+    bars = load_bars(args.candles, args.csv, args.symbol, args.tf)
+    per_day = 86_400_000 // interval_ms(args.tf)
+    grid: Dict[str, Sequence[Any]] = {}
+    if args.lookbacks:
+        grid["lookback"] = tuple(int(x) for x in _floats(args.lookbacks))
+    if args.eps:
+        grid["eps_break"] = _floats(args.eps)
+    if args.prev_close:
+        grid["use_prev_close"] = tuple(bool(int(x)) for x in _floats(args.prev_close))
+    base = {"allow_short": os.environ.get("ALLOW_SHORT", "1") == "1",
+            "min_range": float(os.environ.get("MIN_RANGE", "0")),
+            "tie_side": os.environ.get("TIE_SIDE", "")}
+    res = walk_forward(bars, int(args.is_days * per_day), int(args.oos_days * per_day), param_grid(grid), base,
+                       Costs(args.fee_bps, args.slip_bps), args.objective, args.min_trades,
+                       float(os.environ.get("VOL_RATIO_LOW", "0.70")), args.workers)
+    out = preset_file(res, args.symbol, args.tf)
+    if args.mc_paths > 0:
+        from .montecarlo import analyze, trades_per_day_of
+        oos = [t for w in res["windows"] for t in zip(w["oos_trades"]["entry_ts"], w["oos_trades"]["pnl_pct"])]
+        if oos:
+            ts, pnl = (np.asarray(c, dtype=np.float64) for c in zip(*sorted(oos)))
+            mc = analyze(pnl, args.mc_paths, trades_per_day=trades_per_day_of(ts / 1000.0))
+            out["walk_forward"]["monte_carlo"] = {m: {k: mc[m][k] for k in ("final_pnl_pct", "max_dd_pct", "p_ruin")}
+                                                  for m in ("bootstrap", "shuffle", "slippage")}
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(out, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(res, f, ensure_ascii=False)
+    print(json.dumps({"preset_file": args.out, "thresholds": out["thresholds"], "presets": out["presets"],
+                      "oos": out["walk_forward"]["oos"],
+                      "monte_carlo": out["walk_forward"].get("monte_carlo")}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Geteilter Account-Snapshot (Positionen, offene Orders, Ticker) mit kurzer TTL.
+
+Status-/Guard-Skripte laufen per Cron oft in derselben Minute und fragen
+jeweils dieselben drei Endpoints ab. Hier werden alle drei in einem
+parallelen Burst geholt und als JSON in einem Shared-Memory-Verzeichnis
+(/dev/shm, sonst Temp-Verzeichnis) abgelegt. Folgeaufrufe innerhalb der TTL
+lesen nur die Datei – ohne Client, ohne API-Call.
+
+- Lesende Tools:            snapshot(sym)                 (Cache, wenn frisch)
+- Order-/Panic-Pfade:       snapshot(sym, s, force=True)  (immer frisch, aktualisiert Cache)
+- Health-Probes:            store(sym, positions=..., orders=..., tickers=...)
+
+Gecacht werden nur vollständige Antworten mit retCode == 0. Ein flock auf
+<datei>.lock verhindert, dass parallel startende Cron-Jobs doppelt abfragen.
+
+ENV: SNAPSHOT_TTL (Sekunden, Default 15), SNAPSHOT_DIR
+
+CLI:
+  PYTHONPATH=. .venv/bin/python -m scripts.account_snapshot --symbol BTCUSDT [--force]
+"""
+import os, sys, json, time, hashlib, tempfile, argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - nicht-POSIX
+    fcntl = None
+
+from bot.config import SETTINGS as S
+
+TTL_S = float(os.environ.get("SNAPSHOT_TTL", "15"))
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR") or ("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir())
+PARTS = ("positions", "orders", "tickers")
+
+
+def _ok(r) -> bool:
+    return isinstance(r, dict) and r.get("retCode") == 0
+
+
+def _cache_path(sym: str) -> str:
+    # Testnet/Mainnet und Account trennen (Key-Hash, nie den Key selbst)
+    acct = hashlib.sha1((S.bybit_api_key or "").encode("utf-8")).hexdigest()[:8]
+    net = "test" if S.bybit_testnet else "main"
+    return os.path.join(SNAPSHOT_DIR, f"bybit_snapshot_{net}_{acct}_{sym}.json")
+
+
+def _read(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def _write(path: str, snap: Dict[str, Any]) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(snap, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def _fresh(snap: Optional[Dict[str, Any]], ttl: float) -> bool:
+    return bool(snap) and (time.time() - float(snap.get("ts") or 0)) <= ttl
+
+
+class _FileLock:
+    def __init__(self, path: str):
+        self.path = path + ".lock"
+        self.fd = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self.fd = os.open(self.path, os.O_CREAT | os.O_RDWR, 0o600)
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
+
+
+def fetch(s, sym: str) -> Dict[str, Any]:
+    """Holt Positionen, offene Orders und Ticker parallel (ein Burst)."""
+    calls = {
+        "positions": (s.get_positions,   {"category": "linear", "symbol": sym}),
+        "orders":    (s.get_open_orders, {"category": "linear", "symbol": sym}),
+        "tickers":   (s.get_tickers,     {"category": "linear", "symbol": sym}),
+    }
+    with ThreadPoolExecutor(max_workers=len(calls), thread_name_prefix="snapshot") as pool:
+        futs = {k: pool.submit(fn, **kw) for k, (fn, kw) in calls.items()}
+        snap = {k: f.result() for k, f in futs.items()}
+    snap.update({"ts": time.time(), "symbol": sym})
+    return snap
+
+
+def store(sym: str, **parts) -> bool:
+    """Legt bereits geholte Antworten (positions/orders/tickers) als Snapshot ab."""
+    if set(parts) != set(PARTS) or not all(_ok(parts[k]) for k in PARTS):
+        return False
+    snap = dict(parts, ts=time.time(), symbol=sym)
+    try:
+        _write(_cache_path(sym), snap)
+    except OSError:
+        return False
+    return True
+
+
+def snapshot(sym: str, s=None, ttl: float = TTL_S, force: bool = False) -> Dict[str, Any]:
+    """
+    Snapshot für sym. Aus dem Cache, wenn jünger als ttl (und nicht force),
+    sonst frisch geholt (s oder neuer Client) und – falls vollständig ok – gecacht.
+    Feld "cached" zeigt an, ob der Cache benutzt wurde.
+    """
+    path = _cache_path(sym)
+    if not force:
+        snap = _read(path)
+        if _fresh(snap, ttl):
+            return dict(snap, cached=True)
+
+    with _FileLock(path):
+        if not force:
+            # ein paralleler Prozess hat evtl. gerade aktualisiert
+            snap = _read(path)
+            if _fresh(snap, ttl):
+                return dict(snap, cached=True)
+        if s is None:
+            from bot.exchange_utils import get_client
+            s = get_client()
+        snap = fetch(s, sym)
+        if all(_ok(snap[k]) for k in PARTS):
+            try:
+                _write(path, snap)
+            except OSError:
+                pass
+    return dict(snap, cached=False)
+
+
+def invalidate(sym: str) -> None:
+    try:
+        os.remove(_cache_path(sym))
+    except OSError:
+        pass
+
+
+# --- Zugriffshelfer (gleiche Semantik wie die bisherigen Einzelabfragen) ------------------
+
+def position_list(snap: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return ((snap.get("positions") or {}).get("result") or {}).get("list") or []
+
+
+def open_position(snap: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    return next((p for p in position_list(snap) if float(p.get("size") or 0) > 0), None)
+
+
+def open_orders(snap: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return ((snap.get("orders") or {}).get("result") or {}).get("list") or []
+
+
+def ticker(snap: Dict[str, Any]) -> Dict[str, Any]:
+    lst = ((snap.get("tickers") or {}).get("result") or {}).get("list") or []
+    return lst[0] if lst else {}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Account-Snapshot (Cache mit kurzer TTL)")
+    ap.add_argument("--symbol", default=getattr(S, "symbol", "BTCUSDT") or "BTCUSDT")
+    ap.add_argument("--force", action="store_true", help="Cache ignorieren und neu holen")
+    args = ap.parse_args(argv)
+    snap = snapshot(args.symbol, force=args.force)
+    print(json.dumps(snap, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
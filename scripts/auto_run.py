@@ -9,25 +9,49 @@ Auto-Runner für Bybit-Strategie
 Konfigurierbare Schwellwerte:
 - ATR_THRESHOLDS: (low, high) in Prozent
 - VOL_RATIO_THRESHOLDS: (low, high) als Multiplikator ggü. Durchschnitt
+- PRESET_FILE: JSON aus bot.walkforward (Schwellen + Preset-Parameter);
+  Reihenfolge: ENV > Preset-Datei > eingebaute Defaults
 
 Aufrufbeispiel:
   SYM=BTCUSDT TF=15 DRY=1 EXECUTE=0 PYTHONPATH=. .venv/bin/python scripts/auto_run.py
 """
 import os, json, subprocess, time
 from typing import List, Dict, Any
-from pybit.unified_trading import HTTP
+from bot.exchange_utils import get_client
 from bot.config import SETTINGS as S
+from bot import profiler
+
+# -------- Preset-Datei (Walk-Forward, optional) --------
+PRESET_FILE = os.environ.get("PRESET_FILE", "")
+
+def load_preset_file(path: str) -> Dict[str, Any]:
+    if not path:
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(json.dumps({"preset_file_error": str(e), "path": path}, ensure_ascii=False))
+        return {}
+
+PRESETS = load_preset_file(PRESET_FILE)
+
+def _thr(key: str, default: str) -> float:
+    v = os.environ.get(key)
+    if v is None:
+        v = (PRESETS.get("thresholds") or {}).get(key, default)
+    return float(v)
 
 # -------- Schwellenwerte / Defaults --------
 ATR_LOOKBACK      = int(os.environ.get("ATR_LOOKBACK", "14"))
 VOL_LOOKBACK      = int(os.environ.get("VOL_LOOKBACK", "20"))
 ATR_THRESHOLDS    = (
-    float(os.environ.get("ATR_PCT_LOW", "0.30")),  # unter 0.30% = conservative
-    float(os.environ.get("ATR_PCT_HIGH","0.80")),  # über 0.80% = aggressive (sonst balanced)
+    _thr("ATR_PCT_LOW", "0.30"),   # unter 0.30% = conservative
+    _thr("ATR_PCT_HIGH", "0.80"),  # über 0.80% = aggressive (sonst balanced)
 )
 VOL_RATIO_THRESHOLDS = (
-    float(os.environ.get("VOL_RATIO_LOW",  "0.70")),  # < 0.7x = schwach
-    float(os.environ.get("VOL_RATIO_HIGH", "1.30")),  # > 1.3x = stark
+    _thr("VOL_RATIO_LOW", "0.70"),   # < 0.7x = schwach
+    _thr("VOL_RATIO_HIGH", "1.30"),  # > 1.3x = stark
 )
 
 # Symbole/TF/Modi (können per ENV überschrieben werden)
@@ -47,7 +71,7 @@ RUN_SCRIPT = os.path.join(ROOT, "scripts", "run_strategy.py")
 
 # ---------- Hilfsfunktionen ----------
 def http():
-    return HTTP(timeout=60,  api_key=S.bybit_api_key, api_secret=S.bybit_api_secret, testnet=S.bybit_testnet)
+    return get_client()
 
 def fetch_klines(client) -> List[Dict[str, Any]]:
     r = client.get_kline(category="linear", symbol=SYM, interval=TF, limit=max(VOL_LOOKBACK+2, ATR_LOOKBACK+2, 100))
@@ -96,8 +120,14 @@ def decide_preset(atr_pct: float, vol_ratio: float) -> str:
     return "balanced"
 
 def preset_params(name: str) -> Dict[str, str]:
+    """ENV-Parameter für das Preset: eingebaute Defaults, überschrieben aus PRESET_FILE."""
+    params = default_params(name)
+    params.update({k: str(v) for k, v in ((PRESETS.get("presets") or {}).get(name) or {}).items()})
+    return params
+
+def default_params(name: str) -> Dict[str, str]:
     """
-    Liefert ENV-Parameter für das Preset.
+    Eingebaute Preset-Parameter.
     Werte bewusst konservativ gewählt – bitte nach Geschmack feinjustieren.
     """
     if name == "conservative":
@@ -153,6 +183,7 @@ def run_strategy(env: Dict[str, str]) -> int:
 
 # ---------- main ----------
 def main():
+    profiler.install("auto_run")  # PROFILE_SECS=N → ganzen Lauf profilieren
     client = http()
     kl = fetch_klines(client)
     if len(kl) < max(ATR_LOOKBACK+2, VOL_LOOKBACK+2):
@@ -195,7 +226,8 @@ def main():
             "vol_avg": avgv,
             "vol_ratio": round(vol_ratio, 2),
         },
-        "decision": preset
+        "decision": preset,
+        "preset_file": PRESET_FILE or None,
     }, ensure_ascii=False))
 
     # Strategie ausführen
@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark-Suite mit gespeicherten JSON-Baselines.
+
+Misst die heissen Pfade des Bots auf synthetischen (GBM) oder aufgezeichneten
+Kerzen (bot.candles-Datei, --candles) in drei Grössen:
+
+    1k     1 000 Bars,    10 Symbole
+    100k   100 000 Bars,  100 Symbole
+    5m     5 000 000 Bars, 500 Symbole
+
+Fälle:
+    compute_all        indicators.compute_all über die ganze Historie
+    generate_signals   strategy.generate_signals (vektorisierte Regel-Masken)
+    universe_tick      pro Symbol Ring → compute_all → Signal der letzten Bar (ein Loop-Tick)
+    mom_s_walk         MomScalp.generate Bar für Bar über die Historie (CandleRing)
+    fetch_klines       auto_run.fetch_klines: Parsen einer 1000er-Kline-Seite
+    backfill           data.backfill gegen einen synthetischen Replay-Mitschnitt (SimClock)
+    pnl_from_fills     daily_report.pnl_from_fills (FIFO, vektorisiert)
+    order_path         run_strategy.place_order_and_stops gegen eine lokale Exchange-Attrappe
+                       (inkl. Journal-fsync, ResilientClient, InstrumentedClient)
+
+Aufruf:
+    PYTHONPATH=. python scripts/bench.py run --size 1k                 # → bench/results/1k-<ts>.json
+    PYTHONPATH=. python scripts/bench.py run --size 1k --baseline      # → bench/baseline-1k.json
+    PYTHONPATH=. python scripts/bench.py run --size 100k --compare     # messen + gegen Baseline prüfen
+    PYTHONPATH=. python scripts/bench.py compare bench/results/1k-….json [--base …] [--threshold 0.15]
+    PYTHONPATH=. python scripts/bench.py list
+
+compare vergleicht Mediane; Regression = neu/alt > 1 + threshold und mindestens
+--min-abs-ms langsamer. Exit-Code 1 bei Regression.
+"""
+import os, sys, json, time, random, platform, argparse, subprocess, tempfile, statistics
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+BENCH_DIR = os.path.join(ROOT, "bench")
+
+SIZES: Dict[str, Dict[str, int]] = {
+    "1k":   {"bars": 1_000,     "symbols": 10,  "walk": 1_000,   "klines": 5_000,   "fills": 1_000,     "orders": 20,  "repeat": 5},
+    "100k": {"bars": 100_000,   "symbols": 100, "walk": 100_000, "klines": 50_000,  "fills": 100_000,   "orders": 100, "repeat": 3},
+    "5m":   {"bars": 5_000_000, "symbols": 500, "walk": 500_000, "klines": 500_000, "fills": 1_000_000, "orders": 200, "repeat": 1},
+}
+BAR_MS = 300_000   # 5m
+
+
+# ============================================================
+# Datensätze
+# ============================================================
+
+def synth_frame(n: int, seed: int = 7, start_ms: int = 1_700_000_000_000, px0: float = 40_000.0) -> pd.DataFrame:
+    """GBM-Kerzen (ts in ms, o/h/l/c/v), deterministisch je seed."""
+    rng = np.random.default_rng(seed)
+    ret = rng.normal(0.0, 0.0015, n)
+    close = px0 * np.exp(np.cumsum(ret))
+    open_ = np.empty(n); open_[0] = px0; open_[1:] = close[:-1]
+    wick = np.abs(rng.normal(0.0, 0.0008, (2, n)))
+    high = np.maximum(open_, close) * (1.0 + wick[0])
+    low = np.minimum(open_, close) * (1.0 - wick[1])
+    vol = rng.lognormal(3.0, 0.6, n)
+    ts = start_ms + BAR_MS * np.arange(n, dtype=np.int64)
+    return pd.DataFrame({"ts": ts, "open": open_, "high": high, "low": low, "close": close, "volume": vol})
+
+
+def load_dataset(n: int, candles: Optional[str]) -> pd.DataFrame:
+    """Aufgezeichnete Kerzen (bot.candles) oder synthetisch; ts als UTC-datetime wie data.backfill."""
+    if candles:
+        from bot.candles import open_candles
+        df = open_candles(candles).to_frame().tail(n).reset_index(drop=True)
+    else:
+        df = synth_frame(n)
+    if pd.api.types.is_numeric_dtype(df["ts"]):
+        df["ts"] = pd.to_datetime(df["ts"], unit="ms", utc=True)
+    return df
+
+
+def kline_page(df: pd.DataFrame, i0: int, k: int) -> List[List[str]]:
+    """Bybit-/v5/market/kline-Liste (Strings, neueste zuerst) aus Zeilen i0..i0+k."""
+    sl = df.iloc[i0:i0 + k]
+    ts = (sl["ts"] - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(milliseconds=1)
+    rows = [[str(t), repr(o), repr(h), repr(l), repr(c), repr(v), repr(v * c)]
+            for t, o, h, l, c, v in zip(ts, sl["open"], sl["high"], sl["low"], sl["close"], sl["volume"])]
+    rows.reverse()
+    return rows
+
+
+def synth_fills(n: int, seed: int = 11) -> List[Dict[str, Any]]:
+    rng = np.random.default_rng(seed)
+    px = 40_000.0 * np.exp(np.cumsum(rng.normal(0, 0.001, n)))
+    side = rng.integers(0, 2, n)
+    qty = np.round(rng.uniform(0.001, 0.05, n), 3)
+    return [{"ts": 1_700_000_000 + i, "side": "Buy" if s else "Sell", "price": float(p), "qty": float(q),
+             "fee": float(p * q * 0.00055)} for i, (s, p, q) in enumerate(zip(side, px, qty))]
+
+
+# ============================================================
+# Lokale Exchange-Attrappe (pybit-Schnittstelle, sofortige Fills)
+# ============================================================
+
+class StubExchange:
+    """Minimaler In-Memory-Bybit: Market-Orders füllen sofort zum Mark-Preis, One-Way-Position."""
+
+    def __init__(self, symbol: str = "BTCUSDT", mark: float = 40_000.0):
+        self.symbol = symbol
+        self.mark = mark
+        self.size = 0.0
+        self.side: Optional[str] = None
+        self.avg = 0.0
+        self.orders: Dict[str, Dict[str, Any]] = {}
+        self.calls = 0
+
+    @staticmethod
+    def _ok(result: Any) -> Dict[str, Any]:
+        return {"retCode": 0, "retMsg": "OK", "result": result, "time": int(time.time() * 1000)}
+
+    def get_instruments_info(self, **kw):
+        self.calls += 1
+        return self._ok({"list": [{"symbol": self.symbol,
+                                   "priceFilter": {"tickSize": "0.10", "minPrice": "0.10", "maxPrice": "1999999.80"},
+                                   "lotSizeFilter": {"qtyStep": "0.001", "minOrderQty": "0.001"}}]})
+
+    def get_tickers(self, **kw):
+        self.calls += 1
+        m = f"{self.mark:.1f}"
+        return self._ok({"list": [{"symbol": self.symbol, "lastPrice": m, "markPrice": m,
+                                   "bid1Price": f"{self.mark - 0.1:.1f}", "ask1Price": m}]})
+
+    def place_order(self, **kw):
+        self.calls += 1
+        qty = float(kw["qty"])
+        side = kw["side"]
+        if self.size and side != self.side:
+            self.size = max(0.0, self.size - qty)
+        else:
+            self.avg = (self.avg * self.size + self.mark * qty) / (self.size + qty)
+            self.size += qty
+            self.side = side
+        oid = f"stub-{len(self.orders) + 1}"
+        link = kw.get("orderLinkId") or oid
+        self.orders[link] = {"orderId": oid, "orderLinkId": link, "orderStatus": "Filled", **kw}
+        return self._ok({"orderId": oid, "orderLinkId": link})
+
+    def get_positions(self, **kw):
+        self.calls += 1
+        return self._ok({"list": [{"symbol": self.symbol, "side": self.side or "", "size": f"{self.size:.3f}",
+                                   "avgPrice": f"{self.avg:.2f}", "positionIdx": 0}]})
+
+    def set_trading_stop(self, **kw):
+        self.calls += 1
+        return self._ok({})
+
+    def get_open_orders(self, **kw):
+        self.calls += 1
+        o = self.orders.get(kw.get("orderLinkId"))
+        return self._ok({"list": [o] if o and o["orderStatus"] == "New" else []})
+
+    def get_order_history(self, **kw):
+        self.calls += 1
+        o = self.orders.get(kw.get("orderLinkId"))
+        return self._ok({"list": [o] if o else []})
+
+
+class _KlineStub:
+    """Antwortet auf get_kline immer mit derselben vorbereiteten Seite."""
+
+    def __init__(self, page: List[List[str]]):
+        self._resp = {"retCode": 0, "retMsg": "OK", "result": {"list": page}}
+
+    def get_kline(self, **kw):
+        return self._resp
+
+
+# ============================================================
+# Fälle: setup(cfg, ctx) → (callable, n, unit)
+# ============================================================
+
+def case_compute_all(cfg, ctx):
+    from bot import indicators as ind
+    df = ctx["df"]
+    return (lambda: ind.compute_all(df)), len(df), "bars"
+
+
+def case_generate_signals(cfg, ctx):
+    from bot import indicators as ind
+    from bot import strategy
+    df = ind.compute_all(ctx["df"])
+    return (lambda: strategy.generate_signals(df)), len(df), "bars"
+
+
+def case_universe_tick(cfg, ctx):
+    from bot import indicators as ind
+    from bot import strategy
+    from bot.config import SETTINGS
+    from bot.ringbuffer import CandleRing
+    cap = int(getattr(SETTINGS, "ring_size", 1000) or 1000)
+    rings = []
+    for k in range(cfg["symbols"]):
+        r = CandleRing(cap, f"SYM{k}", "5m")
+        r.load_frame(synth_frame(cap, seed=100 + k))
+        rings.append(r)
+
+    def tick():
+        for r in rings:
+            df = ind.compute_all(r.frame(), copy=False)
+            strategy.long_signal(df.iloc[-1], df.iloc[-2], 0.0)
+            strategy.short_signal(df.iloc[-1], df.iloc[-2], 0.0)
+
+    return tick, len(rings), "symbols"
+
+
+def case_mom_s_walk(cfg, ctx):
+    from bot.ringbuffer import CandleRing
+    from strategies.mom_s import MomScalp
+    df = ctx["df"].tail(cfg["walk"])
+    ts = ((df["ts"] - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(milliseconds=1)).to_numpy()
+    rows = list(zip(ts.tolist(), *(df[c].to_numpy().tolist() for c in ("open", "high", "low", "close", "volume"))))
+    strat = MomScalp(lookback=20, allow_short=True, eps_break=0.0)
+
+    def walk():
+        ring = CandleRing(1000, "BTCUSDT", "5m")
+        state: Dict[str, Any] = {}
+        for r in rows:
+            ring.append(*r)
+            strat.generate(ring, state)
+
+    return walk, len(rows), "bars"
+
+
+def case_fetch_klines(cfg, ctx):
+    from scripts import auto_run
+    page = kline_page(ctx["df"], 0, min(1000, len(ctx["df"])))
+    client = _KlineStub(page)
+    pages = max(1, cfg["klines"] // len(page))
+
+    def run():
+        for _ in range(pages):
+            auto_run.fetch_klines(client)
+
+    return run, pages * len(page), "klines"
+
+
+def case_backfill(cfg, ctx):
+    from bot import clock, data, replay
+    df = ctx["df"]
+    per_call, page = 5_000, 500          # data.backfill: max. 10 Seiten à 500
+    calls = max(1, cfg["klines"] // per_call)
+    tmp = ctx["tmp"]
+    state = {"run": 0}
+
+    def tape_file() -> str:
+        # eigene Datei je Wiederholung: Tapes werden verbraucht und sind pro Pfad gecacht
+        state["run"] += 1
+        path = os.path.join(tmp, f"klines-{state['run']}.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for c in range(calls):
+                for p in range(per_call // page):
+                    i0 = (c * per_call + p * page) % max(1, len(df) - page)
+                    rec = {"k": "rest", "m": "get_kline", "a": {}, "t": 0.0, "d": 0.0,
+                           "r": {"retCode": 0, "retMsg": "OK", "result": {"list": kline_page(df, i0, page)}}}
+                    f.write(json.dumps(rec, separators=(",", ":")) + "\n")
+        return path
+
+    def prepare():
+        path = tape_file()
+        replay.tape(path)                 # Einlesen des Mitschnitts nicht mitmessen
+        return path
+
+    def run(path):
+        os.environ[replay.ENV_REPLAY] = path
+        os.environ[replay.ENV_SPEED] = "0"
+        try:
+            with clock.use(clock.SimClock(df["ts"].iloc[-1].timestamp())):
+                for _ in range(calls):
+                    data.backfill("BTCUSDT", "5m", lookback_days=3650)
+        finally:
+            os.environ.pop(replay.ENV_REPLAY, None)
+            os.environ.pop(replay.ENV_SPEED, None)
+
+    run.prepare = prepare
+    return run, calls * per_call, "klines"
+
+
+def case_pnl_from_fills(cfg, ctx):
+    from scripts.daily_report import pnl_from_fills
+    fills = synth_fills(cfg["fills"])
+    return (lambda: pnl_from_fills(fills)), len(fills), "fills"
+
+
+def case_order_path(cfg, ctx):
+    from bot.metrics import InstrumentedClient
+    from bot.resilience import ResilientClient
+    from bot.risk import RiskEngine
+    import scripts.run_strategy as rs
+    n = cfg["orders"]
+    sig = {"side": "Buy", "size": 0.001, "price": 40_000.0, "sl": 39_800.0, "tp": 40_300.0}
+
+    def run():
+        s = ResilientClient(InstrumentedClient(StubExchange()))
+        # Pre-Trade-Check mitmessen, Limits so weit, dass er nie blockiert
+        engine = RiskEngine(start_equity=1e12, leverage=1e6, max_entries_per_hour=10**9, risk_per_trade_pct=100.0)
+        with open(os.devnull, "w") as null:
+            out, sys.stdout = sys.stdout, null      # Debug-JSON von place_order_and_stops
+            try:
+                for i in range(n):
+                    rs.place_order_and_stops(s, dict(sig, key=f"bench|{i}"), engine=engine)
+            finally:
+                sys.stdout = out
+
+    return run, n, "orders"
+
+
+CASES: Dict[str, Callable] = {
+    "compute_all": case_compute_all,
+    "generate_signals": case_generate_signals,
+    "universe_tick": case_universe_tick,
+    "mom_s_walk": case_mom_s_walk,
+    "fetch_klines": case_fetch_klines,
+    "backfill": case_backfill,
+    "pnl_from_fills": case_pnl_from_fills,
+    "order_path": case_order_path,
+}
+
+
+# ============================================================
+# Runner / Vergleich
+# ============================================================
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _meta(size: str, candles: Optional[str]) -> Dict[str, Any]:
+    return {
+        "size": size,
+        "dataset": candles or "synthetic",
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git": _git_rev(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": f"{platform.system()} {platform.machine()}",
+        "cpus": os.cpu_count(),
+    }
+
+
+def time_case(fn, repeat: int) -> List[float]:
+    prepare = getattr(fn, "prepare", None)
+    if repeat > 1:                         # Warm-up (Imports, Caches) nur bei mehreren Läufen
+        fn(prepare()) if prepare else fn()
+    runs = []
+    for _ in range(repeat):
+        arg = prepare() if prepare else None
+        t0 = time.perf_counter()
+        fn(arg) if prepare else fn()
+        runs.append(time.perf_counter() - t0)
+    return runs
+
+
+def run_suite(size: str, cases: List[str], repeat: Optional[int] = None,
+              candles: Optional[str] = None) -> Dict[str, Any]:
+    cfg = dict(SIZES[size])
+    repeat = repeat or cfg["repeat"]
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        os.environ.setdefault("ORDER_JOURNAL", os.path.join(tmp, "orders.jsonl"))
+        random.seed(0)
+        ctx = {"df": load_dataset(cfg["bars"], candles), "tmp": tmp}
+        for name in cases:
+            try:
+                fn, n, unit = CASES[name](cfg, ctx)
+                runs = time_case(fn, repeat)
+            except Exception as e:
+                results[name] = {"error": f"{type(e).__name__}: {e}"}
+                print(json.dumps({"case": name, "error": results[name]["error"]}), file=sys.stderr)
+                continue
+            med = statistics.median(runs)
+            results[name] = {"n": n, "unit": unit, "runs_s": [round(r, 6) for r in runs],
+                             "median_s": round(med, 6), "min_s": round(min(runs), 6),
+                             "per_item_us": round(med / max(n, 1) * 1e6, 4)}
+            print(json.dumps({"case": name, **{k: results[name][k] for k in ("n", "unit", "median_s", "per_item_us")}}),
+                  file=sys.stderr)
+    return {"meta": _meta(size, candles), "cases": results}
+
+
+def compare(base: Dict[str, Any], new: Dict[str, Any], threshold: float = 0.15,
+            min_abs_ms: float = 1.0) -> Dict[str, Any]:
+    rows, regressions = [], []
+    bc, nc = base.get("cases", {}), new.get("cases", {})
+    for name in sorted(set(bc) | set(nc)):
+        b, n = bc.get(name) or {}, nc.get(name) or {}
+        if "median_s" not in n:
+            rows.append({"case": name, "status": "missing" if name in bc else "error", "error": n.get("error")})
+            continue
+        if "median_s" not in b:
+            rows.append({"case": name, "status": "new", "new_s": n["median_s"]})
+            continue
+        # unterschiedliche n (z. B. andere Grösse) → pro Einheit vergleichen
+        bs = b["median_s"] / max(b.get("n", 1), 1) * max(n.get("n", 1), 1)
+        ratio = n["median_s"] / bs if bs > 0 else float("inf")
+        slower_ms = (n["median_s"] - bs) * 1000.0
+        status = "ok"
+        if ratio > 1.0 + threshold and slower_ms >= min_abs_ms:
+            status = "regression"
+            regressions.append(name)
+        elif ratio < 1.0 - threshold:
+            status = "improved"
+        rows.append({"case": name, "status": status, "base_s": round(bs, 6), "new_s": n["median_s"],
+                     "ratio": round(ratio, 3)})
+    return {"threshold": threshold, "base": base.get("meta"), "new": new.get("meta"),
+            "cases": rows, "regressions": regressions}
+
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save(path: str, res: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(res, f, indent=2)
+        f.write("\n")
+
+
+def baseline_path(size: str) -> str:
+    return os.path.join(BENCH_DIR, f"baseline-{size}.json")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmarks mit JSON-Baselines")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    r = sub.add_parser("run")
+    r.add_argument("--size", choices=sorted(SIZES), default="1k")
+    r.add_argument("--cases", default="", help="Komma-Liste (Default: alle)")
+    r.add_argument("--repeat", type=int, default=None)
+    r.add_argument("--candles", default=None, help="bot.candles-Datei statt synthetischer Kerzen")
+    r.add_argument("--out", default=None)
+    r.add_argument("--baseline", action="store_true", help="als bench/baseline-<size>.json speichern")
+    r.add_argument("--compare", action="store_true", help="danach gegen die Baseline vergleichen")
+    r.add_argument("--threshold", type=float, default=0.15)
+
+    c = sub.add_parser("compare")
+    c.add_argument("new")
+    c.add_argument("--base", default=None, help="Default: bench/baseline-<size>.json")
+    c.add_argument("--threshold", type=float, default=0.15)
+    c.add_argument("--min-abs-ms", type=float, default=1.0)
+
+    sub.add_parser("list")
+    args = ap.parse_args(argv)
+
+    from loguru import logger
+    logger.remove()                        # INFO-Logs je Kline-Seite würden die Messung überlagern
+    logger.add(sys.stderr, level=os.environ.get("BENCH_LOG_LEVEL", "WARNING"))
+
+    if args.cmd == "list":
+        print(json.dumps({"cases": list(CASES), "sizes": SIZES}, indent=2))
+        return 0
+
+    if args.cmd == "run":
+        cases = [x.strip() for x in args.cases.split(",") if x.strip()] or list(CASES)
+        unknown = [x for x in cases if x not in CASES]
+        if unknown:
+            ap.error(f"unbekannte Fälle: {unknown}")
+        res = run_suite(args.size, cases, args.repeat, args.candles)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+        out = baseline_path(args.size) if args.baseline else (
+            args.out or os.path.join(BENCH_DIR, "results", f"{args.size}-{stamp}.json"))
+        _save(out, res)
+        summary = {"saved": os.path.relpath(out, ROOT),
+                   "cases": {k: v.get("median_s", v.get("error")) for k, v in res["cases"].items()}}
+        if args.compare and not args.baseline:
+            base = baseline_path(args.size)
+            if not os.path.exists(base):
+                summary["compare"] = f"keine Baseline {os.path.relpath(base, ROOT)}"
+            else:
+                cmp_ = compare(_load(base), res, args.threshold)
+                summary["compare"] = cmp_["cases"]
+                summary["regressions"] = cmp_["regressions"]
+        print(json.dumps(summary, indent=2, ensure_ascii=False))
+        return 1 if summary.get("regressions") else 0
+
+    new = _load(args.new)
+    base = args.base or baseline_path((new.get("meta") or {}).get("size", "1k"))
+    cmp_ = compare(_load(base), new, args.threshold, args.min_abs_ms)
+    print(json.dumps(cmp_, indent=2, ensure_ascii=False))
+    return 1 if cmp_["regressions"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
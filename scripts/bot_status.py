@@ -1,11 +1,10 @@
 from decimal import Decimal, InvalidOperation
 import json
-from pybit.unified_trading import HTTP
+from bot.exchange_utils import get_client
 from bot.config import SETTINGS
+from scripts.account_snapshot import snapshot, position_list, ticker
 
-s = HTTP(timeout=60,  testnet=SETTINGS.bybit_testnet,
-         api_key=SETTINGS.bybit_api_key,
-         api_secret=SETTINGS.bybit_api_secret)
+s = get_client()
 
 sym = getattr(SETTINGS, "symbol", "BTCUSDT") or "BTCUSDT"
 
@@ -15,9 +14,10 @@ def D(x):
     except (InvalidOperation, TypeError):
         return None
 
+snap = snapshot(sym, s)  # Positionen/Ticker aus dem geteilten Snapshot (TTL)
+
 # --- Position ---
-p_res = s.get_positions(category="linear", symbol=sym)["result"]
-plist = p_res.get("list", []) or []
+plist = position_list(snap)
 pos   = plist[0] if plist else {"size":"0", "side":"", "markPrice":""}
 
 size = pos.get("size","0")
@@ -26,7 +26,7 @@ unrp = pos.get("unrealisedPnl","")
 pos_mark = pos.get("markPrice","")
 
 # --- Ticker ---
-t = s.get_tickers(category="linear", symbol=sym)["result"]["list"][0]
+t = ticker(snap)
 last  = t.get("lastPrice","")
 bid1  = t.get("bid1Price","")
 ask1  = t.get("ask1Price","")
@@ -1,55 +1,54 @@
-from pybit.unified_trading import HTTP
+from bot.exchange_utils import get_client
+from bot.orderbook import quote, spread_guard
+from bot.precision import Precision
 from bot.config import SETTINGS as S
-import time, math, json
+from bot.journal import journal, submit
+from bot.live_risk import pre_trade
+import time, json
 
-def tick_digits(x: str) -> int:
-    s = str(x)
-    return len(s.split(".")[1]) if (x is not None and "." in s) else 0
-
-def safe_digits(tick_str, price):
-    d = tick_digits(str(tick_str))
-    if d == 0:
-        if price < 1:   return 6
-        if price < 10:  return 3
-        if price < 100: return 2
-        return 2
-    return d
-
-def round_up_step(x: float, step: float) -> float:
-    return math.ceil(x / step) * step
-
-def place_market_with_tp_sl(symbol: str, side: str, tp_bps=30, sl_bps=20, min_notional=5.0):
+def place_market_with_tp_sl(symbol: str, side: str, tp_bps=30, sl_bps=20, min_notional=5.0, key=None):
     """
     Plaziert Market-Order und setzt danach TP/SL (in Basis-Punkten).
     tp_bps=30  -> +0.30%, sl_bps=20 -> -0.20% (bei Buy).
+    key (z. B. Start-ts der Signal-Kerze) macht die orderLinkId über Neustarts stabil.
     """
-    s = HTTP(timeout=60,  api_key=S.bybit_api_key, api_secret=S.bybit_api_secret, testnet=S.bybit_testnet)
+    s = get_client()
 
     # --- Instrument & Orderbuch ---
     info = s.get_instruments_info(category="linear", symbol=symbol)
     item = ((info or {}).get("result") or {}).get("list", [{}])[0]
     tick_str = (item.get("priceFilter") or {}).get("tickSize") or "0.0001"
     lsf = (item.get("lotSizeFilter") or {})
-    qty_step = float(lsf.get("qtyStep") or "1")
-    min_qty  = float(lsf.get("minOrderQty") or "1")
+    prec = Precision(tick=tick_str, step=lsf.get("qtyStep") or "1", min_qty=lsf.get("minOrderQty") or "1")
     min_not  = float(lsf.get("minNotionalValue") or min_notional)
 
-    ob = s.get_orderbook(category="linear", symbol=symbol, limit=1)
-    ask = float((((ob or {}).get("result") or {}).get("a") or [[None,0]])[0][0] or 0.0)
-    bid = float((((ob or {}).get("result") or {}).get("b") or [[None,0]])[0][0] or 0.0)
+    bid, ask = quote(s, symbol)   # lokales L2-Buch, sonst REST-L1
     px  = ask if side=="Buy" else bid
     if px <= 0:
         return [{"stage":"price_fetch_failed","ask":ask,"bid":bid}]
+    spread_ok, spread_pct = spread_guard(bid, ask)
+    if not spread_ok:
+        return [{"stage":"spread_guard","ask":ask,"bid":bid,"spread_pct":round(spread_pct, 5),
+                 "max_spread_pct":S.max_spread_pct}]
 
     # --- Menge so wählen, dass Notional passt ---
-    qty_need = max(min_qty, (min_not*1.02)/px)  # +2% Puffer
-    qty = round_up_step(qty_need, qty_step)
+    qty_need = (min_not*1.02)/px  # +2% Puffer
+    qty_str = prec.qty_str(qty_need, "up", enforce_min=True)
+    qty = float(qty_str)
 
-    # --- Order ---
-    order = s.place_order(category="linear", symbol=symbol, side=side, orderType="Market", qty=str(qty), reduceOnly=False)
+    # --- Pre-Trade-Check (Tagesverlust-Halt, Entry-/Exposure-Limits über alle Prozesse) ---
+    sl_px = px * (1 - sl_bps/10000.0) if side=="Buy" else px * (1 + sl_bps/10000.0)
+    ok, reason, risk = pre_trade(s, symbol, side, qty, px, sl=sl_px)
+    if not ok:
+        return [{"stage":"risk_blocked","reason":reason,"risk":risk}]
+
+    # --- Order (Journal + idempotente orderLinkId) ---
+    intent = journal().begin(symbol, side, qty_str, kind="entry", key=key, stops=True, tp_bps=tp_bps, sl_bps=sl_bps)
+    order = submit(s, intent, "entry", side=side, orderType="Market", qty=qty_str, reduceOnly=False)
     out = [{"stage":"order_placed","retCode":order.get("retCode"),"retMsg":order.get("retMsg"),
-            "qty":qty,"px":px,"notional":round(px*qty,6)}]
+            "qty":qty,"px":px,"notional":round(px*qty,6),"orderLinkId":intent.link("entry")}]
     if order.get("retCode") != 0:
+        intent.mark("failed", retCode=order.get("retCode"))
         return out
 
     # --- Position pollen bis gefüllt ---
@@ -68,19 +67,16 @@ def place_market_with_tp_sl(symbol: str, side: str, tp_bps=30, sl_bps=20, min_no
 
     if not (size>0 and avg>0):
         out.append({"stage":"abort_set_stops","reason":"no_filled_position","avgPrice":avg,"size":size})
-        return out
+        return out   # Intent bleibt offen → Reconciler prüft beim nächsten Start
 
-    # --- Digits & Format ---
-    digits = safe_digits(tick_str, avg)
-    def fmt(v: float) -> str: return f"{v:.{digits}f}"
+    # --- Tick-Rundung & Format (ganzzahlig, SL nie enger als berechnet) ---
     tp_val = avg * (1 + tp_bps/10000.0) if side=="Buy" else avg * (1 - tp_bps/10000.0)
     sl_val = avg * (1 - sl_bps/10000.0) if side=="Buy" else avg * (1 + sl_bps/10000.0)
-    tp_str, sl_str = fmt(tp_val), fmt(sl_val)
-    if tp_str in ("0","0.0") or sl_str in ("0","0.0"):
-        digits = max(digits, 4)
-        tp_str, sl_str = fmt(tp_val), fmt(sl_val)
+    tp_str = prec.price_str(tp_val, "nearest")
+    sl_str = prec.stop_str(sl_val, side)
+    intent.mark("filled", avgPrice=avg, size=size, sl=sl_str, tp=tp_str)
 
-    out.append({"stage":"format_debug","tick_str":tick_str,"digits":digits,"avg":avg,
+    out.append({"stage":"format_debug","tick_str":tick_str,"digits":prec.price_decimals,"avg":avg,
                 "tp_val":tp_val,"sl_val":sl_val,"tp_str":tp_str,"sl_str":sl_str})
 
     # --- positionIdx je nach Modus ---
@@ -91,21 +87,23 @@ def place_market_with_tp_sl(symbol: str, side: str, tp_bps=30, sl_bps=20, min_no
                                takeProfit=tp_str, stopLoss=sl_str,
                                tpTriggerBy="LastPrice", slTriggerBy="LastPrice")
     out.append({"stage":"stops_set","positionIdx":position_idx,"retCode":stops.get("retCode"),"retMsg":stops.get("retMsg")})
+    if stops.get("retCode") == 0:
+        intent.mark("stops_set", sl=sl_str, tp=tp_str)
+        intent.mark("done")
     return out
 
 def dry_preview(symbol="DOGEUSDT", side="Buy"):
     """Nur Infos ausgeben, keine Order."""
-    s = HTTP(api_key=S.bybit_api_key, api_secret=S.bybit_api_secret, testnet=S.bybit_testnet)
+    s = get_client()
     info = s.get_instruments_info(category="linear", symbol=symbol)
     item = ((info or {}).get("result") or {}).get("list", [{}])[0]
     tick_str = (item.get("priceFilter") or {}).get("tickSize")
     lsf = (item.get("lotSizeFilter") or {})
-    ob = s.get_orderbook(category="linear", symbol=symbol, limit=1)
-    ask = float((((ob or {}).get("result") or {}).get("a") or [[None,0]])[0][0] or 0.0)
-    d = safe_digits(tick_str, ask or 1.0)
+    bid, ask = quote(s, symbol)
+    d = Precision(tick=tick_str).price_decimals if tick_str else None
     print(json.dumps({
         "symbol":symbol, "side":side,
         "tick_str":tick_str, "qtyStep": lsf.get("qtyStep"), "minQty": lsf.get("minOrderQty"),
         "minNotional": lsf.get("minNotionalValue"),
-        "ask": ask, "digits": d
+        "ask": ask, "bid": bid, "spread_pct": round(spread_guard(bid, ask)[1], 5), "digits": d
     }, indent=2))
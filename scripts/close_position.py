@@ -1,12 +1,9 @@
 import os, sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from bot.config import SETTINGS
-from pybit.unified_trading import HTTP
+from bot.exchange_utils import get_client
 
-s = HTTP(timeout=60,  testnet=SETTINGS.bybit_testnet,
-    api_key=SETTINGS.bybit_api_key,
-    api_secret=SETTINGS.bybit_api_secret
-)
+s = get_client()
 
 symbol = getattr(SETTINGS, "symbol", "BTCUSDT") or "BTCUSDT"
 
@@ -2,41 +2,38 @@
 # -*- coding: utf-8 -*-
 """
 Daily Report (18:00):
-- holt 24h-Kurs (15m-Kerzen) von Bybit
-- markiert Trades (Fills) der letzten 24h
+- holt 24h-Kurs (15m-Kerzen) von Bybit (oder --days N)
+- markiert Trades (Fills) der letzten 24h (alle Seiten, abgeschlossene Tage gecacht)
 - summiert realisierte PnL, zählt Alerts aus logs/
 - optional: vergleicht "Forecasts" aus forecasts.jsonl (wenn vorhanden)
 - erzeugt PNG-Chart + TXT-Zusammenfassung
 """
 import os, sys, json, time, datetime as dt
 from decimal import Decimal
-from pybit.unified_trading import HTTP
+from bot.exchange_utils import get_client
 from bot.config import SETTINGS as S
+from scripts.log_utils import dispatch_notification, HEALTH_LOG, EVENTS_LOG, ALERTS_LOG
+from scripts.log_store import LogStore
+from bot.analytics import fifo_pnl
 
 # ---- Config ----
 SYM = "BTCUSDT"
 OUT_DIR = os.path.join(os.path.dirname(__file__), "..", "reports")
 LOG_DIR = os.path.join(os.path.dirname(__file__), "..", "logs")
 FORECASTS = os.path.join(os.path.dirname(__file__), "..", "forecasts.jsonl")  # optional
+LOG_KEEP_DAYS = os.environ.get("LOG_KEEP_DAYS")  # optional: rotierte Log-Segmente älter als N Tage löschen
 
 # -- plotting (matplotlib, keine Farben setzen) --
 import matplotlib
 matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 
-# --- macOS Notification ---
+# --- macOS Notification (asynchron, siehe scripts.log_utils) ---
 def notify(msg: str, title: str="Bybit Bot – Daily"):
-    try:
-        import subprocess, shlex
-        msg = msg.replace('"', r'\"')
-        title = title.replace('"', r'\"')
-        cmd = f'''osascript -e 'display notification "{msg}" with title "{title}"' '''
-        subprocess.run(shlex.split(cmd), check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    except Exception:
-        pass
+    dispatch_notification(msg, title)
 
 def http():
-    return HTTP(timeout=60,  api_key=S.bybit_api_key, api_secret=S.bybit_api_secret, testnet=S.bybit_testnet)
+    return get_client()
 
 def utcnow():
     return dt.datetime.utcnow()
@@ -44,12 +41,13 @@ def utcnow():
 def ymd():
     return utcnow().strftime("%Y-%m-%d")
 
+def _midnight_utc_ts():
+    now = utcnow()
+    return int(dt.datetime(now.year, now.month, now.day, tzinfo=dt.timezone.utc).timestamp())
+
 def log_lines_for_today():
-    path = os.path.join(LOG_DIR, f"log-{utcnow().strftime('%Y%m%d')}.jsonl")
-    if not os.path.exists(path):
-        return []
-    with open(path, "r", encoding="utf-8") as f:
-        return [json.loads(x) for x in f if x.strip()]
+    """Health-Datensätze seit 00:00 UTC (indiziert, nur das Tagesfenster wird geparst)."""
+    return list(LogStore(HEALTH_LOG).iter(since=_midnight_utc_ts()))
 
 def read_forecasts_window(since_ts):
     """Optional: forecasts.jsonl mit Schemas wie:
@@ -58,30 +56,36 @@ def read_forecasts_window(since_ts):
     """
     if not os.path.exists(FORECASTS):
         return []
-    rows = []
-    with open(FORECASTS, "r", encoding="utf-8") as f:
-        for line in f:
-            line=line.strip()
-            if not line: continue
-            try:
-                j=json.loads(line)
-                if j.get("symbol")==SYM and int(j.get("ts",0))>= since_ts:
-                    rows.append(j)
-            except Exception:
-                pass
-    return rows
+    return list(LogStore(FORECASTS).iter(since=since_ts, where=lambda j: j.get("symbol") == SYM))
 
-def kline_24h(s):
-    # 24h zurück, 15m-Kerzen
-    now_ms = int(time.time()*1000)
-    since_ms = now_ms - 24*60*60*1000
-    # pybit v5: get_kline(category="linear", symbol=SYM, interval="15", start=..., end=...)
-    r = s.get_kline(category="linear", symbol=SYM, interval="15", start=since_ms, end=now_ms)
-    lst = (r.get("result") or {}).get("list") or []
-    # Bybit liefert oft jüngstes zuerst; wir sortieren nach openTime
+# --------------------------------------------------------------------------- #
+#   Datenschicht: Cursor-Paging, parallele Abrufe, Cache für abgeschlossene Tage #
+# --------------------------------------------------------------------------- #
+CACHE_DIR = os.path.join(OUT_DIR, "cache")
+DAY_MS = 24*60*60*1000
+KLINE_INTERVAL = "15"
+FETCH_WORKERS = int(os.environ.get("REPORT_WORKERS", "6"))
+
+def _result_list(r):
+    return ((r or {}).get("result") or {}).get("list") or []
+
+def _paged(call, **params):
+    """Folgt nextPageCursor, bis keine Seite mehr kommt."""
+    out, cursor, seen = [], None, set()
+    while True:
+        kw = dict(params, limit=100)
+        if cursor:
+            kw["cursor"] = cursor
+        r = call(**kw)
+        out.extend(_result_list(r))
+        cursor = ((r or {}).get("result") or {}).get("nextPageCursor") or None
+        if not cursor or cursor in seen:
+            return out
+        seen.add(cursor)
+
+def _parse_kline(lst):
     rows = []
     for it in lst:
-        # unify fields: start, open, high, low, close
         # v5: it = [start, open, high, low, close, volume, turnover]
         try:
             rows.append({
@@ -91,16 +95,9 @@ def kline_24h(s):
             })
         except Exception:
             pass
-    rows.sort(key=lambda x: x["t"])
     return rows
 
-def fills_24h(s):
-    # Executions der letzten 24h
-    now_ms = int(time.time()*1000)
-    since_ms = now_ms - 24*60*60*1000
-    # unified endpoint: get_executions(category="linear", symbol=SYM, startTime=..., endTime=...)
-    r = s.get_executions(category="linear", symbol=SYM, startTime=since_ms, endTime=now_ms)
-    lst = (r.get("result") or {}).get("list") or []
+def _parse_fills(lst):
     fills = []
     for it in lst:
         try:
@@ -115,46 +112,147 @@ def fills_24h(s):
             })
         except Exception:
             pass
-    fills.sort(key=lambda x: x["ts"])
     return fills
 
+def _fetch_kline_day(s, start_ms, end_ms):
+    # max. 1000 Kerzen pro Call; Bybit liefert jüngstes zuerst → Ende nach hinten schieben
+    rows, end = [], end_ms - 1
+    while end >= start_ms:
+        lst = _result_list(s.get_kline(category="linear", symbol=SYM, interval=KLINE_INTERVAL,
+                                       start=start_ms, end=end, limit=1000))
+        batch = [r for r in _parse_kline(lst) if start_ms <= r["t"]*1000 < end_ms]
+        rows.extend(batch)
+        if len(lst) < 1000 or not batch:
+            break
+        end = min(r["t"] for r in batch)*1000 - 1
+    return rows
+
+def _fetch_fills_day(s, start_ms, end_ms):
+    return _parse_fills(_paged(s.get_executions, category="linear", symbol=SYM,
+                               startTime=start_ms, endTime=end_ms - 1))
+
+def _fetch_closed_day(s, start_ms, end_ms):
+    out = []
+    for it in _paged(s.get_closed_pnl, category="linear", symbol=SYM,
+                     startTime=start_ms, endTime=end_ms - 1):
+        # v5 returns "closedPnl"
+        out.append({"ts": int(it.get("updatedTime") or it.get("createdTime") or 0)//1000,
+                    "pnl": str(it.get("closedPnl", "0"))})
+    return out
+
+DATASETS = {
+    "kline":  (_fetch_kline_day,  "t"),
+    "fills":  (_fetch_fills_day,  "ts"),
+    "closed": (_fetch_closed_day, "ts"),
+}
+
+def _cache_path(kind, day_start_ms):
+    day = dt.datetime.utcfromtimestamp(day_start_ms/1000).strftime("%Y%m%d")
+    return os.path.join(CACHE_DIR, SYM, f"{kind}-{day}.json")
+
+def _cache_get(kind, day_start_ms):
+    try:
+        with open(_cache_path(kind, day_start_ms), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+def _cache_put(kind, day_start_ms, rows):
+    path = _cache_path(kind, day_start_ms)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(rows, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+def collect(s, since_ms, until_ms, kinds=("kline", "fills", "closed")):
+    """
+    Holt alle Datensätze für [since_ms, until_ms) tageweise (UTC). Abgeschlossene
+    Tage kommen aus dem Cache (bzw. werden nach dem Abruf gecacht), nur
+    fehlende Tage und der laufende Tag gehen ans API – parallel über alle
+    Datensätze. Rückgabe: {kind: rows | None (Abruf fehlgeschlagen)}.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    now_ms = int(time.time()*1000)
+    first_day = since_ms - since_ms % DAY_MS
+    days = list(range(first_day, until_ms, DAY_MS))
+
+    parts = {k: {} for k in kinds}
+    jobs = []
+    for kind in kinds:
+        for d in days:
+            complete = d + DAY_MS <= now_ms
+            cached = _cache_get(kind, d) if complete else None
+            if cached is not None:
+                parts[kind][d] = cached
+            else:
+                jobs.append((kind, d, complete))
+
+    def _run(job):
+        kind, d, complete = job
+        fetch, _ = DATASETS[kind]
+        rows = fetch(s, d, min(d + DAY_MS, now_ms) if not complete else d + DAY_MS)
+        if complete:
+            _cache_put(kind, d, rows)
+        return job, rows
+
+    failed = set()
+    if jobs:
+        with ThreadPoolExecutor(max_workers=max(1, FETCH_WORKERS)) as ex:
+            futs = [ex.submit(_run, j) for j in jobs]
+            for fut, job in zip(futs, jobs):
+                try:
+                    (kind, d, _), rows = fut.result()
+                    parts[kind][d] = rows
+                except Exception as e:
+                    failed.add(job[0])
+                    print(json.dumps({"fetch_error": job[0], "day": job[1], "error": str(e)}), file=sys.stderr)
+
+    out = {}
+    for kind in kinds:
+        if kind in failed:
+            out[kind] = None
+            continue
+        key = DATASETS[kind][1]
+        rows = [r for d in days for r in parts[kind].get(d, [])
+                if since_ms <= r[key]*1000 < until_ms]
+        rows.sort(key=lambda x: x[key])
+        out[kind] = rows
+    return out
+
+def _window(hours=24):
+    now_ms = int(time.time()*1000)
+    return now_ms - hours*60*60*1000, now_ms
+
+def kline_24h(s):
+    # 24h zurück, 15m-Kerzen (älteste zuerst)
+    return collect(s, *_window(), kinds=("kline",))["kline"] or []
+
+def fills_24h(s):
+    # Executions der letzten 24h (alle Seiten)
+    return collect(s, *_window(), kinds=("fills",))["fills"] or []
+
+def closed_pnl_total(rows):
+    if rows is None:
+        return None
+    total = Decimal("0")
+    for it in rows:
+        total += Decimal(it["pnl"])
+    return float(total)
+
 def realized_pnl_from_closed(s):
     # Optional: geschlossenes PnL (falls verfügbar)
     # Achtung: je nach Account kann get_closed_pnl leer sein; deshalb Fallback über fills.
-    now_ms = int(time.time()*1000)
-    since_ms = now_ms - 24*60*60*1000
     try:
-        r = s.get_closed_pnl(category="linear", symbol=SYM, startTime=since_ms, endTime=now_ms)
-        lst = (r.get("result") or {}).get("list") or []
-        total = Decimal("0")
-        for it in lst:
-            # v5 returns "closedPnl"
-            total += Decimal(str(it.get("closedPnl","0")))
-        return float(total)
+        return closed_pnl_total(collect(s, *_window(), kinds=("closed",))["closed"])
     except Exception:
         return None
 
 def pnl_from_fills(fills):
-    # sehr vereinfachtes PnL aus aufeinanderfolgenden Buys/Sells (kleines FIFO)
-    pos = 0.0
-    avg = 0.0
-    realized = 0.0
-    for f in fills:
-        if f["side"] == "Buy":
-            # position erhöhen
-            total_cost = avg*pos + f["price"]*f["qty"]
-            pos += f["qty"]
-            if pos > 0:
-                avg = total_cost/pos
-        else:  # Sell
-            qty = min(pos, f["qty"])
-            realized += (f["price"] - avg)*qty
-            pos -= qty
-            if pos <= 1e-12:
-                pos, avg = 0.0, 0.0
-    return realized
-
-def draw_chart(rows, fills, out_png, forecasts):
+    # FIFO-PnL aus Buys/Sells, Long und Short (vektorisiert, siehe bot.analytics)
+    return fifo_pnl(fills)
+
+def draw_chart(rows, fills, out_png, forecasts, span="24h"):
     if not rows:
         return
     ts = [dt.datetime.utcfromtimestamp(r["t"]) for r in rows]
@@ -175,7 +273,7 @@ def draw_chart(rows, fills, out_png, forecasts):
         t1 = t0 + dt.timedelta(seconds=int(fc.get("h", 3600)))
         plt.axvspan(t0, t1, alpha=0.1)
 
-    plt.title(f"{SYM} • letzte 24h")
+    plt.title(f"{SYM} • letzte {span}")
     plt.xlabel("UTC Zeit")
     plt.ylabel("Preis")
     plt.tight_layout()
@@ -210,13 +308,21 @@ def evaluate_forecasts(forecasts, rows):
     return {"count":len(forecasts), "hits":hits, "hit_rate": (hits/len(forecasts) if forecasts else None)}
 
 def main():
+    import argparse
+    ap = argparse.ArgumentParser(description="Daily/Multi-Day Report")
+    ap.add_argument("--days", type=int, default=1, help="Report-Horizont in Tagen (Default 1 = 24h)")
+    args = ap.parse_args()
+    hours = 24*max(1, args.days)
+    span = "24h" if hours == 24 else f"{hours//24}d"
+
     os.makedirs(OUT_DIR, exist_ok=True)
     s = http()
 
-    # Daten holen
-    kl = kline_24h(s)
-    fills = fills_24h(s)
-    closed = realized_pnl_from_closed(s)
+    # Daten holen (parallel, gepaged, abgeschlossene Tage aus dem Cache)
+    data = collect(s, *_window(hours))
+    kl = data["kline"] or []
+    fills = data["fills"] or []
+    closed = closed_pnl_total(data["closed"])
     if closed is None:
         closed = pnl_from_fills(fills)
 
@@ -228,14 +334,14 @@ def main():
             d = r.get("data", {})
             alerts += len(d.get("alerts", [])) if isinstance(d.get("alerts"), list) else 0
 
-    # Forecasts (optional) einlesen & bewerten (nur 24h)
-    since_ts = int(time.time()) - 24*60*60
+    # Forecasts (optional) einlesen & bewerten (nur Report-Fenster)
+    since_ts = int(time.time()) - hours*60*60
     forecasts = read_forecasts_window(since_ts)
     fc_eval = evaluate_forecasts(forecasts, kl)
 
     # Chart rendern
     out_png = os.path.abspath(os.path.join(OUT_DIR, f"daily-{ymd()}.png"))
-    draw_chart(kl, fills, out_png, forecasts)
+    draw_chart(kl, fills, out_png, forecasts, span=span)
 
     # Text-Report
     realized_txt = f"{closed:.2f} (USDT)" if closed is not None else "n/a"
@@ -243,8 +349,8 @@ def main():
     summary = [
         f"BYBIT DAILY • {ymd()}",
         f"Symbol: {SYM}",
-        f"Realisierte PnL (24h): {realized_txt}",
-        f"Fills (24h): {len(fills)}",
+        f"Realisierte PnL ({span}): {realized_txt}",
+        f"Fills ({span}): {len(fills)}",
         f"Alerts heute: {alerts}",
         f"Forecast-Qualität: {fc_line}",
         f"Chart: {out_png}",
@@ -258,8 +364,13 @@ def main():
     with open(out_txt, "w", encoding="utf-8") as f:
         f.write("\n".join(summary))
 
+    # Aufräumen: alte Segmente der JSONL-Logs (nur wenn LOG_KEEP_DAYS gesetzt)
+    if LOG_KEEP_DAYS:
+        for p in (HEALTH_LOG, EVENTS_LOG, ALERTS_LOG):
+            LogStore(p).prune(float(LOG_KEEP_DAYS))
+
     # kleine Notification
-    notify(f"PnL 24h: {realized_txt} • Fills: {len(fills)} • Forecasts: {fc_line}", title="Bybit Bot – Daily Report")
+    notify(f"PnL {span}: {realized_txt} • Fills: {len(fills)} • Forecasts: {fc_line}", title="Bybit Bot – Daily Report")
     print(json.dumps({"png": out_png, "txt": out_txt, "fills": len(fills), "pnl": realized_txt, "forecast": fc_line}, ensure_ascii=False))
 
 if __name__ == "__main__":
@@ -4,11 +4,11 @@
 Flatten helper: schliesst alle offenen Positionen im Testnet.
 """
 import time
-from pybit.unified_trading import HTTP
+from bot.exchange_utils import get_client
 from bot.config import SETTINGS as S
 
 SYMS = ["BTCUSDT"]   # Erweiterbar, falls du z. B. ETHUSDT testest
-s = HTTP(timeout=60,  api_key=S.bybit_api_key, api_secret=S.bybit_api_secret, testnet=S.bybit_testnet)
+s = get_client()
 
 def pos_side_sz(p):
     return float(p.get("size","0") or 0), p.get("side")  # side: Buy / Sell
@@ -1,21 +1,16 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 import time, json, subprocess, sys, os
-from pybit.unified_trading import HTTP
 from bot.config import SETTINGS as S
+from scripts import account_snapshot as snap_cache
 
 SYM = "BTCUSDT"
 
-def http():
-    return HTTP(timeout=60,  api_key=S.bybit_api_key, api_secret=S.bybit_api_secret, testnet=S.bybit_testnet)
+def get_pos(snap):
+    return snap_cache.open_position(snap)
 
-def get_pos(s):
-    L = (s.get_positions(category="linear", symbol=SYM)["result"]["list"] or [])
-    return next((p for p in L if float(p.get("size") or 0) > 0), None)
-
-def get_orders(s):
-    res = s.get_open_orders(category="linear", symbol=SYM)["result"]
-    return (res or {}).get("list", []) or []
+def get_orders(snap):
+    return snap_cache.open_orders(snap)
 
 def run_panic():
     proj = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -23,8 +18,9 @@ def run_panic():
     return subprocess.run([sys.executable, exe], capture_output=True, text=True).stdout
 
 def main():
-    s = http()
-    p = get_pos(s); oo = get_orders(s)
+    # Entscheidung über eine Liquidation → frisch holen (force), nicht aus dem Cache
+    snap = snap_cache.snapshot(SYM, force=True)
+    p = get_pos(snap); oo = get_orders(snap)
     print(json.dumps({"ts": int(time.time()), "pos_open": bool(p), "open_orders": len(oo)}))
     if p or len(oo) > 0:
         out = run_panic()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Residenter Health-Monitor (Ersatz für den Cron-One-Shot scripts/health_check.py).
+
+- Ein persistenter Client, Probes laufen parallel (health_check.probe_all)
+  → Zykluszeit = max(Latenz) statt Summe.
+- Latenz je Probe in HDR-Histogrammen (bot.metrics):
+    health_probe_seconds{probe=...}        seit Start (Baseline)
+    + rollierendes Fenster (HEALTH_WINDOW Zyklen) für Degradations-Erkennung
+- Clock-Skew ggü. Serverzeit als Gauge; Alert bei |Skew| > HEALTH_SKEW_MAX_MS.
+- Degradations-Alert, wenn das Fenster-p90 einer Probe über
+  max(HEALTH_DEGRADE_MULT × Baseline-p50, HEALTH_DEGRADE_MIN_MS) liegt –
+  Frühwarnung, bevor die API tatsächlich Fehler liefert.
+- State/Heuristiken (Error-Streak, Position ohne Orders, Auto-Panic) wie im
+  One-Shot; health_state.json wird weiter gepflegt.
+
+Aufruf:
+  HEALTH_INTERVAL=30 METRICS_PORT=9108 PYTHONPATH=. .venv/bin/python scripts/health_daemon.py
+"""
+import os, sys, json, time
+from concurrent.futures import ThreadPoolExecutor
+
+from bot.config import SETTINGS as S
+from bot.exchange_utils import get_client
+from bot.metrics import REGISTRY, Histogram, serve
+from scripts.log_utils import log_event
+from scripts import health_check as hc
+
+INTERVAL_S      = float(os.environ.get("HEALTH_INTERVAL", "30"))
+WINDOW          = int(os.environ.get("HEALTH_WINDOW", "20"))          # Zyklen je Fenster
+WARMUP          = int(os.environ.get("HEALTH_WARMUP", "10"))          # Baseline-Samples vor Alerts
+DEGRADE_MULT    = float(os.environ.get("HEALTH_DEGRADE_MULT", "3.0"))
+DEGRADE_MIN_MS  = float(os.environ.get("HEALTH_DEGRADE_MIN_MS", "500"))
+SKEW_MAX_MS     = float(os.environ.get("HEALTH_SKEW_MAX_MS", "1000"))  # Bybit recv_window = 5000
+ALERT_COOLDOWN  = float(os.environ.get("HEALTH_ALERT_COOLDOWN", "900"))
+PROBES = ("server_time", "ticker", "positions", "orders")
+
+
+class LatencyTracker:
+    """Baseline- und Fenster-Histogramm je Probe + Degradations-Check."""
+
+    def __init__(self, probes=PROBES, window: int = WINDOW):
+        self.window = window
+        self.base = {p: REGISTRY.histogram("health_probe_seconds", "Health-Probe-Latenz", {"probe": p})
+                     for p in probes}
+        self.recent = {p: Histogram() for p in probes}
+        self.errors = {p: REGISTRY.counter("health_probe_errors_total", "Fehlgeschlagene Probes", {"probe": p})
+                       for p in probes}
+        self.cycle = REGISTRY.histogram("health_cycle_seconds", "Dauer eines Probe-Zyklus")
+        self.skew = REGISTRY.gauge("health_clock_skew_ms", "Serverzeit minus lokale Zeit (ms)")
+        self._n = 0
+
+    def record(self, out: dict) -> None:
+        for p, chk in out["checks"].items():
+            sec = chk["latency_ms"] / 1000.0
+            if p in self.base:
+                self.base[p].record(sec)
+                self.recent[p].record(sec)
+                if not chk["ok"]:
+                    self.errors[p].inc()
+        self.cycle.record(out["meta"]["cycle_ms"] / 1000.0)
+        if "clock_skew_ms" in out["meta"]:
+            self.skew.set(out["meta"]["clock_skew_ms"])
+
+    def degraded(self) -> list:
+        """[(probe, p90_ms, limit_ms)] für Probes, deren Fenster-p90 über der Schwelle liegt."""
+        bad = []
+        for p, rec in self.recent.items():
+            base = self.base[p]
+            if base.count < WARMUP or rec.count < max(3, self.window // 4):
+                continue
+            p90 = rec.percentile(90) * 1000.0
+            limit = max(DEGRADE_MULT * base.percentile(50) * 1000.0, DEGRADE_MIN_MS)
+            if p90 > limit:
+                bad.append((p, round(p90, 1), round(limit, 1)))
+        return bad
+
+    def roll(self) -> None:
+        self._n += 1
+        if self._n >= self.window:
+            for h in self.recent.values():
+                h.reset()
+            self._n = 0
+
+    def summary(self) -> dict:
+        return {p: {"p50_ms": round(h.percentile(50) * 1000.0, 1),
+                    "p90_ms": round(h.percentile(90) * 1000.0, 1),
+                    "p99_ms": round(h.percentile(99) * 1000.0, 1),
+                    "n": h.count}
+                for p, h in self.base.items()}
+
+
+def _alert(key: str, text: str, title: str, last_sent: dict, out: dict) -> None:
+    """Alert mit Cooldown je Schlüssel (kein Spam bei dauerhafter Degradation)."""
+    out["alerts"].append(text)
+    now = time.time()
+    if now - last_sent.get(key, 0.0) < ALERT_COOLDOWN:
+        return
+    last_sent[key] = now
+    hc.append_alert_line(text)
+    hc.notify(text, title=title)
+
+
+def run_cycle(s, pool: ThreadPoolExecutor, tracker: LatencyTracker, st: dict, last_sent: dict) -> dict:
+    now = int(time.time())
+    out = hc.probe_all(s, hc.SYM, pool=pool)
+    tracker.record(out)
+    hc.evaluate(out, st, now)
+
+    for probe, p90, limit in tracker.degraded():
+        _alert(f"degrade:{probe}", f"Latenz-Degradation {probe}: p90={p90}ms > {limit}ms",
+               "Bybit Bot – LATENCY 🐢", last_sent, out)
+    skew = out["meta"].get("clock_skew_ms")
+    if skew is not None and abs(skew) > SKEW_MAX_MS:
+        _alert("skew", f"Clock-Skew {skew:+.0f}ms ggü. Serverzeit (> {SKEW_MAX_MS:.0f}ms)",
+               "Bybit Bot – CLOCK ⏰", last_sent, out)
+    tracker.roll()
+
+    out["meta"]["latency"] = tracker.summary()
+    hc.save_state(st)
+    return out
+
+
+def main():
+    os.makedirs("logs", exist_ok=True)
+    if S.metrics_port:
+        serve(S.metrics_port)
+
+    s = get_client()   # persistente Session (Keep-Alive) über alle Zyklen
+    pool = ThreadPoolExecutor(max_workers=len(PROBES), thread_name_prefix="probe")
+    tracker = LatencyTracker()
+    st = hc.load_state()
+    last_sent: dict = {}
+
+    while True:
+        t0 = time.monotonic()
+        try:
+            out = run_cycle(s, pool, tracker, st, last_sent)
+            rec = log_event("health", out)
+        except Exception as e:
+            st["error_streak"] = st.get("error_streak", 0) + 1
+            hc.save_state(st)
+            rec = log_event("health_error", {"error": str(e)})
+            if st["error_streak"] >= 3:
+                hc.notify(f"Health-Error (x{st['error_streak']}): {e}", title="Bybit Bot – HEALTH ❌")
+        print(json.dumps(rec, ensure_ascii=False), flush=True)
+        time.sleep(max(0.0, INTERVAL_S - (time.monotonic() - t0)))
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(0)
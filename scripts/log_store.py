@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+Indizierter JSONL-Log-Store für schnelle Zeitfenster-Abfragen.
+
+Ein Log besteht aus Segmenten: rotierte Dateien <path>.<YYYYmmdd-HHMMSS>
+(siehe log_utils.rotated_name) plus die aktive Datei <path>. Zu jedem
+Segment gehört ein Sidecar <segment>.idx mit
+  - Byte-Offset des ersten Datensatzes je Minute
+  - Zählern je "kind" pro Minute
+  - bereits indizierter Größe (neue Zeilen werden inkrementell nachindiziert)
+
+Abfragen wie "Alerts seit T" springen per Bisect direkt an den Offset und
+parsen nur das Fenster – die Laufzeit hängt vom Fenster ab, nicht von der
+Gesamtgröße der Logs.
+
+API:
+- LogStore(path).iter(since=None, until=None, kind=None, where=None)
+- LogStore(path).count(since=None, until=None, kind=None) -> int
+- LogStore(path).prune(keep_days) -> list[str]
+
+CLI:
+  python -m scripts.log_store query logs/alerts.log --since-h 24
+  python -m scripts.log_store count logs/health.log --since-h 24 --kind health
+  python -m scripts.log_store prune logs/events.log --keep-days 30
+"""
+import os, sys, json, glob, time, bisect, hashlib, argparse
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+INDEX_VERSION = 1
+_HEAD_BYTES = 256
+
+
+def kind_of(rec: Dict[str, Any]) -> str:
+    """Art eines Datensatzes: 'kind'-Feld, sonst 'alert' für Alert-Zeilen."""
+    k = rec.get("kind")
+    if k:
+        return str(k)
+    if "alert" in rec:
+        return "alert"
+    return "_"
+
+
+def _rec_ts(rec: Dict[str, Any]) -> Optional[int]:
+    try:
+        return int(rec.get("ts"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _head_hash(path: str, n: int) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read(n)).hexdigest()
+
+
+class _SegmentIndex:
+    """Sidecar-Index eines Segments (Minute → Offset, Zähler je kind)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.idx_path = path + ".idx"
+        self.size = 0                      # bis hierhin indiziert (Byte-Offset)
+        self.head = ""
+        self.minutes: List[int] = []       # aufsteigende Minute (epoch // 60)
+        self.offsets: List[int] = []       # Offset der ersten Zeile dieser Minute
+        self.counts: List[Dict[str, int]] = []
+        self.first_ts: Optional[int] = None
+        self.last_ts: Optional[int] = None
+        self._load()
+
+    # --- Persistenz ---------------------------------------------------------------
+    def _load(self) -> None:
+        try:
+            with open(self.idx_path, "r", encoding="utf-8") as f:
+                j = json.load(f)
+            if j.get("v") != INDEX_VERSION:
+                return
+            self.size, self.head = int(j["size"]), j.get("head", "")
+            self.minutes = [m for m, _, _ in j["buckets"]]
+            self.offsets = [o for _, o, _ in j["buckets"]]
+            self.counts = [c for _, _, c in j["buckets"]]
+            self.first_ts, self.last_ts = j.get("first_ts"), j.get("last_ts")
+        except Exception:
+            self._reset()
+
+    def _save(self) -> None:
+        j = {"v": INDEX_VERSION, "size": self.size, "head": self.head,
+             "first_ts": self.first_ts, "last_ts": self.last_ts,
+             "buckets": [[m, o, c] for m, o, c in zip(self.minutes, self.offsets, self.counts)]}
+        tmp = self.idx_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(j, f, separators=(",", ":"))
+        os.replace(tmp, self.idx_path)
+
+    def _reset(self) -> None:
+        self.size, self.head = 0, ""
+        self.minutes, self.offsets, self.counts = [], [], []
+        self.first_ts = self.last_ts = None
+
+    # --- Nachindizieren -----------------------------------------------------------
+    def refresh(self) -> None:
+        """Indiziert nur neu angehängte, vollständige Zeilen."""
+        try:
+            st_size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if st_size < self.size or (
+                self.size and _head_hash(self.path, min(self.size, _HEAD_BYTES)) != self.head):
+            self._reset()   # Datei ersetzt/rotiert → neu aufbauen
+        if st_size == self.size:
+            return
+
+        changed = False
+        with open(self.path, "rb") as f:
+            f.seek(self.size)
+            off = self.size
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break   # halbe Zeile (Writer schreibt gerade) → später
+                line_off, off = off, off + len(raw)
+                self.size = off
+                changed = True
+                if not raw.strip():
+                    continue
+                try:
+                    rec = json.loads(raw)
+                except Exception:
+                    continue
+                ts = _rec_ts(rec) if isinstance(rec, dict) else None
+                if ts is None:
+                    continue
+                minute = ts // 60
+                if not self.minutes or minute > self.minutes[-1]:
+                    self.minutes.append(minute)
+                    self.offsets.append(line_off)
+                    self.counts.append({})
+                c = self.counts[-1]
+                k = kind_of(rec)
+                c[k] = c.get(k, 0) + 1
+                self.first_ts = ts if self.first_ts is None else min(self.first_ts, ts)
+                self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+        if changed:
+            self.head = _head_hash(self.path, min(self.size, _HEAD_BYTES))
+            self._save()
+
+    # --- Bereichsgrenzen ------------------------------------------------------------
+    def byte_range(self, since: Optional[int], until: Optional[int]) -> tuple:
+        start = 0
+        if since is not None and self.minutes:
+            i = bisect.bisect_right(self.minutes, since // 60) - 1
+            start = self.offsets[i] if i >= 0 else 0
+        end = self.size
+        if until is not None and self.minutes:
+            j = bisect.bisect_right(self.minutes, until // 60)
+            if j < len(self.offsets):
+                end = self.offsets[j]
+        return start, end
+
+
+class LogStore:
+    """Zeitfenster-Abfragen über alle Segmente eines JSONL-Logs."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def segments(self) -> List[str]:
+        rotated = [p for p in glob.glob(glob.escape(self.path) + ".*")
+                   if not p.endswith((".idx", ".tmp"))]
+        segs = sorted(rotated)
+        if os.path.exists(self.path):
+            segs.append(self.path)
+        return segs
+
+    def _indexes(self, since: Optional[int], until: Optional[int]) -> Iterator[_SegmentIndex]:
+        for seg in self.segments():
+            ix = _SegmentIndex(seg)
+            ix.refresh()
+            if ix.last_ts is None:
+                continue
+            if since is not None and ix.last_ts < since:
+                continue
+            if until is not None and ix.first_ts > until:
+                continue
+            yield ix
+
+    def iter(self, since: Optional[int] = None, until: Optional[int] = None,
+             kind: Optional[str] = None,
+             where: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Iterator[Dict[str, Any]]:
+        """Datensätze mit since <= ts <= until (Sekunden, UTC) in Dateireihenfolge."""
+        for ix in self._indexes(since, until):
+            start, end = ix.byte_range(since, until)
+            if end <= start:
+                continue
+            with open(ix.path, "rb") as f:
+                f.seek(start)
+                data = f.read(end - start)
+            for raw in data.splitlines():
+                if not raw.strip():
+                    continue
+                try:
+                    rec = json.loads(raw)
+                except Exception:
+                    continue
+                ts = _rec_ts(rec) if isinstance(rec, dict) else None
+                if ts is None:
+                    continue
+                if (since is not None and ts < since) or (until is not None and ts > until):
+                    continue
+                if kind is not None and kind_of(rec) != kind:
+                    continue
+                if where is not None and not where(rec):
+                    continue
+                yield rec
+
+    def count(self, since: Optional[int] = None, until: Optional[int] = None,
+              kind: Optional[str] = None) -> int:
+        """
+        Zählt über die Minuten-Zähler; nur die beiden Randminuten des Fensters
+        werden geparst.
+        """
+        total = 0
+        lo_m = None if since is None else since // 60
+        hi_m = None if until is None else until // 60
+        for ix in self._indexes(since, until):
+            for m, c in zip(ix.minutes, ix.counts):
+                if (lo_m is not None and m < lo_m) or (hi_m is not None and m > hi_m):
+                    continue
+                if m == lo_m or m == hi_m:
+                    continue   # Randminute → exakt per Parse
+                total += sum(c.values()) if kind is None else c.get(kind, 0)
+        for edge in {lo_m, hi_m} - {None}:
+            s = max(edge * 60, since) if since is not None else edge * 60
+            u = min(edge * 60 + 59, until) if until is not None else edge * 60 + 59
+            total += sum(1 for _ in self.iter(since=s, until=u, kind=kind))
+        return total
+
+    def prune(self, keep_days: float) -> List[str]:
+        """Löscht rotierte Segmente (inkl. Sidecar), deren jüngster Eintrag älter ist."""
+        cutoff = time.time() - keep_days * 86400
+        removed = []
+        for seg in self.segments():
+            if seg == self.path:
+                continue
+            ix = _SegmentIndex(seg)
+            ix.refresh()
+            if ix.last_ts is not None and ix.last_ts < cutoff:
+                for p in (seg, ix.idx_path):
+                    try:
+                        os.remove(p)
+                    except OSError:
+                        pass
+                removed.append(seg)
+        return removed
+
+
+def alerts_since(ts: int, alerts_log: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Alle Alert-Zeilen aus alerts.log seit ts."""
+    from scripts.log_utils import ALERTS_LOG
+    return list(LogStore(alerts_log or ALERTS_LOG).iter(since=ts))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Indizierte JSONL-Logs abfragen")
+    ap.add_argument("cmd", choices=["query", "count", "prune"])
+    ap.add_argument("path")
+    ap.add_argument("--since-h", type=float, default=None, help="Fenster: letzte N Stunden")
+    ap.add_argument("--kind", default=None)
+    ap.add_argument("--keep-days", type=float, default=30.0)
+    args = ap.parse_args(argv)
+
+    store = LogStore(args.path)
+    since = int(time.time() - args.since_h * 3600) if args.since_h is not None else None
+    if args.cmd == "query":
+        for rec in store.iter(since=since, kind=args.kind):
+            print(json.dumps(rec, ensure_ascii=False))
+    elif args.cmd == "count":
+        print(json.dumps({"path": args.path, "since": since, "kind": args.kind,
+                          "count": store.count(since=since, kind=args.kind)}))
+    else:
+        print(json.dumps({"removed": store.prune(args.keep_days)}))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -3,12 +3,36 @@
 Schlanke Logging- und Notifier-Utilities ohne Zirkularimporte.
 Verwendet JSON-Lines-Logs in ~/Desktop/bybit_bot_skeleton/logs
 
+Schreiben ist nicht-blockierend: Datensätze landen in einer Queue, ein
+Hintergrund-Thread serialisiert (orjson, falls installiert), schreibt
+gebündelt, macht periodisch fsync und rotiert nach Größe. Mehrere Prozesse
+teilen sich dieselben Logs: Writes halten einen geteilten, die Rotation einen
+exklusiven flock auf <dir>/.<name>.lock, und vor jedem Write wird die aktive
+Datei per Inode geprüft (nach fremder Rotation neu öffnen). Writer-Fehler gehen
+nach stderr, nie in die JSON-Ausgabe der Skripte. Notifications (osascript)
+laufen über einen eigenen Dispatcher-Thread.
+
 API:
 - log_event(kind: str, payload: dict) -> dict
 - notify(message: str, title: str = "Bybit Bot") -> None
+- write_record(path: str, rec: dict) -> None      # beliebige JSONL-Datei
+- write_line(path: str, line: str) -> None        # Text-Logzeile
+- dispatch_notification(message, title) -> None   # nur Notification, kein alerts.log
+- flush(timeout: float = 5.0) -> bool
 """
 
-import os, json, datetime as dt, subprocess, shlex
+import os, sys, json, time, atexit, queue, threading, datetime as dt, subprocess, shlex
+from contextlib import contextmanager
+
+try:  # flock für prozessübergreifende Rotation (POSIX)
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+try:  # schneller Encoder, optional
+    import orjson as _orjson
+except Exception:  # pragma: no cover - optional
+    _orjson = None
 
 # Basisverzeichnis = Repo-Root relativ zu dieser Datei
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -19,13 +43,245 @@ EVENTS_LOG = os.path.join(LOG_DIR, "events.log")
 HEALTH_LOG = os.path.join(LOG_DIR, "health.log")
 ALERTS_LOG = os.path.join(LOG_DIR, "alerts.log")
 
-def _ensure_dirs():
-    os.makedirs(LOG_DIR, exist_ok=True)
+# Writer-Tuning (per ENV überschreibbar)
+MAX_BYTES    = int(os.environ.get("LOG_MAX_BYTES", str(20 * 1024 * 1024)))  # Rotation ab 20 MB
+FSYNC_SECS   = float(os.environ.get("LOG_FSYNC_SECS", "1.0"))
+FLUSH_SECS   = float(os.environ.get("LOG_FLUSH_SECS", "0.2"))
+BATCH_MAX    = 512
+
+
+def _dumps(obj) -> bytes:
+    if _orjson is not None:
+        try:
+            return _orjson.dumps(obj, default=str, option=_orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # z. B. Tupel-Keys, zu große ints → json kann mehr
+    return json.dumps(obj, ensure_ascii=False, default=str).encode("utf-8")
+
+
+def rotated_name(path: str, when: float = None) -> str:
+    """Zielname für rotierte Segmente: <path>.<YYYYmmdd-HHMMSS>[-NNN] (lexikografisch sortierbar)."""
+    stamp = dt.datetime.utcfromtimestamp(when if when is not None else time.time()).strftime("%Y%m%d-%H%M%S")
+    name = f"{path}.{stamp}"
+    n = 1
+    while os.path.exists(name):
+        name = f"{path}.{stamp}-{n:03d}"     # gepolstert: "-10" sortiert sonst vor "-2"
+        n += 1
+    return name
+
+
+def _lock_path(path: str) -> str:
+    """Sidecar-Lock (versteckt → kein Treffer für log_store-Segmente <path>.*)."""
+    d, name = os.path.split(path)
+    return os.path.join(d, f".{name}.lock")
+
+
+def _same_file(path: str, f) -> bool:
+    """Zeigt path noch auf die offene Datei? (sonst von einem anderen Prozess rotiert)"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return False
+    fst = os.fstat(f.fileno())
+    return (st.st_ino, st.st_dev) == (fst.st_ino, fst.st_dev)
+
+
+class _AsyncWriter:
+    """Hintergrund-Writer: Queue → gebündelte Writes, periodischer fsync, Rotation."""
+
+    def __init__(self):
+        self._q = queue.SimpleQueue()
+        self._files = {}          # path -> file handle (binär, append)
+        self._locks = {}          # path -> fd des Sidecar-Locks
+        self.errors = 0
+        self._dirty = set()
+        self._last_fsync = time.monotonic()
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._thread = None
+        self._pending = 0
+        self._idle = threading.Condition()
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                    self._thread.start()
+
+    def submit(self, path: str, item) -> None:
+        with self._idle:
+            self._pending += 1
+        self._q.put((path, item))
+        self._ensure_started()
+
+    @contextmanager
+    def _locked(self, path: str, exclusive: bool = False):
+        if fcntl is None:
+            yield
+            return
+        fd = self._locks.get(path)
+        if fd is None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            fd = self._locks[path] = os.open(_lock_path(path), os.O_CREAT | os.O_RDWR, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def _close(self, path: str):
+        f = self._files.pop(path, None)
+        self._dirty.discard(path)
+        if f is not None:
+            f.flush(); os.fsync(f.fileno()); f.close()
+
+    def _file(self, path: str):
+        f = self._files.get(path)
+        if f is not None and not _same_file(path, f):
+            self._close(path)     # anderer Prozess hat rotiert → aktive Datei neu öffnen
+            f = None
+        if f is None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            f = open(path, "ab")
+            self._files[path] = f
+        return f
+
+    def _rotate_if_needed(self, path: str, f):
+        if MAX_BYTES <= 0 or f.tell() < MAX_BYTES:
+            return
+        with self._locked(path, exclusive=True):
+            # unter dem Lock neu prüfen: evtl. hat ein anderer Prozess schon rotiert
+            if _same_file(path, f) and os.fstat(f.fileno()).st_size >= MAX_BYTES:
+                f.flush(); os.fsync(f.fileno())
+                os.replace(path, rotated_name(path))
+        self._close(path)
+
+    def _error(self, msg: str):
+        self.errors += 1
+        print(f"[LOG] {msg}", file=sys.stderr)
+
+    def _write_batch(self, batch):
+        by_path = {}
+        for path, item in batch:
+            try:
+                line = item.encode("utf-8") if isinstance(item, str) else _dumps(item)
+            except Exception as e:
+                self._error(f"encode error {path}: {e}")
+                continue
+            by_path.setdefault(path, []).append(line)
+        for path, lines in by_path.items():
+            try:
+                with self._locked(path):
+                    f = self._file(path)
+                    f.write(b"\n".join(lines) + b"\n")
+                    f.flush()
+                self._dirty.add(path)
+                self._rotate_if_needed(path, f)
+            except Exception as e:
+                self._error(f"write error {path}: {e}")
+
+    def _fsync(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_fsync < FSYNC_SECS:
+            return
+        for path in list(self._dirty):
+            f = self._files.get(path)
+            if f is not None:
+                try:
+                    os.fsync(f.fileno())
+                except Exception:
+                    pass
+        self._dirty.clear()
+        self._last_fsync = now
+
+    def _run(self):
+        while True:
+            try:
+                first = self._q.get(timeout=FLUSH_SECS)
+            except queue.Empty:
+                with self._io_lock:
+                    self._fsync()
+                continue
+            batch = [first]
+            while len(batch) < BATCH_MAX:
+                try:
+                    batch.append(self._q.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with self._io_lock:
+                    self._write_batch(batch)
+                    self._fsync()
+            finally:
+                with self._idle:
+                    self._pending -= len(batch)
+                    if self._pending <= 0:
+                        self._idle.notify_all()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        with self._idle:
+            ok = self._idle.wait_for(lambda: self._pending <= 0, timeout=timeout)
+        with self._io_lock:
+            self._fsync(force=True)
+        return ok
+
+
+class _Notifier:
+    """Eigener Thread für osascript-Notifications (Prozess-Spawn weg vom Hot-Path)."""
+
+    def __init__(self, maxsize: int = 100):
+        self._q = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, title: str, message: str, console_fallback: bool = True) -> None:
+        try:
+            self._q.put_nowait((title, message, console_fallback))
+        except queue.Full:
+            return  # lieber Notification verlieren als den Aufrufer blockieren
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            title, message, console_fallback = self._q.get()
+            try:
+                if not _macos_notify(title, message) and console_fallback:
+                    # Fallback: Console
+                    print(f"[NOTIFY] {title}: {message}")
+            finally:
+                self._q.task_done()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        end = time.monotonic() + timeout
+        while self._q.unfinished_tasks and time.monotonic() < end:
+            time.sleep(0.01)
+        return not self._q.unfinished_tasks
+
+
+_WRITER = _AsyncWriter()
+_NOTIFIER = _Notifier()
+
+
+def flush(timeout: float = 5.0) -> bool:
+    """Wartet, bis alle eingereihten Logs geschrieben und Notifications versendet sind."""
+    ok = _WRITER.flush(timeout)
+    return _NOTIFIER.flush(timeout) and ok
+
+
+# One-Shot-Skripte (cron) sollen beim Beenden nichts verlieren
+atexit.register(flush)
+
 
 def _now_rec(kind: str, payload: dict) -> dict:
+    ts = time.time()
     return {
-        "ts":  int(dt.datetime.utcnow().timestamp()),
-        "iso": dt.datetime.utcnow().isoformat() + "Z",
+        "ts":  int(ts),
+        "iso": dt.datetime.utcfromtimestamp(ts).isoformat() + "Z",
         "kind": kind,
         "data": payload or {}
     }
@@ -36,16 +292,21 @@ def _target_log_for(kind: str) -> str:
         return HEALTH_LOG
     return EVENTS_LOG
 
+def write_record(path: str, rec: dict) -> None:
+    """Reiht einen JSON-Datensatz für path ein (Serialisierung im Writer-Thread)."""
+    _WRITER.submit(path, rec)
+
+def write_line(path: str, line: str) -> None:
+    """Reiht eine fertige Textzeile (ohne Newline) für path ein."""
+    _WRITER.submit(path, line)
+
 def log_event(kind: str, payload: dict) -> dict:
     """
     Schreibt einen JSON-Datensatz in das passende Log
     und gibt ihn als dict zurück.
     """
-    _ensure_dirs()
     rec = _now_rec(kind, payload)
-    path = _target_log_for(kind)
-    with open(path, "a", encoding="utf-8") as f:
-        f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    _WRITER.submit(_target_log_for(kind), rec)
     return rec
 
 def _macos_notify(title: str, message: str) -> bool:
@@ -72,24 +333,21 @@ def _macos_notify(title: str, message: str) -> bool:
     except Exception:
         return False
 
+def dispatch_notification(message: str, title: str = "Bybit Bot", console_fallback: bool = False) -> None:
+    """Nur Notification (asynchron), ohne alerts.log-Eintrag; ohne osascript standardmässig still."""
+    _NOTIFIER.submit(str(title), str(message), console_fallback)
+
 def notify(message: str, title: str = "Bybit Bot") -> None:
     """
     Versucht zuerst eine macOS-Notification, fällt sonst auf Console zurück.
     Loggt zusätzlich in alerts.log.
     """
-    _ensure_dirs()
-    # Alerts-Log mitschreiben
+    ts = time.time()
     line = {
-        "ts":  int(dt.datetime.utcnow().timestamp()),
-        "iso": dt.datetime.utcnow().isoformat() + "Z",
+        "ts":  int(ts),
+        "iso": dt.datetime.utcfromtimestamp(ts).isoformat() + "Z",
         "alert": str(message),
         "title": str(title)
     }
-    with open(ALERTS_LOG, "a", encoding="utf-8") as f:
-        f.write(json.dumps(line, ensure_ascii=False) + "\n")
-
-    if _macos_notify(title, message):
-        return
-
-    # Fallback: Console
-    print(f"[NOTIFY] {title}: {message}")
+    _WRITER.submit(ALERTS_LOG, line)
+    dispatch_notification(message, title, console_fallback=True)
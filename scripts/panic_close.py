@@ -1,17 +1,21 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import time, sys, json
+import sys, json
 from decimal import Decimal
-from pybit.unified_trading import HTTP
+from bot import resilience
+from bot.exchange_utils import get_client
 from bot.config import SETTINGS as S
+from bot.precision import for_symbol
 
 SYM = "BTCUSDT"
 
 def http():
-    return HTTP(timeout=60,  api_key=S.bybit_api_key, api_secret=S.bybit_api_secret, testnet=S.bybit_testnet)
+    return get_client()
 
 def get_pos(s):
-    L = (s.get_positions(category="linear", symbol=SYM)["result"]["list"] or [])
+    # immer frisch und nur Positionen (ein Call, wird von flat_soon wiederholt gepollt)
+    r = s.get_positions(category="linear", symbol=SYM)
+    L = (((r or {}).get("result") or {}).get("list") or [])
     return next((p for p in L if float(p.get("size") or 0) > 0), None)
 
 def get_orders(s):
@@ -37,11 +41,16 @@ def try_ioc_crossed(s, side, size):
     bid = Decimal(tk["bid1Price"]); ask = Decimal(tk["ask1Price"])
     opp = "Sell" if side == "Buy" else "Buy"
     px = (ask * Decimal("1.40") if opp == "Buy" else bid * Decimal("0.60"))
-    px = str(px.quantize(Decimal("0.1")))
+    # auf das Tick-Raster des Instruments, innerhalb minPrice/maxPrice
+    px = for_symbol(s, SYM).price_str(px, "down" if opp == "Buy" else "up", clamp=True)
     return s.place_order(category="linear", symbol=SYM, side=opp,
                          orderType="Limit", qty=size, price=px,
                          timeInForce="IOC", reduceOnly=False)
 
+def flat_soon(s, timeout=0.8):
+    # Position pollen (50 ms, 100 ms, 200 ms …) statt fest zu schlafen
+    return resilience.wait_for(lambda: get_pos(s) is None, timeout=timeout)
+
 def main():
     s = http()
     cancel_all(s)  # Vorab alles löschen
@@ -59,21 +68,19 @@ def main():
         # 1) reduceOnly Market
         try: actions.append({"reduceOnlyMarket": try_reduce_only(s, side, size)})
         except Exception as e: actions.append({"reduceOnlyMarket_err": str(e)})
-        time.sleep(0.8)
-        if not get_pos(s):
+        if flat_soon(s):
             cancel_all(s); print(json.dumps({"status":"flat","round":round_,"actions":actions})); sys.exit(0)
 
         # 2) force Market
         try: actions.append({"forceMarket": try_force_market(s, side, size)})
         except Exception as e: actions.append({"forceMarket_err": str(e)})
-        time.sleep(0.8)
-        if not get_pos(s):
+        if flat_soon(s):
             cancel_all(s); print(json.dumps({"status":"flat","round":round_,"actions":actions})); sys.exit(0)
 
         # 3) IOC crossed
         try: actions.append({"iocCrossed": try_ioc_crossed(s, side, size)})
         except Exception as e: actions.append({"iocCrossed_err": str(e)})
-        time.sleep(0.8)
+        flat_soon(s)
         cancel_all(s)
         print(json.dumps({"status":"retry","round":round_,"actions":actions}))
 
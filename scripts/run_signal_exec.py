@@ -1,5 +1,5 @@
 import os, json, sys, datetime as dt
-from pybit.unified_trading import HTTP
+from bot.exchange_utils import get_client
 from bot.config import SETTINGS as S
 
 # ---- STRATEGY AUSWAHL (per ENV STRAT) ----
@@ -11,20 +11,20 @@ else:
 
 # ---- BYBIT HELFER ----
 from scripts.bybit_helpers import place_market_with_tp_sl
+from scripts.log_utils import write_line
+from bot import profiler
+from bot.journal import reconcile_on_startup
 
 LOGF = "logs/alerts.log"
 
 def log(line: str):
     ts = dt.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
     msg = f"[{ts}Z] {line}"
-    try:
-        with open(LOGF,"a",encoding="utf-8") as f:
-            f.write(msg+"\n")
-    except Exception:
-        pass
+    write_line(LOGF, msg)  # nicht-blockierend (Writer-Thread)
     print(msg)
 
 def main():
+    profiler.install("run_signal_exec")  # PROFILE_SECS=N → ganzen Lauf profilieren
     SYM = os.environ.get("SYM","DOGEUSDT")
     TF  = os.environ.get("TF","1")
     N   = int(os.environ.get("LOOKBACK","2"))
@@ -39,7 +39,9 @@ def main():
     TP_BPS = int(os.environ.get("TP_BPS","30"))   # 30 = +0.30%
     SL_BPS = int(os.environ.get("SL_BPS","20"))   # 20 = -0.20%
 
-    s = HTTP(timeout=60,  api_key=S.bybit_api_key, api_secret=S.bybit_api_secret, testnet=S.bybit_testnet)
+    s = get_client()
+    for r in reconcile_on_startup(s, SYM):   # abgebrochene Order-Sequenzen abschliessen
+        log("RECONCILE " + json.dumps(r, default=str))
 
     # --- Klines holen (älteste->neueste) ---
     r = s.get_kline(category="linear", symbol=SYM, interval=TF, limit=N+3)
@@ -69,7 +71,10 @@ def main():
     if EXECUTE:
         # echte Order + TP/SL
         side = "Buy" if sig.side.lower().startswith("b") else "Sell"
-        out = place_market_with_tp_sl(SYM, side, tp_bps=TP_BPS, sl_bps=SL_BPS, min_notional=5.0)
+        # Signal-Kerze (jüngster Start-ts) als Journal-Key → gleiche orderLinkId bei erneutem Lauf
+        bar_ts = max(int(x[0]) for x in lst)
+        out = place_market_with_tp_sl(SYM, side, tp_bps=TP_BPS, sl_bps=SL_BPS, min_notional=5.0,
+                                      key=f"{TF}|{bar_ts}")
         log("EXEC_RESULT " + json.dumps(out))
         return 0
 
@@ -1,22 +1,34 @@
 from __future__ import annotations
 from pybit.unified_trading import HTTP
 import os
-import time
 import sys
 import json
 import traceback
+from bot.orderbook import quote
+from bot.precision import Precision
+from bot.journal import journal, submit
+from bot.live_risk import pre_trade
+from bot.resilience import wait_for
 
-def place_order_and_stops(s: HTTP, sig: dict) -> dict:
+def place_order_and_stops(s: HTTP, sig: dict, engine=None) -> dict:
     """
     Robuster Live-Exec:
       1) Entry als MARKET (sicherer als IOC-Limit)
       2) Auf Fill/Position warten
       3) TP/SL = Distanz vom Signalpreis, um avgPrice gelegt
       4) Tick-Rundung + Richtungssanity (Buy: TP>avg, SL<avg; Sell: TP<avg, SL>avg)
-    Erwartet sig = {side, size, price, sl, tp}.
+    Erwartet sig = {side, size, price, sl, tp, key}; key (Kerzen-ts bzw. Signal-ID)
+    macht die orderLinkId über Neustarts stabil und ist Pflicht.
     One-Way-Modus: positionIdx=0.
+    Jeder Schritt landet im Order-Journal (bot.journal).
+    Vorher Pre-Trade-Check (bot.live_risk; engine = vorbereitete RiskEngine, sonst
+    aus dem Börsenstand) – blockiert → {"order": None, "risk_blocked": Grund}.
     """
     SYM = os.environ.get("SYM","BTCUSDT")
+    key = sig.get("key")
+    if not key:
+        # ohne Zeitbezug ergäbe ein späteres Signal mit gleichen Preisen dieselbe orderLinkId
+        raise ValueError("sig['key'] fehlt (Kerzen-ts oder Signal-ID für die orderLinkId)")
     side = sig["side"]            # "Buy" / "Sell"
     qty  = str(sig["size"])
     sig_px = float(sig["price"])
@@ -26,20 +38,27 @@ def place_order_and_stops(s: HTTP, sig: dict) -> dict:
     info = _instr_info(s, SYM)
     tick = float(((info.get("priceFilter") or {}).get("tickSize")) or 0.1)
 
-    # --- Entry: Market ---
-    order = s.place_order(
-        category="linear", symbol=SYM, side=side,
-        orderType="Market", qty=qty, reduceOnly=False, timeInForce="IOC"
-    )
+    ok, reason, risk = pre_trade(s, SYM, side, float(qty), sig_px, sl=sig_sl, engine=engine)
+    if not ok:
+        return {"order": None, "risk_blocked": reason, "risk": risk}
+
+    intent = journal().begin(SYM, side, qty, kind="entry", key=key,
+                             stops=True, sl=sig_sl, tp=sig_tp, price=sig_px)
+
+    # --- Entry: Market (idempotent über orderLinkId) ---
+    order = submit(s, intent, "entry", side=side, orderType="Market", qty=qty,
+                   reduceOnly=False, timeInForce="IOC")
 
-    # --- Warten bis Position existiert ---
+    # --- Warten bis Position existiert (Polling 50 ms → 0.5 s, max. 10 s) ---
     pos = None
-    for _ in range(40):
-        time.sleep(0.25)
+
+    def _filled() -> bool:
+        nonlocal pos
         pos = _position(s, SYM)
-        if pos["size"] > 0 and pos["side"] == side:
-            break
-    if not pos or pos["size"] <= 0 or pos["side"] != side:
+        return pos["size"] > 0 and pos["side"] == side
+
+    if not wait_for(_filled, timeout=10.0):
+        intent.mark("failed", reason="not_filled", retCode=order.get("retCode"))
         raise RuntimeError("Entry nicht gefüllt – keine passende Position gefunden.")
 
     avg = float(pos["avgPrice"] or sig_px or 0)
@@ -62,9 +81,11 @@ def place_order_and_stops(s: HTTP, sig: dict) -> dict:
         if tp_val >= avg: tp_val = max(0.0, avg - max(tick, abs(dist_tp)))
         if sl_val <= avg: sl_val = avg + max(tick, abs(dist_sl))
 
-    # --- Tick-Rundung ---
-    tp_str = _tick_round(tp_val, tick)
-    sl_str = _tick_round(sl_val, tick)
+    # --- Tick-Rundung (ganzzahlig; SL nie enger als berechnet) ---
+    prec = Precision.from_instrument(info)
+    tp_str = prec.price_str(tp_val, "nearest")
+    sl_str = prec.stop_str(sl_val, "LONG" if side == "Buy" else "SHORT")
+    intent.mark("filled", avgPrice=avg, size=pos["size"], sl=sl_str, tp=tp_str)
 
     # --- Stops setzen (One-Way) ---
     stops = s.set_trading_stop(
@@ -72,6 +93,9 @@ def place_order_and_stops(s: HTTP, sig: dict) -> dict:
         takeProfit=tp_str, stopLoss=sl_str,
         tpTriggerBy="LastPrice", slTriggerBy="LastPrice"
     )
+    if (stops or {}).get("retCode") == 0:
+        intent.mark("stops_set", sl=sl_str, tp=tp_str)
+        intent.mark("done")
 
     # Debug-Ausgabe, hilft bei künftigen Issues
     try:
@@ -85,23 +109,15 @@ def place_order_and_stops(s: HTTP, sig: dict) -> dict:
     return {"order": order, "stops": stops, "avgPrice": avg,
             "tick": tick, "dist_tp": dist_tp, "dist_sl": dist_sl}
 
-def _tick_round(x: float, tick: float) -> str:
-    if tick <= 0: 
-        return f"{x:.1f}"
-    # runden auf Tick
-    q = round(x / tick) * tick
-    # Bybit mag Strings; zu viele Nachkommastellen vermeiden
-    return f"{q:.{max(0, str(tick)[::-1].find('.'))}f}".rstrip('0').rstrip('.') if '.' in f"{q}" else str(q)
-
 def _instr_info(s: HTTP, symbol: str) -> dict:
     r = s.get_instruments_info(category="linear", symbol=symbol)
     return ((r or {}).get("result") or {}).get("list",[{}])[0]
 
 def _best_price(s: HTTP, symbol: str, side: str) -> float:
-    ob = s.get_orderbook(category="linear", symbol=symbol, limit=1)
-    arr = ((ob or {}).get("result") or {}).get("b",[]) if side=="Sell" else ((ob or {}).get("result") or {}).get("a",[])
-    if arr and len(arr[0])>=1:
-        return float(arr[0][0])
+    bid, ask = quote(s, symbol)   # lokales L2-Buch, sonst REST-L1
+    px = bid if side=="Sell" else ask
+    if px > 0:
+        return px
     # Fallback: letzte Ticker-Price
     tk = s.get_tickers(category="linear", symbol=symbol)
     px = (((tk or {}).get("result") or {}).get("list") or [{}])[0].get("lastPrice")
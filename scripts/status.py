@@ -4,27 +4,26 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 # --- Imports ---
 from bot.config import SETTINGS
-from pybit.unified_trading import HTTP
+from bot.exchange_utils import get_client
+from scripts.account_snapshot import snapshot
 import pprint
 
 # --- PrettyPrinter für saubere Ausgabe ---
 pp = pprint.PrettyPrinter(indent=2, width=100)
 
 # --- API Session ---
-s = HTTP(timeout=60,  testnet=SETTINGS.bybit_testnet,
-    api_key=SETTINGS.bybit_api_key,
-    api_secret=SETTINGS.bybit_api_secret
-)
+s = get_client()
 
 # --- Standardsymbol, falls in config kein Symbol gesetzt ist ---
 symbol = getattr(SETTINGS, "symbol", "BTCUSDT") or "BTCUSDT"
 
-# --- Positionen, offene Orders und Fills anzeigen ---
+# --- Positionen, offene Orders (geteilter Snapshot) und Fills anzeigen ---
+snap = snapshot(symbol, s)
 print("=== Positions ===")
-pp.pprint(s.get_positions(category="linear", symbol=symbol))
+pp.pprint(snap["positions"])
 
 print("\n=== Open orders ===")
-pp.pprint(s.get_open_orders(category="linear", symbol=symbol))
+pp.pprint(snap["orders"])
 
 print("\n=== Recent fills ===")
 pp.pprint(s.get_executions(category="linear", symbol=symbol))
\ No newline at end of file
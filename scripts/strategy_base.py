@@ -1,6 +1,12 @@
 # -*- coding: utf-8 -*-
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Union
+
+import numpy as np
+
+from bot.ringbuffer import CandleRing
+
+Klines = Union[List[Dict[str, Any]], CandleRing]
 
 class Signal:
     def __init__(self, side:str, price:float, size:float, sl:float, tp:float, note:str=""):
@@ -17,16 +23,21 @@ class Signal:
 
 class IStrategy(ABC):
     @abstractmethod
-    def generate(self, klines:List[Dict[str,Any]], state:Dict[str,Any]) -> Optional[Signal]:
-        """Gibt ein Signal zurück oder None."""
+    def generate(self, klines:Klines, state:Dict[str,Any]) -> Optional[Signal]:
+        """Gibt ein Signal zurück oder None (klines: Liste von Dicts oder CandleRing)."""
         ...
 
-def atr(kl:List[Dict[str,Any]], n:int=14) -> float:
-    import math
-    trs=[]
-    for i in range(1, min(len(kl), n+1)):
-        h=float(kl[-i]["high"]); l=float(kl[-i]["low"])
-        pc=float(kl[-i-1]["close"])
-        tr=max(h-l, abs(h-pc), abs(l-pc))
-        trs.append(tr)
-    return sum(trs)/len(trs) if trs else 0.0
+def as_ring(kl:Klines) -> CandleRing:
+    """CandleRing unverändert durchreichen, Listen (einmalig) übernehmen."""
+    return kl if isinstance(kl, CandleRing) else CandleRing.from_rows(kl)
+
+def atr(kl:Klines, n:int=14) -> float:
+    # TR über die letzten n Kerzen (Views auf den Ringpuffer, keine Kopie der Daten)
+    ring = as_ring(kl)
+    m = min(len(ring)-1, n)
+    if m <= 0:
+        return 0.0
+    h = ring.last(m, "high"); l = ring.last(m, "low")
+    pc = ring.last(m+1, "close")[:-1]
+    tr = np.maximum(h-l, np.maximum(np.abs(h-pc), np.abs(l-pc)))
+    return float(tr.mean())
@@ -7,15 +7,20 @@ Erstellt eine einmalige Buy/Sell-Order auf Bybit (Testnet)
 mit robuster Fehlerbehandlung gegen Glitches (ErrCode 110003).
 """
 
-import os, sys, json, time, pprint
-from decimal import Decimal, ROUND_DOWN, getcontext
-from pybit.unified_trading import HTTP
+import os, sys, json, pprint
+from decimal import Decimal, getcontext
 
 # --- ensure project root on sys.path ---
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 # ---------------------------------------
 
 from bot.config import SETTINGS
+from bot import clock, resilience
+from bot.exchange_utils import get_client
+from bot.orderbook import marketable_limit
+from bot.precision import Precision
+from bot.journal import Intent, journal, reconcile_on_startup, submit
+from bot.live_risk import pre_trade
 
 pp = pprint.PrettyPrinter(indent=2, width=100)
 D = Decimal
@@ -26,66 +31,71 @@ getcontext().prec = 28
 # Hilfsfunktionen
 # ============================================================
 
-def round_tick(x: Decimal, tick: Decimal) -> Decimal:
-    return (x / tick).to_integral_value(rounding=ROUND_DOWN) * tick if tick > 0 else x
-
-
-def load_filters(s, sym):
-    """Liest Preis- und Mengenfilter von Bybit."""
+def load_filters(s, sym) -> Precision:
+    """Liest Preis- und Mengenfilter von Bybit (Tick/Step/Min/Max als Integer-Raster)."""
     info = s.get_instruments_info(category="linear", symbol=sym)["result"]["list"][0]
-    tick = D(info["priceFilter"]["tickSize"])
-    qty_step = D(info["lotSizeFilter"]["qtyStep"])
-    min_qty = D(info["lotSizeFilter"]["minOrderQty"])
-    min_price = D(info["priceFilter"]["minPrice"])
-    max_price = D(info["priceFilter"]["maxPrice"])
-    return tick, qty_step, min_qty, min_price, max_price
-
-
-def safe_place_ioc(s, sym, side, px, qty, tick, min_price, max_price, tries=6):
-    """Versucht IOC mehrfach, bei 110003 automatisch Preis anpassen."""
-    print(f"[Filters] tick={tick} min_price={min_price} max_price={max_price}")
-    for i in range(tries):
-        p = round_tick(px + D("0.1") * i, tick)
-        print(f"Try #{i+1}: IOC {side} @ {p}")
-        try:
-            res = s.place_order(
-                category="linear",
-                symbol=sym,
-                side=side,
-                orderType="Limit",
-                price=str(p),
-                qty=str(qty),
-                timeInForce="IOC",
-                reduceOnly=False,
-            )
-            return res
-        except Exception as e:
-            msg = str(e)
-            if "110003" in msg:
-                print(f"⚠️  110003 @ {p} → nudge price …")
-                continue
-            else:
-                print(f"❌  Fehler: {msg}")
-                time.sleep(0.3)
+    return Precision.from_instrument(info)
+
+
+def safe_place_ioc(s, sym, side, px, qty, prec: Precision, tries=6, intent: Intent = None, key=None):
+    """
+    Versucht IOC mehrfach, bei 110003 (Fehlerklasse price_adjust) Preis um je +1 Tick anpassen.
+    Alle Nudge-Versuche tragen dieselbe orderLinkId (110003 legt keine Order an),
+    jede Widen-Stufe eine eigene; unklare Fehler werden per orderLinkId geprüft
+    → Wiederholungen füllen nie doppelt.
+    """
+    print(f"[Filters] {prec} min_ticks={prec.min_ticks} max_ticks={prec.max_ticks}")
+    base = prec.price_ticks(px, "down")
+    qty_str = prec.qty_str(qty, "down")
+    intent = intent or journal().begin(sym, side, qty_str, kind="ioc", key=key)
+
+    def nudge(params, n):
+        params["price"] = prec.ticks_str(prec.clamp_ticks(base + n))
+        print(f"⚠️  110003 → nudge price → {params['price']}")
+        return params
+
+    p = prec.ticks_str(prec.clamp_ticks(base))
+    print(f"Try: IOC {side} @ {p}")
+    try:
+        # transiente Fehler wiederholt bereits der Client (ResilientClient); hier nur 110003-Nudges
+        res = resilience.call(
+            submit, s, intent, "ioc",
+            endpoint="safe_place_ioc",
+            policy=resilience.Policy(max_retries=0, max_price_adjust=tries - 1),
+            on_price_adjust=nudge,
+            symbol=sym,
+            side=side,
+            orderType="Limit",
+            price=p,
+            qty=qty_str,
+            timeInForce="IOC",
+            reduceOnly=False,
+        )
+        intent.mark("done", retCode=res.get("retCode"))
+        return res
+    except Exception as e:
+        print(f"❌  Fehler: {e}")
     # Fallback: mehrere weiter entfernte Limits
     for j in range(6):
         mult = D("1.1") + D("0.1") * j if side == "Buy" else D("0.9") - D("0.1") * j
-        widened = round_tick(px * mult, tick)
+        widened = prec.price_str(px * mult, "down", clamp=True)
         print(f"[Widen {j+1}] IOC {side} @ {widened}")
         try:
-            res = s.place_order(
-                category="linear",
+            res = submit(
+                s, intent, f"widen{j+1}",
                 symbol=sym,
                 side=side,
                 orderType="Limit",
-                price=str(widened),
-                qty=str(qty),
+                price=widened,
+                qty=qty_str,
                 timeInForce="IOC",
                 reduceOnly=False,
             )
+            intent.mark("done", retCode=res.get("retCode"))
             return res
         except Exception as e:
             print("Fehler:", e)
+    intent.mark("failed", reason="no_order_accepted")
     return {"retCode": -1, "retMsg": "keine Order erfolgreich"}
 
 
@@ -100,14 +110,18 @@ def main():
     parser.add_argument("--notional", required=True, type=float)
     parser.add_argument("--base", type=float, help="Basispreis zur Simulation")
     parser.add_argument("--force-cross", action="store_true", help="setzt Limit ans andere OB-Ende")
+    parser.add_argument("--key", default=None,
+                        help="Journal-Key (stabile orderLinkId); Default: Seite|Notional|Minute")
     args = parser.parse_args()
 
     sym = getattr(SETTINGS, "symbol", "BTCUSDT")
 
-    s = HTTP(timeout=60,  testnet=getattr(SETTINGS, "bybit_testnet", True),
-        api_key=SETTINGS.bybit_api_key,
-        api_secret=SETTINGS.bybit_api_secret
-    )
+    s = get_client()
+
+    # Offene Sequenzen aus einem abgebrochenen Lauf zuerst abschliessen
+    rec = reconcile_on_startup(s, sym)
+    if rec:
+        print(json.dumps({"reconcile": rec}, default=str))
 
     # Pre-Check
     pos = s.get_positions(category="linear", symbol=sym)["result"]["list"][0]
@@ -126,14 +140,15 @@ def main():
     safe = index
     basis = D(str(args.base)) if args.base else safe
 
-    tick, qty_step, min_qty, min_price, max_price = load_filters(s, sym)
-    qty = max(min_qty, D(str(args.notional)) / basis)
-    qty = (qty / qty_step).to_integral_value(rounding=ROUND_DOWN) * qty_step
+    prec = load_filters(s, sym)
+    qty = D(prec.qty_str(D(str(args.notional)) / basis, "down", enforce_min=True))
 
     # Limitpreis wählen
     limit_px = basis * (D("1.02") if args.side == "Buy" else D("0.98"))
     if args.force_cross:
-        limit_px = ask1 if args.side == "Buy" else bid1
+        # Preis, der die Menge im Buch sofort füllt (lokales L2-Buch bzw. REST-Snapshot)
+        sweep = marketable_limit(s, sym, args.side, float(qty))
+        limit_px = D(str(sweep)) if sweep else (ask1 if args.side == "Buy" else bid1)
 
     plan = {
         "side": args.side,
@@ -149,8 +164,16 @@ def main():
     }
     print(json.dumps({"symbol": sym, "plan": plan}))
 
+    # Pre-Trade-Check (Tagesverlust-Halt, Entry-/Exposure-Limits); reduzierende Orders gehen immer
+    ok, reason, risk = pre_trade(s, sym, args.side, float(qty), float(basis))
+    if not ok:
+        print(json.dumps({"risk_blocked": reason, "risk": risk}))
+        return
+
     print("\nORDER (IOC-Limit):")
-    res1 = safe_place_ioc(s, sym, args.side, limit_px, qty, tick, min_price, max_price)
+    # gleicher Aufruf in derselben Minute (z. B. Neustart nach Crash) → dieselbe orderLinkId
+    key = args.key or f"{args.side}|{args.notional}|{int(clock.time() // 60)}"
+    res1 = safe_place_ioc(s, sym, args.side, limit_px, qty, prec, key=key)
     pp.pprint(res1)
 
     # Nachstatus
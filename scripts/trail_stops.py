@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Residenter Stop-Nachzieher für Live-Positionen (Trailing + Timeout über bot.exits).
+
+Die Order-Pfade (run_signal_exec → bybit_helpers, run_strategy.place_order_and_stops)
+setzen TP/SL einmalig. Dieser Loop übernimmt danach:
+
+- pollt Position + Last-Price je TRAIL_INTERVAL Sekunden
+- neue Position → ExitManager.open (avgPrice, gesetzter stopLoss/takeProfit, Tick)
+- Trailing nach bot.risk.trail_params; Amends per set_trading_stop
+  (exits.make_amend_fn), je Position max. alle TRAIL_MIN_AMEND_S Sekunden
+- Kerzenwechsel (TF) → on_bar; Timeout (risk.should_timeout) → force_flat_now.
+  Kerzen zählen ab createdTime der Position – ein Neustart des Loops (oder ein
+  Nachkauf, der avgPrice ändert) setzt den Timeout nicht zurück
+- TP/SL-Auslösung selbst macht die Börse; Position weg → Tracking endet
+
+Aufruf:
+  SYM=BTCUSDT TF=5m TRAIL_INTERVAL=2 PYTHONPATH=. .venv/bin/python scripts/trail_stops.py
+"""
+import os, sys, json, time
+
+from bot import clock, risk
+from bot.config import SETTINGS as S
+from bot.exchange_utils import force_flat_now, get_client
+from bot.exits import ExitManager, make_amend_fn
+from bot.precision import for_symbol
+from bot.ringbuffer import interval_ms
+from scripts.log_utils import log_event
+
+SYM          = os.environ.get("SYM", S.symbol)
+TF_MS        = interval_ms(os.environ.get("TF", S.timeframe))
+INTERVAL_S   = float(os.environ.get("TRAIL_INTERVAL", "2"))
+MIN_AMEND_S  = float(os.environ.get("TRAIL_MIN_AMEND_S", "5"))
+
+
+def _position(s) -> dict:
+    r = s.get_positions(category="linear", symbol=SYM)
+    lst = ((r or {}).get("result") or {}).get("list") or []
+    return next((p for p in lst if float(p.get("size") or 0) > 0), {})
+
+
+def _last_price(s) -> float:
+    r = s.get_tickers(category="linear", symbol=SYM)
+    lst = ((r or {}).get("result") or {}).get("list") or [{}]
+    return float(lst[0].get("lastPrice") or 0)
+
+
+def step(s, exits: ExitManager, state: dict) -> dict:
+    """Ein Zyklus; gibt einen Status-Datensatz zurück."""
+    pos = _position(s)
+    if not pos:
+        if exits.close(SYM) is not None:
+            log_event("trail_closed", {"symbol": SYM})
+        state.pop("key", None)
+        return {"pos": None}
+
+    side = "LONG" if pos.get("side") == "Buy" else "SHORT"
+    key = (side, pos.get("avgPrice"), pos.get("createdTime"))
+    reason = None
+    now_ms = int(clock.time() * 1000)
+    if state.get("key") != key or exits.get(SYM) is None:
+        exits.close(SYM)
+        prec = for_symbol(s, SYM)
+        # Kerzen seit Eröffnung (createdTime), nicht seit Start des Trackings
+        created_ms = int(pos.get("createdTime") or 0) or now_ms
+        bars = max(0, now_ms // TF_MS - created_ms // TF_MS)
+        p = exits.open(SYM, side, float(pos.get("avgPrice") or 0), float(pos.get("size") or 0),
+                       stop=float(pos.get("stopLoss") or 0) or None, tp=float(pos.get("takeProfit") or 0) or None,
+                       tick=prec.tick, position_idx=int(pos.get("positionIdx") or 0), bars_open=bars)
+        state["key"] = key
+        state["bar"] = now_ms // TF_MS
+        log_event("trail_open", {"symbol": SYM, "side": side, "avg": pos.get("avgPrice"),
+                                 "sl": pos.get("stopLoss"), "tp": pos.get("takeProfit"), "bars_open": bars})
+        if risk.should_timeout(p.bars_open):
+            reason = "timeout"       # Timeout schon während einer Auszeit des Loops abgelaufen
+
+    bar = now_ms // TF_MS
+    if bar != state.get("bar"):
+        state["bar"] = bar
+        reason = exits.on_bar(SYM)
+    px = _last_price(s)
+    if px > 0:
+        exits.on_price(SYM, px)      # Stop/TP-Hit meldet nur DRY_RUN – live führt die Börse aus
+    amends = exits.flush()
+    p = exits.get(SYM)
+    out = {"pos": side, "px": px, "stop": p.stop if p else None, "amends": amends,
+           "bars_open": p.bars_open if p else None}
+    if reason == "timeout":
+        res = force_flat_now(s, SYM)
+        exits.close(SYM)
+        state.pop("key", None)
+        out["timeout"] = res.get("status")
+        log_event("trail_timeout", {"symbol": SYM, "status": res.get("status")})
+    return out
+
+
+def main(max_cycles: int = None) -> int:
+    s = get_client()
+    exits = ExitManager(amend_fn=make_amend_fn(s), min_interval_s=MIN_AMEND_S)
+    state: dict = {}
+    print(json.dumps({"trail": SYM, "tf_ms": TF_MS, "interval_s": INTERVAL_S, "min_amend_s": MIN_AMEND_S}))
+    n = 0
+    while max_cycles is None or n < max_cycles:
+        t0 = time.monotonic()
+        try:
+            out = step(s, exits, state)
+            if out.get("amends") or out.get("timeout"):
+                print(json.dumps(out))
+        except Exception as e:
+            log_event("trail_error", {"symbol": SYM, "error": str(e)})
+            print(json.dumps({"error": str(e)}))
+        n += 1
+        clock.sleep(max(0.0, INTERVAL_S - (time.monotonic() - t0)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(os.environ["TRAIL_MAX_CYCLES"]) if os.environ.get("TRAIL_MAX_CYCLES") else None))
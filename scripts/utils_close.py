@@ -4,7 +4,7 @@
 # Schließt offene Positionen unabhängig vom Status.
 # -----------------------------------------------------
 
-from pybit.unified_trading import HTTP
+from bot.exchange_utils import get_client
 from bot.config import SETTINGS as S
 
 
@@ -14,10 +14,7 @@ def force_close_open_position(symbol="BTCUSDT"):
     Prüft zuerst, ob eine Position offen ist, und schließt sie dann
     mit einer Market-Order (reduceOnly=False, um Testnet-Glitches zu umgehen).
     """
-    s = HTTP(timeout=60,  api_key=S.bybit_api_key,
-        api_secret=S.bybit_api_secret,
-        testnet=S.bybit_testnet,
-    )
+    s = get_client()
 
     print(f"🔍 Suche offene Position für {symbol} …")
     L = (s.get_positions(category="linear", symbol=symbol)["result"]["list"] or [])
@@ -1,9 +1,10 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional
 import os
 
-from scripts.strategy_base import IStrategy, Signal, atr
+from scripts.strategy_base import IStrategy, Klines, Signal, as_ring, atr
+from bot.ringbuffer import CandleRing
 
 class MomScalp(IStrategy):
     """
@@ -40,16 +41,17 @@ class MomScalp(IStrategy):
         self.use_prev_close = bool(use_prev_close)
 
     # --- Hilfsfunktionen für N-High/Low über abgeschlossene Kerzen ---
-    def _high(self, kl: List[Dict[str, Any]], n: int) -> float:
+    def _high(self, kl: CandleRing, n: int) -> float:
         # N abschlossene Kerzen (exkl. laufende)
-        return max(float(k["high"]) for k in kl[-n-1:-1])
+        return float(kl.last(n+1, "high")[:-1].max())
 
-    def _low(self, kl: List[Dict[str, Any]], n: int) -> float:
-        return min(float(k["low"]) for k in kl[-n-1:-1])
+    def _low(self, kl: CandleRing, n: int) -> float:
+        return float(kl.last(n+1, "low")[:-1].min())
 
-    def generate(self, klines: List[Dict[str, Any]], state: Optional[Dict[str, Any]] = None) -> Optional[Signal]:
+    def generate(self, klines: Klines, state: Optional[Dict[str, Any]] = None) -> Optional[Signal]:
         if state is None:
             state = {}
+        klines = as_ring(klines)   # Ringpuffer wird ohne Kopie gelesen
 
         n = int(self.lookback)
         if len(klines) < (n + 2):
@@ -73,7 +75,7 @@ class MomScalp(IStrategy):
         # Debug-Infos
         if self.debug:
             lv   = float(prev["volume"])
-            avgv = sum(float(k["volume"]) for k in klines[-n-1:-1]) / float(n)
+            avgv = float(klines.last(n+1, "volume")[:-1].sum()) / float(n)
             state.setdefault("__debug__", {}).update({
                 "px": px, "hiN": hiN, "loN": loN,
                 "atr14": a14,
@@ -0,0 +1,163 @@
+# tests/test_journal.py
+"""Order-Journal: Crash-Recovery, Duplikat-orderLinkId, Reconciler-Besitzerprüfung."""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import bot.journal as jn
+from bot.journal import OrderJournal, RC_DUPLICATE_LINK, reconcile, reconcile_on_startup, submit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Kindprozess: Intent schreiben, optional "submitted" (durabel), dann ohne Aufräumen sterben
+_CRASH = """
+import json, os, sys
+from bot.journal import OrderJournal
+j = OrderJournal(sys.argv[1])
+it = j.begin("BTCUSDT", "Buy", "0.010", kind="entry", key="bar-1", stops=True, sl="99.0", tp="102.0")
+if sys.argv[2] == "submitted":
+    it.mark("submitted", durable=True, leg="entry", orderLinkId=it.link("entry"), params={"side": "Buy"})
+j.sync()
+print(json.dumps({"id": it.id, "link": it.link("entry")}), flush=True)
+os._exit(1)
+"""
+
+
+def _crash(path: str, stage: str) -> dict:
+    out = subprocess.run([sys.executable, "-c", _CRASH, path, stage], cwd=ROOT, capture_output=True, text=True,
+                         env=dict(os.environ, PYTHONPATH=ROOT))
+    assert out.returncode == 1, out.stderr
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+class FakeExchange:
+    def __init__(self):
+        self.orders = {}          # orderLinkId → Order
+        self.position = {}
+        self.calls = []
+
+    @staticmethod
+    def _ok(result, rc=0):
+        return {"retCode": rc, "retMsg": "OK" if rc == 0 else "err", "result": result}
+
+    def place_order(self, **kw):
+        self.calls.append(("place_order", kw))
+        link = kw["orderLinkId"]
+        if link in self.orders:
+            return self._ok({}, RC_DUPLICATE_LINK)
+        self.orders[link] = {"orderId": f"oid-{len(self.orders) + 1}", "orderLinkId": link,
+                             "orderStatus": "Filled", "cumExecQty": kw["qty"], "avgPrice": "100"}
+        return self._ok({"orderId": self.orders[link]["orderId"], "orderLinkId": link})
+
+    def get_open_orders(self, **kw):
+        o = self.orders.get(kw.get("orderLinkId"))
+        return self._ok({"list": [o] if o and o["orderStatus"] == "New" else []})
+
+    def get_order_history(self, **kw):
+        o = self.orders.get(kw.get("orderLinkId"))
+        return self._ok({"list": [o] if o else []})
+
+    def get_positions(self, **kw):
+        return self._ok({"list": [self.position] if self.position else []})
+
+    def set_trading_stop(self, **kw):
+        self.calls.append(("set_trading_stop", kw))
+        self.position["stopLoss"] = kw["stopLoss"]
+        return self._ok({})
+
+    def cancel_order(self, **kw):
+        self.calls.append(("cancel_order", kw))
+        return self._ok({})
+
+
+@pytest.fixture
+def jpath(tmp_path):
+    return str(tmp_path / "orders.jsonl")
+
+
+def test_crash_after_intent_before_submitted_is_abandoned(jpath):
+    ids = _crash(jpath, "intent")
+    j = OrderJournal(jpath)
+    assert [it.id for it in j.pending()] == [ids["id"]]
+    ex = FakeExchange()
+    rep = reconcile(ex, "BTCUSDT", j=j)
+    assert [r["action"] for r in rep] == ["abandon"]
+    assert j.pending() == [] and ex.calls == []
+    j.close()
+
+
+def test_crash_after_submitted_restores_stops_from_intent(jpath):
+    ids = _crash(jpath, "submitted")
+    ex = FakeExchange()
+    # Order kam an der Börse an, der Prozess starb vor "acked"
+    ex.orders[ids["link"]] = {"orderId": "oid-1", "orderLinkId": ids["link"], "orderStatus": "Filled",
+                              "cumExecQty": "0.010", "avgPrice": "100"}
+    ex.position = {"symbol": "BTCUSDT", "side": "Buy", "size": "0.010", "avgPrice": "100",
+                   "stopLoss": "0", "positionIdx": 0}
+    j = OrderJournal(jpath)
+    pend = j.pending("BTCUSDT")
+    assert len(pend) == 1 and pend[0].stage == "submitted" and pend[0].legs == {"entry": ids["link"]}
+    rep = reconcile(ex, "BTCUSDT", j=j)
+    assert [r["action"] for r in rep] == ["set_stops"]
+    stops = [kw for name, kw in ex.calls if name == "set_trading_stop"]
+    assert stops and stops[0]["stopLoss"] == "99.0" and stops[0]["takeProfit"] == "102.0"
+    assert not any(name == "place_order" for name, _ in ex.calls)     # kein zweiter Entry
+    assert j.pending() == []
+    j.close()
+
+
+def test_retry_with_same_key_hits_duplicate_link_and_reuses_order(jpath):
+    j = OrderJournal(jpath)
+    ex = FakeExchange()
+    first = j.begin("BTCUSDT", "Buy", "0.010", kind="entry", key="bar-7")
+    r1 = submit(ex, first, "entry", side="Buy", orderType="Market", qty="0.010")
+    # Neustart: gleicher Key → gleiche orderLinkId → Bybit 110072 → bestehende Order
+    again = j.begin("BTCUSDT", "Buy", "0.010", kind="entry", key="bar-7")
+    assert again.link("entry") == first.link("entry")
+    r2 = submit(ex, again, "entry", side="Buy", orderType="Market", qty="0.010")
+    assert r2["retCode"] == 0 and r2["retMsg"] == "OK (duplicate)"
+    assert r2["result"]["orderId"] == r1["result"]["orderId"]
+    assert len(ex.orders) == 1 and again.stage == "acked"
+    j.close()
+
+
+def test_exception_on_submit_with_existing_order_is_not_resent(jpath):
+    class Flaky(FakeExchange):
+        def place_order(self, **kw):
+            super().place_order(**kw)                 # Order ist angekommen …
+            raise ConnectionError("read timeout")     # … Antwort ging verloren
+    j = OrderJournal(jpath)
+    ex = Flaky()
+    it = j.begin("BTCUSDT", "Sell", "0.010", kind="entry", key="bar-8")
+    res = submit(ex, it, "entry", side="Sell", orderType="Market", qty="0.010")
+    assert res["retCode"] == 0 and res["retMsg"] == "OK (existing)"
+    assert it.stage == "acked" and len(ex.orders) == 1
+    j.close()
+
+
+def test_reconcile_skips_sequences_of_a_live_owner(jpath, monkeypatch):
+    j = OrderJournal(jpath)
+    it = j.begin("BTCUSDT", "Buy", "0.010", kind="entry", key="bar-9", stops=True, sl="99.0")
+    it.mark("submitted", durable=True, leg="entry", orderLinkId=it.link("entry"), params={})
+    ex = FakeExchange()
+    rep = reconcile(ex, "BTCUSDT", j=j)            # Besitzer = dieser (laufende) Prozess
+    assert [r["action"] for r in rep] == ["skip_active"]
+    assert rep[0]["owner"]["pid"] == os.getpid()
+    monkeypatch.setattr(jn, "_JOURNAL", j)
+    assert reconcile_on_startup(ex, "BTCUSDT") == []
+    assert len(j.pending()) == 1 and ex.calls == []
+    rep = reconcile(ex, "BTCUSDT", j=j, force=True)
+    assert [r["action"] for r in rep] == ["close_unfilled"]
+    j.close()
+
+
+def test_foreign_host_owner_is_active_until_min_age(jpath):
+    j = OrderJournal(jpath)
+    it = j.begin("BTCUSDT", "Buy", "0.010", kind="entry", key="bar-10")
+    it.owner = {"pid": 1, "host": "other-host"}
+    assert jn.owner_active(it, min_age_s=30.0, now=it.updated + 5.0)
+    assert not jn.owner_active(it, min_age_s=30.0, now=it.updated + 31.0)
+    j.close()
@@ -0,0 +1,96 @@
+# tests/test_live_risk.py
+"""Live-Pre-Trade-Check: RiskEngine aus Konto, Positionen, closedPnl und Order-Journal."""
+import time
+
+from bot.journal import OrderJournal
+from bot.live_risk import engine_from_exchange, pre_trade
+
+DAY_MS = 86_400_000
+
+
+class FakeAccount:
+    def __init__(self, equity=10_000.0, positions=(), closed=(), day_open=None):
+        self.equity = equity
+        self.positions = list(positions)
+        self.closed = list(closed)
+        self.day_open = day_open or {}
+
+    @staticmethod
+    def _ok(result):
+        return {"retCode": 0, "retMsg": "OK", "result": result}
+
+    def get_wallet_balance(self, **kw):
+        return self._ok({"list": [{"totalEquity": str(self.equity)}]})
+
+    def get_positions(self, **kw):
+        return self._ok({"list": self.positions})
+
+    def get_closed_pnl(self, **kw):
+        # zwei Seiten, damit das Cursor-Paging mitläuft
+        if kw.get("cursor") == "p2":
+            return self._ok({"list": self.closed[1:], "nextPageCursor": ""})
+        return self._ok({"list": self.closed[:1], "nextPageCursor": "p2" if len(self.closed) > 1 else ""})
+
+    def get_kline(self, **kw):
+        px = self.day_open.get(kw["symbol"], 0.0)
+        return self._ok({"list": [[0, str(px), str(px), str(px), str(px), "0"]]})
+
+
+def _pos(symbol, side, size, avg, mark, created_ms):
+    upl = (mark - avg) * size * (1 if side == "Buy" else -1)
+    return {"symbol": symbol, "side": side, "size": str(size), "avgPrice": str(avg), "markPrice": str(mark),
+            "unrealisedPnl": str(upl), "createdTime": str(created_ms)}
+
+
+def test_daily_loss_from_closed_pnl_halts_entries_but_not_reductions(tmp_path):
+    now_ms = int(time.time() * 1000)
+    acc = FakeAccount(equity=9_700.0, closed=[{"closedPnl": "-200"}, {"closedPnl": "-100"}],
+                      positions=[_pos("ETHUSDT", "Buy", 1.0, 100.0, 100.0, now_ms - 60_000)])
+    j = OrderJournal(str(tmp_path / "orders.jsonl"))
+    eng = engine_from_exchange(acc, j)
+    assert round(eng.realized_today, 6) == -300.0
+    ok, reason, _ = pre_trade(acc, "BTCUSDT", "Buy", 0.001, 50_000.0, engine=eng)
+    assert not ok and reason.startswith("halted")
+    ok, reason, _ = pre_trade(acc, "ETHUSDT", "Sell", 1.0, 100.0, engine=eng)
+    assert ok and reason == "reduce"
+    j.close()
+
+
+def test_yesterdays_open_loss_is_not_todays_loss(tmp_path):
+    now_ms = int(time.time() * 1000)
+    # seit Vortag offen: avg 100, Tagesopen 80, jetzt 80 → -200 unrealisiert, heute 0
+    acc = FakeAccount(equity=9_800.0, day_open={"ETHUSDT": 80.0},
+                      positions=[_pos("ETHUSDT", "Buy", 10.0, 100.0, 80.0, now_ms - 2 * DAY_MS)])
+    j = OrderJournal(str(tmp_path / "orders.jsonl"))
+    eng = engine_from_exchange(acc, j)
+    assert round(eng.daily_pnl_pct(), 6) == 0.0
+    assert round(eng.exposure, 6) == 800.0
+    ok, reason, _ = pre_trade(acc, "BTCUSDT", "Buy", 0.001, 50_000.0, engine=eng)
+    assert ok, reason
+    j.close()
+
+
+def test_entries_of_other_processes_count_against_the_hourly_limit(tmp_path):
+    acc = FakeAccount()
+    j = OrderJournal(str(tmp_path / "orders.jsonl"))
+    for k in range(3):
+        j.begin("BTCUSDT", "Buy", "0.001", kind="entry", key=f"bar-{k}")
+    failed = j.begin("BTCUSDT", "Buy", "0.001", kind="entry", key="bar-x")
+    failed.mark("failed", retCode=10001)
+    j.begin("BTCUSDT", "Sell", "0.001", kind="flat", key="flat-1")     # kein Entry
+    ok, reason, _ = pre_trade(acc, "BTCUSDT", "Buy", 0.001, 50_000.0, engine=engine_from_exchange(acc, j))
+    assert not ok and reason.startswith("entry_rate BTCUSDT: 3/3")
+    ok, _, _ = pre_trade(acc, "SOLUSDT", "Buy", 0.1, 100.0, engine=engine_from_exchange(acc, j))
+    assert ok
+    j.close()
+
+
+def test_exposure_is_summed_across_symbols(tmp_path):
+    now_ms = int(time.time() * 1000)
+    acc = FakeAccount(equity=1_000.0, positions=[_pos("ETHUSDT", "Buy", 10.0, 250.0, 250.0, now_ms),
+                                                 _pos("SOLUSDT", "Sell", 3.0, 100.0, 100.0, now_ms)])
+    j = OrderJournal(str(tmp_path / "orders.jsonl"))
+    eng = engine_from_exchange(acc, j)                 # 2800 von 3000 (3x) belegt
+    ok, reason, _ = pre_trade(acc, "BTCUSDT", "Buy", 0.005, 50_000.0, engine=eng)
+    assert not ok and reason.startswith("exposure")
+    j.close()
@@ -0,0 +1,74 @@
+# tests/test_orderbook.py
+"""Lokales Orderbuch: Sequenzprüfung und Resync per Neu-Abo."""
+import threading
+
+from bot.orderbook import LocalBooks, ws_resync
+
+TOPIC = "orderbook.50.BTCUSDT"
+
+
+def _msg(kind: str, u: int, bid: str = "100", ask: str = "101") -> dict:
+    return {"topic": TOPIC, "type": kind, "ts": u,
+            "data": {"s": "BTCUSDT", "b": [[bid, "1"]], "a": [[ask, "1"]], "u": u}}
+
+
+def _books():
+    calls = []
+    return LocalBooks(resync=calls.append), calls
+
+
+def test_stale_deltas_after_snapshot_are_dropped_silently():
+    books, calls = _books()
+    books.on_message(_msg("snapshot", 100))
+    for u in (97, 99, 100):                       # noch unterwegs, älter als der Snapshot
+        books.on_message(_msg("delta", u, bid="99"))
+    book = books.get("BTCUSDT")
+    assert calls == [] and not book.stale and book.gaps == 0
+    assert book.best_bid() == (100.0, 1.0)
+    books.on_message(_msg("delta", 101, bid="100.5"))
+    assert book.best_bid() == (100.5, 1.0) and book.update_id == 101
+
+
+def test_gap_marks_stale_until_next_snapshot():
+    books, calls = _books()
+    books.on_message(_msg("snapshot", 100))
+    books.on_message(_msg("delta", 103))
+    book = books.get("BTCUSDT")
+    assert book.stale and book.gaps == 1 and calls == ["BTCUSDT"]
+    books.on_message(_msg("snapshot", 900))
+    books.on_message(_msg("delta", 901, bid="100.2"))
+    assert not book.stale and book.best_bid() == (100.2, 1.0)
+
+
+def test_rest_snapshot_is_no_ws_sequence_base():
+    books, calls = _books()
+    books.load_rest("BTCUSDT", {"retCode": 0, "result": {"b": [["100", "1"]], "a": [["101", "1"]],
+                                                         "u": 5, "ts": 1}})
+    assert books.get("BTCUSDT").update_id is None
+    books.on_message(_msg("delta", 6))
+    assert books.get("BTCUSDT").stale and calls == ["BTCUSDT"]
+
+
+class _FakeWS:
+    def __init__(self):
+        self.callback_directory = {TOPIC: None}
+        self.sent = []
+        self.done = threading.Event()
+
+    def unsubscribe(self, topic):
+        self.sent.append(("unsub", topic))
+        self.callback_directory.pop(topic)       # Bestätigung sofort
+
+    def orderbook_stream(self, depth, symbol, callback):
+        self.sent.append(("sub", f"orderbook.{depth}.{symbol}"))
+        self.callback_directory[f"orderbook.{depth}.{symbol}"] = callback
+        self.done.set()
+
+
+def test_ws_resync_resubscribes_once_while_in_flight():
+    ws = _FakeWS()
+    resync = ws_resync(ws, callback=lambda m: None, depth=50, min_interval_s=60.0)
+    for _ in range(10):
+        resync("BTCUSDT")
+    assert ws.done.wait(2.0)
+    assert ws.sent == [("unsub", TOPIC), ("sub", TOPIC)]
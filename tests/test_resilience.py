@@ -0,0 +1,161 @@
+# tests/test_resilience.py
+"""Retry-Policy je Fehlerklasse, Schreib-Idempotenz, Circuit-Breaker, Replay-Klassifikation."""
+import pytest
+import requests
+from pybit.exceptions import FailedRequestError, InvalidRequestError
+
+from bot import clock, resilience
+from bot.replay import ReplayedError
+from bot.resilience import (FATAL, RATE_LIMIT, RETRYABLE, CircuitBreaker, CircuitOpen, Policy,
+                            ResilientClient, classify)
+
+POLICY = Policy(max_retries=3, base=0.025, cap=1.0, rate_limit_base=0.25, rate_limit_cap=5.0)
+
+
+@pytest.fixture(autouse=True)
+def sim(monkeypatch):
+    monkeypatch.setattr(resilience.random, "uniform", lambda a, b: b)     # Jitter = Obergrenze
+    monkeypatch.setattr(resilience, "_BREAKERS", {})                      # Breaker je Test frisch
+    with clock.use(clock.SimClock(1_700_000_000.0)) as c:
+        yield c
+
+
+def _invalid(rc: int) -> InvalidRequestError:
+    return InvalidRequestError(request="POST /v5/order/create", message="err", status_code=rc,
+                               time="00:00:00", resp_headers={})
+
+
+class Scripted:
+    """Antwortet je Methode der Reihe nach mit den vorgegebenen Ergebnissen (Exception → raise)."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = []
+
+    def _next(self, name, kw):
+        self.calls.append((name, kw))
+        r = self.results.pop(0)
+        if isinstance(r, BaseException):
+            raise r
+        return r
+
+    def get_tickers(self, **kw):
+        return self._next("get_tickers", kw)
+
+    def place_order(self, **kw):
+        return self._next("place_order", kw)
+
+
+def _client(*results):
+    ex = Scripted(*results)
+    s = ResilientClient(ex, policy=POLICY)
+    return s, ex
+
+
+OK = {"retCode": 0, "retMsg": "OK", "result": {}}
+
+
+@pytest.mark.parametrize("rc,cls,delays", [
+    (10002, RETRYABLE, [0.025, 0.05]),
+    (10006, RATE_LIMIT, [0.25, 0.5]),
+])
+def test_transient_retcodes_retry_with_backoff(sim, rc, cls, delays):
+    assert classify({"retCode": rc}) == cls and classify(_invalid(rc)) == cls
+    s, ex = _client(_invalid(rc), {"retCode": rc, "retMsg": "x"}, OK)
+    assert s.get_tickers(category="linear", symbol="BTCUSDT") == OK
+    assert len(ex.calls) == 3
+    assert sim.slept == pytest.approx(sum(delays))
+
+
+@pytest.mark.parametrize("rc", [10001, 110007, 110017])
+def test_fatal_retcodes_are_not_retried(sim, rc):
+    assert classify(_invalid(rc)) == FATAL
+    s, ex = _client(_invalid(rc), OK)
+    with pytest.raises(InvalidRequestError):
+        s.get_tickers(category="linear", symbol="BTCUSDT")
+    s2, ex2 = _client({"retCode": rc, "retMsg": "bad"}, OK)
+    assert s2.get_tickers(category="linear", symbol="BTCUSDT")["retCode"] == rc
+    assert len(ex.calls) == 1 and len(ex2.calls) == 1 and sim.slept == 0.0
+
+
+def test_write_without_order_link_id_is_never_retried(sim):
+    s, ex = _client(requests.exceptions.ReadTimeout("timeout"), OK)
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        s.place_order(category="linear", symbol="BTCUSDT", side="Buy", qty="0.01")
+    assert len(ex.calls) == 1
+
+    # mit orderLinkId idempotent → Retry
+    s, ex = _client(requests.exceptions.ReadTimeout("timeout"), OK)
+    assert s.place_order(category="linear", symbol="BTCUSDT", side="Buy", qty="0.01", orderLinkId="bb-1") == OK
+    assert len(ex.calls) == 2
+
+    # Rate-Limit-Ablehnung: Order wurde nicht angenommen → auch ohne orderLinkId wiederholbar
+    s, ex = _client(_invalid(10006), OK)
+    assert s.place_order(category="linear", symbol="BTCUSDT", side="Buy", qty="0.01") == OK
+    assert len(ex.calls) == 2
+
+
+def test_breaker_opens_and_half_opens(sim):
+    br = CircuitBreaker("get_kline", threshold=3, open_s=10.0)
+    for _ in range(3):
+        br.before()
+        br.failure()
+    assert br.state == "open"
+    with pytest.raises(CircuitOpen):
+        br.before()
+    assert CircuitBreaker("get_tickers", threshold=3, open_s=10.0).state == "closed"
+
+    sim.advance(10.0)
+    assert br.state == "half_open"
+    br.before()                                  # eine Probe
+    with pytest.raises(CircuitOpen):
+        br.before()                              # zweite parallele Probe gesperrt
+    br.failure()
+    assert br.state == "open"                    # Probe gescheitert → sofort wieder offen
+    sim.advance(10.0)
+    br.before()
+    br.success()
+    assert br.state == "closed"
+
+
+def test_breaker_per_endpoint_via_call(sim, monkeypatch):
+    monkeypatch.setenv("BREAKER_THRESHOLD", "2")
+    monkeypatch.setenv("BREAKER_OPEN_S", "5")
+    pol = Policy(max_retries=0)
+    n = {"a": 0}
+
+    def down():
+        n["a"] += 1
+        raise requests.exceptions.ConnectionError("reset")
+
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            resilience.call(down, endpoint="get_kline", policy=pol)
+    with pytest.raises(CircuitOpen):
+        resilience.call(down, endpoint="get_kline", policy=pol)
+    assert n["a"] == 2
+    assert resilience.call(lambda: OK, endpoint="get_tickers", policy=pol) == OK   # anderer Endpoint
+    sim.advance(5.0)
+    assert resilience.call(lambda: OK, endpoint="get_kline", policy=pol) == OK     # Probe ok
+    assert resilience.breaker("get_kline").state == "closed"
+
+
+@pytest.mark.parametrize("exc", [
+    FailedRequestError(request="GET /v5/market/tickers", message="Bad gateway", status_code=502,
+                       time="00:00:00", resp_headers=None),
+    FailedRequestError(request="GET /v5/market/tickers", message="Too many", status_code=429,
+                       time="00:00:00", resp_headers=None),
+    FailedRequestError(request="GET /v5/market/tickers", message="Bad request", status_code=400,
+                       time="00:00:00", resp_headers=None),
+    requests.exceptions.ConnectionError("reset"),
+    requests.exceptions.ReadTimeout("timeout"),
+    InvalidRequestError(request="x", message="Too many visits", status_code=10006, time="t", resp_headers={}),
+    InvalidRequestError(request="x", message="qty invalid", status_code=10001, time="t", resp_headers={}),
+    ValueError("boom"),
+])
+def test_replayed_error_classifies_like_live_exception(exc):
+    code = getattr(exc, "status_code", None)
+    rep = ReplayedError(type(exc).__name__, str(exc), code if isinstance(code, int) else None)
+    assert classify(rep) == classify(exc)
+    # ältere Mitschnitte ohne Statuscode: aus dem pybit-Text
+    assert classify(ReplayedError(type(exc).__name__, str(exc))) == classify(exc)
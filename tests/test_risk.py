@@ -0,0 +1,39 @@
+# tests/test_risk.py
+"""RiskEngine: Tages-PnL über den UTC-Tageswechsel."""
+from bot.events import OrderIntent
+from bot.risk import RiskEngine
+
+DAY = 86_400.0
+
+
+def _engine(now: float) -> RiskEngine:
+    eng = RiskEngine(start_equity=10_000.0, leverage=100, max_entries_per_hour=10, risk_per_trade_pct=100.0)
+    eng._day = int(now // DAY)
+    return eng
+
+
+def test_unrealized_loss_not_carried_into_next_day():
+    t0 = 10 * DAY + 3_600.0
+    eng = _engine(t0)
+    eng.on_fill("BTCUSDT", "LONG", 1.0, 100.0, now=t0)
+    eng.on_mark("BTCUSDT", 80.0, now=t0 + 60.0)
+    assert round(eng.daily_pnl_pct(), 6) == -0.2
+
+    # neuer Tag, gleicher Kurs → kein Tagesverlust
+    eng.on_mark("BTCUSDT", 80.0, now=t0 + DAY)
+    assert round(eng.daily_pnl_pct(), 6) == 0.0
+
+    # Realisierung zum gleichen Kurs zählt nicht noch einmal
+    eng.on_fill("BTCUSDT", "SHORT", 1.0, 80.0, now=t0 + DAY + 60.0)
+    assert round(eng.daily_pnl_pct(), 6) == 0.0
+    assert round(eng.equity, 6) == 9_980.0
+
+
+def test_halt_not_repeated_at_midnight():
+    t0 = 10 * DAY + 3_600.0
+    eng = _engine(t0)
+    eng.on_fill("BTCUSDT", "LONG", 10.0, 100.0, now=t0)
+    eng.on_mark("BTCUSDT", 78.0, now=t0 + 60.0)          # -2.2 % → Halt
+    assert eng.halted
+    ok, _ = eng.check(OrderIntent("ETHUSDT", "LONG", 0.01, 100.0), now=t0 + DAY)
+    assert ok and not eng.halted
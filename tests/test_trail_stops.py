@@ -0,0 +1,64 @@
+# tests/test_trail_stops.py
+"""Live-Trailing-Loop: Timeout zählt ab createdTime der Position, nicht ab Start des Loops."""
+import pytest
+
+import scripts.trail_stops as ts
+from bot import clock
+from bot.exits import ExitManager
+
+T0 = 1_700_000_000.0
+
+
+class FakeExchange:
+    def __init__(self, created_ms: int, last: float = 100.0):
+        self.created_ms = created_ms
+        self.last = last
+
+    @staticmethod
+    def _ok(result):
+        return {"retCode": 0, "retMsg": "OK", "result": result}
+
+    def get_positions(self, **kw):
+        return self._ok({"list": [{"symbol": ts.SYM, "side": "Buy", "size": "1", "avgPrice": "100",
+                                   "createdTime": str(self.created_ms), "stopLoss": "99",
+                                   "takeProfit": "0", "positionIdx": 0}]})
+
+    def get_tickers(self, **kw):
+        return self._ok({"list": [{"lastPrice": str(self.last)}]})
+
+    def get_instruments_info(self, **kw):
+        return self._ok({"list": [{"priceFilter": {"tickSize": "0.1"},
+                                   "lotSizeFilter": {"qtyStep": "0.001", "minOrderQty": "0.001"}}]})
+
+
+@pytest.fixture
+def flat_calls(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ts, "force_flat_now", lambda s, sym: calls.append(sym) or {"status": "closed"})
+    monkeypatch.setattr(ts, "log_event", lambda kind, payload: None)
+    return calls
+
+
+def _bars_ago(n: int) -> int:
+    return int(T0 * 1000) - n * ts.TF_MS
+
+
+def test_restart_resumes_bar_count_from_created_time(flat_calls):
+    with clock.use(clock.SimClock(T0)):
+        out = ts.step(FakeExchange(_bars_ago(10)), ExitManager(), {})
+    assert out["bars_open"] == 10 and "timeout" not in out and flat_calls == []
+
+
+def test_timeout_elapsed_while_loop_was_down_flattens_immediately(flat_calls):
+    with clock.use(clock.SimClock(T0)):
+        out = ts.step(FakeExchange(_bars_ago(60)), ExitManager(), {})
+    assert out["timeout"] == "closed" and flat_calls == [ts.SYM]
+
+
+def test_bar_change_counts_on_top_of_seeded_bars(flat_calls):
+    ex, exits, state = FakeExchange(_bars_ago(49)), ExitManager(), {}
+    with clock.use(clock.SimClock(T0)) as c:
+        assert ts.step(ex, exits, state)["bars_open"] == 49
+        c.advance(ts.TF_MS / 1000.0)
+        out = ts.step(ex, exits, state)
+    assert out["bars_open"] == 50 and out["timeout"] == "closed"